@@ -0,0 +1,127 @@
+"""
+Request-coalescing embedding service.
+
+Concurrent requests each need one query embedding. Encoding them one at a
+time wastes the batched matrix throughput SentenceTransformer gets on CPU, so
+EmbeddingBatcher queues texts from all threads, encodes whatever arrives
+within max_wait_ms (up to max_batch_size texts) in one call, and hands each
+caller its own vector.
+"""
+
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+# Upper bounds (ms) of the queueing-delay histogram buckets
+QUEUE_DELAY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250]
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts from concurrent callers and encodes them in batches.
+
+    A single daemon worker thread takes the first queued text, then keeps
+    collecting until max_batch_size texts are gathered or max_wait_ms has
+    passed since that first text was queued, and calls encode_batch once.
+    """
+
+    def __init__(self, encode_batch: Callable[[List[str]], List[List[float]]],
+                 max_batch_size: int = 32, max_wait_ms: float = 5):
+        self.encode_batch = encode_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self.queue_delay_buckets = [0] * (len(QUEUE_DELAY_BUCKETS_MS) + 1)
+        self.queue_delay_sum_ms = 0.0
+        self.queue_delay_max_ms = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(
+                        target=self._run, name='embedding-batcher', daemon=True
+                    )
+                    self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue text for embedding and return a Future for its vector."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.monotonic()))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        """Embed text through the batcher, blocking until its batch is encoded."""
+        return self.submit(text).result()
+
+    def _collect(self) -> list:
+        first = self._queue.get()
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            self._record(batch, started)
+            try:
+                vectors = self.encode_batch([text for text, _, _ in batch])
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future, _), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def _record(self, batch: list, started: float) -> None:
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+            for _, _, queued in batch:
+                delay_ms = (started - queued) * 1000
+                self.queue_delay_buckets[bisect_left(QUEUE_DELAY_BUCKETS_MS, delay_ms)] += 1
+                self.queue_delay_sum_ms += delay_ms
+                self.queue_delay_max_ms = max(self.queue_delay_max_ms, delay_ms)
+
+    def stats(self) -> Dict:
+        """Return batch size distribution and queueing delay metrics."""
+        with self._lock:
+            bucket_labels = [f"<={bound}ms" for bound in QUEUE_DELAY_BUCKETS_MS] + [
+                f">{QUEUE_DELAY_BUCKETS_MS[-1]}ms"
+            ]
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'errors': self.errors,
+                'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+                'batch_sizes': dict(sorted(self.batch_sizes.items())),
+                'queue_delay_avg_ms': round(self.queue_delay_sum_ms / self.items, 3) if self.items else 0.0,
+                'queue_delay_max_ms': round(self.queue_delay_max_ms, 3),
+                'queue_delay_histogram': dict(zip(bucket_labels, self.queue_delay_buckets)),
+                'queued': self._queue.qsize(),
+            }
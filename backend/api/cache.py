@@ -0,0 +1,369 @@
+"""
+In-process caches for the RAG pipeline.
+
+EmbeddingCache: bounded LRU of query embeddings with TTL and hit/miss
+counters, optionally backed by a SQLite file shared by all worker processes
+on the host.
+
+SemanticAnswerCache: generated answers keyed by query embedding and the
+retrieved sources, so near-duplicate questions skip the LLM call.
+
+FAQRowCache: question/answer/category of recently retrieved FAQs, so
+hydrating sources from the FAQ table usually needs no query at all.
+"""
+
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query for cache lookups.
+
+    Case folding and whitespace collapsing don't change the embedding of the
+    (uncased) MiniLM model, so normalized variants can share one cache entry.
+    """
+    return _WHITESPACE_RE.sub(' ', text).strip().casefold()
+
+
+class SQLiteEmbeddingStore:
+    """
+    On-disk embedding store shared across processes through one SQLite file.
+
+    Vectors are stored as float32 blobs. Each thread gets its own connection;
+    WAL mode lets readers in other workers proceed while one writes.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int = 100000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[List[float]]:
+        row = self._connection().execute(
+            "SELECT vector, created FROM embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            return None
+        return array('f', row[0]).tolist()
+
+    def set(self, key: str, embedding: List[float]) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO embeddings (key, vector, created) VALUES (?, ?, ?)",
+            (key, array('f', embedding).tobytes(), time.time())
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            # Keep the file bounded: drop expired rows, then the oldest overflow
+            if self.ttl:
+                conn.execute("DELETE FROM embeddings WHERE created < ?", (time.time() - self.ttl,))
+            conn.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                "SELECT key FROM embeddings ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM embeddings")
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings keyed by normalized text.
+
+    Entries expire after ttl seconds (0 disables expiry). On a local miss the
+    optional shared store is consulted before the embedding is computed.
+    All methods are thread-safe.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600,
+                 store: Optional[SQLiteEmbeddingStore] = None, namespace: str = ''):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.store = store
+        self.namespace = namespace
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.store_hits = 0
+
+    def _store_key(self, key: str) -> str:
+        return hashlib.sha1(f"{self.namespace}\x1f{key}".encode('utf-8')).hexdigest()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for text, or None."""
+        key = normalize_query(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                embedding, created = entry
+                if self.ttl and time.monotonic() - created > self.ttl:
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding
+
+        if self.store is not None:
+            embedding = self.store.get(self._store_key(key))
+            if embedding is not None:
+                self._put(key, embedding)
+                with self._lock:
+                    self.hits += 1
+                    self.store_hits += 1
+                return embedding
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, text: str, embedding: List[float]) -> None:
+        """Store embedding for text locally and in the shared store."""
+        key = normalize_query(text)
+        self._put(key, embedding)
+        if self.store is not None:
+            self.store.set(self._store_key(key), embedding)
+
+    def _put(self, key: str, embedding: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = (embedding, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, text: str, compute: Callable[[str], List[float]]) -> List[float]:
+        """Return the cached embedding for text, computing and storing it on a miss."""
+        embedding = self.get(text)
+        if embedding is None:
+            embedding = compute(text)
+            self.set(text, embedding)
+        return embedding
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> Dict:
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'shared_hits': self.store_hits,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class FAQRowCache:
+    """
+    Bounded LRU of FAQ rows (question, answer, category) keyed by FAQ id.
+
+    Entries expire after ttl seconds (0 disables expiry), which bounds how
+    long an FAQ edited by another process can be served stale. Ingestion in
+    this process clears the cache. All methods are thread-safe.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()  # id -> (row, created)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, ids: List[int]) -> Dict[int, Dict]:
+        """Return the cached rows among ids; missing or expired ids are left out."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for faq_id in ids:
+                entry = self._entries.get(faq_id)
+                if entry is not None and self.ttl and now - entry[1] > self.ttl:
+                    del self._entries[faq_id]
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(faq_id)
+                self.hits += 1
+                found[faq_id] = entry[0]
+        return found
+
+    def set_many(self, rows: Dict[int, Dict]) -> None:
+        """Store rows keyed by FAQ id."""
+        now = time.monotonic()
+        with self._lock:
+            for faq_id, row in rows.items():
+                self._entries[faq_id] = (row, now)
+                self._entries.move_to_end(faq_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def sources_signature(sources: List[Dict]) -> Tuple:
+    """
+    Identify a retrieved source list by FAQ id and content.
+
+    Including a digest of the text means an FAQ edited by another process
+    (e.g. the loader) no longer matches answers generated from its old text.
+    """
+    return tuple(
+        (str(source['id']), hashlib.sha1(
+            f"{source['question']}\x1f{source['answer']}".encode('utf-8')
+        ).hexdigest())
+        for source in sources
+    )
+
+
+class SemanticAnswerCache:
+    """
+    LRU cache of generated answers looked up by embedding similarity.
+
+    A cached answer is reused when the new query's embedding has cosine
+    similarity >= threshold with the cached query AND the same sources were
+    retrieved. Embeddings live in one preallocated float32 matrix so a lookup
+    is a single matrix-vector product. All methods are thread-safe.
+    """
+
+    def __init__(self, max_size: int = 512, ttl: float = 3600, threshold: float = 0.95,
+                 dimensions: int = 384):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self._matrix = np.zeros((max_size, dimensions), dtype=np.float32)
+        self._active = np.zeros(max_size, dtype=bool)
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()  # slot -> (signature, answer, created)
+        self._free = list(range(max_size - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _release(self, slot: int) -> None:
+        del self._entries[slot]
+        self._active[slot] = False
+        self._free.append(slot)
+
+    def get(self, embedding: List[float], sources: List[Dict]) -> Optional[str]:
+        """Return a cached answer for a similar query with the same sources, or None."""
+        query = self._normalize(embedding)
+        signature = sources_signature(sources)
+        now = time.monotonic()
+
+        with self._lock:
+            if self._entries:
+                similarities = self._matrix @ query
+                similarities[~self._active] = -1.0
+                for slot in np.argsort(-similarities):
+                    slot = int(slot)
+                    if similarities[slot] < self.threshold:
+                        break
+                    cached_signature, answer, created = self._entries[slot]
+                    if self.ttl and now - created > self.ttl:
+                        self._release(slot)
+                        continue
+                    if cached_signature == signature:
+                        self._entries.move_to_end(slot)
+                        self.hits += 1
+                        return answer
+            self.misses += 1
+            return None
+
+    def set(self, embedding: List[float], sources: List[Dict], answer: str) -> None:
+        """Store answer for the query embedding and its retrieved sources."""
+        with self._lock:
+            if not self._free:
+                oldest = next(iter(self._entries))
+                self._release(oldest)
+                self.evictions += 1
+            slot = self._free.pop()
+            self._matrix[slot] = self._normalize(embedding)
+            self._active[slot] = True
+            self._entries[slot] = (sources_signature(sources), answer, time.monotonic())
+
+    def invalidate(self) -> None:
+        """Drop every cached answer, e.g. after the FAQ corpus changed."""
+        with self._lock:
+            for slot in list(self._entries):
+                self._release(slot)
+            self.invalidations += 1
+
+    def stats(self) -> Dict:
+        """Return size and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,75 @@
+"""
+Query-side category classifier for category-aware retrieval.
+
+Each category is represented by the normalized mean (centroid) of its FAQ
+embeddings. A question is routed to the category whose centroid is most
+similar to its embedding, but only when that category clearly beats the
+runner-up; ambiguous questions are searched across the whole corpus, so a
+wrong guess cannot hide the right FAQ.
+
+The centroids come from the vector index (see BaseRetriever.category_classifier):
+NumpyRetriever stores them next to the index at build time, ChromaRetriever
+in a separate file written after ingestion (rag.refresh_retriever_index).
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Category filter value that lets the classifier pick the partition
+AUTO_CATEGORY = 'auto'
+
+
+def category_centroids(embeddings, codes, n_categories: int) -> np.ndarray:
+    """
+    L2-normalized mean embedding per category code.
+
+    Args:
+        embeddings: (N, D) array-like of embeddings
+        codes: Category code (0 .. n_categories - 1) per row
+        n_categories: Number of categories
+
+    Returns:
+        (n_categories, D) float32 matrix; categories without rows are zero
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    codes = np.asarray(codes, dtype=np.int64)
+    sums = np.zeros((n_categories, embeddings.shape[1] if embeddings.ndim == 2 else 0), dtype=np.float64)
+    np.add.at(sums, codes, embeddings)
+    norms = np.linalg.norm(sums, axis=1, keepdims=True)
+    return (sums / np.where(norms == 0, 1, norms)).astype(np.float32)
+
+
+class CentroidClassifier:
+    """
+    Nearest-centroid category classifier: one (C, D) matrix-vector product
+    per question.
+
+    Args:
+        names: Category name per centroid row
+        centroids: (C, D) L2-normalized centroids
+    """
+
+    def __init__(self, names: Sequence[str], centroids):
+        self.names = list(names)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+
+    def rank(self, query_embedding: Sequence[float]) -> List[Tuple[str, float]]:
+        """Return (category, cosine similarity to its centroid) pairs, best first."""
+        if not self.names:
+            return []
+        scores = self.centroids @ np.asarray(query_embedding, dtype=np.float32)
+        order = np.argsort(-scores)
+        return [(self.names[i], float(scores[i])) for i in order]
+
+    def predict(self, query_embedding: Sequence[float], min_margin: float = 0.0) -> Optional[str]:
+        """
+        Return the best category, or None when its similarity beats the
+        runner-up's by less than min_margin (or there are no categories).
+        """
+        ranked = self.rank(query_embedding)
+        if not ranked:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < min_margin:
+            return None
+        return ranked[0][0]
@@ -0,0 +1,161 @@
+"""
+Embedding runtimes behind RAGEngine.embedding_model.
+
+'torch' (default): sentence_transformers.SentenceTransformer on PyTorch.
+'onnx': the same all-MiniLM-L6-v2 network exported to ONNX by
+    manage.py export_onnx_embedder and run with onnxruntime and the
+    tokenizers library, so workers never import PyTorch. With
+    RAG_ONNX_QUANTIZED the int8 dynamically quantized export is used.
+
+Both expose SentenceTransformer's encode(sentences, batch_size,
+normalize_embeddings), so callers don't depend on the runtime.
+"""
+
+import os
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+ONNX_MODEL_FILE = 'model.onnx'
+ONNX_QUANTIZED_MODEL_FILE = 'model_quantized.onnx'
+TOKENIZER_FILE = 'tokenizer.json'
+MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2's max_seq_length
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+    """Average token embeddings over real (unpadded) tokens, like the model's Pooling layer."""
+    mask = attention_mask[..., np.newaxis].astype(token_embeddings.dtype)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    return summed / counts
+
+
+def onnx_model_path(model_dir: str, quantized: bool = False) -> str:
+    return os.path.join(model_dir, ONNX_QUANTIZED_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+
+
+class OnnxEmbedder:
+    """
+    Sentence embeddings from an exported transformer with ONNX Runtime.
+
+    Args:
+        session: onnxruntime.InferenceSession whose first output is the
+            last hidden state (batch, tokens, dimensions)
+        tokenizer: tokenizers.Tokenizer with truncation and padding enabled
+    """
+
+    def __init__(self, session, tokenizer):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.input_names = {model_input.name for model_input in session.get_inputs()}
+
+    @classmethod
+    def from_directory(cls, model_dir: str, quantized: bool = False, threads: int = 0) -> 'OnnxEmbedder':
+        """
+        Load an export made by manage.py export_onnx_embedder.
+
+        Args:
+            model_dir: Directory with model.onnx (and model_quantized.onnx) and tokenizer.json
+            quantized: Load the int8 model
+            threads: ONNX Runtime intra-op threads (0: one per core)
+
+        Raises:
+            FileNotFoundError: if the export is missing
+        """
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        path = onnx_model_path(model_dir, quantized)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"No ONNX embedding model at {path}; run 'python manage.py export_onnx_embedder'"
+            )
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+        tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        tokenizer.enable_truncation(MAX_SEQ_LENGTH)
+        tokenizer.enable_padding(pad_id=0, pad_token='[PAD]')
+        return cls(session, tokenizer)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            feeds['token_type_ids'] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, feeds)[0]
+        return mean_pool(token_embeddings, attention_mask)
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """
+        Embed one sentence (1-D result) or a list (2-D result, input order).
+
+        Texts are batched longest first, as SentenceTransformer does, so each
+        batch pads to similar lengths. Other SentenceTransformer keyword
+        arguments (show_progress_bar, ...) are accepted and ignored.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        pooled: Optional[np.ndarray] = None
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            batch = self._encode_batch([texts[row] for row in rows])
+            if pooled is None:
+                pooled = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+            pooled[rows] = batch
+
+        if normalize_embeddings:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled[0] if single else pooled
+
+
+def compare_rankings(reference_corpus: np.ndarray, reference_queries: np.ndarray,
+                     corpus: np.ndarray, queries: np.ndarray, top_k: int = 2) -> Dict[str, float]:
+    """
+    How closely one runtime reproduces another's retrieval.
+
+    Each argument is a matrix of L2-normalized embeddings; the queries are
+    ranked against their own runtime's corpus by cosine similarity.
+
+    Returns:
+        min_cosine / mean_cosine between the runtimes' query vectors,
+        top1_agreement (same best match) and topk_overlap (shared share of
+        the top_k ids), the last two averaged over queries
+    """
+    cosines = (reference_queries * queries).sum(axis=1)
+    reference_top = np.argsort(-(reference_queries @ reference_corpus.T), axis=1)[:, :top_k]
+    top = np.argsort(-(queries @ corpus.T), axis=1)[:, :top_k]
+    overlap = [len(set(a) & set(b)) / top_k for a, b in zip(reference_top, top)]
+    return {
+        'min_cosine': round(float(cosines.min()), 4),
+        'mean_cosine': round(float(cosines.mean()), 4),
+        'top1_agreement': round(float((reference_top[:, 0] == top[:, 0]).mean()), 4),
+        f'top{top_k}_overlap': round(float(np.mean(overlap)), 4),
+    }
+
+
+def load_embedder(runtime: str, model_name: str, onnx_model_dir: str,
+                  quantized: bool = False, threads: int = 0):
+    """
+    Load the embedding model for runtime ('torch' or 'onnx').
+
+    Raises:
+        ValueError: for an unknown runtime
+    """
+    if runtime == 'torch':
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(model_name)
+    if runtime == 'onnx':
+        return OnnxEmbedder.from_directory(onnx_model_dir, quantized=quantized, threads=threads)
+    raise ValueError(f"Unknown RAG_EMBEDDING_RUNTIME: {runtime!r}")
@@ -0,0 +1,240 @@
+"""
+Pluggable answer generation backends behind rag.request_answer.
+
+GatewayGenerator: chat completions through an LLMGateway (api.llm). Used
+    with the Groq client ('groq', the default) and with
+    OpenAICompatibleClient for a local server ('local') - llama.cpp's
+    llama-server running a small GGUF model on CPU, Ollama, vLLM, or
+    anything else serving POST {base_url}/chat/completions.
+FakeGenerator: deterministic offline answers with a configurable time to
+    first token and token rate ('fake'), so load tests and CI benchmarks
+    can run the full process_question path without network or API quota.
+
+rag.get_generator() picks one by RAG_GENERATOR_BACKEND. Every backend
+offers complete(), stream() and acomplete() and raises
+LLMUnavailableError when it cannot answer.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+from .llm import LLMGateway
+
+
+class BaseGenerator:
+    """Interface for answer generation backends."""
+
+    name = 'base'
+
+    def complete(self, messages: List[Dict], max_tokens: int, temperature: float) -> str:
+        """Return the completion text for chat messages."""
+        raise NotImplementedError
+
+    def stream(self, messages: List[Dict], max_tokens: int, temperature: float) -> Iterator[str]:
+        """Yield completion text fragments in order."""
+        raise NotImplementedError
+
+    async def acomplete(self, messages: List[Dict], max_tokens: int, temperature: float) -> str:
+        """Async complete()."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        """Backend name plus backend-specific metrics."""
+        return {'backend': self.name}
+
+
+class GatewayGenerator(BaseGenerator):
+    """Generation through an LLMGateway with a fixed model name."""
+
+    def __init__(self, name: str, gateway: LLMGateway, model: str):
+        self.name = name
+        self.gateway = gateway
+        self.model = model
+
+    def complete(self, messages, max_tokens, temperature):
+        return self.gateway.complete(messages, model=self.model, max_tokens=max_tokens,
+                                     temperature=temperature)
+
+    def stream(self, messages, max_tokens, temperature):
+        yield from self.gateway.stream(messages, model=self.model, max_tokens=max_tokens,
+                                       temperature=temperature)
+
+    async def acomplete(self, messages, max_tokens, temperature):
+        return await self.gateway.acomplete(messages, model=self.model, max_tokens=max_tokens,
+                                            temperature=temperature)
+
+    def stats(self):
+        return {'backend': self.name, 'model': self.model, **self.gateway.stats()}
+
+
+class UpstreamHTTPError(Exception):
+    """Non-2xx response from an OpenAI-compatible server (retried by LLMGateway if 429/5xx)."""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}: {response.text[:200]}")
+        self.status_code = response.status_code
+        self.response = response
+
+
+class OpenAICompatibleClient:
+    """
+    Minimal OpenAI-style chat completions client over httpx, shaped like the
+    Groq SDK (client.chat.completions.create) so LLMGateway can drive it.
+
+    Args:
+        base_url: Server URL up to and including the API prefix, e.g.
+            http://127.0.0.1:8080/v1
+        api_key: Sent as a bearer token when set
+        max_connections: Size of the keep-alive connection pool
+        is_async: Build an httpx.AsyncClient and return coroutines from create()
+    """
+
+    def __init__(self, base_url: str, api_key: str = '', max_connections: int = 4,
+                 is_async: bool = False):
+        import httpx
+
+        self._httpx = httpx
+        headers = {'Authorization': f"Bearer {api_key}"} if api_key else {}
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        client_class = httpx.AsyncClient if is_async else httpx.Client
+        self._http = client_class(base_url=base_url.rstrip('/'), headers=headers, limits=limits)
+        create = self._acreate if is_async else self._create
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+    def _translate(self, error: Exception) -> Exception:
+        """Map httpx transport errors onto the builtins LLMGateway retries."""
+        if isinstance(error, self._httpx.TimeoutException):
+            return TimeoutError(str(error))
+        if isinstance(error, self._httpx.TransportError):
+            return ConnectionError(str(error))
+        return error
+
+    @staticmethod
+    def _parse(body: Dict):
+        usage = body.get('usage') or {}
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=body['choices'][0]['message']['content']))],
+            usage=SimpleNamespace(total_tokens=usage.get('total_tokens')),
+        )
+
+    @staticmethod
+    def _chunks(lines) -> Iterator:
+        """Parse 'data: {...}' server-sent event lines into chunk objects."""
+        for line in lines:
+            if not line.startswith('data:'):
+                continue
+            data = line[len('data:'):].strip()
+            if data == '[DONE]':
+                return
+            choices = json.loads(data).get('choices') or []
+            yield SimpleNamespace(choices=[
+                SimpleNamespace(delta=SimpleNamespace(content=(choice.get('delta') or {}).get('content')))
+                for choice in choices
+            ])
+
+    def _create(self, timeout: Optional[float] = None, stream: bool = False, **request):
+        try:
+            if stream:
+                return self._stream(timeout, request)
+            response = self._http.post('/chat/completions', json=request, timeout=timeout)
+        except Exception as e:
+            raise self._translate(e) from e
+        if response.status_code >= 400:
+            raise UpstreamHTTPError(response)
+        return self._parse(response.json())
+
+    def _stream(self, timeout, request):
+        try:
+            with self._http.stream('POST', '/chat/completions', json=dict(request, stream=True),
+                                   timeout=timeout) as response:
+                if response.status_code >= 400:
+                    response.read()
+                    raise UpstreamHTTPError(response)
+                yield from self._chunks(response.iter_lines())
+        except UpstreamHTTPError:
+            raise
+        except Exception as e:
+            raise self._translate(e) from e
+
+    async def _acreate(self, timeout: Optional[float] = None, **request):
+        try:
+            response = await self._http.post('/chat/completions', json=request, timeout=timeout)
+        except Exception as e:
+            raise self._translate(e) from e
+        if response.status_code >= 400:
+            raise UpstreamHTTPError(response)
+        return self._parse(response.json())
+
+
+class FakeGenerator(BaseGenerator):
+    """
+    Deterministic stand-in for an LLM.
+
+    The answer depends only on the prompt, so repeated runs produce the same
+    text. Timing follows a simple model: latency_ms before the first token,
+    then tokens_per_second (0 for instant output).
+
+    Args:
+        latency_ms: Time to first token
+        tokens_per_second: Output rate after the first token (0: instant)
+        answer_tokens: Words in each answer (capped at max_tokens)
+    """
+
+    name = 'fake'
+
+    WORDS = (
+        "the", "court", "may", "require", "written", "notice", "within", "days", "of", "filing",
+        "and", "a", "party", "should", "consult", "an", "attorney", "about", "their", "rights",
+    )
+
+    def __init__(self, latency_ms: float = 200, tokens_per_second: float = 50,
+                 answer_tokens: int = 80):
+        self.latency = latency_ms / 1000
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.calls = 0
+
+    def answer_words(self, messages: List[Dict], max_tokens: int) -> List[str]:
+        prompt = '\n'.join(message.get('content') or '' for message in messages)
+        digest = hashlib.sha256(prompt.encode()).digest()
+        count = max(1, min(self.answer_tokens, max_tokens))
+        words = [self.WORDS[digest[i % len(digest)] % len(self.WORDS)] for i in range(count)]
+        words[0] = words[0].capitalize()
+        words[-1] += '.'
+        return words
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+    def complete(self, messages, max_tokens, temperature):
+        self.calls += 1
+        words = self.answer_words(messages, max_tokens)
+        time.sleep(self.latency + self._token_delay() * (len(words) - 1))
+        return ' '.join(words)
+
+    def stream(self, messages, max_tokens, temperature):
+        self.calls += 1
+        words = self.answer_words(messages, max_tokens)
+        time.sleep(self.latency)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self._token_delay())
+            yield word if i == 0 else ' ' + word
+
+    async def acomplete(self, messages, max_tokens, temperature):
+        self.calls += 1
+        words = self.answer_words(messages, max_tokens)
+        await asyncio.sleep(self.latency + self._token_delay() * (len(words) - 1))
+        return ' '.join(words)
+
+    def stats(self):
+        return {
+            'backend': self.name,
+            'calls': self.calls,
+            'latency_ms': round(self.latency * 1000, 3),
+            'tokens_per_second': self.tokens_per_second,
+        }
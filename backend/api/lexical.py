@@ -0,0 +1,253 @@
+"""
+In-process BM25 index over FAQ questions and answers.
+
+Dense retrieval ranks exact legal terms ("FMLA", "Chapter 7", statute
+numbers) poorly, so hybrid search runs this lexical index next to the vector
+search and fuses both rankings with reciprocal rank fusion (fuse_rrf).
+
+Postings are stored per term as two NumPy arrays (int32 document rows and
+uint16 term frequencies), about 6 bytes per posting. A query touches only
+the postings of its terms, which keeps lookups well under a millisecond at
+100k documents.
+"""
+
+import re
+import math
+import time
+import threading
+from array import array
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.db import connections
+
+# Keeps alphanumeric runs together, including "401k", "chapter", "7", "1983"
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how i if in into is it
+its me my of on or our so than that the their them then there these they this
+to was we what when where which who why will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase text and split it into BM25 terms, dropping stopwords and
+    single letters (the "s" of "it's"); single digits ("Chapter 7") are kept.
+    """
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if token not in STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+
+class BM25Index:
+    """
+    Immutable BM25 index over (faq_id, category, text) documents.
+
+    Build with BM25Index.build(); a changed corpus gets a new index rather
+    than in-place updates, so readers never see a half-updated one.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = np.zeros(0, dtype=np.int64)
+        self.doc_categories = np.zeros(0, dtype=np.int16)
+        self.category_names: List[str] = []
+        # term -> (document rows, BM25 weight of the term in each row)
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[int, str, str]], k1: float = 1.5, b: float = 0.75) -> 'BM25Index':
+        """
+        Build an index from (faq_id, category, text) tuples.
+
+        Args:
+            documents: Iterable of documents (consumed once)
+            k1: Term frequency saturation
+            b: Document length normalization
+
+        Returns:
+            The new BM25Index
+        """
+        index = cls(k1=k1, b=b)
+        doc_ids, categories, lengths = [], [], []
+        # Typed arrays keep the build at a few bytes per posting
+        term_docs = defaultdict(lambda: array('i'))
+        term_tfs = defaultdict(lambda: array('H'))
+
+        for row, (faq_id, category, text) in enumerate(documents):
+            counts = Counter(tokenize(text))
+            doc_ids.append(faq_id)
+            categories.append(category)
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                term_docs[term].append(row)
+                term_tfs[term].append(min(tf, 65535))
+
+        n_docs = len(doc_ids)
+        index.category_names = sorted(set(categories))
+        code_of = {name: code for code, name in enumerate(index.category_names)}
+        index.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        index.doc_categories = np.asarray([code_of[c] for c in categories], dtype=np.int16)
+
+        lengths = np.asarray(lengths, dtype=np.float32)
+        avg_length = float(lengths.mean()) if n_docs else 1.0
+        # Per-document part of the BM25 denominator: k1 * (1 - b + b * len / avg)
+        length_norm = k1 * (1 - b + b * lengths / max(avg_length, 1.0))
+
+        # Weights are precomputed per posting (idf * saturated tf), so a query
+        # only sums them; float16 is ample precision for ranking
+        for term, rows in term_docs.items():
+            rows = np.frombuffer(rows, dtype=np.int32)
+            tf = np.frombuffer(term_tfs[term], dtype=np.uint16).astype(np.float32)
+            idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            weights = idf * tf * (k1 + 1) / (tf + length_norm[rows])
+            index.postings[term] = (rows, weights.astype(np.float16))
+        return index
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def postings_bytes(self) -> int:
+        """Memory used by the postings arrays."""
+        return sum(rows.nbytes + weights.nbytes for rows, weights in self.postings.values())
+
+    def search(self, query: str, top_k: int, categories: Optional[Sequence[str]] = None) -> List[Dict]:
+        """
+        Return up to top_k documents by BM25 score, best first.
+
+        Returns:
+            List of {'id': '12', 'score': 7.3}
+        """
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        if not terms or top_k <= 0:
+            return []
+
+        # One bincount over the concatenated postings sums each row's weights
+        rows = np.concatenate([self.postings[term][0] for term in terms])
+        weights = np.concatenate([self.postings[term][1] for term in terms])
+        scores = np.bincount(rows, weights=weights, minlength=len(self.doc_ids))
+        if categories:
+            wanted = [self.category_names.index(c) for c in categories if c in self.category_names]
+            scores[~np.isin(self.doc_categories, wanted)] = 0
+
+        k = min(top_k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [
+            {'id': str(int(self.doc_ids[row])), 'score': float(scores[row])}
+            for row in best
+            if scores[row] > 0
+        ]
+
+
+def fuse_rrf(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Reciprocal rank fusion: score(d) = sum over rankings of 1 / (k + rank).
+
+    Args:
+        rankings: Lists of document ids, each best first
+        k: Damping constant (60 in the original RRF paper)
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndexManager:
+    """
+    Keeps a BM25Index in sync with the FAQ table.
+
+    The first call to get() builds the index synchronously. After that, a
+    changed corpus - flagged by invalidate() after in-process ingestion, or
+    detected by comparing load_fingerprint() every refresh_seconds, which
+    catches loads run from other processes - is rebuilt on a background
+    thread while queries keep using the previous index.
+
+    Args:
+        load_documents: Callable returning an iterable of (faq_id, category, text)
+        load_fingerprint: Callable returning a value that changes with the corpus
+        refresh_seconds: Minimum interval between fingerprint checks
+    """
+
+    def __init__(self, load_documents: Callable[[], Iterable[Tuple[int, str, str]]],
+                 load_fingerprint: Callable[[], str], refresh_seconds: float = 60):
+        self.load_documents = load_documents
+        self.load_fingerprint = load_fingerprint
+        self.refresh_seconds = refresh_seconds
+        self._index: Optional[BM25Index] = None
+        self._fingerprint = None
+        self._stale = False
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def _build(self) -> None:
+        fingerprint = self.load_fingerprint()
+        index = BM25Index.build(self.load_documents())
+        self._index, self._fingerprint = index, fingerprint
+        self.rebuilds += 1
+
+    def _refresh(self) -> None:
+        try:
+            if self._stale or self.load_fingerprint() != self._fingerprint:
+                # Cleared before the build so an invalidate() during it is kept
+                self._stale = False
+                try:
+                    self._build()
+                except Exception:
+                    self._stale = True  # Retried by the next query
+                    raise
+        except Exception as e:
+            print(f"Error rebuilding lexical index: {e}")
+        finally:
+            self._refreshing = False
+            connections.close_all()  # This thread's database connection
+
+    def get(self) -> BM25Index:
+        """Return the current index, starting a background refresh if one is due."""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._build()
+                    self._checked_at = time.monotonic()
+            return self._index
+
+        now = time.monotonic()
+        if (self._stale or now - self._checked_at >= self.refresh_seconds) and not self._refreshing:
+            with self._lock:
+                if not self._refreshing:
+                    self._refreshing = True
+                    self._checked_at = now
+                    threading.Thread(target=self._refresh, name='lexical-index-refresh',
+                                     daemon=True).start()
+        return self._index
+
+    def reset_after_fork(self) -> None:
+        """Keep the index but drop lock and refresh state of the parent's threads."""
+        self._lock = threading.Lock()
+        self._refreshing = False  # A parent refresh thread does not exist here
+
+    def invalidate(self) -> None:
+        """Mark the index stale so the next query triggers a background rebuild."""
+        self._stale = True
+
+    def stats(self) -> Dict:
+        """Return index size and rebuild count."""
+        index = self._index
+        return {
+            'documents': len(index) if index is not None else 0,
+            'terms': len(index.postings) if index is not None else 0,
+            'postings_bytes': index.postings_bytes() if index is not None else 0,
+            'rebuilds': self.rebuilds,
+        }
@@ -0,0 +1,495 @@
+"""
+Gateway between the RAG pipeline and the Groq chat completions API.
+
+Every LLM call goes through LLMGateway, which:
+- caps concurrent upstream calls (max_concurrency); sync and async callers
+  queue for the same slots, the async ones on their event loop,
+- paces requests and tokens with token buckets sized to the provider's
+  per-minute limits, so bursts queue locally instead of drawing 429s,
+- retries timeouts, connection errors, 429s and 5xx responses with jittered
+  exponential backoff (honouring Retry-After),
+- gives each call a deadline covering queueing, retries and the request.
+
+When a call cannot complete within its deadline it raises
+LLMUnavailableError, which the views turn into 503 responses instead of
+a 200 carrying an error message. The Groq clients themselves are built by
+RAGEngine with a pooled keep-alive HTTP connection and SDK retries off.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+# Upper bounds (ms) of the queue-wait and upstream-latency histogram buckets
+LATENCY_BUCKETS_MS = [10, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Characters per token used to estimate prompt size before the call
+CHARS_PER_TOKEN = 4
+
+RETRYABLE_STATUS = {408, 409, 429}
+RETRYABLE_ERRORS = ('APITimeoutError', 'APIConnectionError', 'InternalServerError', 'RateLimitError')
+
+
+class LLMUnavailableError(Exception):
+    """
+    The LLM could not answer within the call's deadline (rate limited,
+    overloaded, timing out or failing).
+
+    Attributes:
+        retry_after: Suggested seconds before retrying, if known
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at per_minute / 60 tokens per second, holding at
+    most burst tokens (default: one minute's worth).
+
+    reserve() takes tokens immediately and returns how long the caller must
+    wait before using them, so waiting callers are served in order.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60
+        self.capacity = burst or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Take amount tokens (capped at the bucket size).
+
+        Returns:
+            Seconds to wait before proceeding, or None - with nothing
+            taken - if that would exceed max_wait
+        """
+        with self._lock:
+            self._refill()
+            amount = min(amount, self.capacity)
+            wait = max(0.0, (amount - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= amount
+            return wait
+
+    def adjust(self, amount: float) -> None:
+        """Take (positive) or return (negative) tokens after the fact."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status of an SDK error, if it carries one."""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Retry-After header of an SDK error response, in seconds."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection failures, 408/409/429 and 5xx are worth retrying."""
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or \
+        type(error).__name__ in RETRYABLE_ERRORS
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _SlotWaiter:
+    """A caller queued for an LLMGateway slot: a thread (event) or a coroutine (future)."""
+
+    __slots__ = ('loop', 'event', 'future', 'granted')
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop
+        self.event = threading.Event() if loop is None else None
+        self.future = loop.create_future() if loop is not None else None
+        self.granted = False
+
+    def wake(self) -> None:
+        """Signal the grant; raises RuntimeError if the waiter's loop is closed."""
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+
+
+class LLMGateway:
+    """
+    Concurrency-limited, rate-aware wrapper around a chat completions client.
+
+    Args:
+        get_client: Returns the (sync) OpenAI-style client, e.g. groq.Groq
+        get_async_client: Returns the async client, e.g. groq.AsyncGroq
+        max_concurrency: Upstream calls allowed in flight at once
+        requests_per_minute: Request budget (0 disables request pacing)
+        tokens_per_minute: Token budget (0 disables token pacing)
+        max_retries: Retries after the first attempt
+        backoff_base: First backoff delay in seconds, doubled per retry
+        backoff_max: Largest backoff delay in seconds
+        timeout: Longest single upstream request in seconds
+        deadline: Default total time per call in seconds
+    """
+
+    def __init__(self, get_client: Callable, get_async_client: Optional[Callable] = None,
+                 max_concurrency: int = 8, requests_per_minute: float = 0,
+                 tokens_per_minute: float = 0, max_retries: int = 3,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 timeout: float = 20.0, deadline: float = 30.0):
+        self.get_client = get_client
+        self.get_async_client = get_async_client
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.deadline = deadline
+        # Free upstream slots, and callers queued for one in arrival order;
+        # a released slot is handed straight to the first waiter
+        self._slot_lock = threading.Lock()
+        self._free_slots = max_concurrency
+        self._slot_waiters: Deque[_SlotWaiter] = deque()
+        self._request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.calls = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.attempts = 0
+        self.retries = 0
+        self.upstream_rate_limited = 0
+        self.in_flight = 0
+        self.queue_wait_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.queue_wait_sum_ms = 0.0
+        self.queue_wait_max_ms = 0.0
+        self.upstream_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.upstream_sum_ms = 0.0
+        self.upstream_max_ms = 0.0
+
+    # Shared steps of the sync and async paths
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+        """Prompt tokens (estimated from characters) plus the completion budget."""
+        chars = sum(len(message.get('content') or '') for message in messages)
+        return chars // CHARS_PER_TOKEN + max_tokens
+
+    def _deadline_error(self, what: str, retry_after: Optional[float] = None) -> LLMUnavailableError:
+        with self._lock:
+            self.failed += 1
+        return LLMUnavailableError(f"LLM unavailable: {what}", retry_after=retry_after)
+
+    def _reserve_rate(self, tokens: int, deadline_at: float) -> float:
+        """Reserve request and token budget; returns the wait before calling."""
+        remaining = deadline_at - time.monotonic()
+        waits = []
+        reserved = []
+        for bucket, amount in ((self._request_bucket, 1), (self._token_bucket, tokens)):
+            if bucket is None:
+                continue
+            wait = bucket.reserve(amount, max_wait=remaining)
+            if wait is None:
+                for taken_bucket, taken in reserved:
+                    taken_bucket.adjust(-taken)
+                raise self._deadline_error(
+                    "rate limit budget exhausted", retry_after=min(amount, bucket.capacity) / bucket.rate
+                )
+            reserved.append((bucket, amount))
+            waits.append(wait)
+        return max(waits, default=0.0)
+
+    def _record_queue_wait(self, seconds: float) -> None:
+        wait_ms = seconds * 1000
+        with self._lock:
+            self.queue_wait_buckets[bisect_left(LATENCY_BUCKETS_MS, wait_ms)] += 1
+            self.queue_wait_sum_ms += wait_ms
+            self.queue_wait_max_ms = max(self.queue_wait_max_ms, wait_ms)
+
+    def _record_upstream(self, seconds: float) -> None:
+        latency_ms = seconds * 1000
+        with self._lock:
+            self.attempts += 1
+            self.upstream_buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+            self.upstream_sum_ms += latency_ms
+            self.upstream_max_ms = max(self.upstream_max_ms, latency_ms)
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline_at: float) -> float:
+        """Backoff before the next attempt, or raise LLMUnavailableError to give up."""
+        if error_status(error) == 429:
+            with self._lock:
+                self.upstream_rate_limited += 1
+        retry_after = retry_after_seconds(error)
+        if not is_retryable(error):
+            raise self._deadline_error(f"{type(error).__name__}: {error}") from error
+        if attempt >= self.max_retries:
+            raise self._deadline_error(
+                f"gave up after {attempt + 1} attempts ({type(error).__name__}: {error})",
+                retry_after=retry_after
+            ) from error
+
+        # Full jitter: uniform in [0, base * 2^attempt], at least Retry-After
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if time.monotonic() + delay >= deadline_at:
+            raise self._deadline_error(
+                f"deadline reached while retrying ({type(error).__name__}: {error})",
+                retry_after=retry_after
+            ) from error
+        with self._lock:
+            self.retries += 1
+        return delay
+
+    def _succeeded(self, response, estimated_tokens: int) -> None:
+        with self._lock:
+            self.succeeded += 1
+        usage = getattr(response, 'usage', None)
+        total_tokens = getattr(usage, 'total_tokens', None)
+        if self._token_bucket is not None and isinstance(total_tokens, int):
+            self._token_bucket.adjust(total_tokens - estimated_tokens)
+
+    def _start_call(self, deadline: Optional[float]) -> float:
+        with self._lock:
+            self.calls += 1
+        return time.monotonic() + (deadline if deadline is not None else self.deadline)
+
+    def _acquire_slot(self, deadline_at: float) -> None:
+        with self._slot_lock:
+            waiter = self._take_slot_or_queue()
+        if waiter is not None:
+            waiter.event.wait(max(0.0, deadline_at - time.monotonic()))
+            with self._slot_lock:
+                if not waiter.granted:
+                    self._slot_waiters.remove(waiter)
+                    raise self._deadline_error("all LLM connections busy until the deadline")
+        with self._lock:
+            self.in_flight += 1
+
+    async def _aacquire_slot(self, deadline_at: float) -> None:
+        """
+        _acquire_slot() for the async path: the caller waits on a future that
+        _release_slot() resolves through call_soon_threadsafe, so waiting
+        for a slot ties up neither the event loop nor an executor thread.
+        """
+        with self._slot_lock:
+            waiter = self._take_slot_or_queue(asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter.future, max(0.0, deadline_at - time.monotonic()))
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                with self._slot_lock:
+                    if not waiter.granted:
+                        self._slot_waiters.remove(waiter)
+                    elif isinstance(e, asyncio.CancelledError):
+                        self._hand_off_slot()  # Granted just as the caller was cancelled
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                if not waiter.granted:
+                    raise self._deadline_error("all LLM connections busy until the deadline") from None
+        with self._lock:
+            self.in_flight += 1
+
+    def _take_slot_or_queue(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional['_SlotWaiter']:
+        """Take a free slot (returns None) or queue a waiter behind earlier ones. Call with _slot_lock held."""
+        if self._free_slots and not self._slot_waiters:
+            self._free_slots -= 1
+            return None
+        waiter = _SlotWaiter(loop)
+        self._slot_waiters.append(waiter)
+        return waiter
+
+    def _hand_off_slot(self) -> None:
+        """Give a freed slot to the longest-waiting caller, or back to the pool. Call with _slot_lock held."""
+        while self._slot_waiters:
+            waiter = self._slot_waiters.popleft()
+            try:
+                waiter.wake()
+            except RuntimeError:  # The waiter's event loop has closed
+                continue
+            waiter.granted = True
+            return
+        self._free_slots += 1
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        with self._slot_lock:
+            self._hand_off_slot()
+
+    # Public API
+
+    def complete(self, messages: List[Dict], model: str, max_tokens: int,
+                 deadline: Optional[float] = None, **params) -> str:
+        """
+        Chat completion text for messages.
+
+        Args:
+            messages: Chat messages
+            model: Model name
+            max_tokens: Completion token limit
+            deadline: Seconds the whole call may take (default: self.deadline)
+            **params: Other create() arguments (temperature, ...)
+
+        Raises:
+            LLMUnavailableError: if no answer could be obtained in time
+        """
+        deadline_at = self._start_call(deadline)
+        estimated = self.estimate_tokens(messages, max_tokens)
+        queued = time.monotonic()
+        self._acquire_slot(deadline_at)
+        try:
+            for attempt in range(self.max_retries + 1):
+                wait = self._reserve_rate(estimated, deadline_at)
+                if wait:
+                    time.sleep(wait)
+                if attempt == 0:
+                    self._record_queue_wait(time.monotonic() - queued)
+                started = time.monotonic()
+                try:
+                    response = self.get_client().chat.completions.create(
+                        messages=messages, model=model, max_tokens=max_tokens,
+                        timeout=max(0.001, min(self.timeout, deadline_at - started)), **params
+                    )
+                except Exception as e:
+                    self._record_upstream(time.monotonic() - started)
+                    time.sleep(self._retry_delay(e, attempt, deadline_at))
+                    continue
+                self._record_upstream(time.monotonic() - started)
+                self._succeeded(response, estimated)
+                return response.choices[0].message.content.strip()
+        finally:
+            self._release_slot()
+
+    def stream(self, messages: List[Dict], model: str, max_tokens: int,
+               deadline: Optional[float] = None, **params) -> Iterator[str]:
+        """
+        Stream completion text fragments. Failures before the first fragment
+        are retried like complete(); later failures are raised as
+        LLMUnavailableError since part of the answer was already sent.
+        """
+        deadline_at = self._start_call(deadline)
+        estimated = self.estimate_tokens(messages, max_tokens)
+        queued = time.monotonic()
+        self._acquire_slot(deadline_at)
+        try:
+            for attempt in range(self.max_retries + 1):
+                wait = self._reserve_rate(estimated, deadline_at)
+                if wait:
+                    time.sleep(wait)
+                if attempt == 0:
+                    self._record_queue_wait(time.monotonic() - queued)
+                started = time.monotonic()
+                sent_any = False
+                responded = False
+                try:
+                    chunks = self.get_client().chat.completions.create(
+                        messages=messages, model=model, max_tokens=max_tokens, stream=True,
+                        timeout=max(0.001, min(self.timeout, deadline_at - started)), **params
+                    )
+                    for chunk in chunks:
+                        if not responded:
+                            # Time to first chunk (often role-only, without content)
+                            responded = True
+                            self._record_upstream(time.monotonic() - started)
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            sent_any = True
+                            yield delta
+                except Exception as e:
+                    if sent_any:
+                        raise self._deadline_error(f"stream interrupted ({type(e).__name__}: {e})") from e
+                    if not responded:
+                        self._record_upstream(time.monotonic() - started)
+                    time.sleep(self._retry_delay(e, attempt, deadline_at))
+                    continue
+                with self._lock:
+                    self.succeeded += 1
+                return
+        finally:
+            self._release_slot()
+
+    async def acomplete(self, messages: List[Dict], model: str, max_tokens: int,
+                        deadline: Optional[float] = None, **params) -> str:
+        """
+        Async complete() using the async client. Waiting for rate budget or
+        a free slot happens on the event loop.
+        """
+        deadline_at = self._start_call(deadline)
+        estimated = self.estimate_tokens(messages, max_tokens)
+        queued = time.monotonic()
+        await self._aacquire_slot(deadline_at)
+        try:
+            for attempt in range(self.max_retries + 1):
+                wait = self._reserve_rate(estimated, deadline_at)
+                if wait:
+                    await asyncio.sleep(wait)
+                if attempt == 0:
+                    self._record_queue_wait(time.monotonic() - queued)
+                started = time.monotonic()
+                try:
+                    response = await self.get_async_client().chat.completions.create(
+                        messages=messages, model=model, max_tokens=max_tokens,
+                        timeout=max(0.001, min(self.timeout, deadline_at - started)), **params
+                    )
+                except Exception as e:
+                    self._record_upstream(time.monotonic() - started)
+                    await asyncio.sleep(self._retry_delay(e, attempt, deadline_at))
+                    continue
+                self._record_upstream(time.monotonic() - started)
+                self._succeeded(response, estimated)
+                return response.choices[0].message.content.strip()
+        finally:
+            self._release_slot()
+
+    def stats(self) -> Dict:
+        """Return call counters, queue wait and upstream latency metrics."""
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        with self._lock:
+            queued = sum(self.queue_wait_buckets)
+            return {
+                'calls': self.calls,
+                'succeeded': self.succeeded,
+                'failed': self.failed,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'upstream_rate_limited': self.upstream_rate_limited,
+                'in_flight': self.in_flight,
+                'max_concurrency': self.max_concurrency,
+                'queue_wait_avg_ms': round(self.queue_wait_sum_ms / queued, 3) if queued else 0.0,
+                'queue_wait_max_ms': round(self.queue_wait_max_ms, 3),
+                'queue_wait_histogram': dict(zip(labels, self.queue_wait_buckets)),
+                'upstream_latency_avg_ms': round(self.upstream_sum_ms / self.attempts, 3) if self.attempts else 0.0,
+                'upstream_latency_max_ms': round(self.upstream_max_ms, 3),
+                'upstream_latency_histogram': dict(zip(labels, self.upstream_buckets)),
+            }
@@ -0,0 +1,245 @@
+"""
+Background writer for QueryLog rows.
+
+Saving a QueryLog on the request path costs a SQLite write transaction per
+request, and concurrent writers serialize on the database lock.
+QueryLogSink instead queues rows in memory and a single worker thread
+writes them with bulk_create, every batch_size rows or flush_interval_ms,
+whichever comes first. Queued rows are flushed at interpreter exit.
+
+Rows are written by write_query_logs(), which also updates the stats
+rollups (api.rollups) in the same transaction. Async views use
+arecord_query_log(), which inserts with the async ORM instead.
+"""
+
+import queue
+import atexit
+import threading
+import time
+from typing import Dict, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import QueryLog
+from .rollups import update_rollups
+
+# What submit() does when the queue is full
+FULL_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+
+def write_query_logs(query_logs: List[QueryLog]) -> None:
+    """Insert QueryLog rows and add them to the stats rollups, atomically."""
+    with transaction.atomic():
+        QueryLog.objects.bulk_create(query_logs)
+        update_rollups(query_logs)
+
+
+class QueryLogSink:
+    """
+    Bounded queue of unsaved QueryLog rows drained by one worker thread.
+
+    Args:
+        max_queue: Maximum rows waiting to be written
+        batch_size: Rows per bulk_create
+        flush_interval_ms: Longest time a row waits before being written
+        full_policy: 'drop_newest' (reject the new row), 'drop_oldest'
+            (discard the oldest queued row) or 'block' (wait up to
+            block_timeout seconds for space, then drop the new row)
+        block_timeout: Seconds submit() may wait under the 'block' policy
+    """
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 200,
+                 flush_interval_ms: float = 500, full_policy: str = 'drop_newest',
+                 block_timeout: float = 1.0):
+        if full_policy not in FULL_POLICIES:
+            raise ValueError(f"Unknown full_policy {full_policy!r}, expected one of {FULL_POLICIES}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self._queue: 'queue.Queue[QueryLog]' = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0  # Submitted rows not yet written or dropped
+        self._worker = None
+
+        # Metrics
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(
+                        target=self._run, name='query-log-sink', daemon=True
+                    )
+                    self._worker.start()
+
+    def submit(self, query_log: QueryLog) -> bool:
+        """
+        Queue an unsaved QueryLog for writing.
+
+        Returns:
+            False if the row was dropped because the queue was full
+        """
+        self._ensure_worker()
+        with self._lock:
+            self._pending += 1
+        try:
+            if self.full_policy == 'block':
+                self._queue.put(query_log, timeout=self.block_timeout)
+            elif self.full_policy == 'drop_oldest':
+                while True:
+                    try:
+                        self._queue.put_nowait(query_log)
+                        break
+                    except queue.Full:
+                        try:
+                            self._queue.get_nowait()
+                        except queue.Empty:
+                            continue
+                        self._finish(dropped=1)
+            else:
+                self._queue.put_nowait(query_log)
+        except queue.Full:
+            self._finish(dropped=1)
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _finish(self, flushed: int = 0, dropped: int = 0, failed: int = 0) -> None:
+        with self._lock:
+            self.flushed += flushed
+            self.dropped += dropped
+            self.failed += failed
+            self._pending -= flushed + dropped + failed
+            if self._pending <= 0:
+                self._idle.notify_all()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            close_old_connections()
+            try:
+                write_query_logs(batch)
+            except Exception as e:
+                print(f"Error writing {len(batch)} query logs: {e}")
+                self._finish(failed=len(batch))
+            else:
+                with self._lock:
+                    self.batches += 1
+                self._finish(flushed=len(batch))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every row submitted so far has been written (or dropped).
+
+        Returns:
+            False if timeout expired first
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: self._pending <= 0, timeout=timeout)
+
+    def stats(self) -> Dict:
+        """Return queue depth and enqueued/flushed/dropped/failed counters."""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'enqueued': self.enqueued,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches,
+                'full_policy': self.full_policy,
+            }
+
+
+_sink: Optional[QueryLogSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_query_log_sink() -> Optional[QueryLogSink]:
+    """
+    Return the process-wide sink configured by RAG_QUERY_LOG_*, or None
+    when RAG_QUERY_LOG_ASYNC is disabled and rows are saved inline.
+    """
+    global _sink
+    if not settings.RAG_QUERY_LOG_ASYNC:
+        return None
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = QueryLogSink(
+                    max_queue=settings.RAG_QUERY_LOG_QUEUE_SIZE,
+                    batch_size=settings.RAG_QUERY_LOG_BATCH_SIZE,
+                    flush_interval_ms=settings.RAG_QUERY_LOG_FLUSH_MS,
+                    full_policy=settings.RAG_QUERY_LOG_FULL_POLICY,
+                    block_timeout=settings.RAG_QUERY_LOG_BLOCK_TIMEOUT
+                )
+                atexit.register(_sink.flush, timeout=5)
+    return _sink
+
+
+def reset_after_fork() -> None:
+    """Drop a sink inherited from the pre-fork parent; the worker builds its own."""
+    global _sink, _sink_lock
+    _sink, _sink_lock = None, threading.Lock()
+
+
+def record_query_log(query_log: QueryLog) -> None:
+    """Write query_log through the sink, or save it now if the sink is disabled."""
+    sink = get_query_log_sink()
+    if sink is None:
+        write_query_logs([query_log])
+    else:
+        sink.submit(query_log)
+
+
+async def arecord_query_log(query_log: QueryLog) -> None:
+    """
+    record_query_log() for async views. Without a sink the row is inserted
+    with the async ORM and then added to the rollups; the rollup update
+    needs a transaction and row locks, which the async ORM doesn't offer,
+    so it runs in a thread (a failure there leaves the rollups behind until
+    backfill_rollups()). A sink with the 'block' policy may wait for queue
+    space, so that submit runs in a thread too.
+    """
+    sink = get_query_log_sink()
+    if sink is None:
+        await query_log.asave()
+        await sync_to_async(update_rollups)([query_log])
+    elif sink.full_policy == 'block':
+        await sync_to_async(sink.submit)(query_log)
+    else:
+        sink.submit(query_log)  # Never waits
+
+
+def record_query_logs(query_logs: List[QueryLog]) -> None:
+    """Write many rows: queued on the sink, or saved in one bulk insert if it is disabled."""
+    sink = get_query_log_sink()
+    if sink is None:
+        if query_logs:
+            write_query_logs(query_logs)
+    else:
+        for query_log in query_logs:
+            sink.submit(query_log)
@@ -0,0 +1,103 @@
+"""
+Answer a JSONL file of questions offline with the batch RAG pipeline.
+
+Each input line is an object with a "question" key; any other keys (e.g. an
+intake "id") are copied to the matching output line, which adds answer,
+sources, cache_hit and processing_time. Output lines are written as answers
+complete, so their order differs from the input. Questions are processed in
+chunks of --chunk-size and logged to QueryLog in bulk.
+
+Usage:
+    python manage.py ask_batch questions.jsonl [--output answers.jsonl]
+        [--chunk-size 500] [--no-log]
+"""
+
+import json
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api import rag
+from api.logsink import get_query_log_sink, record_query_logs
+from api.views import build_query_log
+
+
+class Command(BaseCommand):
+    help = "Answer questions from a JSONL file and write answers as JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="JSONL file of {\"question\": ...} objects ('-' for stdin)")
+        parser.add_argument('--output', help="Where to write answers (default: stdout)")
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.RAG_BATCH_MAX_QUESTIONS,
+            help="Questions embedded and searched together"
+        )
+        parser.add_argument('--no-log', action='store_true', help="Do not write QueryLog rows")
+
+    def read_items(self, path):
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        items = []
+        with stream:
+            for line_number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    item = json.loads(line)
+                except ValueError as e:
+                    raise CommandError(f"Line {line_number}: invalid JSON ({e})")
+                question = item.get('question') if isinstance(item, dict) else None
+                if not isinstance(question, str) or not question.strip():
+                    raise CommandError(f"Line {line_number}: missing \"question\"")
+                item['question'] = question.strip()
+                items.append(item)
+        return items
+
+    def handle(self, *args, **options):
+        items = self.read_items(options['input'])
+        chunk_size = max(1, options['chunk_size'])
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else self.stdout
+
+        start = time.perf_counter()
+        timings = {'embedding': 0.0, 'search': 0.0}
+        results = []
+        try:
+            for offset in range(0, len(items), chunk_size):
+                chunk = items[offset:offset + chunk_size]
+                questions = [item['question'] for item in chunk]
+                chunk_start = time.perf_counter()
+                chunk_timings = {}
+                query_logs = []
+                for index, result in rag.process_questions(questions, timings=chunk_timings):
+                    processing_time = round(time.perf_counter() - chunk_start, 2)
+                    results.append(result)
+                    query_logs.append(build_query_log(
+                        None, questions[index], result, processing_time, user_agent='manage.py ask_batch'
+                    ))
+                    line = {
+                        **chunk[index],
+                        'answer': result['answer'],
+                        'sources': result['sources'],
+                        'cache_hit': result['cache_hit'],
+                        'exact_match': result['exact_match'],
+                        'processing_time': processing_time,
+                    }
+                    if result.get('error'):
+                        line['error'] = result['error']
+                    output.write(json.dumps(line) + '\n')
+                for stage in timings:
+                    timings[stage] += chunk_timings.get(stage, 0.0)
+                if not options['no_log']:
+                    record_query_logs(query_logs)
+                self.stderr.write(f"Answered {len(results)}/{len(items)} questions")
+        finally:
+            if output is not self.stdout:
+                output.close()
+
+        sink = get_query_log_sink()
+        if sink is not None:
+            sink.flush(timeout=30)
+
+        report = rag.batch_report(results, time.perf_counter() - start, timings)
+        self.stderr.write(self.style.SUCCESS(json.dumps(report, indent=2)))
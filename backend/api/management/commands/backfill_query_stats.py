@@ -0,0 +1,27 @@
+"""
+Recompute the /api/stats/ rollups from the QueryLog table, e.g. to repair
+them after QueryLog rows were edited or deleted (migration 0010 backfills
+the logs written before the rollups existed).
+
+Usage:
+    python manage.py backfill_query_stats
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.models import QueryLog
+from api.rollups import backfill_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild QueryStatsRollup rows from QueryLog."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Aggregating {QueryLog.objects.count()} query logs...")
+        start = time.perf_counter()
+        rows = backfill_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} rollup rows in {time.perf_counter() - start:.2f}s."
+        ))
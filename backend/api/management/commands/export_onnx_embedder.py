@@ -0,0 +1,109 @@
+"""
+Export the embedding model to ONNX for RAG_EMBEDDING_RUNTIME='onnx'.
+
+Writes model.onnx (fp32), model_quantized.onnx (int8 dynamic quantization
+of the weights, unless --no-quantize) and tokenizer.json to
+RAG_ONNX_MODEL_DIR, then checks that both exports rank the curated FAQs
+like the PyTorch model. Needs sentence_transformers, torch, onnx and
+onnxruntime here; serving the export needs only onnxruntime and tokenizers.
+
+Usage:
+    python manage.py export_onnx_embedder [--output DIR] [--no-quantize] [--opset 14]
+"""
+
+import json
+import os
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import rag
+from api.embeddings import (
+    MAX_SEQ_LENGTH, ONNX_MODEL_FILE, ONNX_QUANTIZED_MODEL_FILE,
+    OnnxEmbedder, compare_rankings,
+)
+
+SEED_FAQS_PATH = os.path.join(settings.BASE_DIR, 'data', 'legal_faqs.json')
+HELDOUT_PATH = os.path.join(settings.BASE_DIR, 'benchmarks', 'data', 'heldout_questions.json')
+
+
+class Command(BaseCommand):
+    help = "Export the sentence embedding model to ONNX (fp32 and int8) for the onnx runtime."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.RAG_ONNX_MODEL_DIR,
+                            help="Export directory (default: RAG_ONNX_MODEL_DIR)")
+        parser.add_argument('--no-quantize', action='store_true', help="Skip the int8 model")
+        parser.add_argument('--opset', type=int, default=14)
+
+    def export(self, model, path, opset):
+        import inspect
+
+        import torch
+
+        class LastHiddenState(torch.nn.Module):
+            # Keyword call: forward()'s positional order varies across transformers versions
+            def __init__(self, transformer):
+                super().__init__()
+                self.transformer = transformer
+
+            def forward(self, input_ids, attention_mask, token_type_ids):
+                return self.transformer(input_ids=input_ids, attention_mask=attention_mask,
+                                        token_type_ids=token_type_ids).last_hidden_state
+
+        transformer = LastHiddenState(model[0].auto_model).eval()
+        sample = model.tokenizer(["An example legal question?"], return_tensors='pt',
+                                 padding='max_length', max_length=16)
+        names = ['input_ids', 'attention_mask', 'token_type_ids']
+        dynamic = {'input_ids': {0: 'batch', 1: 'tokens'}, 'attention_mask': {0: 'batch', 1: 'tokens'},
+                   'token_type_ids': {0: 'batch', 1: 'tokens'}, 'last_hidden_state': {0: 'batch', 1: 'tokens'}}
+        # torch>=2.9 defaults to the dynamo exporter (needs onnxscript); the
+        # TorchScript exporter handles dynamic_axes on every supported version
+        legacy = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer, tuple(sample[name] for name in names), path,
+                input_names=names, output_names=['last_hidden_state'],
+                dynamic_axes=dynamic, opset_version=opset, **legacy
+            )
+
+    def handle(self, *args, **options):
+        from sentence_transformers import SentenceTransformer
+
+        output = options['output']
+        os.makedirs(output, exist_ok=True)
+        model = SentenceTransformer(rag.EMBEDDING_MODEL_NAME)
+        if model.max_seq_length != MAX_SEQ_LENGTH:
+            self.stderr.write(self.style.WARNING(
+                f"Model max_seq_length is {model.max_seq_length}, the onnx runtime truncates at {MAX_SEQ_LENGTH}"
+            ))
+
+        fp32_path = os.path.join(output, ONNX_MODEL_FILE)
+        self.export(model, fp32_path, options['opset'])
+        model.tokenizer.save_pretrained(output)  # Writes tokenizer.json (fast tokenizer)
+        self.stdout.write(f"Wrote {fp32_path} ({os.path.getsize(fp32_path) / 1e6:.1f} MB)")
+
+        variants = [('onnx', False)]
+        if not options['no_quantize']:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            int8_path = os.path.join(output, ONNX_QUANTIZED_MODEL_FILE)
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+            self.stdout.write(f"Wrote {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB)")
+            variants.append(('onnx-int8', True))
+
+        with open(SEED_FAQS_PATH, encoding='utf-8') as f:
+            corpus = [faq['question'] for faq in json.load(f)]
+        with open(HELDOUT_PATH, encoding='utf-8') as f:
+            queries = [item['question'] for item in json.load(f)]
+        reference = [np.asarray(model.encode(texts, normalize_embeddings=True)) for texts in (corpus, queries)]
+        for name, quantized in variants:
+            embedder = OnnxEmbedder.from_directory(output, quantized=quantized)
+            candidate = [embedder.encode(texts, normalize_embeddings=True) for texts in (corpus, queries)]
+            report = compare_rankings(*reference, *candidate)
+            self.stdout.write(f"{name:<10} vs torch: {json.dumps(report)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported to {output}. Set RAG_EMBEDDING_RUNTIME=onnx (and RAG_ONNX_QUANTIZED=true for int8)."
+        ))
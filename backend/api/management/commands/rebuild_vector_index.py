@@ -0,0 +1,51 @@
+"""
+Rebuild the ChromaDB collection with the configured distance space and HNSW
+parameters (RAG_HNSW_*). Needed once for collections created before cosine
+space was set or that still store question/answer text in their metadata,
+and after changing any HNSW setting.
+
+Usage:
+    python manage.py rebuild_vector_index [--from-database] [--check]
+"""
+
+from django.core.management.base import BaseCommand
+
+from api import rag
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ChromaDB collection with the configured cosine/HNSW settings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-database', action='store_true',
+            help="Re-embed FAQs from the database instead of copying stored vectors"
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report whether the collection needs a rebuild"
+        )
+
+    def handle(self, *args, **options):
+        collection = rag.get_engine().collection
+        mismatches = rag.collection_config_mismatches(collection.metadata)
+        stores_payloads = rag.collection_stores_payloads(collection)
+
+        if options['check']:
+            if mismatches or stores_payloads:
+                for key, (current, wanted) in mismatches.items():
+                    self.stdout.write(f"  {key}: {current} -> {wanted}")
+                if stores_payloads:
+                    self.stdout.write("  metadata: question/answer text -> category only")
+                self.stdout.write(self.style.WARNING("Collection needs a rebuild."))
+            else:
+                self.stdout.write(self.style.SUCCESS("Collection matches the configuration."))
+            return
+
+        self.stdout.write(f"Rebuilding '{rag.COLLECTION_NAME}' ({collection.count()} vectors)...")
+        count = rag.rebuild_collection(from_database=options['from_database'])
+        rag.refresh_retriever_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt '{rag.COLLECTION_NAME}' with {count} vectors. "
+            f"Restart running servers to pick up the new collection."
+        ))
@@ -0,0 +1,78 @@
+"""
+Run the retrieval service for web workers with RAG_RETRIEVAL_MODE='service'
+(see api.retrieval_service).
+
+The service loads the embedding model (RAG_EMBEDDING_RUNTIME), the vector
+index (RAG_RETRIEVER) and, with RAG_HYBRID_SEARCH, the BM25 index, then
+answers embed and embed-plus-search requests on RAG_RETRIEVAL_SOCKET until
+interrupted. Encodes from all clients are batched together.
+
+Usage:
+    python manage.py run_retrieval_service [--socket PATH]
+        [--max-batch-size 32] [--max-wait-ms 5]
+"""
+
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import rag
+from api.retrieval_service import RetrievalServer
+
+
+class Command(BaseCommand):
+    help = "Serve embedding and FAQ search over a Unix socket for RAG_RETRIEVAL_MODE=service."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=settings.RAG_RETRIEVAL_SOCKET,
+                            help="Socket path (default: RAG_RETRIEVAL_SOCKET)")
+        parser.add_argument('--max-batch-size', type=int, default=settings.RAG_EMBEDDING_BATCH_MAX_SIZE,
+                            help="Most texts encoded together across clients")
+        parser.add_argument('--max-wait-ms', type=float, default=settings.RAG_EMBEDDING_BATCH_MAX_WAIT_MS,
+                            help="How long a text waits for others to join its batch")
+
+    def handle(self, *args, **options):
+        # This process is the service: embed and search in-process
+        settings.RAG_RETRIEVAL_MODE = 'local'
+
+        self.stdout.write("Loading embedding model and indexes...")
+        model = rag.get_engine().embedding_model
+        model.encode("warm up")
+        retriever = rag.get_retriever()
+        if settings.RAG_HYBRID_SEARCH:
+            rag.get_lexical_index().get()
+
+        def encode_batch(texts):
+            return model.encode(texts, batch_size=rag.EMBEDDING_BATCH_SIZE, normalize_embeddings=True)
+
+        def search(questions, embeddings, top_k, categories):
+            if len(questions) == 1:  # Runs BM25 alongside the vector search
+                return [rag.search_hits(questions[0], embeddings[0], top_k, categories)]
+            return rag.search_hits_many(questions, embeddings, top_k, categories)
+
+        def describe():
+            return {
+                'vectors': retriever.count(),
+                'retriever': retriever.name,
+                'embedding_runtime': rag.embedding_runtime_name(),
+                'hybrid_search': settings.RAG_HYBRID_SEARCH,
+            }
+
+        server = RetrievalServer(
+            options['socket'], encode_batch, search, describe,
+            max_batch_size=options['max_batch_size'], max_wait_ms=options['max_wait_ms']
+        )
+        # shutdown() waits for serve_forever(), so it can't run on this thread
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+        self.stdout.write(self.style.SUCCESS(
+            f"Retrieval service listening on {options['socket']} ({describe()['vectors']} vectors)"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write("Retrieval service stopped.")
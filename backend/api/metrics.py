@@ -0,0 +1,275 @@
+"""
+Per-stage latency instrumentation for the RAG pipeline.
+
+A StageTimer follows one question through its stages (embed, retrieve,
+generate, persist) on the monotonic clock. The durations are saved on the
+QueryLog row and, when the request finishes, folded into PipelineMetrics,
+which /api/metrics/ renders in the Prometheus text exposition format.
+
+When RAG_TRACING is enabled and opentelemetry-api is installed, each
+request is also emitted as a 'rag.request' span with one child span per
+stage. Exporting the spans is left to the deployment's OpenTelemetry SDK
+setup (e.g. opentelemetry-instrument).
+
+Metrics are per process: scrape every worker, or run one.
+"""
+
+import resource
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+STAGES = ('embed', 'retrieve', 'generate', 'persist')
+
+# Upper bounds (seconds) of the stage and request latency histogram buckets
+LATENCY_BUCKETS_SECONDS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+# QueryLog field that stores each stage's duration (persist happens after
+# the row is built, so it is only observed in the metrics)
+STAGE_LOG_FIELDS = {'embed': 'embed_time', 'retrieve': 'retrieve_time', 'generate': 'generate_time'}
+
+
+def get_tracer():
+    """OpenTelemetry tracer when RAG_TRACING is enabled and available, else None."""
+    if not settings.RAG_TRACING:
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    return trace.get_tracer('legal_qa.rag')
+
+
+def process_memory() -> Dict[str, int]:
+    """
+    This process's memory in bytes.
+
+    Returns:
+        max_rss everywhere; on Linux also rss, pss (shared pages split
+        between the processes mapping them) and uss (private pages: what
+        one more pre-forked worker costs)
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    memory = {'max_rss': max_rss if sys.platform == 'darwin' else max_rss * 1024}
+    try:
+        with open('/proc/self/smaps_rollup', encoding='ascii') as f:
+            fields = {
+                name: int(value.split()[0]) * 1024
+                for name, value in (line.split(':', 1) for line in f if ':' in line)
+                if value.strip().endswith('kB')
+            }
+    except OSError:
+        return memory
+    memory.update(
+        rss=fields.get('Rss', 0),
+        pss=fields.get('Pss', 0),
+        uss=fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    )
+    return memory
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_SECONDS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs including '+Inf'."""
+        pairs, total = [], 0
+        for bound, count in zip([*map(str, self.buckets), '+Inf'], self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    pairs = (
+        name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels.items()
+    )
+    return '{' + ','.join(pairs) + '}'
+
+
+class PipelineMetrics:
+    """Process-wide request counters and stage latency histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str], int] = {}      # (endpoint, status) -> count
+        self.cache_hits: Dict[str, int] = {}                # endpoint -> answer cache hits
+        self.stage_errors: Dict[str, int] = {}              # stage -> exceptions raised in it
+        self.stage_latency: Dict[str, Histogram] = {}
+        self.request_latency: Dict[str, Histogram] = {}
+
+    def record(self, endpoint: str, status: str, seconds: float, durations: Dict[str, float],
+               errors: List[str], cache_hit: bool) -> None:
+        with self._lock:
+            key = (endpoint, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            if cache_hit:
+                self.cache_hits[endpoint] = self.cache_hits.get(endpoint, 0) + 1
+            for stage in errors:
+                self.stage_errors[stage] = self.stage_errors.get(stage, 0) + 1
+            for stage, duration in durations.items():
+                self.stage_latency.setdefault(stage, Histogram()).observe(duration)
+            self.request_latency.setdefault(endpoint, Histogram()).observe(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.__init__()
+
+    def render(self, extra: Optional[List[Tuple[str, str, str, Dict, float]]] = None) -> str:
+        """
+        Prometheus text exposition (format 0.0.4).
+
+        Args:
+            extra: (name, type, help, labels, value) samples from other
+                components, e.g. cache counters read at scrape time
+        """
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def histogram(name, text, label, histograms):
+            header(name, 'histogram', text)
+            for value, hist in sorted(histograms.items()):
+                for bound, count in hist.cumulative():
+                    lines.append(f"{name}_bucket{format_labels({label: value, 'le': bound})} {count}")
+                lines.append(f"{name}_sum{format_labels({label: value})} {hist.sum:.6f}")
+                lines.append(f"{name}_count{format_labels({label: value})} {hist.count}")
+
+        with self._lock:
+            header('rag_requests_total', 'counter', "Questions answered, by endpoint and status.")
+            for (endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f"rag_requests_total{format_labels({'endpoint': endpoint, 'status': status})} {count}")
+            header('rag_answer_cache_hits_total', 'counter', "Answers served from the semantic answer cache.")
+            for endpoint, count in sorted(self.cache_hits.items()):
+                lines.append(f"rag_answer_cache_hits_total{format_labels({'endpoint': endpoint})} {count}")
+            header('rag_stage_errors_total', 'counter', "Exceptions raised inside a pipeline stage.")
+            for stage, count in sorted(self.stage_errors.items()):
+                lines.append(f"rag_stage_errors_total{format_labels({'stage': stage})} {count}")
+            histogram('rag_stage_duration_seconds', "Time spent in each pipeline stage.",
+                      'stage', self.stage_latency)
+            histogram('rag_request_duration_seconds', "End-to-end question latency.",
+                      'endpoint', self.request_latency)
+
+        seen = set()
+        for name, kind, text, labels, value in extra or []:
+            if name not in seen:
+                header(name, kind, text)
+                seen.add(name)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+pipeline_metrics = PipelineMetrics()
+
+
+class StageTimer:
+    """
+    Times the stages of one question on the monotonic clock.
+
+    Usage:
+        timer = StageTimer('ask')
+        with timer.stage('embed'):
+            ...
+        timer.finish(cache_hit=False)
+
+    Stages may run on other threads (e.g. the executor under ASGI) as long
+    as they run one at a time. Repeated stages accumulate. A stage left by
+    GeneratorExit (a streaming client went away) is timed but not counted
+    as an error.
+    """
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.errors: List[str] = []
+        self._tracer = get_tracer()
+        self._span = self._tracer.start_span('rag.request', attributes={'rag.endpoint': endpoint}) \
+            if self._tracer is not None else None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage name; exceptions are counted and re-raised."""
+        span = None
+        if self._span is not None:
+            from opentelemetry import trace
+
+            span = self._tracer.start_span(f"rag.{name}", context=trace.set_span_in_context(self._span))
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.errors.append(name)
+            if span is not None:
+                span.record_exception(e)
+            raise
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+            if span is not None:
+                span.end()
+
+    def reassign(self, from_stage: str, to_stage: str, seconds: float) -> None:
+        """
+        Move seconds of from_stage to to_stage: for stages timed as one block
+        here but measured separately elsewhere (the retrieval service).
+        """
+        seconds = min(seconds, self.durations.get(from_stage, 0.0))
+        self.durations[from_stage] = self.durations.get(from_stage, 0.0) - seconds
+        self.durations[to_stage] = self.durations.get(to_stage, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def log_fields(self) -> Dict[str, float]:
+        """QueryLog keyword arguments for the stages timed so far."""
+        return {
+            field: round(self.durations[stage], 4)
+            for stage, field in STAGE_LOG_FIELDS.items() if stage in self.durations
+        }
+
+    def finish(self, status: Optional[str] = None, cache_hit: bool = False) -> float:
+        """
+        Record the request in pipeline_metrics and end its span.
+
+        Args:
+            status: 'ok', 'error' or 'unavailable'; by default 'error' if a
+                stage raised (even if the pipeline recovered) else 'ok'
+            cache_hit: Whether the answer came from the answer cache
+
+        Returns:
+            Elapsed seconds since the timer was created
+        """
+        status = status or ('error' if self.errors else 'ok')
+        seconds = self.elapsed()
+        pipeline_metrics.record(self.endpoint, status, seconds, self.durations, self.errors, cache_hit)
+        if self._span is not None:
+            self._span.set_attribute('rag.status', status)
+            self._span.set_attribute('rag.cache_hit', cache_hit)
+            self._span.end()
+        return seconds
+
+
+def timed(timer: Optional[StageTimer], stage: str):
+    """timer.stage(stage), or a no-op when the caller passed no timer."""
+    return timer.stage(stage) if timer is not None else nullcontext()
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0002_alter_querylog_options_querylog_avg_similarity_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="faq",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=64),
+        ),
+    ]
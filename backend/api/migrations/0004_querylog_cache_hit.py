@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_faq_content_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="querylog",
+            name="cache_hit",
+            field=models.BooleanField(default=False),
+        ),
+    ]
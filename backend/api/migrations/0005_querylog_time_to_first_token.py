@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_querylog_cache_hit"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="querylog",
+            name="time_to_first_token",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_querylog_time_to_first_token"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueryStatsRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[
+                            ("minute", "Minute"),
+                            ("hour", "Hour"),
+                            ("day", "Day"),
+                            ("total", "Total"),
+                        ],
+                        max_length=6,
+                    ),
+                ),
+                ("bucket_start", models.DateTimeField()),
+                ("query_count", models.IntegerField(default=0)),
+                ("cache_hits", models.IntegerField(default=0)),
+                ("processing_time_sum", models.FloatField(default=0)),
+                ("processing_time_count", models.IntegerField(default=0)),
+                ("similarity_sum", models.FloatField(default=0)),
+                ("similarity_count", models.IntegerField(default=0)),
+                ("latency_histogram", models.JSONField(default=list)),
+            ],
+            options={
+                "verbose_name": "Query Stats Rollup",
+                "verbose_name_plural": "Query Stats Rollups",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="querystatsrollup",
+            constraint=models.UniqueConstraint(
+                fields=("granularity", "bucket_start"), name="unique_rollup_bucket"
+            ),
+        ),
+    ]
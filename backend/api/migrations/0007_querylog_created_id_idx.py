@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_querystatsrollup"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="querylog",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="querylog_created_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_querylog_created_id_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="querylog",
+            name="embed_time",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="querylog",
+            name="generate_time",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="querylog",
+            name="retrieve_time",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
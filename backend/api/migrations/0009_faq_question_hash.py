@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:10
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Frozen copy of api.normalization.question_hash, so later changes to the
+# live normalizer don't change what this migration computes. Rows hashed
+# here are brought up to date by `load_faqs.py --sync`.
+_PHRASES = [
+    (re.compile(r"\bw/o\b"), " without "),
+    (re.compile(r"\bw/(?=\s|[a-z])"), " with "),
+    (re.compile(r"&"), " and "),
+    (re.compile(r"§+"), " section "),
+]
+_INITIALISM_RE = re.compile(r"\b(?:[a-z]\.){2,}")
+_APOSTROPHE_RE = re.compile(r"['‘’`]")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_ABBREVIATIONS = {
+    "atty": "attorney",
+    "attys": "attorneys",
+    "corp": "corporation",
+    "dept": "department",
+    "govt": "government",
+    "hrs": "hours",
+    "info": "information",
+    "v": "versus",
+    "vs": "versus",
+    "wk": "week",
+    "wks": "weeks",
+    "yr": "year",
+    "yrs": "years",
+}
+
+
+def question_hash(text):
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _APOSTROPHE_RE.sub("", text)
+    text = _INITIALISM_RE.sub(lambda match: match.group(0).replace(".", ""), text)
+    for pattern, replacement in _PHRASES:
+        text = pattern.sub(replacement, text)
+    normalized = " ".join(_ABBREVIATIONS.get(word, word) for word in _WORD_RE.findall(text))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def hash_questions(apps, schema_editor):
+    FAQ = apps.get_model("api", "FAQ")
+    faqs = list(FAQ.objects.only("id", "question"))
+    for faq in faqs:
+        faq.question_hash = question_hash(faq.question)
+    FAQ.objects.bulk_update(faqs, ["question_hash"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_querylog_stage_times"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="faq",
+            name="question_hash",
+            field=models.CharField(blank=True, db_index=True, default="", max_length=64),
+        ),
+        migrations.RunPython(hash_questions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:40
+
+from django.db import migrations
+
+from api.rollups import backfill_rollups
+
+
+def backfill_query_stats(apps, schema_editor):
+    # QueryLog rows written before 0006 have no rollups, and /api/stats/ reads only rollups
+    backfill_rollups(
+        query_log_model=apps.get_model("api", "QueryLog"),
+        rollup_model=apps.get_model("api", "QueryStatsRollup"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_faq_question_hash"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_query_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_backfill_query_stats_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="faq",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
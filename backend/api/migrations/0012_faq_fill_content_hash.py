@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:30
+
+import hashlib
+
+from django.db import migrations
+
+
+# Frozen copy of api.models.FAQ.compute_content_hash
+def content_hash(question, answer, category):
+    content = "\x1f".join((question, answer, category))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def fill_content_hashes(apps, schema_editor):
+    # Rows from before 0003 have no hash, so the first --sync would re-embed them all
+    FAQ = apps.get_model("api", "FAQ")
+    faqs = list(FAQ.objects.filter(content_hash="").only("id", "question", "answer", "category"))
+    for faq in faqs:
+        faq.content_hash = content_hash(faq.question, faq.answer, faq.category)
+    FAQ.objects.bulk_update(faqs, ["content_hash"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_faq_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_content_hashes, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,14 @@
 """
 Simple Django models for Legal Q&A chatbot.
-Two models: FAQ and QueryLog.
+Two models: FAQ and QueryLog, plus QueryStatsRollup aggregates of QueryLog.
 """
 
+import hashlib
+
 from django.db import models
 
+from .normalization import question_hash
+
 
 class FAQ(models.Model):
     """
@@ -14,10 +18,27 @@ class FAQ(models.Model):
     question = models.TextField()
     answer = models.TextField()
     category = models.CharField(max_length=100)
+    content_hash = models.CharField(max_length=64, blank=True, default='')  # SHA-256 of question/answer/category
+    # SHA-256 of the normalized question: the exact-match index (api.normalization)
+    question_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # Last write; with the row count and max id it fingerprints the corpus (rag.faq_corpus_fingerprint)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.category}: {self.question[:50]}..."
 
+    def save(self, *args, **kwargs):
+        # bulk_create/bulk_update skip save(); their callers set both hashes (see load_faqs.build_faq)
+        self.content_hash = self.compute_content_hash(self.question, self.answer, self.category)
+        self.question_hash = question_hash(self.question)
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def compute_content_hash(question, answer, category):
+        """Hash the fields that feed the vector index, to detect changed FAQs."""
+        content = '\x1f'.join((question, answer, category))
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
     class Meta:
         verbose_name = "FAQ"
         verbose_name_plural = "FAQs"
@@ -32,8 +53,14 @@ class QueryLog(models.Model):
     answer = models.TextField()
     sources = models.JSONField()  # Store array of source FAQs
     processing_time = models.FloatField(null=True, blank=True)  # Time in seconds
+    time_to_first_token = models.FloatField(null=True, blank=True)  # Seconds until the first streamed token
+    # Per-stage seconds on the monotonic clock (api.metrics.StageTimer); null when not timed
+    embed_time = models.FloatField(null=True, blank=True)  # Question embedding
+    retrieve_time = models.FloatField(null=True, blank=True)  # Vector/lexical search and FAQ hydration
+    generate_time = models.FloatField(null=True, blank=True)  # LLM call (or token stream)
     source_count = models.IntegerField(default=0)  # Number of sources retrieved
     avg_similarity = models.FloatField(null=True, blank=True)  # Average similarity score
+    cache_hit = models.BooleanField(default=False)  # Answer served from the semantic cache
     created_at = models.DateTimeField(auto_now_add=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)  # User IP
     user_agent = models.TextField(null=True, blank=True)  # Browser info
@@ -45,3 +72,43 @@ class QueryLog(models.Model):
         ordering = ['-created_at']
         verbose_name = "Query Log"
         verbose_name_plural = "Query Logs"
+        indexes = [
+            # Keyset pagination of /api/logs/ (api.pagination)
+            models.Index(fields=['-created_at', '-id'], name='querylog_created_id_idx'),
+        ]
+
+
+class QueryStatsRollup(models.Model):
+    """
+    Pre-aggregated QueryLog statistics for one time bucket.
+
+    Updated together with every batch of QueryLog rows (see api.rollups),
+    so /api/stats/ reads a bounded number of rows instead of scanning
+    QueryLog. The 'total' granularity has a single bucket covering all time.
+    """
+    GRANULARITY_CHOICES = [
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+        ('total', 'Total'),
+    ]
+
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    query_count = models.IntegerField(default=0)
+    cache_hits = models.IntegerField(default=0)
+    processing_time_sum = models.FloatField(default=0)
+    processing_time_count = models.IntegerField(default=0)
+    similarity_sum = models.FloatField(default=0)
+    similarity_count = models.IntegerField(default=0)
+    latency_histogram = models.JSONField(default=list)  # Counts per api.rollups.LATENCY_BUCKETS
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket_start}: {self.query_count} queries"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket_start'], name='unique_rollup_bucket'),
+        ]
+        verbose_name = "Query Stats Rollup"
+        verbose_name_plural = "Query Stats Rollups"
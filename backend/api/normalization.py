@@ -0,0 +1,70 @@
+"""
+Question normalization for the exact-match fast path.
+
+normalize_question() maps questions that differ only in case, punctuation,
+whitespace, apostrophes or common abbreviations ("atty", "w/o", "U.S.") to
+the same string. question_hash() digests that string; FAQ.question_hash
+stores it for every FAQ so a verbatim or near-verbatim copy of a curated
+question is found with one indexed lookup instead of embedding, vector
+search and generation.
+"""
+
+import re
+import hashlib
+import unicodedata
+
+# Written forms that punctuation stripping would otherwise split or mangle
+_PHRASES = [
+    (re.compile(r"\bw/o\b"), " without "),
+    (re.compile(r"\bw/(?=\s|[a-z])"), " with "),
+    (re.compile(r"&"), " and "),
+    (re.compile(r"§+"), " section "),
+]
+# Dotted initialisms ("u.s.", "e.g.") become one token ("us", "eg")
+_INITIALISM_RE = re.compile(r"\b(?:[a-z]\.){2,}")
+# Apostrophes join their word ("employer's" -> "employers", "can't" -> "cant")
+_APOSTROPHE_RE = re.compile(r"['‘’`]")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Only unambiguous abbreviations: 'hr' (human resources or hour) and 'sec'
+# (the SEC or section) are left alone, so they can't map a question onto
+# the wrong FAQ
+ABBREVIATIONS = {
+    'atty': 'attorney',
+    'attys': 'attorneys',
+    'corp': 'corporation',
+    'dept': 'department',
+    'govt': 'government',
+    'hrs': 'hours',
+    'info': 'information',
+    'v': 'versus',
+    'vs': 'versus',
+    'wk': 'week',
+    'wks': 'weeks',
+    'yr': 'year',
+    'yrs': 'years',
+}
+
+
+def normalize_question(text: str) -> str:
+    """
+    Canonical form of a question: Unicode-folded, lowercase, abbreviations
+    expanded, punctuation dropped and words separated by single spaces.
+
+    Args:
+        text: Question as asked or as stored in the FAQ table
+
+    Returns:
+        Normalized question ('' if it has no words)
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _APOSTROPHE_RE.sub('', text)
+    text = _INITIALISM_RE.sub(lambda match: match.group(0).replace('.', ''), text)
+    for pattern, replacement in _PHRASES:
+        text = pattern.sub(replacement, text)
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in _WORD_RE.findall(text))
+
+
+def question_hash(text: str) -> str:
+    """SHA-256 hex digest of normalize_question(text)."""
+    return hashlib.sha256(normalize_question(text).encode('utf-8')).hexdigest()
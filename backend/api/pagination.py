@@ -0,0 +1,52 @@
+"""
+Keyset pagination for QueryLog listings.
+
+OFFSET pagination makes the database walk and discard every skipped row, so
+deep pages get slower as the log grows. A cursor instead remembers the
+(created_at, id) of the last row served and the next page starts right after
+it, which the (created_at, id) index on QueryLog answers with a range scan
+whatever the depth.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+from django.db.models import Q, QuerySet
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    """Opaque, URL-safe cursor pointing just after the row (created_at, pk)."""
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Inverse of encode_cursor().
+
+    Raises:
+        ValueError: if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        created_at = datetime.fromisoformat(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor {cursor!r}") from e
+    if created_at.tzinfo is None:
+        raise ValueError(f"Invalid cursor {cursor!r}")
+    return created_at, pk
+
+
+def after_cursor(queryset: QuerySet, cursor: str) -> QuerySet:
+    """Rows of queryset (ordered by -created_at, -id) that come after cursor."""
+    created_at, pk = decode_cursor(cursor)
+    # The redundant created_at <= bound lets SQLite seek into the index
+    # instead of scanning it from the start to evaluate the OR
+    return queryset.filter(
+        Q(created_at__lte=created_at),
+        Q(created_at__lt=created_at) | Q(id__lt=pk)
+    )
@@ -3,61 +3,858 @@ RAG System for Legal Q&A Chatbot
 ALL RAG LOGIC IN ONE FILE
 
 Components:
-1. Sentence Transformers for embeddings (FREE, local)
-2. ChromaDB for vector storage (persistent)
-3. ChatGroq for answer generation
+1. Sentence Transformers for embeddings (FREE, local), on PyTorch or as an
+   ONNX Runtime export (RAG_EMBEDDING_RUNTIME, see api.embeddings)
+2. ChromaDB for vector storage (persistent) - IDs, vectors and category
+   only; source text is hydrated from the FAQ table
+3. ChatGroq for answer generation, through the rate-aware LLMGateway
+   (api.llm). RAG_GENERATOR_BACKEND swaps in a local OpenAI-compatible
+   server or a deterministic fake (api.generators)
+
+Heavy resources (the embedding model, the ChromaDB client and the Groq
+client) are created lazily by RAGEngine on first use, so importing this
+module - which every manage.py command does through api.views - stays cheap.
+Servers call warm_up() at startup to pay the loading cost before the first
+request instead of during it. Under gunicorn with preloading (RAG_PREFORK),
+prepare_for_fork() loads the shareable parts once in the parent and each
+worker calls reset_after_fork() before serving.
+
+When RAG_HYBRID_SEARCH is enabled, search_similar_faqs() also queries an
+in-process BM25 index (api.lexical) in parallel with the vector search and
+fuses the two rankings by reciprocal rank, so exact legal terms ("FMLA",
+"Chapter 7") are not outranked by loosely similar FAQs.
+
+aprocess_question() is the async variant of the pipeline used under ASGI:
+embedding and ChromaDB search run on a bounded thread pool and the LLM call
+uses the async Groq client, so waiting on the network ties up no threads.
+
+process_questions() answers many questions at once for /api/ask/batch/ and
+the ask_batch command: one batched encode, one multi-query vector search,
+one FAQ hydration query, then generation on a bounded pool.
+
+Retrieval can be limited to FAQ categories (the categories argument of
+the pipeline functions): the vector search runs against that partition of
+the index and BM25 skips other categories. AUTO_CATEGORY, or any question
+without categories when RAG_CATEGORY_AUTO is on, lets a centroid
+classifier (api.categories) pick the partition from the question embedding.
+
+Before any of that, a question whose normalized text matches a FAQ
+question (RAG_EXACT_MATCH, see api.normalization) is answered with the
+curated FAQ answer from one indexed lookup: no embedding, search or LLM call.
+
+With RAG_RETRIEVAL_MODE='service', embedding and search (vector and BM25)
+run in a separate process (manage.py run_retrieval_service, see
+api.retrieval_service) reached over a Unix socket; this process only
+hydrates the hits from the FAQ table.
 """
 
 import os
-from typing import List, Dict
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
-from groq import Groq
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .batching import EmbeddingBatcher
+from .models import FAQ
+from .categories import AUTO_CATEGORY
+from .cache import EmbeddingCache, FAQRowCache, SemanticAnswerCache, SQLiteEmbeddingStore
+from .lexical import LexicalIndexManager, fuse_rrf
+from .embeddings import load_embedder
+from .generators import BaseGenerator, FakeGenerator, GatewayGenerator, OpenAICompatibleClient
+from .llm import LLMGateway, LLMUnavailableError
+from .metrics import StageTimer, timed
+from .normalization import normalize_question, question_hash
+from .retrieval_service import RetrievalClient, RetrievalServiceError
+from .retrievers import BaseRetriever, ChromaRetriever, NumpyRetriever
 
 # Load environment variables
 load_dotenv()
 
-# SentenceTransformer for embeddings (384 dimensions, fast, FREE)
-print("Loading SentenceTransformer model...")
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-print("SentenceTransformer model loaded successfully!")
-
-# ChromaDB client (persistent mode)
-print("Initializing ChromaDB...")
-chroma_client = chromadb.PersistentClient(
-    path="./chroma_db",
-    settings=Settings(
-        anonymized_telemetry=False  # Disable telemetry
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+CHROMA_PATH = os.getenv('CHROMA_PATH', "./chroma_db")
+COLLECTION_NAME = "legal_faqs"
+COLLECTION_DESCRIPTION = "Legal FAQ embeddings for RAG"
+
+# Answer generation
+LLM_MODEL = "llama-3.3-70b-versatile"
+LLM_TEMPERATURE = 0.7
+LLM_MAX_TOKENS = 500
+
+# Batch sizes for bulk ingestion
+EMBEDDING_BATCH_SIZE = 64
+CHROMA_UPSERT_BATCH_SIZE = 5000  # Below ChromaDB's max batch size
+
+# Category filter: None (all), category names, or AUTO_CATEGORY
+Categories = Union[None, str, Sequence[str]]
+
+
+def embedding_runtime_name() -> str:
+    """'torch', 'onnx' or 'onnx-int8', as configured."""
+    if settings.RAG_EMBEDDING_RUNTIME == 'onnx' and settings.RAG_ONNX_QUANTIZED:
+        return 'onnx-int8'
+    return settings.RAG_EMBEDDING_RUNTIME
+
+
+def uses_retrieval_service() -> bool:
+    """
+    True when embedding and search run in the retrieval service
+    (RAG_RETRIEVAL_MODE='service'), False for in-process ('local').
+
+    Raises:
+        ValueError: for an unknown RAG_RETRIEVAL_MODE
+    """
+    mode = settings.RAG_RETRIEVAL_MODE
+    if mode not in ('local', 'service'):
+        raise ValueError(f"Unknown RAG_RETRIEVAL_MODE: {mode!r}")
+    return mode == 'service'
+
+
+def collection_metadata() -> Dict:
+    """
+    Metadata for new collections: cosine distance and the HNSW parameters
+    from RAG_HNSW_M / RAG_HNSW_CONSTRUCTION_EF / RAG_HNSW_SEARCH_EF.
+    """
+    return {
+        "description": COLLECTION_DESCRIPTION,
+        "hnsw:space": "cosine",
+        "hnsw:M": settings.RAG_HNSW_M,
+        "hnsw:construction_ef": settings.RAG_HNSW_CONSTRUCTION_EF,
+        "hnsw:search_ef": settings.RAG_HNSW_SEARCH_EF,
+    }
+
+
+def collection_config_mismatches(metadata: Optional[Dict]) -> Dict[str, Tuple]:
+    """
+    Compare an existing collection's index settings with the configured ones.
+
+    HNSW settings are fixed when a collection is created, so any mismatch
+    means the collection must be rebuilt (manage.py rebuild_vector_index).
+
+    Returns:
+        {key: (current, wanted)} for every setting that differs
+    """
+    metadata = metadata or {}
+    wanted = collection_metadata()
+    # ChromaDB's defaults when a key is absent
+    defaults = {"hnsw:space": "l2", "hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 10}
+    return {
+        key: (metadata.get(key, defaults[key]), wanted[key])
+        for key in defaults
+        if metadata.get(key, defaults[key]) != wanted[key]
+    }
+
+
+class RAGEngine:
+    """
+    Owns the embedding model, ChromaDB client/collection and Groq client.
+
+    Each resource is built on first access and cached on the instance.
+    Initialization is guarded by a lock so concurrent first requests load
+    the model only once.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._embedding_model = None
+        self._chroma_client = None
+        self._collection = None
+        self._groq_client = None
+        self._async_groq_client = None
+        self._executor = None
+        self._lexical_executor = None
+        self._generation_executor = None
+
+    @property
+    def embedding_model(self):
+        """
+        Embedding model (384 dimensions, fast, FREE): a SentenceTransformer,
+        or an OnnxEmbedder with the same encode() for RAG_EMBEDDING_RUNTIME='onnx'.
+        """
+        if self._embedding_model is None:
+            with self._lock:
+                if self._embedding_model is None:
+                    runtime = embedding_runtime_name()
+                    print(f"Loading embedding model ({runtime})...")
+                    self._embedding_model = load_embedder(
+                        settings.RAG_EMBEDDING_RUNTIME,
+                        EMBEDDING_MODEL_NAME,
+                        settings.RAG_ONNX_MODEL_DIR,
+                        quantized=settings.RAG_ONNX_QUANTIZED,
+                        threads=settings.RAG_ONNX_THREADS
+                    )
+                    print("Embedding model loaded successfully!")
+        return self._embedding_model
+
+    @property
+    def chroma_client(self):
+        """ChromaDB client (persistent mode)."""
+        if self._chroma_client is None:
+            with self._lock:
+                if self._chroma_client is None:
+                    import chromadb
+                    from chromadb.config import Settings
+
+                    print("Initializing ChromaDB...")
+                    self._chroma_client = chromadb.PersistentClient(
+                        path=CHROMA_PATH,
+                        settings=Settings(
+                            anonymized_telemetry=False  # Disable telemetry
+                        )
+                    )
+        return self._chroma_client
+
+    @property
+    def collection(self):
+        """
+        The 'legal_faqs' collection, created with collection_metadata() if it
+        does not exist. An existing collection is never modified here; if its
+        index settings are out of date a warning points to the rebuild command.
+        """
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    try:
+                        collection = self.chroma_client.get_collection(name=COLLECTION_NAME)
+                    except ValueError:  # ChromaDB raises ValueError for a missing collection
+                        collection = self.chroma_client.create_collection(
+                            name=COLLECTION_NAME,
+                            metadata=collection_metadata()
+                        )
+                    else:
+                        mismatches = collection_config_mismatches(collection.metadata)
+                        if mismatches:
+                            print(f"Warning: collection '{COLLECTION_NAME}' index settings differ from "
+                                  f"the configuration {mismatches}. Run "
+                                  f"'python manage.py rebuild_vector_index' to rebuild it.")
+                    self._collection = collection
+                    print(f"ChromaDB initialized! Collection '{COLLECTION_NAME}' ready.")
+        return self._collection
+
+    @staticmethod
+    def groq_client_options() -> Dict:
+        """
+        Client options shared by the sync and async Groq clients. Retries
+        are left to LLMGateway, and RAG_LLM_BASE_URL can point the clients
+        at a local fake server.
+        """
+        options = {
+            'api_key': os.getenv('GROQ_API_KEY') or ('fake' if settings.RAG_LLM_BASE_URL else None),
+            'timeout': settings.RAG_LLM_TIMEOUT,
+            'max_retries': 0,
+        }
+        if settings.RAG_LLM_BASE_URL:
+            options['base_url'] = settings.RAG_LLM_BASE_URL
+        return options
+
+    @staticmethod
+    def http_limits():
+        """Keep-alive pool sized for RAG_LLM_MAX_CONCURRENCY concurrent calls."""
+        import httpx
+
+        return httpx.Limits(
+            max_connections=settings.RAG_LLM_MAX_CONCURRENCY,
+            max_keepalive_connections=settings.RAG_LLM_MAX_CONCURRENCY
+        )
+
+    @property
+    def groq_client(self):
+        """Groq client for LLM, reusing pooled HTTP connections."""
+        if self._groq_client is None:
+            with self._lock:
+                if self._groq_client is None:
+                    import httpx
+                    from groq import Groq
+
+                    self._groq_client = Groq(
+                        http_client=httpx.Client(limits=self.http_limits()),
+                        **self.groq_client_options()
+                    )
+        return self._groq_client
+
+    @property
+    def async_groq_client(self):
+        """Async Groq client for the ASGI request path."""
+        if self._async_groq_client is None:
+            with self._lock:
+                if self._async_groq_client is None:
+                    import httpx
+                    from groq import AsyncGroq
+
+                    self._async_groq_client = AsyncGroq(
+                        http_client=httpx.AsyncClient(limits=self.http_limits()),
+                        **self.groq_client_options()
+                    )
+        return self._async_groq_client
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Bounded pool for blocking work (embedding, ChromaDB) called from
+        async code. Its size caps concurrent CPU-bound encodes.
+        """
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.RAG_EXECUTOR_WORKERS,
+                        thread_name_prefix='rag'
+                    )
+        return self._executor
+
+    def reset_collection(self):
+        """Delete and recreate the collection (use with caution!)."""
+        with self._lock:
+            self.chroma_client.delete_collection(name=COLLECTION_NAME)
+            self._collection = self.chroma_client.create_collection(
+                name=COLLECTION_NAME,
+                metadata=collection_metadata()
+            )
+
+    def replace_collection(self, collection) -> None:
+        """Use collection from now on (after a rebuild swapped it in)."""
+        with self._lock:
+            self._collection = collection
+
+    @property
+    def lexical_executor(self) -> ThreadPoolExecutor:
+        """
+        Small pool for BM25 lookups run alongside the vector search. It is
+        separate from executor because retrieval itself runs on that pool.
+        """
+        if self._lexical_executor is None:
+            with self._lock:
+                if self._lexical_executor is None:
+                    self._lexical_executor = ThreadPoolExecutor(
+                        max_workers=settings.RAG_EXECUTOR_WORKERS,
+                        thread_name_prefix='rag-lexical'
+                    )
+        return self._lexical_executor
+
+    @property
+    def generation_executor(self) -> ThreadPoolExecutor:
+        """
+        Pool for LLM calls of batch requests. RAG_BATCH_GENERATION_CONCURRENCY
+        caps concurrent Groq requests across all batches in the process.
+        """
+        if self._generation_executor is None:
+            with self._lock:
+                if self._generation_executor is None:
+                    self._generation_executor = ThreadPoolExecutor(
+                        max_workers=settings.RAG_BATCH_GENERATION_CONCURRENCY,
+                        thread_name_prefix='rag-generate'
+                    )
+        return self._generation_executor
+
+    def warm_up(self) -> None:
+        """
+        Load every resource now and run one encode to initialize the model.
+        In service mode only the retrieval service connection is checked.
+        """
+        if uses_retrieval_service():
+            get_retrieval_client().stats()
+        else:
+            self.embedding_model.encode("warm up")
+            self.collection
+            if settings.RAG_HYBRID_SEARCH:
+                get_lexical_index().get()
+        if settings.RAG_GENERATOR_BACKEND == 'groq':
+            self.groq_client
+
+    def reset_after_fork(self) -> None:
+        """
+        Forget the handles a forked worker must not share with its parent.
+
+        ChromaDB (SQLite and index files), HTTP connection pools and thread
+        pools are reopened lazily by the worker. A PyTorch model is kept:
+        its weights stay shared copy-on-write. An ONNX Runtime session is
+        not fork-safe (its thread pool does not survive the fork), so it is
+        reloaded.
+        """
+        self._lock = threading.RLock()
+        if embedding_runtime_name() != 'torch':
+            self._embedding_model = None
+        self._chroma_client = None
+        self._collection = None
+        self._groq_client = None
+        self._async_groq_client = None
+        self._executor = None
+        self._lexical_executor = None
+        self._generation_executor = None
+
+    def is_loaded(self) -> Dict[str, bool]:
+        """Report which resources have been initialized so far."""
+        if uses_retrieval_service():
+            return {
+                'retrieval_service': _retrieval_client is not None,
+                'groq_client': self._groq_client is not None,
+            }
+        return {
+            'embedding_model': self._embedding_model is not None,
+            'chroma_client': self._chroma_client is not None,
+            'collection': self._collection is not None,
+            'groq_client': self._groq_client is not None,
+        }
+
+
+_engine: Optional[RAGEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RAGEngine:
+    """Return the process-wide RAGEngine, creating it on first call."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RAGEngine()
+    return _engine
+
+
+def warm_up() -> None:
+    """
+    Eagerly load the model and clients.
+
+    Called from the WSGI/ASGI entry points when RAG_WARMUP_ON_STARTUP is
+    enabled so the first /api/ask/ request doesn't pay the loading cost.
+    """
+    try:
+        get_engine().warm_up()
+        print("RAG engine warmed up!")
+    except Exception as e:
+        print(f"Error warming up RAG engine: {e}")
+
+
+def prepare_for_fork() -> None:
+    """
+    Load the read-only state workers can share, in the pre-fork parent.
+
+    Called from wsgi.py when RAG_PREFORK is set (gunicorn --preload, see
+    gunicorn.conf.py). The PyTorch model weights, the memory-mapped numpy
+    index and the BM25 index are loaded once and inherited copy-on-write by
+    every worker. Nothing that holds a file handle, socket or thread is
+    opened: no ChromaDB client, no Groq client and no encode (PyTorch's
+    OpenMP pool is not fork-safe). Database connections are closed and
+    the loaded objects are moved to the permanent GC generation so the
+    workers' collections don't write to (and un-share) their pages.
+    """
+    import gc
+    from django.db import connections
+
+    try:
+        if not uses_retrieval_service():  # Otherwise the service holds all of it
+            if settings.RAG_EMBEDDING_RUNTIME == 'torch':
+                get_engine().embedding_model
+            if settings.RAG_RETRIEVER == 'numpy':
+                get_retriever().count()  # Maps the index
+            if settings.RAG_HYBRID_SEARCH:
+                get_lexical_index().get()
+        print("RAG engine prepared for fork!")
+    except Exception as e:
+        print(f"Error preparing RAG engine for fork: {e}")
+    finally:
+        connections.close_all()
+    gc.freeze()
+
+
+def reset_after_fork() -> None:
+    """
+    Make the state inherited from the parent safe to use in a new worker.
+
+    Called from gunicorn's post_fork hook. Locks are recreated (a lock
+    held by another parent thread stays locked in the child), and caches,
+    clients and background threads are dropped so each worker builds its
+    own on first use. The model, retriever and BM25 index are kept.
+    """
+    global _engine_lock, _embedding_cache, _answer_cache, _faq_row_cache
+    global _llm_gateway, _generator, _embedding_batcher, _retrieval_client
+
+    _engine_lock = threading.Lock()
+    if _engine is not None:
+        _engine.reset_after_fork()
+    _embedding_cache = None     # SQLite connections
+    _answer_cache = None
+    _faq_row_cache = None
+    _llm_gateway = None         # Semaphores and HTTP clients
+    _generator = None
+    _embedding_batcher = None   # Worker thread
+    _retrieval_client = None    # Sockets
+    if _lexical_index is not None:
+        _lexical_index.reset_after_fork()
+    if isinstance(_retriever, NumpyRetriever):
+        _retriever.reset_after_fork()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Return the query-embedding cache configured by RAG_EMBEDDING_CACHE_*,
+    or None when RAG_EMBEDDING_CACHE_SIZE is 0.
+    """
+    global _embedding_cache
+    if _embedding_cache is None and settings.RAG_EMBEDDING_CACHE_SIZE > 0:
+        with _engine_lock:
+            if _embedding_cache is None:
+                store = None
+                if settings.RAG_EMBEDDING_CACHE_PATH:
+                    store = SQLiteEmbeddingStore(
+                        settings.RAG_EMBEDDING_CACHE_PATH,
+                        ttl=settings.RAG_EMBEDDING_CACHE_TTL
+                    )
+                _embedding_cache = EmbeddingCache(
+                    max_size=settings.RAG_EMBEDDING_CACHE_SIZE,
+                    ttl=settings.RAG_EMBEDDING_CACHE_TTL,
+                    store=store,
+                    # Runtimes give slightly different vectors; don't share cached ones
+                    namespace=(EMBEDDING_MODEL_NAME if embedding_runtime_name() == 'torch'
+                               else f"{EMBEDDING_MODEL_NAME}:{embedding_runtime_name()}")
+                )
+    return _embedding_cache
+
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """
+    Return the semantic answer cache configured by RAG_ANSWER_CACHE_*,
+    or None when RAG_ANSWER_CACHE_SIZE is 0.
+    """
+    global _answer_cache
+    if _answer_cache is None and settings.RAG_ANSWER_CACHE_SIZE > 0:
+        with _engine_lock:
+            if _answer_cache is None:
+                _answer_cache = SemanticAnswerCache(
+                    max_size=settings.RAG_ANSWER_CACHE_SIZE,
+                    ttl=settings.RAG_ANSWER_CACHE_TTL,
+                    threshold=settings.RAG_ANSWER_CACHE_THRESHOLD
+                )
+    return _answer_cache
+
+
+def invalidate_answer_cache() -> None:
+    """Drop cached answers after the FAQ corpus changed."""
+    if _answer_cache is not None:
+        _answer_cache.invalidate()
+
+
+_faq_row_cache: Optional[FAQRowCache] = None
+
+
+def get_faq_row_cache() -> Optional[FAQRowCache]:
+    """
+    Return the FAQ row cache configured by RAG_FAQ_ROW_CACHE_*, or None
+    when RAG_FAQ_ROW_CACHE_SIZE is 0.
+    """
+    global _faq_row_cache
+    if _faq_row_cache is None and settings.RAG_FAQ_ROW_CACHE_SIZE > 0:
+        with _engine_lock:
+            if _faq_row_cache is None:
+                _faq_row_cache = FAQRowCache(
+                    max_size=settings.RAG_FAQ_ROW_CACHE_SIZE,
+                    ttl=settings.RAG_FAQ_ROW_CACHE_TTL
+                )
+    return _faq_row_cache
+
+
+def fetch_faq_rows(faq_ids: List[int]) -> Dict[int, Dict]:
+    """
+    Load question, answer and category for faq_ids.
+
+    Rows come from the row cache when possible; the rest are read with one
+    FAQ.objects.in_bulk() query. IDs without a row (deleted since the vector
+    index was built) are left out.
+
+    Returns:
+        {faq_id: {'question', 'answer', 'category'}}
+    """
+    cache = get_faq_row_cache()
+    rows = cache.get_many(faq_ids) if cache is not None else {}
+    missing = [faq_id for faq_id in faq_ids if faq_id not in rows]
+    if missing:
+        loaded = {
+            faq.id: {'question': faq.question, 'answer': faq.answer, 'category': faq.category}
+            for faq in FAQ.objects.only('question', 'answer', 'category').in_bulk(missing).values()
+        }
+        if cache is not None:
+            cache.set_many(loaded)
+        rows.update(loaded)
+    return rows
+
+
+def iter_lexical_documents():
+    """Yield (id, category, question + answer) for every FAQ, for the BM25 index."""
+    rows = FAQ.objects.order_by('id').values_list('id', 'category', 'question', 'answer')
+    for faq_id, category, question, answer in rows.iterator(chunk_size=5000):
+        yield faq_id, category, f"{question}\n{answer}"
+
+
+def faq_corpus_fingerprint() -> str:
+    """
+    Row count, largest id and latest updated_at of the FAQ table: one
+    aggregate over indexed columns that changes whenever FAQs are added,
+    edited or deleted.
+    """
+    corpus = FAQ.objects.aggregate(count=Count('id'), max_id=Max('id'), updated=Max('updated_at'))
+    updated = corpus['updated'].isoformat() if corpus['updated'] else ''
+    return f"{corpus['count']}:{corpus['max_id']}:{updated}"
+
+
+_lexical_index: Optional[LexicalIndexManager] = None
+
+
+def get_lexical_index() -> LexicalIndexManager:
+    """
+    Return the BM25 index manager over the FAQ table, refreshed when the
+    corpus changes (checked every RAG_LEXICAL_REFRESH_SECONDS).
+    """
+    global _lexical_index
+    if _lexical_index is None:
+        with _engine_lock:
+            if _lexical_index is None:
+                _lexical_index = LexicalIndexManager(
+                    iter_lexical_documents,
+                    faq_corpus_fingerprint,
+                    refresh_seconds=settings.RAG_LEXICAL_REFRESH_SECONDS
+                )
+    return _lexical_index
+
+
+def lexical_search(question: str, top_k: int) -> List[Dict]:
+    """
+    BM25 search over FAQ questions and answers.
+
+    Returns:
+        List of {'id', 'score'} dicts, best first
+    """
+    return get_lexical_index().get().search(question, top_k)
+
+
+def corpus_changed() -> None:
+    """
+    Drop cached answers, rows and category centroids and mark the BM25
+    index stale after FAQs were written.
+    """
+    invalidate_answer_cache()
+    if _faq_row_cache is not None:
+        _faq_row_cache.clear()
+    if _lexical_index is not None:
+        _lexical_index.invalidate()
+    if _retriever is not None:
+        _retriever.invalidate()
+
+
+_retriever: Optional[BaseRetriever] = None
+
+
+def get_retriever() -> BaseRetriever:
+    """
+    Return the vector search backend selected by RAG_RETRIEVER:
+    'chroma' (default) or 'numpy' (memory-mapped exact search over the
+    index in RAG_NUMPY_INDEX_PATH, rebuilt by refresh_retriever_index()).
+    """
+    global _retriever
+    if _retriever is None:
+        with _engine_lock:
+            if _retriever is None:
+                if settings.RAG_RETRIEVER == 'numpy':
+                    _retriever = NumpyRetriever(settings.RAG_NUMPY_INDEX_PATH)
+                elif settings.RAG_RETRIEVER == 'chroma':
+                    _retriever = ChromaRetriever(
+                        lambda: get_engine().collection, settings.RAG_CATEGORY_CENTROIDS_PATH
+                    )
+                else:
+                    raise ValueError(f"Unknown RAG_RETRIEVER: {settings.RAG_RETRIEVER!r}")
+    return _retriever
+
+
+_llm_gateway: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide LLM gateway configured by RAG_LLM_*."""
+    global _llm_gateway
+    if _llm_gateway is None:
+        with _engine_lock:
+            if _llm_gateway is None:
+                _llm_gateway = LLMGateway(
+                    lambda: get_engine().groq_client,
+                    lambda: get_engine().async_groq_client,
+                    max_concurrency=settings.RAG_LLM_MAX_CONCURRENCY,
+                    requests_per_minute=settings.RAG_LLM_REQUESTS_PER_MINUTE,
+                    tokens_per_minute=settings.RAG_LLM_TOKENS_PER_MINUTE,
+                    max_retries=settings.RAG_LLM_MAX_RETRIES,
+                    backoff_base=settings.RAG_LLM_BACKOFF_BASE,
+                    backoff_max=settings.RAG_LLM_BACKOFF_MAX,
+                    timeout=settings.RAG_LLM_TIMEOUT,
+                    deadline=settings.RAG_LLM_DEADLINE
+                )
+    return _llm_gateway
+
+
+def local_llm_gateway() -> LLMGateway:
+    """
+    Gateway over an OpenAI-compatible server at RAG_LOCAL_LLM_URL (e.g.
+    llama.cpp's llama-server with a GGUF model). A local server has no rate
+    budget, so only concurrency, retries and the timeout apply.
+    """
+    options = {
+        'base_url': settings.RAG_LOCAL_LLM_URL,
+        'api_key': settings.RAG_LOCAL_LLM_API_KEY,
+        'max_connections': settings.RAG_LOCAL_LLM_MAX_CONCURRENCY,
+    }
+    client = OpenAICompatibleClient(**options)
+    async_client = OpenAICompatibleClient(is_async=True, **options)
+    return LLMGateway(
+        lambda: client,
+        lambda: async_client,
+        max_concurrency=settings.RAG_LOCAL_LLM_MAX_CONCURRENCY,
+        max_retries=settings.RAG_LLM_MAX_RETRIES,
+        backoff_base=settings.RAG_LLM_BACKOFF_BASE,
+        backoff_max=settings.RAG_LLM_BACKOFF_MAX,
+        timeout=settings.RAG_LOCAL_LLM_TIMEOUT,
+        deadline=settings.RAG_LOCAL_LLM_TIMEOUT
     )
-)
 
-# Get or create collection
-collection = chroma_client.get_or_create_collection(
-    name="legal_faqs",
-    metadata={"description": "Legal FAQ embeddings for RAG"}
-)
-print(f"ChromaDB initialized! Collection 'legal_faqs' ready.")
 
-# Groq client for LLM
-groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+_generator: Optional[BaseGenerator] = None
+
+
+def get_generator() -> BaseGenerator:
+    """Return the process-wide answer generator selected by RAG_GENERATOR_BACKEND."""
+    global _generator
+    if _generator is None:
+        backend = settings.RAG_GENERATOR_BACKEND
+        if backend == 'groq':
+            gateway = get_llm_gateway()
+        with _engine_lock:
+            if _generator is None:
+                if backend == 'groq':
+                    _generator = GatewayGenerator('groq', gateway, LLM_MODEL)
+                elif backend == 'local':
+                    _generator = GatewayGenerator(
+                        'local', local_llm_gateway(), settings.RAG_LOCAL_LLM_MODEL
+                    )
+                elif backend == 'fake':
+                    _generator = FakeGenerator(
+                        latency_ms=settings.RAG_FAKE_LLM_LATENCY_MS,
+                        tokens_per_second=settings.RAG_FAKE_LLM_TOKENS_PER_SECOND,
+                        answer_tokens=settings.RAG_FAKE_LLM_ANSWER_TOKENS
+                    )
+                else:
+                    raise ValueError(f"Unknown RAG_GENERATOR_BACKEND: {backend!r}")
+    return _generator
+
+
+_retrieval_client: Optional[RetrievalClient] = None
+
+
+def get_retrieval_client() -> RetrievalClient:
+    """Return the client of the retrieval service at RAG_RETRIEVAL_SOCKET."""
+    global _retrieval_client
+    if _retrieval_client is None:
+        with _engine_lock:
+            if _retrieval_client is None:
+                _retrieval_client = RetrievalClient(
+                    settings.RAG_RETRIEVAL_SOCKET,
+                    timeout=settings.RAG_RETRIEVAL_TIMEOUT
+                )
+    return _retrieval_client
+
+
+_embedding_batcher: Optional[EmbeddingBatcher] = None
+
+
+def get_embedding_batcher() -> Optional[EmbeddingBatcher]:
+    """
+    Return the request-coalescing embedding batcher, or None unless
+    RAG_EMBEDDING_BATCHING is enabled.
+    """
+    global _embedding_batcher
+    if _embedding_batcher is None and settings.RAG_EMBEDDING_BATCHING:
+        with _engine_lock:
+            if _embedding_batcher is None:
+                _embedding_batcher = EmbeddingBatcher(
+                    get_embeddings,
+                    max_batch_size=settings.RAG_EMBEDDING_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.RAG_EMBEDDING_BATCH_MAX_WAIT_MS
+                )
+    return _embedding_batcher
 
 
 def get_embedding(text: str) -> List[float]:
     """
-    Generate embedding vector for text using SentenceTransformer.
+    Generate embedding vector for text with the configured embedding runtime.
 
     Args:
         text: Input text string
 
     Returns:
-        List of floats representing the embedding vector (384 dimensions)
+        List of floats representing the L2-normalized embedding vector (384 dimensions)
     """
-    embedding = embedding_model.encode(text)
+    if uses_retrieval_service():
+        return get_retrieval_client().embed([text])[0].tolist()
+    embedding = get_engine().embedding_model.encode(text, normalize_embeddings=True)
     return embedding.tolist()
 
 
+def get_query_embedding(question: str) -> List[float]:
+    """
+    Embed a user question, reusing cached embeddings of equivalent
+    (case/whitespace-normalized) questions. Cache misses are coalesced with
+    concurrent requests by the embedding batcher when it is enabled.
+
+    Args:
+        question: User's question
+
+    Returns:
+        List of floats representing the embedding vector (384 dimensions)
+    """
+    batcher = get_embedding_batcher()
+    compute = batcher.embed if batcher is not None else get_embedding
+
+    cache = get_embedding_cache()
+    if cache is None:
+        return compute(question)
+    return cache.get_or_compute(question, compute)
+
+
+def get_query_embeddings(questions: List[str]) -> List[List[float]]:
+    """
+    Embed many user questions: cached embeddings are reused and all misses
+    are encoded in one batched model call.
+
+    Args:
+        questions: User questions
+
+    Returns:
+        Embedding vectors, in the same order as questions
+    """
+    cache = get_embedding_cache()
+    embeddings = [cache.get(question) if cache is not None else None for question in questions]
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        computed = get_embeddings([questions[i] for i in missing])
+        for i, embedding in zip(missing, computed):
+            embeddings[i] = embedding
+            if cache is not None:
+                cache.set(questions[i], embedding)
+    return embeddings
+
+
+def vector_metadata(category: str) -> Dict:
+    """
+    Metadata stored with each vector. Only the category (for filtered
+    search) is kept; sources are hydrated from the FAQ table by id.
+    """
+    return {"category": category}
+
+
 def add_faq_to_chroma(faq_id: int, question: str, answer: str, category: str) -> None:
     """
     Add FAQ to ChromaDB collection.
@@ -72,87 +869,563 @@ def add_faq_to_chroma(faq_id: int, question: str, answer: str, category: str) ->
         # Generate embedding for the question
         embedding = get_embedding(question)
 
-        # Add to ChromaDB
-        collection.add(
+        # Add to ChromaDB; question/answer text stays in the FAQ table
+        get_engine().collection.add(
             ids=[str(faq_id)],
             embeddings=[embedding],
-            documents=[question],
-            metadatas=[{
-                "question": question,
-                "answer": answer,
-                "category": category
-            }]
+            metadatas=[vector_metadata(category)]
         )
+        corpus_changed()
         print(f"Added FAQ {faq_id} to ChromaDB: {question[:50]}...")
     except Exception as e:
         print(f"Error adding FAQ {faq_id} to ChromaDB: {e}")
 
 
-def search_similar_faqs(question: str, top_k: int = 2) -> List[Dict]:
+def get_embeddings(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+    """
+    Generate embeddings for many texts in batched model calls.
+
+    Args:
+        texts: Input text strings
+        batch_size: Number of texts per forward pass
+
+    Returns:
+        List of embedding vectors, in the same order as texts
+    """
+    if not texts:
+        return []
+    if uses_retrieval_service():
+        client = get_retrieval_client()
+        return [
+            vector for start in range(0, len(texts), batch_size)
+            for vector in client.embed(texts[start:start + batch_size]).tolist()
+        ]
+    embeddings = get_engine().embedding_model.encode(
+        texts, batch_size=batch_size, normalize_embeddings=True
+    )
+    return embeddings.tolist()
+
+
+def add_faqs_to_chroma(faqs: List[Dict], batch_size: int = EMBEDDING_BATCH_SIZE,
+                       collection=None) -> int:
+    """
+    Embed and upsert many FAQs into ChromaDB.
+
+    Questions are encoded in batches and written with as few upsert calls
+    as ChromaDB's batch limit allows. Existing IDs are overwritten. Only
+    the category is stored with each vector (see vector_metadata).
+
+    Args:
+        faqs: Dicts with id, question and category (other keys are ignored)
+        batch_size: Number of questions per encode batch
+        collection: Target collection (default: the engine's collection)
+
+    Returns:
+        Number of FAQs written
+    """
+    if not faqs:
+        return 0
+
+    embeddings = get_embeddings([faq['question'] for faq in faqs], batch_size=batch_size)
+    collection = collection or get_engine().collection
+
+    for start in range(0, len(faqs), CHROMA_UPSERT_BATCH_SIZE):
+        chunk = faqs[start:start + CHROMA_UPSERT_BATCH_SIZE]
+        collection.upsert(
+            ids=[str(faq['id']) for faq in chunk],
+            embeddings=embeddings[start:start + CHROMA_UPSERT_BATCH_SIZE],
+            metadatas=[vector_metadata(faq['category']) for faq in chunk]
+        )
+    corpus_changed()
+    return len(faqs)
+
+
+def delete_faqs_from_chroma(faq_ids: List[int]) -> int:
     """
-    Search for similar FAQs using semantic similarity.
+    Remove FAQ vectors from ChromaDB.
+
+    Args:
+        faq_ids: IDs of the FAQs to delete
+
+    Returns:
+        Number of IDs passed to ChromaDB
+    """
+    if not faq_ids:
+        return 0
+
+    collection = get_engine().collection
+    ids = [str(faq_id) for faq_id in faq_ids]
+    for start in range(0, len(ids), CHROMA_UPSERT_BATCH_SIZE):
+        collection.delete(ids=ids[start:start + CHROMA_UPSERT_BATCH_SIZE])
+    corpus_changed()
+    return len(ids)
+
+
+def collection_stores_payloads(collection) -> bool:
+    """True if the collection still holds question/answer text (pre-hydration layout)."""
+    sample = collection.get(include=['metadatas', 'documents'], limit=1)
+    if not sample['ids']:
+        return False
+    metadata = sample['metadatas'][0] or {}
+    return bool((sample.get('documents') or [None])[0]) or 'answer' in metadata or 'question' in metadata
+
+
+def get_collection_ids() -> List[str]:
+    """Return every ID stored in the ChromaDB collection."""
+    return get_engine().collection.get(include=[])['ids']
+
+
+def rebuild_collection(from_database: bool = False,
+                       batch_size: int = CHROMA_UPSERT_BATCH_SIZE) -> int:
+    """
+    Rebuild the ChromaDB collection with the configured index settings.
+
+    Vectors are copied (or re-embedded from the FAQ table when from_database
+    is set) into a new collection created with collection_metadata(), which
+    then replaces the old one. Question/answer text stored in metadata by
+    older versions is not copied. Other processes holding the old collection
+    must be restarted afterwards.
+
+    Args:
+        from_database: Re-embed FAQ rows instead of copying stored vectors
+        batch_size: Rows per read/write batch
+
+    Returns:
+        Number of vectors in the rebuilt collection
+    """
+    engine = get_engine()
+    client = engine.chroma_client
+    temp_name = f"{COLLECTION_NAME}_rebuild"
+    try:
+        client.delete_collection(name=temp_name)  # Left over from an interrupted rebuild
+    except ValueError:
+        pass
+    new_collection = client.create_collection(name=temp_name, metadata=collection_metadata())
+
+    if from_database:
+        batch = []
+        for faq in FAQ.objects.order_by('id').iterator(chunk_size=batch_size):
+            batch.append({'id': faq.id, 'question': faq.question,
+                          'answer': faq.answer, 'category': faq.category})
+            if len(batch) >= batch_size:
+                add_faqs_to_chroma(batch, collection=new_collection)
+                batch = []
+        add_faqs_to_chroma(batch, collection=new_collection)
+    else:
+        old_collection = engine.collection
+        offset = 0
+        while True:
+            page = old_collection.get(
+                include=['embeddings', 'metadatas'], limit=batch_size, offset=offset
+            )
+            if not page['ids']:
+                break
+            # Question/answer payloads from older collections are dropped
+            new_collection.add(
+                ids=page['ids'],
+                embeddings=page['embeddings'],
+                metadatas=[vector_metadata(metadata['category']) for metadata in page['metadatas']]
+            )
+            offset += len(page['ids'])
+
+    client.delete_collection(name=COLLECTION_NAME)
+    new_collection.modify(name=COLLECTION_NAME)
+    engine.replace_collection(new_collection)
+    invalidate_answer_cache()
+    return new_collection.count()
+
+
+def refresh_retriever_index(batch_size: int = CHROMA_UPSERT_BATCH_SIZE) -> int:
+    """
+    Rebuild what the retriever derives from the vectors stored in ChromaDB:
+    the NumPy index when RAG_RETRIEVER is 'numpy', otherwise the category
+    centroids file (RAG_CATEGORY_CENTROIDS_PATH).
+
+    ChromaDB stays the system of record for embeddings; the loader calls this
+    after ingestion, so requests never page the collection themselves.
+
+    Returns:
+        Number of vectors read
+    """
+    collection = get_engine().collection
+    ids, embeddings, categories = [], [], []
+    offset = 0
+    while True:
+        page = collection.get(
+            include=['embeddings', 'metadatas'], limit=batch_size, offset=offset
+        )
+        if not page['ids']:
+            break
+        ids.extend(int(faq_id) for faq_id in page['ids'])
+        embeddings.extend(page['embeddings'])
+        categories.extend(metadata['category'] for metadata in page['metadatas'])
+        offset += len(page['ids'])
+
+    if settings.RAG_RETRIEVER == 'numpy':
+        NumpyRetriever.build(settings.RAG_NUMPY_INDEX_PATH, ids, embeddings, categories)
+        print(f"NumPy index rebuilt with {len(ids)} vectors at {settings.RAG_NUMPY_INDEX_PATH}")
+    else:
+        ChromaRetriever.build_centroids(settings.RAG_CATEGORY_CENTROIDS_PATH, embeddings, categories)
+        print(f"Category centroids rebuilt from {len(ids)} vectors at {settings.RAG_CATEGORY_CENTROIDS_PATH}")
+    if _retriever is not None:
+        _retriever.invalidate()
+    return len(ids)
+
+
+def hybrid_search(question: str, query_embedding: List[float], top_k: int,
+                  categories: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Fuse vector and BM25 rankings by reciprocal rank, both limited to
+    categories when given.
+
+    Both searches fetch top_k * RAG_HYBRID_CANDIDATES candidates; the BM25
+    lookup runs on the lexical executor while the vector search runs here.
+    FAQs found only lexically get their similarity from the vector index so
+    similarity_score keeps its meaning. If the lexical search fails, the
+    vector hits are returned unchanged.
+
+    Returns:
+        Retriever-style hits ({'id', 'similarity', 'metadata'}), best first
+    """
+    candidates = top_k * settings.RAG_HYBRID_CANDIDATES
+    retriever = get_retriever()
+    try:
+        # Fetched here so a first, synchronous build uses this thread's
+        # database connection; the pool only runs the in-memory lookup
+        lexical_index = get_lexical_index().get()
+        lexical_future = get_engine().lexical_executor.submit(
+            lexical_index.search, question, candidates, categories
+        )
+    except Exception as e:
+        print(f"Error in lexical search: {e}")
+        return retriever.search(query_embedding, top_k, categories)
+
+    vector_hits = retriever.search(query_embedding, candidates, categories)
+    try:
+        lexical_hits = lexical_future.result()
+    except Exception as e:
+        print(f"Error in lexical search: {e}")
+        return vector_hits[:top_k]
+    return fuse_hits(query_embedding, vector_hits, lexical_hits, top_k)
+
+
+def fuse_hits(query_embedding: List[float], vector_hits: List[Dict],
+              lexical_hits: List[Dict], top_k: int) -> List[Dict]:
+    """
+    Reciprocal rank fusion of vector and BM25 hits for one query; FAQs
+    found only lexically are scored against the vector index.
+    """
+    by_id = {hit['id']: hit for hit in vector_hits}
+    fused = fuse_rrf(
+        [[hit['id'] for hit in vector_hits], [hit['id'] for hit in lexical_hits]],
+        k=settings.RAG_RRF_K
+    )[:top_k]
+
+    lexical_only = [faq_id for faq_id, _ in fused if faq_id not in by_id]
+    similarities = get_retriever().score(query_embedding, lexical_only) if lexical_only else {}
+    return [
+        by_id.get(faq_id) or {'id': faq_id, 'similarity': similarities.get(faq_id, 0.0), 'metadata': None}
+        for faq_id, _ in fused
+    ]
+
+
+def search_similar_faqs(question: str, top_k: int = 2,
+                        query_embedding: Optional[List[float]] = None,
+                        categories: Categories = None) -> List[Dict]:
+    """
+    Search for similar FAQs using semantic similarity, fused with BM25
+    keyword ranking when RAG_HYBRID_SEARCH is enabled.
 
     Args:
         question: User's question
         top_k: Number of top results to return (default: 2)
+        query_embedding: Precomputed embedding of question, if available
+        categories: Category filter (see resolve_categories)
 
     Returns:
         List of dicts with: id, question, answer, category, similarity_score
+        (empty if the search failed; see find_similar_faqs for the raising
+        variant)
     """
     try:
-        # Generate embedding for user question
-        query_embedding = get_embedding(question)
+        return find_similar_faqs(question, top_k, query_embedding, categories)
+    except Exception as e:
+        print(f"Error searching FAQs: {e}")
+        return []
+
+
+def find_similar_faqs(question: str, top_k: int = 2,
+                      query_embedding: Optional[List[float]] = None,
+                      categories: Categories = None) -> List[Dict]:
+    """search_similar_faqs() that raises search errors instead of returning no sources."""
+    if uses_retrieval_service():
+        return remote_search([question], top_k, [query_embedding], categories)[1][0]
+
+    # Generate embedding for user question
+    if query_embedding is None:
+        query_embedding = get_query_embedding(question)
+
+    # Hydrate source text from the FAQ table (one in_bulk for cache misses)
+    hits = search_hits(question, query_embedding, top_k, categories)
+    rows = fetch_faq_rows([int(hit['id']) for hit in hits])
+    return format_sources(hits, rows)
 
-        # Query ChromaDB
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k
-        )
 
-        # Format results
-        formatted_results = []
-        if results and results['ids'] and len(results['ids'][0]) > 0:
-            for i in range(len(results['ids'][0])):
-                # Convert distance to similarity score (1 - distance)
-                # ChromaDB returns L2 distance, convert to similarity percentage
-                distance = results['distances'][0][i]
-                similarity = max(0, 1 - distance)  # Ensure non-negative
-
-                formatted_results.append({
-                    'id': results['ids'][0][i],
-                    'question': results['metadatas'][0][i]['question'],
-                    'answer': results['metadatas'][0][i]['answer'],
-                    'category': results['metadatas'][0][i]['category'],
-                    'similarity_score': round(similarity * 100, 2)  # Convert to percentage
-                })
-
-        return formatted_results
+def classify_category(query_embedding: List[float]) -> Optional[str]:
+    """
+    The category whose centroid is nearest the question embedding, or None
+    when it doesn't beat the runner-up by RAG_CATEGORY_MIN_MARGIN. A failed
+    classification is reported and searches every category.
+    """
+    try:
+        classifier = get_retriever().category_classifier()
+        if classifier is None:
+            return None
+        return classifier.predict(query_embedding, min_margin=settings.RAG_CATEGORY_MIN_MARGIN)
     except Exception as e:
-        print(f"Error searching FAQs: {e}")
+        print(f"Error classifying question category: {e}")
+        return None
+
+
+def resolve_categories(query_embedding: List[float], categories: Categories) -> Optional[List[str]]:
+    """
+    Turn a category filter into the categories to search.
+
+    Args:
+        query_embedding: Embedding of the question
+        categories: Category names to search; AUTO_CATEGORY to let the
+            classifier pick one; None for every category (or the
+            classifier's pick when RAG_CATEGORY_AUTO is on)
+
+    Returns:
+        Category names, or None to search the whole index (also when the
+        classifier is not confident)
+    """
+    if categories == AUTO_CATEGORY or (categories is None and settings.RAG_CATEGORY_AUTO):
+        category = classify_category(query_embedding)
+        return [category] if category is not None else None
+    if isinstance(categories, str):
+        return [categories]
+    return list(categories) if categories else None
+
+
+def search_hits(question: str, query_embedding: List[float], top_k: int,
+                categories: Categories = None) -> List[Dict]:
+    """
+    Retriever hits for one question: vector search, fused with BM25 when
+    RAG_HYBRID_SEARCH is on, within the resolved categories.
+    """
+    categories = resolve_categories(query_embedding, categories)
+    if settings.RAG_HYBRID_SEARCH:
+        return hybrid_search(question, query_embedding, top_k, categories)
+    return get_retriever().search(query_embedding, top_k, categories)
+
+
+def remote_search(questions: List[str], top_k: int,
+                  query_embeddings: Optional[List[Optional[List[float]]]] = None,
+                  categories: Categories = None
+                  ) -> Tuple[List[List[float]], List[List[Dict]], Dict[str, float]]:
+    """
+    Embed and search questions in the retrieval service in one round trip.
+    The category filter (see resolve_categories) is resolved by the service.
+
+    Embeddings come from query_embeddings or the embedding cache when
+    known, so the service only encodes the rest; new ones are cached.
+
+    Returns:
+        (embedding per question, sources per question, the service's
+        'embed' and 'search' seconds)
+    """
+    cache = get_embedding_cache()
+    known = list(query_embeddings) if query_embeddings is not None else [None] * len(questions)
+    if cache is not None:
+        known = [embedding if embedding is not None else cache.get(question)
+                 for question, embedding in zip(questions, known)]
+
+    vectors, all_hits, service_times = get_retrieval_client().search(questions, top_k, known, categories)
+    embeddings = vectors.tolist()
+    if cache is not None:
+        for question, embedding, was_known in zip(questions, embeddings, known):
+            if was_known is None:
+                cache.set(question, embedding)
+
+    rows = fetch_faq_rows(list({int(hit['id']) for hits in all_hits for hit in hits}))
+    return embeddings, [format_sources(hits, rows) for hits in all_hits], service_times
+
+
+def format_sources(hits: List[Dict], rows: Dict[int, Dict]) -> List[Dict]:
+    """Turn retriever hits plus hydrated FAQ rows into API source dicts."""
+    formatted_results = []
+    for hit in hits:
+        row = rows.get(int(hit['id']))
+        if row is None:
+            continue  # Deleted since the index was built
+        formatted_results.append({
+            'id': hit['id'],
+            'question': row['question'],
+            'answer': row['answer'],
+            'category': row['category'],
+            'similarity_score': round(hit['similarity'] * 100, 2)  # Convert to percentage
+        })
+    return formatted_results
+
+
+def search_many_faqs(questions: List[str], query_embeddings: List[List[float]],
+                     top_k: int = 2, categories: Categories = None) -> List[List[Dict]]:
+    """
+    search_similar_faqs() for many questions: one multi-query vector search,
+    in-process BM25 lookups when RAG_HYBRID_SEARCH is enabled, and one
+    hydration query for all hits.
+
+    Args:
+        questions: User questions
+        query_embeddings: Embedding of each question
+        top_k: Number of sources per question
+        categories: Category filter for every question (see resolve_categories)
+
+    Returns:
+        One list of sources per question, in order
+    """
+    if not questions:
         return []
+    if uses_retrieval_service():
+        return remote_search(questions, top_k, query_embeddings, categories)[1]
+    all_hits = search_hits_many(questions, query_embeddings, top_k, categories)
+    rows = fetch_faq_rows(list({int(hit['id']) for hits in all_hits for hit in hits}))
+    return [format_sources(hits, rows) for hits in all_hits]
 
 
-def generate_answer(question: str, sources: List[Dict]) -> str:
+def search_hits_many(questions: List[str], query_embeddings: List[List[float]],
+                     top_k: int, categories: Categories = None) -> List[List[Dict]]:
     """
-    Generate AI answer using ChatGroq based on retrieved sources.
+    search_hits() for many questions, with one multi-query vector search
+    per distinct resolved category filter.
+    """
+    groups: Dict[Optional[Tuple[str, ...]], List[int]] = {}
+    for index, query_embedding in enumerate(query_embeddings):
+        resolved = resolve_categories(query_embedding, categories)
+        groups.setdefault(tuple(resolved) if resolved else None, []).append(index)
+
+    all_hits: List[List[Dict]] = [[] for _ in questions]
+    for group, indexes in groups.items():
+        group_hits = search_hits_filtered(
+            [questions[i] for i in indexes], [query_embeddings[i] for i in indexes], top_k,
+            list(group) if group else None
+        )
+        for index, hits in zip(indexes, group_hits):
+            all_hits[index] = hits
+    return all_hits
+
+
+def search_hits_filtered(questions: List[str], query_embeddings: List[List[float]],
+                         top_k: int, categories: Optional[List[str]]) -> List[List[Dict]]:
+    """Hits for questions that share one category filter (None: all categories)."""
+    retriever = get_retriever()
+    if not settings.RAG_HYBRID_SEARCH:
+        all_hits = retriever.search_many(query_embeddings, top_k, categories)
+    else:
+        candidates = top_k * settings.RAG_HYBRID_CANDIDATES
+        all_vector_hits = retriever.search_many(query_embeddings, candidates, categories)
+        try:
+            lexical_index = get_lexical_index().get()
+            all_lexical_hits = [lexical_index.search(question, candidates, categories) for question in questions]
+        except Exception as e:
+            print(f"Error in lexical search: {e}")
+            all_hits = [vector_hits[:top_k] for vector_hits in all_vector_hits]
+        else:
+            all_hits = [
+                fuse_hits(query_embedding, vector_hits, lexical_hits, top_k)
+                for query_embedding, vector_hits, lexical_hits
+                in zip(query_embeddings, all_vector_hits, all_lexical_hits)
+            ]
+    return all_hits
+
+
+def exact_match_sources(questions: List[str], categories: Categories = None) -> Dict[int, Dict]:
+    """
+    Look questions up in the exact-match index (FAQ.question_hash) with one
+    query. Nothing is looked up when RAG_EXACT_MATCH is off, nor for
+    questions of fewer than RAG_EXACT_MATCH_MIN_WORDS normalized words. A
+    failed lookup is reported and treated as no match. Category names
+    limit the matches; AUTO_CATEGORY doesn't (a known question needs no
+    routing).
+
+    Returns:
+        {index into questions: source dict of the matching FAQ}
+    """
+    if not settings.RAG_EXACT_MATCH:
+        return {}
+    hashes = {
+        index: question_hash(question) for index, question in enumerate(questions)
+        if len(normalize_question(question).split()) >= settings.RAG_EXACT_MATCH_MIN_WORDS
+    }
+    if not hashes:
+        return {}
+    try:
+        faqs = FAQ.objects.filter(question_hash__in=set(hashes.values()))
+        if categories and categories != AUTO_CATEGORY:
+            faqs = faqs.filter(category__in=[categories] if isinstance(categories, str) else list(categories))
+        rows = faqs.order_by('-id').values_list('question_hash', 'id', 'question', 'answer', 'category')
+        faqs = {row[0]: row[1:] for row in rows}  # The lowest id wins among duplicates
+    except Exception as e:
+        print(f"Error in exact-match lookup: {e}")
+        return {}
+
+    matches = {}
+    for index, digest in hashes.items():
+        if digest in faqs:
+            faq_id, question, answer, category = faqs[digest]
+            matches[index] = {
+                'id': str(faq_id),
+                'question': question,
+                'answer': answer,
+                'category': category,
+                'similarity_score': 100.0
+            }
+    return matches
+
+
+def exact_match_result(source: Dict) -> Dict:
+    """Pipeline result for a question answered with a FAQ's curated answer."""
+    return {
+        'answer': source['answer'],
+        'sources': [source],
+        'cache_hit': False,
+        'exact_match': True
+    }
+
+
+def find_exact_match(question: str, timer: Optional[StageTimer] = None,
+                     categories: Categories = None) -> Optional[Dict]:
+    """
+    exact_match_result() for question, or None if no FAQ question matches.
+    The lookup is timed as part of timer's 'retrieve' stage.
+    """
+    with timed(timer, 'retrieve'):
+        source = exact_match_sources([question], categories).get(0)
+    return exact_match_result(source) if source is not None else None
+
+
+def build_messages(question: str, sources: List[Dict]) -> List[Dict]:
+    """
+    Build the chat messages sent to the LLM for a question and its sources.
 
     Args:
         question: User's question
         sources: List of relevant FAQ sources
 
     Returns:
-        AI-generated answer text
+        List of chat messages (system + user prompt)
     """
-    try:
-        # Build context from sources
-        context = ""
-        for idx, source in enumerate(sources, 1):
-            context += f"\n[Source {idx} - {source['category']}]\n"
-            context += f"Q: {source['question']}\n"
-            context += f"A: {source['answer']}\n"
+    # Build context from sources
+    context = ""
+    for idx, source in enumerate(sources, 1):
+        context += f"\n[Source {idx} - {source['category']}]\n"
+        context += f"Q: {source['question']}\n"
+        context += f"A: {source['answer']}\n"
 
-        # Create prompt
-        prompt = f"""You are a helpful legal assistant. Answer the user's question based on the following context from our legal FAQ database.
+    # Create prompt
+    prompt = f"""You are a helpful legal assistant. Answer the user's question based on the following context from our legal FAQ database.
 
 Provide a clear, accurate, and helpful answer. If the context doesn't fully answer the question, do your best to provide useful information while noting any limitations.
 
@@ -163,73 +1436,474 @@ User Question: {question}
 
 Answer:"""
 
-        # Call Groq API
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful legal assistant that provides accurate information based on the given context. Always be clear, concise, and helpful."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=500
-        )
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful legal assistant that provides accurate information based on the given context. Always be clear, concise, and helpful."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+
+def request_answer(question: str, sources: List[Dict]) -> str:
+    """
+    Get an answer from the configured generator backend (Groq through the
+    LLM gateway by default). Unlike generate_answer, errors are raised.
+
+    Args:
+        question: User's question
+        sources: List of relevant FAQ sources
+
+    Returns:
+        AI-generated answer text
+
+    Raises:
+        LLMUnavailableError: if the backend could not get an answer in time
+    """
+    return get_generator().complete(
+        build_messages(question, sources),
+        temperature=LLM_TEMPERATURE,
+        max_tokens=LLM_MAX_TOKENS
+    )
 
-        answer = chat_completion.choices[0].message.content
-        return answer.strip()
 
+def request_answer_stream(question: str, sources: List[Dict]) -> Iterator[str]:
+    """
+    Stream an answer from the generator backend as it is generated. Errors
+    are raised.
+
+    Args:
+        question: User's question
+        sources: List of relevant FAQ sources
+
+    Yields:
+        Answer text fragments in order
+    """
+    yield from get_generator().stream(
+        build_messages(question, sources),
+        temperature=LLM_TEMPERATURE,
+        max_tokens=LLM_MAX_TOKENS
+    )
+
+
+async def arequest_answer(question: str, sources: List[Dict]) -> str:
+    """
+    Async variant of request_answer (the async Groq client for 'groq').
+
+    Args:
+        question: User's question
+        sources: List of relevant FAQ sources
+
+    Returns:
+        AI-generated answer text
+    """
+    return await get_generator().acomplete(
+        build_messages(question, sources),
+        temperature=LLM_TEMPERATURE,
+        max_tokens=LLM_MAX_TOKENS
+    )
+
+
+def generation_error_answer(error: Exception) -> str:
+    """Answer text shown to the user when generation fails."""
+    return f"I apologize, but I encountered an error generating an answer. Please try again. Error: {str(error)}"
+
+
+def generate_answer(question: str, sources: List[Dict]) -> str:
+    """
+    Generate AI answer using ChatGroq based on retrieved sources.
+
+    Args:
+        question: User's question
+        sources: List of relevant FAQ sources
+
+    Returns:
+        AI-generated answer text
+    """
+    try:
+        return request_answer(question, sources)
     except Exception as e:
         print(f"Error generating answer: {e}")
-        return f"I apologize, but I encountered an error generating an answer. Please try again. Error: {str(e)}"
+        return generation_error_answer(e)
+
 
+NO_SOURCES_ANSWER = "I apologize, but I couldn't find relevant information in our FAQ database. Please try rephrasing your question or contact a legal professional for assistance."
 
-def process_question(question: str) -> Dict:
+
+def process_question(question: str, timer: Optional[StageTimer] = None,
+                     categories: Categories = None) -> Dict:
     """
     Main RAG pipeline: retrieve sources and generate answer.
 
+    Questions matching a FAQ question get its curated answer directly
+    (exact_match set). Answers for near-identical questions that retrieved
+    the same sources are served from the semantic answer cache without
+    calling the LLM.
+
     Args:
         question: User's question
+        timer: Optional StageTimer that receives embed/retrieve/generate times
+        categories: Category filter for the sources (see resolve_categories)
 
     Returns:
-        Dict with 'answer' and 'sources' keys
+        Dict with 'answer', 'sources', 'cache_hit' and 'exact_match' keys
+
+    Raises:
+        LLMUnavailableError: if the LLM could not answer in time
+        RetrievalServiceError: if the retrieval service (RAG_RETRIEVAL_MODE
+            'service') could not be reached or failed
     """
     try:
+        # Known FAQ question: no retrieval or generation
+        exact = find_exact_match(question, timer, categories)
+        if exact is not None:
+            return exact
+
         # Step 1: Search for similar FAQs
-        sources = search_similar_faqs(question, top_k=2)
+        query_embedding, sources = retrieve(question, timer, categories)
+
+        # Steps 2-3: cached or generated answer
+        return answer_with_sources(question, query_embedding, sources, timer)
+
+    except (LLMUnavailableError, RetrievalServiceError):
+        raise
+    except Exception as e:
+        print(f"Error processing question: {e}")
+        return {
+            'answer': f"An error occurred while processing your question: {str(e)}",
+            'sources': [],
+            'cache_hit': False,
+            'exact_match': False
+        }
+
+
+def answer_with_sources(question: str, query_embedding: List[float], sources: List[Dict],
+                        timer: Optional[StageTimer] = None) -> Dict:
+    """
+    Answer a question from already retrieved sources (blocking): the semantic
+    answer cache first, then the LLM. Generation errors become the answer text.
+    The LLM call is timed as timer's 'generate' stage.
+
+    Returns:
+        Dict with 'answer', 'sources', 'cache_hit' and 'exact_match' keys
+    """
+    if not sources:
+        return {
+            'answer': NO_SOURCES_ANSWER,
+            'sources': [],
+            'cache_hit': False,
+            'exact_match': False
+        }
+
+    # Reuse a cached answer if one matches
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        cached_answer = answer_cache.get(query_embedding, sources)
+        if cached_answer is not None:
+            return {
+                'answer': cached_answer,
+                'sources': sources,
+                'cache_hit': True,
+                'exact_match': False
+            }
+
+    # Generate answer using sources
+    try:
+        with timed(timer, 'generate'):
+            answer = request_answer(question, sources)
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        print(f"Error generating answer: {e}")
+        answer = generation_error_answer(e)
+    else:
+        if answer_cache is not None:
+            answer_cache.set(query_embedding, sources, answer)
+
+    return {
+        'answer': answer,
+        'sources': sources,
+        'cache_hit': False,
+        'exact_match': False
+    }
+
+
+def retrieve(question: str, timer: Optional[StageTimer] = None,
+             categories: Categories = None) -> Tuple[List[float], List[Dict]]:
+    """
+    Embed a question and search for similar FAQs (blocking), timing both
+    stages. In service mode both happen in one round trip, and the
+    service's encode time is reported as the embed stage. A failed local
+    search is counted as a 'retrieve' stage error and answered with no
+    sources.
+    """
+    if uses_retrieval_service():
+        with timed(timer, 'retrieve'):
+            query_embeddings, all_sources, service_times = remote_search([question], 2, categories=categories)
+        if timer is not None:
+            timer.reassign('retrieve', 'embed', service_times['embed'])
+        return query_embeddings[0], all_sources[0]
+
+    with timed(timer, 'embed'):
+        query_embedding = get_query_embedding(question)
+    try:
+        with timed(timer, 'retrieve'):
+            sources = find_similar_faqs(question, top_k=2, query_embedding=query_embedding,
+                                        categories=categories)
+    except Exception as e:
+        print(f"Error searching FAQs: {e}")
+        sources = []
+    return query_embedding, sources
+
+
+async def aprocess_question(question: str, timer: Optional[StageTimer] = None,
+                            categories: Categories = None) -> Dict:
+    """
+    Async RAG pipeline with the same result as process_question.
+
+    Embedding and vector search are offloaded to the engine's bounded
+    executor; generation awaits the async Groq client.
+
+    Args:
+        question: User's question
+        timer: Optional StageTimer that receives embed/retrieve/generate times
+        categories: Category filter for the sources (see resolve_categories)
+
+    Returns:
+        Dict with 'answer', 'sources', 'cache_hit' and 'exact_match' keys
+
+    Raises:
+        LLMUnavailableError: if the LLM could not answer in time
+        RetrievalServiceError: if the retrieval service (RAG_RETRIEVAL_MODE
+            'service') could not be reached or failed
+    """
+    try:
+        # Known FAQ question: no retrieval or generation
+        loop = asyncio.get_running_loop()
+        exact = await loop.run_in_executor(get_engine().executor, find_exact_match, question, timer, categories)
+        if exact is not None:
+            return exact
+
+        # Step 1: Search for similar FAQs off the event loop
+        query_embedding, sources = await loop.run_in_executor(
+            get_engine().executor, retrieve, question, timer, categories
+        )
 
         if not sources:
             return {
-                'answer': "I apologize, but I couldn't find relevant information in our FAQ database. Please try rephrasing your question or contact a legal professional for assistance.",
-                'sources': []
+                'answer': NO_SOURCES_ANSWER,
+                'sources': [],
+                'cache_hit': False,
+                'exact_match': False
             }
 
-        # Step 2: Generate answer using sources
-        answer = generate_answer(question, sources)
+        # Step 2: Reuse a cached answer if one matches
+        answer_cache = get_answer_cache()
+        if answer_cache is not None:
+            cached_answer = answer_cache.get(query_embedding, sources)
+            if cached_answer is not None:
+                return {
+                    'answer': cached_answer,
+                    'sources': sources,
+                    'cache_hit': True,
+                    'exact_match': False
+                }
+
+        # Step 3: Generate answer using sources
+        try:
+            with timed(timer, 'generate'):
+                answer = await arequest_answer(question, sources)
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Error generating answer: {e}")
+            answer = generation_error_answer(e)
+        else:
+            if answer_cache is not None:
+                answer_cache.set(query_embedding, sources, answer)
 
         return {
             'answer': answer,
-            'sources': sources
+            'sources': sources,
+            'cache_hit': False,
+            'exact_match': False
         }
 
+    except (LLMUnavailableError, RetrievalServiceError):
+        raise
     except Exception as e:
         print(f"Error processing question: {e}")
         return {
             'answer': f"An error occurred while processing your question: {str(e)}",
-            'sources': []
+            'sources': [],
+            'cache_hit': False,
+            'exact_match': False
         }
 
 
+def stream_question(question: str, timer: Optional[StageTimer] = None,
+                    categories: Categories = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Streaming RAG pipeline: sources first, then the answer as it generates.
+
+    Yields (event, payload) pairs:
+        ('sources', [...])            once, as soon as retrieval finishes
+        ('token', 'text')             for each answer fragment
+        ('error', 'message')          if generation fails part-way
+        ('done', {'answer', 'sources', 'cache_hit', 'exact_match'})  last, with the full answer
+
+    Args:
+        question: User's question
+        timer: Optional StageTimer; 'generate' spans the whole token stream
+        categories: Category filter for the sources (see resolve_categories)
+    """
+    exact = find_exact_match(question, timer, categories)
+    if exact is not None:
+        yield 'sources', exact['sources']
+        yield 'token', exact['answer']
+        yield 'done', exact
+        return
+
+    query_embedding, sources = retrieve(question, timer, categories)
+    yield 'sources', sources
+
+    if not sources:
+        yield 'token', NO_SOURCES_ANSWER
+        yield 'done', {'answer': NO_SOURCES_ANSWER, 'sources': [], 'cache_hit': False, 'exact_match': False}
+        return
+
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        cached_answer = answer_cache.get(query_embedding, sources)
+        if cached_answer is not None:
+            yield 'token', cached_answer
+            yield 'done', {'answer': cached_answer, 'sources': sources, 'cache_hit': True, 'exact_match': False}
+            return
+
+    parts = []
+    try:
+        with timed(timer, 'generate'):
+            for delta in request_answer_stream(question, sources):
+                parts.append(delta)
+                yield 'token', delta
+    except Exception as e:
+        print(f"Error streaming answer: {e}")
+        error_answer = generation_error_answer(e)
+        yield 'error', error_answer
+        yield 'done', {'answer': error_answer, 'sources': sources, 'cache_hit': False, 'exact_match': False}
+        return
+
+    answer = ''.join(parts).strip()
+    if answer_cache is not None:
+        answer_cache.set(query_embedding, sources, answer)
+    yield 'done', {'answer': answer, 'sources': sources, 'cache_hit': False, 'exact_match': False}
+
+
+def process_questions(questions: List[str], top_k: int = 2,
+                      timings: Optional[Dict[str, float]] = None,
+                      timers: Optional[List[StageTimer]] = None,
+                      categories: Categories = None) -> Iterator[Tuple[int, Dict]]:
+    """
+    Batch RAG pipeline for many questions at once.
+
+    Questions matching a FAQ question are answered from one exact-match
+    lookup. The others are embedded in one batched encode and searched with
+    one multi-query vector search and one hydration query; answers are then
+    generated on the engine's generation pool, so at most
+    RAG_BATCH_GENERATION_CONCURRENCY LLM calls run at a time. Nothing is
+    yielded before the search is done, so a retrieval failure surfaces
+    before any result.
+
+    Args:
+        questions: User questions
+        top_k: Number of sources per question
+        timings: Optional dict that receives 'embedding' and 'search' seconds
+        timers: Optional StageTimer per question for its 'generate' stage
+            (embedding and search are shared by the batch, see timings)
+        categories: Category filter for every question (see
+            resolve_categories); with AUTO_CATEGORY each question is routed
+            on its own and questions routed alike are searched together
+
+    Yields:
+        (index into questions, result dict as from process_question):
+        exact matches first, then each answer as it completes, not in input
+        order. Results whose LLM call failed carry the reason under 'error'.
+
+    Raises:
+        RetrievalServiceError: if the retrieval service (RAG_RETRIEVAL_MODE
+            'service') could not be reached or failed
+    """
+    exact = exact_match_sources(questions, categories)
+    pending = [index for index in range(len(questions)) if index not in exact]
+    if not pending:
+        for index, source in exact.items():
+            yield index, exact_match_result(source)
+        return
+    pending_questions = [questions[index] for index in pending]
+
+    start = time.perf_counter()
+    if uses_retrieval_service():
+        query_embeddings, all_sources, service_times = remote_search(pending_questions, top_k,
+                                                                     categories=categories)
+        if timings is not None:
+            timings['embedding'] = service_times['embed']
+            timings['search'] = time.perf_counter() - start - service_times['embed']
+    else:
+        query_embeddings = get_query_embeddings(pending_questions)
+        embedded = time.perf_counter()
+        all_sources = search_many_faqs(pending_questions, query_embeddings, top_k, categories)
+        if timings is not None:
+            timings['embedding'] = embedded - start
+            timings['search'] = time.perf_counter() - embedded
+    sources_of = dict(zip(pending, all_sources))
+    for index, source in exact.items():
+        yield index, exact_match_result(source)
+
+    executor = get_engine().generation_executor
+    futures = {
+        executor.submit(answer_with_sources, questions[index], query_embedding, sources,
+                        timers[index] if timers else None): index
+        for index, query_embedding, sources in zip(pending, query_embeddings, all_sources)
+    }
+    for future in as_completed(futures):
+        index = futures[future]
+        try:
+            result = future.result()
+        except LLMUnavailableError as e:
+            result = {
+                'answer': generation_error_answer(e),
+                'sources': sources_of[index],
+                'cache_hit': False,
+                'exact_match': False,
+                'error': str(e)
+            }
+        yield index, result
+
+
+def batch_report(results: List[Dict], elapsed: float, timings: Dict[str, float]) -> Dict:
+    """Throughput summary of a process_questions() run."""
+    return {
+        'questions': len(results),
+        'seconds': round(elapsed, 3),
+        'questions_per_second': round(len(results) / elapsed, 2) if elapsed else 0.0,
+        'embedding_seconds': round(timings.get('embedding', 0.0), 3),
+        'search_seconds': round(timings.get('search', 0.0), 3),
+        'cache_hits': sum(1 for result in results if result['cache_hit']),
+        'exact_matches': sum(1 for result in results if result['exact_match']),
+        'without_sources': sum(1 for result in results if not result['sources']),
+        'llm_unavailable': sum(1 for result in results if result.get('error')),
+    }
 
 
 def get_collection_count() -> int:
-    """Get count of documents in ChromaDB collection."""
+    """Get count of documents in ChromaDB collection (the service's index in service mode)."""
     try:
-        return collection.count()
+        if uses_retrieval_service():
+            return get_retrieval_client().stats()['vectors']
+        return get_engine().collection.count()
     except:
         return 0
 
@@ -238,12 +1912,8 @@ def clear_collection() -> None:
     """Clear all documents from ChromaDB collection (use with caution!)."""
     try:
         # Delete and recreate collection
-        chroma_client.delete_collection(name="legal_faqs")
-        global collection
-        collection = chroma_client.create_collection(
-            name="legal_faqs",
-            metadata={"description": "Legal FAQ embeddings for RAG"}
-        )
+        get_engine().reset_collection()
+        corpus_changed()
         print("Collection cleared successfully!")
     except Exception as e:
         print(f"Error clearing collection: {e}")
@@ -0,0 +1,396 @@
+"""
+Out-of-process embedding and retrieval over a Unix domain socket.
+
+manage.py run_retrieval_service starts a RetrievalServer that owns the
+embedding model and the vector and BM25 indexes. Web workers with
+RAG_RETRIEVAL_MODE='service' send questions through a RetrievalClient and
+get back each question's embedding and retriever hits in one round trip
+(the FAQ text is hydrated on the web side), so they load no model, hold no
+index and don't encode under their own GIL. Encodes from all connections
+are coalesced by an EmbeddingBatcher in the service.
+
+Wire format: every message is a frame header !IB (payload length, opcode)
+followed by the payload. A connection carries one request at a time, each
+answered by one reply (REPLY or ERROR); clients keep one connection per
+thread. Payload fields:
+    string   !I byte length + UTF-8
+    strings  !I count + strings
+    matrix   !II rows, columns + float32 values (little-endian, row-major)
+
+    EMBED   request: strings                         reply: matrix
+    SEARCH  request: !H top_k, !B category mode (0 all, 1 listed, 2 auto),
+            strings (listed categories), strings (questions), !B per
+            question (1 if its embedding is sent), matrix (the sent
+            embeddings)
+            reply: matrix (every question's embedding), !ff (embed and
+            search seconds in the service), strings (category table), then
+            per question !H hit count and per hit !qfH (FAQ id,
+            similarity, category index or 0xFFFF)
+    STATS   request: empty                           reply: JSON string
+    ERROR   reply only: string
+"""
+
+import os
+import json
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .batching import EmbeddingBatcher
+from .categories import AUTO_CATEGORY
+
+OP_EMBED = 1
+OP_SEARCH = 2
+OP_STATS = 3
+OP_REPLY = 128
+OP_ERROR = 129
+
+HEADER = struct.Struct('!IB')
+HIT = struct.Struct('!qfH')
+NO_CATEGORY = 0xFFFF
+CATEGORIES_ALL, CATEGORIES_LISTED, CATEGORIES_AUTO = 0, 1, 2
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+class RetrievalServiceError(ConnectionError):
+    """The retrieval service could not be reached or failed the request."""
+
+
+class Writer:
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def pack(self, fmt: str, *values) -> 'Writer':
+        self.parts.append(struct.pack(fmt, *values))
+        return self
+
+    def string(self, text: str) -> 'Writer':
+        data = text.encode('utf-8')
+        return self.pack('!I', len(data)).raw(data)
+
+    def strings(self, texts: Sequence[str]) -> 'Writer':
+        self.pack('!I', len(texts))
+        for text in texts:
+            self.string(text)
+        return self
+
+    def matrix(self, rows) -> 'Writer':
+        array = np.ascontiguousarray(rows, dtype='<f4')
+        if array.size == 0:
+            array = array.reshape(0, 0)
+        return self.pack('!II', *array.shape).raw(array.tobytes())
+
+    def raw(self, data: bytes) -> 'Writer':
+        self.parts.append(data)
+        return self
+
+    def getvalue(self) -> bytes:
+        return b''.join(self.parts)
+
+
+class Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def unpack(self, fmt: str) -> Tuple:
+        values = struct.unpack_from(fmt, self.data, self.offset)
+        self.offset += struct.calcsize(fmt)
+        return values
+
+    def string(self) -> str:
+        (length,) = self.unpack('!I')
+        text = bytes(self.data[self.offset:self.offset + length]).decode('utf-8')
+        self.offset += length
+        return text
+
+    def strings(self) -> List[str]:
+        (count,) = self.unpack('!I')
+        return [self.string() for _ in range(count)]
+
+    def matrix(self) -> np.ndarray:
+        rows, columns = self.unpack('!II')
+        size = rows * columns * 4
+        array = np.frombuffer(self.data[self.offset:self.offset + size], dtype='<f4').reshape(rows, columns)
+        self.offset += size
+        return array
+
+
+def send_frame(sock: socket.socket, op: int, payload: bytes) -> None:
+    sock.sendall(HEADER.pack(len(payload), op) + payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if count == 0:
+            raise EOFError("Connection closed")
+        received += count
+    return bytes(buffer)
+
+
+def recv_frame(sock: socket.socket) -> Tuple[int, bytes]:
+    length, op = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return op, _recv_exactly(sock, length)
+
+
+def encode_hits(writer: Writer, all_hits: List[List[Dict]]) -> None:
+    names = sorted({
+        hit['metadata']['category'] for hits in all_hits for hit in hits
+        if hit.get('metadata') and hit['metadata'].get('category') is not None
+    })
+    code_of = {name: code for code, name in enumerate(names)}
+    writer.strings(names)
+    for hits in all_hits:
+        writer.pack('!H', len(hits))
+        for hit in hits:
+            category = (hit.get('metadata') or {}).get('category')
+            writer.raw(HIT.pack(int(hit['id']), hit['similarity'], code_of.get(category, NO_CATEGORY)))
+
+
+def decode_hits(reader: Reader, count: int) -> List[List[Dict]]:
+    names = reader.strings()
+    all_hits = []
+    for _ in range(count):
+        (hit_count,) = reader.unpack('!H')
+        hits = []
+        for _ in range(hit_count):
+            faq_id, similarity, code = reader.unpack(HIT.format)
+            hits.append({
+                'id': str(faq_id),
+                'similarity': similarity,
+                'metadata': {'category': names[code]} if code != NO_CATEGORY else None,
+            })
+        all_hits.append(hits)
+    return all_hits
+
+
+class RetrievalServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serves EMBED, SEARCH and STATS requests on a Unix socket, one thread per
+    connection.
+
+    Args:
+        path: Socket path (a stale socket file is replaced)
+        encode_batch: Embeds a list of texts; returns L2-normalized vectors
+        search: (questions, embeddings, top_k, categories) -> retriever hits
+            per question; categories is None, a list of names or AUTO_CATEGORY
+        describe: Extra fields for STATS (index size, runtime, ...)
+        max_batch_size / max_wait_ms: Cross-client encode batching
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, encode_batch: Callable[[List[str]], Sequence],
+                 search: Callable[[List[str], List[List[float]], int, Any], List[List[Dict]]],
+                 describe: Optional[Callable[[], Dict]] = None,
+                 max_batch_size: int = 32, max_wait_ms: float = 5):
+        self.path = path
+        self.search = search
+        self.describe = describe
+        self.batcher = EmbeddingBatcher(encode_batch, max_batch_size=max_batch_size,
+                                        max_wait_ms=max_wait_ms)
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.errors = 0
+        self.connections = 0
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, RetrievalRequestHandler)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed texts through the shared batcher (one batch with other clients' texts)."""
+        futures = [self.batcher.submit(text) for text in texts]
+        return np.asarray([future.result() for future in futures], dtype=np.float32)
+
+    def handle_request_frame(self, op: int, payload: bytes) -> bytes:
+        reader = Reader(payload)
+        if op == OP_EMBED:
+            self._count('embed')
+            return Writer().matrix(self.embed(reader.strings())).getvalue()
+        if op == OP_SEARCH:
+            self._count('search')
+            top_k, mode = reader.unpack('!HB')
+            listed = reader.strings()
+            categories = AUTO_CATEGORY if mode == CATEGORIES_AUTO else (listed if mode == CATEGORIES_LISTED else None)
+            questions = reader.strings()
+            sent = reader.unpack(f'!{len(questions)}B') if questions else ()
+            known = iter(reader.matrix())
+            embeddings: List[Optional[np.ndarray]] = [next(known) if flag else None for flag in sent]
+
+            start = time.perf_counter()
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if missing:
+                for i, vector in zip(missing, self.embed([questions[i] for i in missing])):
+                    embeddings[i] = vector
+            embedded = time.perf_counter()
+            all_hits = self.search(questions, [embedding.tolist() for embedding in embeddings], top_k,
+                                   categories) if questions else []
+            searched = time.perf_counter()
+
+            writer = Writer().matrix(embeddings if questions else np.empty((0, 0)))
+            writer.pack('!ff', embedded - start, searched - embedded)
+            encode_hits(writer, all_hits)
+            return writer.getvalue()
+        if op == OP_STATS:
+            return Writer().string(json.dumps(self.stats())).getvalue()
+        raise ValueError(f"Unknown opcode {op}")
+
+    def _count(self, op: str) -> None:
+        with self._lock:
+            self.requests[op] = self.requests.get(op, 0) + 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {
+                'pid': os.getpid(),
+                'connections': self.connections,
+                'requests': dict(self.requests),
+                'errors': self.errors,
+            }
+        stats['embedding_batcher'] = self.batcher.stats()
+        if self.describe is not None:
+            stats.update(self.describe())
+        return stats
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class RetrievalRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        with server._lock:
+            server.connections += 1
+        while True:
+            try:
+                op, payload = recv_frame(self.request)
+            except (EOFError, OSError):
+                return
+            except ValueError as e:
+                send_frame(self.request, OP_ERROR, Writer().string(str(e)).getvalue())
+                return  # Can't find the next frame boundary
+            try:
+                reply_op, reply = OP_REPLY, server.handle_request_frame(op, payload)
+            except Exception as e:
+                with server._lock:
+                    server.errors += 1
+                reply_op, reply = OP_ERROR, Writer().string(f"{type(e).__name__}: {e}").getvalue()
+            try:
+                send_frame(self.request, reply_op, reply)
+            except OSError:
+                return
+
+    def finish(self):
+        with self.server._lock:
+            self.server.connections -= 1
+
+
+class RetrievalClient:
+    """
+    Client for a RetrievalServer; safe to share between threads (each
+    thread uses its own connection).
+
+    Args:
+        path: Socket path of the service
+        timeout: Seconds to wait for a connection or a reply
+    """
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise RetrievalServiceError(f"Retrieval service unreachable at {self.path}: {e}") from e
+        return sock
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _call(self, op: int, payload: bytes) -> Reader:
+        sock = getattr(self._local, 'sock', None)
+        reused = sock is not None
+        while True:
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            try:
+                send_frame(sock, op, payload)
+                reply_op, reply = recv_frame(sock)
+                break
+            except (EOFError, OSError, ValueError) as e:
+                self.close()
+                sock = None
+                if reused and not isinstance(e, socket.timeout):
+                    reused = False  # Stale connection (service restarted): retry once
+                    continue
+                raise RetrievalServiceError(f"Retrieval service request failed: {e}") from e
+        if reply_op == OP_ERROR:
+            raise RetrievalServiceError(Reader(reply).string())
+        return Reader(reply)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts in the service; returns a (len(texts), dimensions) matrix."""
+        return self._call(OP_EMBED, Writer().strings(list(texts)).getvalue()).matrix()
+
+    def search(self, questions: Sequence[str], top_k: int,
+               embeddings: Optional[Sequence[Optional[Sequence[float]]]] = None,
+               categories: Any = None) -> Tuple[np.ndarray, List[List[Dict]], Dict[str, float]]:
+        """
+        Embed (where no embedding is given) and search questions in one round trip.
+
+        Args:
+            questions: Questions to search for
+            top_k: Hits per question
+            embeddings: Known embedding (or None) per question
+            categories: None for every category, category names, or
+                AUTO_CATEGORY for the service's classifier to pick
+
+        Returns:
+            (embedding matrix, retriever hits per question, the service's
+            'embed' and 'search' seconds)
+        """
+        embeddings = list(embeddings) if embeddings is not None else [None] * len(questions)
+        known = [embedding for embedding in embeddings if embedding is not None]
+        if categories == AUTO_CATEGORY:
+            writer = Writer().pack('!HB', top_k, CATEGORIES_AUTO).strings([])
+        elif categories:
+            listed = [categories] if isinstance(categories, str) else list(categories)
+            writer = Writer().pack('!HB', top_k, CATEGORIES_LISTED).strings(listed)
+        else:
+            writer = Writer().pack('!HB', top_k, CATEGORIES_ALL).strings([])
+        writer.strings(list(questions))
+        writer.pack(f'!{len(questions)}B', *(embedding is not None for embedding in embeddings))
+        writer.matrix(known if known else np.empty((0, 0)))
+
+        reader = self._call(OP_SEARCH, writer.getvalue())
+        vectors = reader.matrix()
+        embed_seconds, search_seconds = reader.unpack('!ff')
+        hits = decode_hits(reader, len(questions))
+        return vectors, hits, {'embed': embed_seconds, 'search': search_seconds}
+
+    def stats(self) -> Dict:
+        """The service's counters, batcher metrics and index description."""
+        return json.loads(self._call(OP_STATS, b'').string())
@@ -0,0 +1,393 @@
+"""
+Pluggable vector retrieval backends behind rag.search_similar_faqs.
+
+ChromaRetriever: queries the persistent ChromaDB collection.
+NumpyRetriever: exact search over a memory-mapped float32 matrix of
+normalized embeddings - one matrix-vector product plus argpartition, which
+beats a ChromaDB round-trip for corpora up to a few hundred thousand FAQs.
+
+Every backend returns hits as dicts:
+    {'id': '12', 'similarity': 0.83, 'metadata': {...} or None}
+where similarity is in [0, 1] and metadata holds at most the category.
+Question and answer text is hydrated by the caller from the FAQ table.
+
+Searches can be limited to categories: ChromaDB applies a `where`
+pre-filter, and the NumPy index keeps each category's rows contiguous so a
+filtered search only scores that partition. Each backend also provides the
+category centroids for the query-side classifier (api.categories); both
+compute them at ingestion time and reload them when the files change.
+"""
+
+import os
+import json
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .categories import CentroidClassifier, category_centroids
+
+
+def distance_to_similarity(distance: float, space: str) -> float:
+    """
+    Convert a ChromaDB distance to cosine similarity in [0, 1].
+
+    Embeddings are L2-normalized, so every space maps onto cosine similarity:
+    'cosine' and 'ip' return 1 - cos, and 'l2' returns the squared L2
+    distance, which is 2 - 2cos for unit vectors.
+    """
+    if space == 'l2':
+        similarity = 1 - distance / 2
+    else:
+        similarity = 1 - distance
+    return min(1.0, max(0.0, similarity))
+
+
+class BaseRetriever:
+    """Interface for vector search backends."""
+
+    name = 'base'
+
+    def search(self, query_embedding: Sequence[float], top_k: int,
+               categories: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Return up to top_k hits, best first, optionally limited to categories."""
+        raise NotImplementedError
+
+    def search_many(self, query_embeddings: Sequence[Sequence[float]], top_k: int,
+                    categories: Optional[Sequence[str]] = None) -> List[List[Dict]]:
+        """Run search() for each query embedding; backends override this to batch."""
+        return [self.search(query_embedding, top_k, categories) for query_embedding in query_embeddings]
+
+    def score(self, query_embedding: Sequence[float], ids: Sequence[str]) -> Dict[str, float]:
+        """Return the similarity of each of ids to the query (ids not indexed are left out)."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Number of vectors in the index."""
+        raise NotImplementedError
+
+    def category_classifier(self) -> Optional[CentroidClassifier]:
+        """Centroid classifier over the indexed categories, or None for an empty index."""
+        raise NotImplementedError
+
+    def invalidate(self) -> None:
+        """Drop anything derived from the indexed vectors after they were written in-process."""
+
+
+class ChromaRetriever(BaseRetriever):
+    """Vector search through a ChromaDB collection."""
+
+    name = 'chroma'
+
+    def __init__(self, get_collection: Callable, centroids_path: Optional[str] = None):
+        # Resolved per call so collection resets (clear_collection) are picked up
+        self.get_collection = get_collection
+        self.centroids_path = centroids_path
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._classifier = None
+
+    def search(self, query_embedding, top_k, categories=None):
+        return self.search_many([query_embedding], top_k, categories)[0]
+
+    def search_many(self, query_embeddings, top_k, categories=None):
+        if len(query_embeddings) == 0:
+            return []
+        collection = self.get_collection()
+        space = (collection.metadata or {}).get('hnsw:space', 'l2')
+
+        # One query call for all embeddings
+        query = {
+            'query_embeddings': [list(query_embedding) for query_embedding in query_embeddings],
+            'n_results': top_k,
+            'include': ['distances', 'metadatas'],
+        }
+        if categories:
+            query['where'] = {'category': {'$in': list(categories)}}
+        results = collection.query(**query)
+
+        all_hits = []
+        for q in range(len(query_embeddings)):
+            hits = []
+            if results and results['ids'] and len(results['ids'][q]) > 0:
+                for i in range(len(results['ids'][q])):
+                    hits.append({
+                        'id': results['ids'][q][i],
+                        'similarity': distance_to_similarity(results['distances'][q][i], space),
+                        'metadata': results['metadatas'][q][i],
+                    })
+            all_hits.append(hits)
+        return all_hits
+
+    def score(self, query_embedding, ids):
+        if not ids:
+            return {}
+        stored = self.get_collection().get(ids=list(ids), include=['embeddings'])
+        if not stored['ids']:
+            return {}
+        query = np.asarray(query_embedding, dtype=np.float32)
+        similarities = np.asarray(stored['embeddings'], dtype=np.float32) @ query
+        return {
+            faq_id: min(1.0, max(0.0, float(similarity)))
+            for faq_id, similarity in zip(stored['ids'], similarities)
+        }
+
+    def count(self):
+        return self.get_collection().count()
+
+    @staticmethod
+    def build_centroids(path: str, embeddings, categories: Sequence[str]) -> None:
+        """
+        Write the category centroids of the collection's vectors to path (.npz).
+
+        Called after ingestion, so no request has to page the collection; the
+        file is replaced atomically and its mtime tells every process to reload.
+
+        Args:
+            path: Output file
+            embeddings: (N, D) array-like of embeddings
+            categories: Category name per row
+        """
+        names = sorted(set(categories))
+        code_of = {name: code for code, name in enumerate(names)}
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if categories:
+            matrix = matrix.reshape(len(categories), -1)
+        else:  # Empty collection
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        centroids = category_centroids(matrix, [code_of[c] for c in categories], len(names))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(os.path.abspath(path)), f".{os.path.basename(path)}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, names=np.asarray(names, dtype=str), centroids=centroids)
+        os.replace(tmp_path, path)
+
+    def reset_after_fork(self) -> None:
+        """Keep the loaded centroids; replace the lock, which a parent thread may hold."""
+        self._lock = threading.Lock()
+
+    def category_classifier(self):
+        """Centroids stored by build_centroids(), reloaded when the file changes."""
+        if not self.centroids_path:
+            return None
+        try:
+            mtime = os.stat(self.centroids_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    with np.load(self.centroids_path) as stored:
+                        names = [str(name) for name in stored['names']]
+                        centroids = stored['centroids']
+                    self._classifier = CentroidClassifier(names, centroids) if names else None
+                    self._loaded_mtime = mtime
+        return self._classifier
+
+    def invalidate(self):
+        # Re-read the centroid file on the next call, even if its mtime is unchanged
+        self._loaded_mtime = None
+
+
+class NumpyRetriever(BaseRetriever):
+    """
+    Exact cosine search over a memory-mapped .npy matrix.
+
+    The index directory holds:
+        embeddings.npy   float32 (N, D), rows L2-normalized
+        ids.npy          int64 (N,) FAQ ids
+        categories.npy   int16 (N,) category codes
+        centroids.npy    float32 (C, D) normalized mean embedding per category
+        categories.json  list of category names, indexed by code
+
+    Rows are sorted by category, so each category is a contiguous partition
+    and a filtered search multiplies only that slice of the matrix (indexes
+    built before partitioning gather the matching rows instead).
+
+    Files are memory-mapped read-only, so worker processes share the pages
+    through the OS page cache. The index is reloaded when build() replaces it.
+    """
+
+    name = 'numpy'
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        # (embeddings, ids, category_codes, category_names, id_order,
+        # partition offsets or None, classifier), swapped as one snapshot so a
+        # concurrent reload never mixes old and new arrays
+        self._index = None
+
+    @classmethod
+    def build(cls, path: str, ids: Sequence[int], embeddings, categories: Sequence[str]) -> None:
+        """
+        Write a new index to path, replacing any existing one atomically.
+        Rows are stored grouped by category (stable within a category).
+
+        Args:
+            path: Index directory
+            ids: FAQ ids, one per row
+            embeddings: (N, D) array-like of embeddings (normalized here)
+            categories: Category name per row
+        """
+        os.makedirs(path, exist_ok=True)
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        names = sorted(set(categories))
+        code_of = {name: code for code, name in enumerate(names)}
+        codes = np.asarray([code_of[c] for c in categories], dtype=np.int16)
+        order = np.argsort(codes, kind='stable')
+        arrays = {
+            'embeddings.npy': matrix[order],
+            'ids.npy': np.asarray(ids, dtype=np.int64)[order],
+            'categories.npy': codes[order],
+            'centroids.npy': category_centroids(matrix, codes, len(names)),
+        }
+        for filename, array in arrays.items():
+            tmp_path = os.path.join(path, f".{filename}.tmp")
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, os.path.join(path, filename))
+
+        # categories.json is written last; its mtime marks a complete build
+        tmp_path = os.path.join(path, '.categories.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(names, f)
+        os.replace(tmp_path, os.path.join(path, 'categories.json'))
+
+    def reset_after_fork(self) -> None:
+        """Keep the mapped index; replace the lock, which a parent thread may hold."""
+        self._lock = threading.Lock()
+
+    def _marker_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(os.path.join(self.path, 'categories.json')).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        """Return the current index snapshot, (re)loading it if the files changed."""
+        mtime = self._marker_mtime()
+        if mtime is None:
+            return None
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    with open(os.path.join(self.path, 'categories.json'), encoding='utf-8') as f:
+                        names = json.load(f)
+                    ids = np.load(os.path.join(self.path, 'ids.npy'))
+                    embeddings = np.load(os.path.join(self.path, 'embeddings.npy'), mmap_mode='r')
+                    codes = np.load(os.path.join(self.path, 'categories.npy'))
+                    offsets = None
+                    if np.all(codes[:-1] <= codes[1:]):
+                        # Category c occupies rows offsets[c]:offsets[c + 1]
+                        offsets = np.searchsorted(codes, np.arange(len(names) + 1))
+                    centroids_path = os.path.join(self.path, 'centroids.npy')
+                    if os.path.exists(centroids_path):
+                        centroids = np.load(centroids_path)
+                    else:  # Built before centroids were stored
+                        centroids = category_centroids(embeddings, codes, len(names))
+                    self._index = (
+                        embeddings,
+                        ids,
+                        codes,
+                        names,
+                        np.argsort(ids),  # Row lookup by FAQ id for score()
+                        offsets,
+                        CentroidClassifier(names, centroids),
+                    )
+                    self._loaded_mtime = mtime
+        return self._index
+
+    @staticmethod
+    def _category_rows(index, categories: Sequence[str]) -> np.ndarray:
+        """Ascending index rows of categories: partition ranges, or a scan of the codes."""
+        _, _, codes, names, _, offsets, _ = index
+        code_of = {name: code for code, name in enumerate(names)}
+        wanted = sorted({code_of[c] for c in categories if c in code_of})
+        if not wanted:
+            return np.zeros(0, dtype=np.int64)
+        if offsets is not None:
+            return np.concatenate([np.arange(offsets[code], offsets[code + 1]) for code in wanted])
+        return np.flatnonzero(np.isin(codes, wanted))
+
+    def search(self, query_embedding, top_k, categories=None):
+        return self.search_many([query_embedding], top_k, categories)[0]
+
+    def search_many(self, query_embeddings, top_k, categories=None):
+        index = self._load()
+        if index is None or len(index[1]) == 0:
+            return [[] for _ in query_embeddings]
+        if len(query_embeddings) == 0:
+            return []
+        embeddings, ids, category_codes, category_names = index[:4]
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        # Only the rows of the requested categories are scored
+        rows = None
+        matrix = embeddings
+        if categories:
+            rows = self._category_rows(index, categories)
+            if len(rows) == 0:
+                return [[] for _ in query_embeddings]
+            if rows[-1] - rows[0] + 1 == len(rows):
+                matrix = embeddings[rows[0]:rows[-1] + 1]  # One partition: a view, no copy
+            else:
+                matrix = embeddings[rows]
+
+        # One matrix-matrix product scores every query against the candidates
+        scores = queries @ matrix.T
+
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        top = np.take_along_axis(top, np.argsort(-top_scores, axis=1), axis=1)
+
+        all_hits = []
+        for columns, column_scores in zip(top, scores):
+            hits = []
+            for column in columns:
+                row = rows[column] if rows is not None else column
+                hits.append({
+                    'id': str(int(ids[row])),
+                    'similarity': max(0.0, float(column_scores[column])),
+                    'metadata': {'category': category_names[category_codes[row]]},
+                })
+            all_hits.append(hits)
+        return all_hits
+
+    @staticmethod
+    def _normalize(query_embedding) -> np.ndarray:
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def score(self, query_embedding, ids):
+        index = self._load()
+        if index is None or len(index[1]) == 0 or not ids:
+            return {}
+        embeddings, stored_ids, _, _, id_order = index[:5]
+
+        wanted = np.asarray([int(faq_id) for faq_id in ids], dtype=np.int64)
+        positions = np.minimum(np.searchsorted(stored_ids, wanted, sorter=id_order), len(id_order) - 1)
+        rows = id_order[positions]
+        found = stored_ids[rows] == wanted
+
+        similarities = embeddings[rows[found]] @ self._normalize(query_embedding)
+        return {
+            str(int(faq_id)): max(0.0, float(similarity))
+            for faq_id, similarity in zip(wanted[found], similarities)
+        }
+
+    def count(self):
+        index = self._load()
+        return len(index[1]) if index is not None else 0
+
+    def category_classifier(self):
+        index = self._load()
+        return index[6] if index is not None and len(index[1]) else None
@@ -0,0 +1,284 @@
+"""
+Incrementally maintained QueryLog statistics.
+
+Every batch of QueryLog rows also updates one QueryStatsRollup row per
+granularity (minute, hour, day and an all-time total) and bucket, in the
+same transaction. /api/stats/ then sums a bounded number of rollup rows for
+the requested window instead of scanning QueryLog. backfill_rollups()
+recomputes everything from QueryLog: migration 0010 runs it once for logs
+written before the rollups existed, and manage.py backfill_query_stats
+repairs them.
+"""
+
+import re
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncMinute
+from django.utils import timezone
+
+from .models import QueryLog, QueryStatsRollup
+
+# Upper bounds (seconds) of the processing-time histogram buckets; the last
+# histogram slot counts slower requests
+LATENCY_BUCKETS = [0.25, 0.5, 1, 2, 3, 5, 10, 30]
+
+# bucket_start of the single 'total' bucket
+TOTAL_BUCKET = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Minute buckets are only read for windows up to MINUTE_MAX_WINDOW, so
+# older ones are pruned
+MINUTE_MAX_WINDOW = timedelta(hours=6)
+HOUR_MAX_WINDOW = timedelta(days=14)
+MINUTE_RETENTION = timedelta(hours=48)
+MAX_WINDOW = timedelta(days=366)
+
+_WINDOW_RE = re.compile(r'^(\d+)([mhd])$')
+_WINDOW_UNITS = {'m': 'minutes', 'h': 'hours', 'd': 'days'}
+
+COUNTER_FIELDS = (
+    'query_count', 'cache_hits', 'processing_time_sum', 'processing_time_count',
+    'similarity_sum', 'similarity_count',
+)
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Start of the bucket of the given granularity containing moment (UTC)."""
+    moment = moment.astimezone(dt_timezone.utc)
+    if granularity == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return TOTAL_BUCKET
+
+
+def latency_bucket(seconds: float) -> int:
+    """Index of the histogram slot for a processing time."""
+    return bisect_left(LATENCY_BUCKETS, seconds)
+
+
+def histogram_labels() -> List[str]:
+    return [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+
+
+def _empty_counters() -> Dict:
+    counters = dict.fromkeys(COUNTER_FIELDS, 0)
+    counters['latency_histogram'] = [0] * (len(LATENCY_BUCKETS) + 1)
+    return counters
+
+
+def summarize(logs: Iterable[QueryLog]) -> Dict[tuple, Dict]:
+    """Per-(granularity, bucket_start) counters for saved QueryLog rows."""
+    deltas: Dict[tuple, Dict] = {}
+    for log in logs:
+        for granularity in ('minute', 'hour', 'day', 'total'):
+            key = (granularity, bucket_start(log.created_at, granularity))
+            counters = deltas.get(key)
+            if counters is None:
+                counters = deltas[key] = _empty_counters()
+            counters['query_count'] += 1
+            counters['cache_hits'] += int(bool(log.cache_hit))
+            if log.processing_time is not None:
+                counters['processing_time_sum'] += log.processing_time
+                counters['processing_time_count'] += 1
+                counters['latency_histogram'][latency_bucket(log.processing_time)] += 1
+            if log.avg_similarity is not None:
+                counters['similarity_sum'] += log.avg_similarity
+                counters['similarity_count'] += 1
+    return deltas
+
+
+def _apply(deltas: Dict[tuple, Dict]) -> bool:
+    """Add deltas to the rollup rows; returns True if a new hour bucket was created."""
+    bucket_filter = Q()
+    for granularity, start in deltas:
+        bucket_filter |= Q(granularity=granularity, bucket_start=start)
+    existing = {
+        (row.granularity, row.bucket_start): row
+        for row in QueryStatsRollup.objects.select_for_update().filter(bucket_filter)
+    }
+
+    to_update, to_create = [], []
+    for key, counters in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            to_create.append(QueryStatsRollup(granularity=key[0], bucket_start=key[1], **counters))
+            continue
+        for field in COUNTER_FIELDS:
+            setattr(row, field, getattr(row, field) + counters[field])
+        histogram = list(row.latency_histogram) or [0] * len(counters['latency_histogram'])
+        row.latency_histogram = [a + b for a, b in zip(histogram, counters['latency_histogram'])]
+        to_update.append(row)
+
+    QueryStatsRollup.objects.bulk_update(to_update, list(COUNTER_FIELDS) + ['latency_histogram'])
+    QueryStatsRollup.objects.bulk_create(to_create)
+    return any(row.granularity == 'hour' for row in to_create)
+
+
+def update_rollups(logs: List[QueryLog]) -> None:
+    """
+    Add saved QueryLog rows (created_at set) to the rollups. Call inside the
+    transaction that wrote the rows so logs and rollups stay consistent.
+    """
+    deltas = summarize(logs)
+    if not deltas:
+        return
+    try:
+        with transaction.atomic():
+            new_hour = _apply(deltas)
+    except IntegrityError:
+        # Another writer created one of the buckets first; its row now exists
+        new_hour = _apply(deltas)
+    if new_hour:
+        QueryStatsRollup.objects.filter(
+            granularity='minute', bucket_start__lt=timezone.now() - MINUTE_RETENTION
+        ).delete()
+
+
+def backfill_rollups(minute_retention: timedelta = MINUTE_RETENTION,
+                     query_log_model=QueryLog, rollup_model=QueryStatsRollup) -> int:
+    """
+    Recompute every rollup from QueryLog with one aggregate query per
+    granularity, replacing existing rollups.
+
+    Args:
+        minute_retention: Only logs this recent get minute buckets
+        query_log_model: QueryLog model (a migration passes its historical model)
+        rollup_model: QueryStatsRollup model (likewise)
+
+    Returns:
+        Number of rollup rows written
+    """
+    histogram = {}
+    previous = None
+    for index, bound in enumerate(LATENCY_BUCKETS + [None]):
+        condition = Q()
+        if previous is not None:
+            condition &= Q(processing_time__gt=previous)
+        if bound is not None:
+            condition &= Q(processing_time__lte=bound)
+        else:
+            condition &= Q(processing_time__isnull=False)
+        histogram[f'h{index}'] = Count('id', filter=condition)
+        previous = bound
+
+    aggregates = dict(
+        query_count=Count('id'),
+        cache_hits=Count('id', filter=Q(cache_hit=True)),
+        processing_time_sum=Sum('processing_time'),
+        processing_time_count=Count('processing_time'),
+        similarity_sum=Sum('avg_similarity'),
+        similarity_count=Count('avg_similarity'),
+        **histogram
+    )
+
+    def to_row(granularity, start, values):
+        return rollup_model(
+            granularity=granularity,
+            bucket_start=start,
+            latency_histogram=[values[f'h{i}'] for i in range(len(LATENCY_BUCKETS) + 1)],
+            **{field: values[field] or 0 for field in COUNTER_FIELDS}
+        )
+
+    rows = []
+    minute_cutoff = timezone.now() - minute_retention
+    truncations = {'minute': TruncMinute, 'hour': TruncHour, 'day': TruncDay}
+    for granularity, trunc in truncations.items():
+        logs = query_log_model.objects.order_by()
+        if granularity == 'minute':
+            logs = logs.filter(created_at__gte=minute_cutoff)
+        buckets = logs.annotate(bucket=trunc('created_at', tzinfo=dt_timezone.utc)) \
+            .values('bucket').annotate(**aggregates)
+        rows.extend(to_row(granularity, values['bucket'], values) for values in buckets)
+
+    total = query_log_model.objects.aggregate(**aggregates)
+    if total['query_count']:
+        rows.append(to_row('total', TOTAL_BUCKET, total))
+
+    with transaction.atomic():
+        rollup_model.objects.all().delete()
+        rollup_model.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def parse_window(window: Optional[str]) -> Optional[timedelta]:
+    """
+    Parse a window like '15m', '24h' or '7d'; 'all' or empty means all time.
+
+    Raises:
+        ValueError: for malformed windows or windows over MAX_WINDOW
+    """
+    if not window or window == 'all':
+        return None
+    match = _WINDOW_RE.match(window)
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid window {window!r}; use e.g. 15m, 24h, 7d or all")
+    delta = timedelta(**{_WINDOW_UNITS[match.group(2)]: int(match.group(1))})
+    if delta > MAX_WINDOW:
+        raise ValueError(f"Window {window!r} is longer than {MAX_WINDOW.days} days")
+    return delta
+
+
+def approximate_query_count() -> Optional[int]:
+    """
+    All-time QueryLog count from the 'total' rollup, or None if there is no
+    total rollup yet. Lags QueryLog.objects.count() only by rows still
+    queued in the log sink.
+    """
+    return QueryStatsRollup.objects.filter(
+        granularity='total', bucket_start=TOTAL_BUCKET
+    ).values_list('query_count', flat=True).first()
+
+
+def read_window(window: Optional[timedelta], now: Optional[datetime] = None) -> Dict:
+    """
+    Sum the rollups covering the last window (all time if None).
+
+    The window start is rounded down to the bucket size: minute buckets for
+    windows up to 6 hours, hour buckets up to 14 days, day buckets beyond.
+
+    Returns:
+        Dict with total_queries, cache_hits, cache_hit_rate,
+        avg_processing_time, avg_similarity and latency_histogram
+    """
+    if window is None:
+        rollups = QueryStatsRollup.objects.filter(granularity='total')
+    else:
+        now = now or timezone.now()
+        if window <= MINUTE_MAX_WINDOW:
+            granularity = 'minute'
+        elif window <= HOUR_MAX_WINDOW:
+            granularity = 'hour'
+        else:
+            granularity = 'day'
+        rollups = QueryStatsRollup.objects.filter(
+            granularity=granularity,
+            bucket_start__gte=bucket_start(now - window, granularity)
+        )
+
+    totals = _empty_counters()
+    for row in rollups.values(*COUNTER_FIELDS, 'latency_histogram'):
+        for field in COUNTER_FIELDS:
+            totals[field] += row[field]
+        totals['latency_histogram'] = [
+            a + b for a, b in zip(totals['latency_histogram'], row['latency_histogram'])
+        ]
+
+    count = totals['query_count']
+    return {
+        'total_queries': count,
+        'cache_hits': totals['cache_hits'],
+        'cache_hit_rate': round(totals['cache_hits'] / count, 4) if count else 0.0,
+        'avg_processing_time': round(
+            totals['processing_time_sum'] / totals['processing_time_count'], 2
+        ) if totals['processing_time_count'] else 0,
+        'avg_similarity': round(
+            totals['similarity_sum'] / totals['similarity_count'], 2
+        ) if totals['similarity_count'] else 0,
+        'latency_histogram': dict(zip(histogram_labels(), totals['latency_histogram'])),
+    }
@@ -3,9 +3,39 @@ Basic tests for Legal Q&A API
 Run with: python manage.py test
 """
 
-from django.test import TestCase
+import os
+import sys
+import json
+import asyncio
+import importlib
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
 from rest_framework.test import APIClient
-from .models import FAQ, QueryLog
+from .models import FAQ, QueryLog, QueryStatsRollup
+from . import rag
+from .batching import EmbeddingBatcher
+from .embeddings import OnnxEmbedder, compare_rankings, load_embedder, onnx_model_path
+from .cache import EmbeddingCache, FAQRowCache, SemanticAnswerCache, SQLiteEmbeddingStore
+from .generators import FakeGenerator
+from .metrics import StageTimer, pipeline_metrics
+from .normalization import normalize_question, question_hash
+from .logsink import QueryLogSink, write_query_logs
+from .rollups import backfill_rollups, parse_window, read_window
+from .lexical import BM25Index, LexicalIndexManager, fuse_rrf
+from .llm import LLMGateway, LLMUnavailableError, TokenBucket
+from .retrieval_service import RetrievalClient, RetrievalServer, RetrievalServiceError
+from .retrievers import ChromaRetriever, NumpyRetriever, distance_to_similarity
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data'))
+import load_faqs  # noqa: E402
 
 
 class APITestCase(TestCase):
@@ -25,6 +55,12 @@ class APITestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['status'], 'ok')
 
+    def test_health_check_does_not_load_rag(self):
+        """Health check must not trigger model or client loading"""
+        response = self.client.get('/api/health/')
+        self.assertFalse(response.json()['rag_ready'])
+        self.assertFalse(any(rag.get_engine().is_loaded().values()))
+
     def test_stats_endpoint(self):
         """Test stats endpoint"""
         response = self.client.get('/api/stats/')
@@ -37,11 +73,1248 @@ class APITestCase(TestCase):
         self.assertIsNotNone(faq)
         self.assertEqual(faq.category, "Test Category")
 
-    # Note: Commenting out ask endpoint test as it requires ChromaDB setup
-    # def test_ask_endpoint(self):
-    #     """Test ask endpoint"""
-    #     response = self.client.post('/api/ask/', {
-    #         'question': 'What is a test question?'
-    #     }, format='json')
-    #     self.assertEqual(response.status_code, 200)
-    #     self.assertIn('answer', response.json())
+
+class LoadFaqsTestCase(TestCase):
+    def test_iter_faqs_streams_json_array(self):
+        """Streaming reader yields every FAQ, even with tiny reads"""
+        with mock.patch.object(load_faqs, 'READ_SIZE', 16):
+            faqs = list(load_faqs.iter_faqs(load_faqs.DEFAULT_JSON_PATH))
+        self.assertEqual(len(faqs), 15)
+        self.assertEqual(faqs[0]['id'], 1)
+
+    def test_load_in_chunks_uses_bulk_writes(self):
+        """Bulk loader writes one Chroma batch per chunk"""
+        faqs = list(load_faqs.iter_faqs(load_faqs.DEFAULT_JSON_PATH))
+        with mock.patch.object(rag, 'add_faqs_to_chroma') as add_faqs:
+            loaded = load_faqs.load_in_chunks(faqs, chunk_size=10)
+        self.assertEqual(loaded, 15)
+        self.assertEqual(FAQ.objects.count(), 15)
+        self.assertEqual(add_faqs.call_count, 2)
+        self.assertEqual(len(add_faqs.call_args_list[0].args[0]), 10)
+
+    def test_failed_chroma_upsert_rolls_back_the_chunk(self):
+        """A chunk whose vectors fail to write leaves no rows, so a reload creates no duplicates"""
+        faqs = list(load_faqs.iter_faqs(load_faqs.DEFAULT_JSON_PATH))
+        with mock.patch.object(rag, 'add_faqs_to_chroma', side_effect=[None, RuntimeError("disk full")]), \
+                mock.patch('builtins.print'):
+            loaded = load_faqs.load_in_chunks(faqs, chunk_size=10)
+        self.assertEqual(loaded, 10)
+        self.assertEqual(FAQ.objects.count(), 10)
+
+    def test_migration_fills_missing_content_hashes(self):
+        """Rows saved before content hashes existed are hashed like the loader does"""
+        migration = importlib.import_module('api.migrations.0012_faq_fill_content_hash')
+        faq = FAQ.objects.create(question="Q?", answer="A.", category="Civil Law")
+        FAQ.objects.filter(id=faq.id).update(content_hash='')
+        migration.fill_content_hashes(django_apps, None)
+        self.assertEqual(FAQ.objects.get(id=faq.id).content_hash, faq.content_hash)
+
+    def test_sync_only_reembeds_changed_faqs(self):
+        """Incremental sync writes only new/changed FAQs and deletes removed ones"""
+        faqs = list(load_faqs.iter_faqs(load_faqs.DEFAULT_JSON_PATH))
+        with mock.patch.object(rag, 'add_faqs_to_chroma'):
+            load_faqs.load_in_chunks(faqs)
+
+        faqs[0] = dict(faqs[0], answer="Updated answer.")
+        removed = faqs.pop()
+        with mock.patch.object(rag, 'add_faqs_to_chroma') as add_faqs, \
+                mock.patch.object(rag, 'delete_faqs_from_chroma') as delete_faqs, \
+                mock.patch.object(rag, 'get_collection_ids', return_value=[]):
+            summary = load_faqs.sync_faqs(faqs)
+
+        self.assertEqual(summary['updated'], 1)
+        self.assertEqual(summary['unchanged'], 13)
+        self.assertEqual(summary['removed'], 1)
+        self.assertEqual([row['id'] for row in add_faqs.call_args.args[0]], [faqs[0]['id']])
+        delete_faqs.assert_any_call([removed['id']])
+        self.assertEqual(FAQ.objects.get(id=faqs[0]['id']).answer, "Updated answer.")
+        self.assertFalse(FAQ.objects.filter(id=removed['id']).exists())
+
+    def test_legacy_loader_rows_are_unchanged_on_sync(self):
+        """One-by-one loads store content hashes, so the next sync re-embeds nothing"""
+        faqs = list(load_faqs.iter_faqs(load_faqs.DEFAULT_JSON_PATH))
+        with mock.patch.object(rag, 'add_faq_to_chroma'):
+            load_faqs.load_one_by_one(faqs)
+        with mock.patch.object(rag, 'add_faqs_to_chroma') as add_faqs, \
+                mock.patch.object(rag, 'delete_faqs_from_chroma'), \
+                mock.patch.object(rag, 'get_collection_ids', return_value=[]):
+            summary = load_faqs.sync_faqs(faqs)
+        self.assertEqual(summary['unchanged'], 15)
+        self.assertEqual(add_faqs.call_args.args[0], [])
+
+    def test_loaders_maintain_the_exact_match_index(self):
+        """Bulk loads hash every question and a sync repairs stale hashes without re-embedding"""
+        faqs = list(load_faqs.iter_faqs(load_faqs.DEFAULT_JSON_PATH))
+        with mock.patch.object(rag, 'add_faqs_to_chroma'):
+            load_faqs.load_in_chunks(faqs)
+        faq = FAQ.objects.get(id=faqs[0]['id'])
+        self.assertEqual(faq.question_hash, question_hash(faqs[0]['question']))
+
+        FAQ.objects.filter(id=faq.id).update(question_hash='')
+        with mock.patch.object(rag, 'add_faqs_to_chroma') as add_faqs, \
+                mock.patch.object(rag, 'delete_faqs_from_chroma'), \
+                mock.patch.object(rag, 'get_collection_ids', return_value=[]):
+            summary = load_faqs.sync_faqs(faqs)
+        self.assertEqual(summary['rehashed'], 1)
+        self.assertEqual(add_faqs.call_args.args[0], [])
+        self.assertEqual(FAQ.objects.get(id=faq.id).question_hash, faq.question_hash)
+
+
+class NormalizationTestCase(SimpleTestCase):
+    def test_variants_share_a_hash(self):
+        """Case, punctuation, whitespace, apostrophes and abbreviations don't change the hash"""
+        self.assertEqual(
+            normalize_question("  Can my employer’s ATTY sue me w/o notice in the U.S.?? "),
+            "can my employers attorney sue me without notice in the us"
+        )
+        self.assertEqual(question_hash("What is the statute of limitations for filing a lawsuit?"),
+                         question_hash("what is the statute of limitations for filing a lawsuit"))
+        self.assertNotEqual(question_hash("What is the statute of limitations?"),
+                            question_hash("What is the statute of frauds?"))
+        self.assertEqual(normalize_question("Can HR report me to the SEC?"), "can hr report me to the sec")
+
+
+class EmbeddingCacheTestCase(SimpleTestCase):
+    def test_normalized_queries_share_an_entry(self):
+        """Case and whitespace variants hit the same cache entry"""
+        cache = EmbeddingCache(max_size=4)
+        compute = mock.Mock(return_value=[0.1, 0.2])
+        cache.get_or_compute("What is a  Statute of Limitations?", compute)
+        cache.get_or_compute("what is a statute of limitations?", compute)
+        self.assertEqual(compute.call_count, 1)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_lru_eviction_and_ttl(self):
+        """Oldest entries are evicted and expired entries are recomputed"""
+        cache = EmbeddingCache(max_size=2, ttl=60)
+        for text in ("a", "b", "c"):
+            cache.set(text, [1.0])
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+        with mock.patch('api.cache.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(cache.get("c"))
+        self.assertEqual(cache.stats()['expirations'], 1)
+
+    def test_shared_store_between_caches(self):
+        """A second process-local cache reads embeddings from the shared file"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'embeddings.sqlite3')
+            first = EmbeddingCache(store=SQLiteEmbeddingStore(path, ttl=60))
+            second = EmbeddingCache(store=SQLiteEmbeddingStore(path, ttl=60))
+            first.set("question", [0.5, 0.25])
+            self.assertEqual(second.get("QUESTION"), [0.5, 0.25])
+            self.assertEqual(second.stats()['shared_hits'], 1)
+
+
+class FAQRowCacheTestCase(SimpleTestCase):
+    def test_lru_eviction_and_ttl(self):
+        """Least recently used rows are evicted; expired rows count as misses"""
+        cache = FAQRowCache(max_size=2, ttl=60)
+        cache.set_many({1: {'answer': 'A1'}, 2: {'answer': 'A2'}})
+        cache.get_many([1])
+        cache.set_many({3: {'answer': 'A3'}})
+        self.assertEqual(set(cache.get_many([1, 2, 3])), {1, 3})
+
+        with mock.patch('api.cache.time.monotonic', return_value=time.monotonic() + 120):
+            self.assertEqual(cache.get_many([1]), {})
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+SOURCES = [{
+    'id': '1',
+    'question': "What is a test question?",
+    'answer': "This is a test answer.",
+    'category': "Test Category",
+    'similarity_score': 90.0
+}]
+
+
+class SemanticAnswerCacheTestCase(SimpleTestCase):
+    def test_similar_query_with_same_sources_hits(self):
+        """Near-identical embeddings with the same sources reuse the answer"""
+        cache = SemanticAnswerCache(max_size=2, threshold=0.95, dimensions=2)
+        cache.set([1.0, 0.0], SOURCES, "cached answer")
+        self.assertEqual(cache.get([0.99, 0.05], SOURCES), "cached answer")
+        self.assertIsNone(cache.get([0.0, 1.0], SOURCES))
+
+    def test_changed_sources_or_invalidation_miss(self):
+        """Different source content or an invalidation prevents reuse"""
+        cache = SemanticAnswerCache(max_size=2, dimensions=2)
+        cache.set([1.0, 0.0], SOURCES, "cached answer")
+        edited = [dict(SOURCES[0], answer="Edited answer.")]
+        self.assertIsNone(cache.get([1.0, 0.0], edited))
+        cache.invalidate()
+        self.assertIsNone(cache.get([1.0, 0.0], SOURCES))
+
+    def test_eviction_when_full(self):
+        """The least recently used answer is evicted when the cache is full"""
+        cache = SemanticAnswerCache(max_size=1, dimensions=2)
+        cache.set([1.0, 0.0], SOURCES, "first")
+        cache.set([0.0, 1.0], SOURCES, "second")
+        self.assertIsNone(cache.get([1.0, 0.0], SOURCES))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+# Rows are saved inline so assertions see them inside the test transaction
+@override_settings(RAG_QUERY_LOG_ASYNC=False)
+class AskEndpointTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        patches = [
+            mock.patch.object(rag, '_answer_cache', None),
+            mock.patch.object(rag, 'get_query_embedding', return_value=[0.1] * 384),
+            mock.patch.object(rag, 'find_similar_faqs', return_value=SOURCES),
+            mock.patch.object(rag, 'request_answer', return_value="Generated answer."),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_ask_endpoint(self):
+        """Ask endpoint returns the answer and logs the query"""
+        response = self.client.post('/api/ask/', {
+            'question': 'What is a test question?'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['answer'], "Generated answer.")
+        self.assertFalse(response.json()['cache_hit'])
+        self.assertEqual(QueryLog.objects.count(), 1)
+
+    def test_category_filter_is_validated_and_passed_on(self):
+        """category is handed to retrieval; other types are rejected"""
+        response = self.client.post('/api/ask/', {
+            'question': 'What is a test question?', 'category': ["Civil Law", "Tax Law"]
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(rag.find_similar_faqs.call_args.kwargs['categories'], ["Civil Law", "Tax Law"])
+
+        for category in (7, "", ["Civil Law", ""]):
+            response = self.client.post('/api/ask/', {
+                'question': 'What is a test question?', 'category': category
+            }, format='json')
+            self.assertEqual(response.status_code, 400)
+
+    def test_repeated_question_is_served_from_cache(self):
+        """A repeated question skips the LLM and is flagged as a cache hit"""
+        self.client.post('/api/ask/', {'question': 'What is a test question?'}, format='json')
+        response = self.client.post('/api/ask/', {'question': 'what is a test question?'}, format='json')
+        self.assertTrue(response.json()['cache_hit'])
+        self.assertEqual(rag.request_answer.call_count, 1)
+        self.assertTrue(QueryLog.objects.filter(cache_hit=True).exists())
+
+    def test_stream_endpoint_sends_sources_then_tokens(self):
+        """Streaming endpoint emits sources, tokens and done, then logs the query"""
+        with mock.patch.object(rag, 'request_answer_stream', return_value=iter(["Gen", "erated."])):
+            response = self.client.post('/api/ask/stream/', {
+                'question': 'What is a test question?'
+            }, format='json')
+            body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = [line[len('event: '):] for line in body.splitlines() if line.startswith('event: ')]
+        self.assertEqual(events, ['sources', 'token', 'token', 'done'])
+        log = QueryLog.objects.get()
+        self.assertEqual(log.answer, "Generated.")
+        self.assertIsNotNone(log.time_to_first_token)
+
+    def test_stream_endpoint_rejects_non_object_bodies(self):
+        """A JSON list or scalar body is a 400, not a server error"""
+        for body in ('["What is a test question?"]', '"What is a test question?"', '3'):
+            response = self.client.post('/api/ask/stream/', body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+    async def test_async_endpoint(self):
+        """Async ask endpoint awaits the async LLM call and logs the query"""
+        with mock.patch.object(rag, 'arequest_answer', new=mock.AsyncMock(return_value="Async answer.")):
+            response = await self.async_client.post(
+                '/api/ask/async/', {'question': 'What is a test question?'},
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['answer'], "Async answer.")
+        self.assertEqual(await QueryLog.objects.acount(), 1)
+        total = await QueryStatsRollup.objects.aget(granularity='total')
+        self.assertEqual(total.query_count, 1)
+
+        response = await self.async_client.post('/api/ask/async/', ['What is a test question?'],
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_endpoint_streams_results_and_logs_in_bulk(self):
+        """Batch endpoint streams one NDJSON line per question plus a summary"""
+        questions = ['First question?', 'Second question?', 'Third question?']
+        with mock.patch.object(rag, 'get_query_embeddings', return_value=[[0.1] * 384] * 3), \
+                mock.patch.object(rag, 'search_many_faqs', return_value=[SOURCES, [], SOURCES]):
+            response = self.client.post('/api/ask/batch/', {'questions': questions}, format='json')
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        items, summary = lines[:-1], lines[-1]['summary']
+        self.assertEqual(sorted(item['index'] for item in items), [0, 1, 2])
+        self.assertEqual(next(item for item in items if item['index'] == 1)['answer'], rag.NO_SOURCES_ANSWER)
+        self.assertEqual(summary['questions'], 3)
+        self.assertEqual(summary['without_sources'], 1)
+        self.assertEqual(QueryLog.objects.count(), 3)
+        self.assertEqual(
+            self.client.post('/api/ask/batch/', {'questions': ['ok', ' ']}, format='json').status_code, 400
+        )
+
+    def test_known_faq_question_skips_retrieval_and_generation(self):
+        """A near-verbatim FAQ question gets the curated answer, flagged exact_match"""
+        faq = FAQ.objects.create(question="Can my landlord keep my security deposit?",
+                                 answer="Only for unpaid rent or damage.", category="Housing Law")
+        response = self.client.post('/api/ask/', {'question': 'can my landlord keep my security deposit'},
+                                    format='json')
+        body = response.json()
+        self.assertEqual(body['answer'], faq.answer)
+        self.assertTrue(body['exact_match'])
+        self.assertEqual(body['sources'][0]['id'], str(faq.id))
+        self.assertEqual(body['sources'][0]['similarity_score'], 100.0)
+        rag.get_query_embedding.assert_not_called()
+        rag.request_answer.assert_not_called()
+        self.assertEqual(QueryLog.objects.get().answer, faq.answer)
+
+        response = self.client.post('/api/ask/stream/', {'question': faq.question}, format='json')
+        body = b''.join(response.streaming_content).decode()
+        events = [line[len('event: '):] for line in body.splitlines() if line.startswith('event: ')]
+        self.assertEqual(events, ['sources', 'token', 'done'])
+        self.assertIn('"exact_match": true', body)
+
+        with mock.patch.object(rag, 'get_query_embeddings', return_value=[[0.1] * 384]) as embed, \
+                mock.patch.object(rag, 'search_many_faqs', return_value=[SOURCES]):
+            response = self.client.post('/api/ask/batch/', {'questions': ['Other?', faq.question]}, format='json')
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        embed.assert_called_once_with(['Other?'])
+        self.assertEqual([line['exact_match'] for line in lines[:-1]], [True, False])
+        self.assertEqual(lines[-1]['summary']['exact_matches'], 1)
+
+        with self.settings(RAG_EXACT_MATCH=False):
+            response = self.client.post('/api/ask/', {'question': faq.question}, format='json')
+        self.assertEqual(response.json()['answer'], "Generated answer.")
+        self.assertFalse(response.json()['exact_match'])
+
+    def test_llm_unavailable_returns_503(self):
+        """A gateway failure is a 503 with Retry-After, not a 200 with an error string"""
+        error = LLMUnavailableError("LLM unavailable: rate limited", retry_after=7.2)
+        with mock.patch.object(rag, 'request_answer', side_effect=error):
+            response = self.client.post('/api/ask/', {'question': 'What is a test question?'}, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(QueryLog.objects.count(), 0)
+
+    def test_stage_times_are_logged_and_exported(self):
+        """Per-stage times land on the QueryLog row and in /api/metrics/"""
+        pipeline_metrics.reset()
+        self.client.post('/api/ask/', {'question': 'What is a test question?'}, format='json')
+        self.client.post('/api/ask/', {'question': 'What is a test question?'}, format='json')
+        with mock.patch.object(rag, 'request_answer', side_effect=LLMUnavailableError("down")), \
+                mock.patch.object(rag, 'get_query_embedding', return_value=[-0.1] * 384):
+            self.client.post('/api/ask/', {'question': 'Another question?'}, format='json')
+
+        log = QueryLog.objects.earliest('id')
+        self.assertIsNotNone(log.embed_time)
+        self.assertIsNotNone(log.retrieve_time)
+        self.assertIsNotNone(log.generate_time)
+        self.assertIsNone(QueryLog.objects.latest('id').generate_time)  # Cache hit
+
+        response = self.client.get('/api/metrics/')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('rag_requests_total{endpoint="ask",status="ok"} 2', body)
+        self.assertIn('rag_requests_total{endpoint="ask",status="unavailable"} 1', body)
+        self.assertIn('rag_answer_cache_hits_total{endpoint="ask"} 1', body)
+        self.assertIn('rag_stage_errors_total{stage="generate"} 1', body)
+        self.assertIn('rag_stage_duration_seconds_count{stage="generate"} 2', body)
+        self.assertIn('rag_stage_duration_seconds_count{stage="persist"} 2', body)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="embed",le="+Inf"} 3', body)
+        self.assertIn(f'rag_process_memory_bytes{{kind="max_rss",pid="{os.getpid()}"}}', body)
+
+    def test_search_errors_are_counted_in_the_retrieve_stage(self):
+        """A failed search answers without sources but is exported as a retrieve error"""
+        pipeline_metrics.reset()
+        with mock.patch.object(rag, 'find_similar_faqs', side_effect=RuntimeError("index missing")):
+            response = self.client.post('/api/ask/', {'question': 'What is a test question?'}, format='json')
+        self.assertEqual(response.json()['sources'], [])
+        body = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('rag_stage_errors_total{stage="retrieve"} 1', body)
+        self.assertIn('rag_requests_total{endpoint="ask",status="error"} 1', body)
+
+
+class QueryLogSinkTestCase(TransactionTestCase):
+    def make_log(self, n):
+        return QueryLog(question=f"Q{n}", answer="A", sources=[])
+
+    def test_rows_are_bulk_written_in_batches(self):
+        """Queued rows are written by the worker in batch_size chunks"""
+        sink = QueryLogSink(batch_size=2, flush_interval_ms=50)
+        for n in range(5):
+            sink.submit(self.make_log(n))
+        self.assertTrue(sink.flush(timeout=5))
+        self.assertEqual(QueryLog.objects.count(), 5)
+        self.assertEqual(sink.stats()['flushed'], 5)
+        self.assertGreaterEqual(sink.stats()['batches'], 3)
+
+    def test_full_queue_policies(self):
+        """drop_newest rejects the new row; drop_oldest makes room for it"""
+        with mock.patch.object(QueryLogSink, '_ensure_worker'):
+            newest = QueryLogSink(max_queue=1, full_policy='drop_newest')
+            self.assertTrue(newest.submit(self.make_log(1)))
+            self.assertFalse(newest.submit(self.make_log(2)))
+            self.assertEqual(newest._queue.get_nowait().question, "Q1")
+
+            oldest = QueryLogSink(max_queue=1, full_policy='drop_oldest')
+            oldest.submit(self.make_log(1))
+            self.assertTrue(oldest.submit(self.make_log(2)))
+            self.assertEqual(oldest._queue.get_nowait().question, "Q2")
+        self.assertEqual(newest.stats()['dropped'], 1)
+        self.assertEqual(oldest.stats()['dropped'], 1)
+
+
+class QueryStatsRollupTestCase(TestCase):
+    def setUp(self):
+        write_query_logs([
+            QueryLog(question="Q1", answer="A", sources=[], processing_time=0.2,
+                     avg_similarity=80.0, cache_hit=True),
+            QueryLog(question="Q2", answer="A", sources=[], processing_time=1.5, avg_similarity=60.0),
+        ])
+
+    def test_rollups_follow_log_writes(self):
+        """Each write updates minute, hour, day and total buckets"""
+        self.assertEqual(
+            set(QueryStatsRollup.objects.values_list('granularity', flat=True)),
+            {'minute', 'hour', 'day', 'total'}
+        )
+        stats = read_window(None)
+        self.assertEqual(stats['total_queries'], 2)
+        self.assertEqual(stats['cache_hit_rate'], 0.5)
+        self.assertEqual(stats['avg_similarity'], 70.0)
+        self.assertEqual(stats['latency_histogram']['<=0.25s'], 1)
+        self.assertEqual(stats['latency_histogram']['<=2s'], 1)
+
+    def test_backfill_matches_incremental_rollups(self):
+        """Recomputing from QueryLog gives the same totals"""
+        incremental = [read_window(None), read_window(parse_window('1h')), read_window(parse_window('30d'))]
+        backfill_rollups()
+        self.assertEqual([read_window(None), read_window(parse_window('1h')),
+                          read_window(parse_window('30d'))], incremental)
+
+    def test_migration_backfills_existing_logs(self):
+        """Logs written before the rollups existed are counted after migrating"""
+        migration = importlib.import_module('api.migrations.0010_backfill_query_stats_rollups')
+        QueryStatsRollup.objects.all().delete()
+        migration.backfill_query_stats(django_apps, None)
+        self.assertEqual(read_window(None)['total_queries'], 2)
+
+    def test_stats_endpoint_window(self):
+        """Stats read the rollups for the requested window; bad windows are rejected"""
+        client = APIClient()
+        cache.clear()
+        with self.assertNumQueries(2):  # FAQ count and one rollup read
+            response = client.get('/api/stats/', {'window': '24h'})
+        with self.assertNumQueries(1):  # FAQ count is cached
+            client.get('/api/stats/')
+        self.assertEqual(response.json()['total_queries'], 2)
+        self.assertEqual(response.json()['avg_processing_time'], 0.85)
+        self.assertEqual(client.get('/api/stats/', {'window': 'soon'}).status_code, 400)
+
+
+class LogsPaginationTestCase(TestCase):
+    def setUp(self):
+        # One bulk insert, so rows may share created_at and the id breaks ties
+        write_query_logs([
+            QueryLog(question=f"Q{n}", answer="A" * (250 if n == 0 else 10), sources=[])
+            for n in range(5)
+        ])
+        self.client = APIClient()
+
+    def test_cursor_walks_every_log_once(self):
+        """Following next_cursor returns all logs newest first, one query per page"""
+        seen = []
+        params = {'limit': 2, 'count': 'none'}
+        while True:
+            with self.assertNumQueries(1):
+                data = self.client.get('/api/logs/', params).json()
+            seen.extend(log['id'] for log in data['logs'])
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        expected = list(QueryLog.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_answers_truncated_and_counts(self):
+        """Long answers are cut in the database; approx count comes from the rollups"""
+        data = self.client.get('/api/logs/', {'offset': 4, 'count': 'approx'}).json()
+        self.assertEqual(data['count'], 5)
+        self.assertEqual(data['logs'][0]['answer'], "A" * 200 + "...")
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(self.client.get('/api/logs/', {'cursor': 'nonsense'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/logs/', {'count': 'maybe'}).status_code, 400)
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        headers = {'retry-after': str(retry_after)} if retry_after is not None else {}
+        self.response = mock.Mock(status_code=status_code, headers=headers)
+
+
+def fake_completion(text="Answer."):
+    return mock.Mock(choices=[mock.Mock(message=mock.Mock(content=text))], usage=None)
+
+
+class LLMGatewayTestCase(SimpleTestCase):
+    def make_gateway(self, create, **options):
+        client = mock.Mock()
+        client.chat.completions.create.side_effect = create
+        options.setdefault('backoff_base', 0.001)
+        return LLMGateway(lambda: client, **options), client
+
+    def test_transient_errors_are_retried(self):
+        """503s are retried with backoff and the call still succeeds"""
+        gateway, client = self.make_gateway([UpstreamError(503), UpstreamError(503), fake_completion()])
+        self.assertEqual(gateway.complete([], model='m', max_tokens=10), "Answer.")
+        self.assertEqual(client.chat.completions.create.call_count, 3)
+        self.assertEqual(gateway.stats()['retries'], 2)
+
+    def test_gives_up_with_unavailable_error(self):
+        """Exhausted 429 retries and non-retryable errors raise LLMUnavailableError"""
+        gateway, client = self.make_gateway(UpstreamError(429, retry_after=0.001), max_retries=1)
+        with self.assertRaises(LLMUnavailableError) as raised:
+            gateway.complete([], model='m', max_tokens=10)
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+        self.assertEqual(raised.exception.retry_after, 0.001)
+
+        gateway, client = self.make_gateway(UpstreamError(400))
+        with self.assertRaises(LLMUnavailableError):
+            gateway.complete([], model='m', max_tokens=10)
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+
+    def test_concurrency_is_bounded(self):
+        """No more than max_concurrency calls are in flight at once"""
+        lock = threading.Lock()
+        active = {'now': 0, 'peak': 0}
+
+        def create(**kwargs):
+            with lock:
+                active['now'] += 1
+                active['peak'] = max(active['peak'], active['now'])
+            time.sleep(0.02)
+            with lock:
+                active['now'] -= 1
+            return fake_completion()
+
+        gateway, _ = self.make_gateway(create, max_concurrency=2)
+        threads = [threading.Thread(target=gateway.complete, args=([],), kwargs={'model': 'm', 'max_tokens': 1})
+                   for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(active['peak'], 2)
+        self.assertEqual(gateway.stats()['succeeded'], 6)
+
+    def test_stream_records_one_attempt_per_request(self):
+        """A role-only first chunk doesn't count as another upstream attempt"""
+        def chunk(content):
+            return mock.Mock(choices=[mock.Mock(delta=mock.Mock(content=content))])
+
+        gateway, _ = self.make_gateway([iter([chunk(None), chunk(None), chunk("Ans"), chunk("wer.")])])
+        self.assertEqual(''.join(gateway.stream([], model='m', max_tokens=10)), "Answer.")
+        stats = gateway.stats()
+        self.assertEqual(stats['attempts'], 1)
+        self.assertEqual(sum(stats['upstream_latency_histogram'].values()), 1)
+
+    def test_async_calls_share_slots_with_sync_calls(self):
+        """acomplete waits for a slot held by a sync call and gives up at its deadline"""
+        release = threading.Event()
+
+        def create(**kwargs):
+            release.wait(5)
+            return fake_completion("Sync.")
+
+        gateway, _ = self.make_gateway(create, max_concurrency=1)
+        async_client = mock.Mock()
+        async_client.chat.completions.create = mock.AsyncMock(return_value=fake_completion("Async."))
+        gateway.get_async_client = lambda: async_client
+        holder = threading.Thread(target=gateway.complete, args=([],), kwargs={'model': 'm', 'max_tokens': 1})
+        holder.start()
+        while gateway.stats()['in_flight'] == 0:
+            time.sleep(0.001)
+
+        with self.assertRaises(LLMUnavailableError):
+            asyncio.run(gateway.acomplete([], model='m', max_tokens=1, deadline=0.05))
+        threading.Timer(0.05, release.set).start()
+        self.assertEqual(asyncio.run(gateway.acomplete([], model='m', max_tokens=1, deadline=5)), "Async.")
+        holder.join()
+        self.assertEqual(gateway.stats()['in_flight'], 0)
+
+    def test_async_waiters_queue_on_the_event_loop(self):
+        """Queued async callers use no threads, get slots in turn and may be cancelled"""
+        gateway, _ = self.make_gateway(lambda **kwargs: fake_completion(), max_concurrency=1)
+        async_client = mock.Mock()
+        gateway.get_async_client = lambda: async_client
+
+        async def burst():
+            gate = asyncio.Event()
+
+            async def create(**kwargs):
+                await gate.wait()
+                return fake_completion()
+
+            async_client.chat.completions.create = create
+            threads = threading.active_count()
+            calls = [asyncio.ensure_future(gateway.acomplete([], model='m', max_tokens=1, deadline=5))
+                     for _ in range(20)]
+            await asyncio.sleep(0.01)
+            self.assertEqual(threading.active_count(), threads)
+            calls[1].cancel()
+            gate.set()
+            return await asyncio.gather(*calls, return_exceptions=True)
+
+        results = asyncio.run(burst())
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertEqual(results[:1] + results[2:], ["Answer."] * 19)
+        self.assertEqual(gateway.stats()['in_flight'], 0)
+        self.assertEqual(gateway.complete([], model='m', max_tokens=1, deadline=0.05), "Answer.")
+
+    def test_token_bucket_paces_and_respects_deadlines(self):
+        """Reservations beyond the burst wait for refill; too-long waits are refused"""
+        bucket = TokenBucket(per_minute=60, burst=1)
+        self.assertEqual(bucket.reserve(1), 0.0)
+        self.assertAlmostEqual(bucket.reserve(1), 1.0, places=1)
+        self.assertIsNone(bucket.reserve(1, max_wait=0.5))
+
+        gateway, client = self.make_gateway([fake_completion()], requests_per_minute=1)
+        gateway.complete([], model='m', max_tokens=1)
+        with self.assertRaises(LLMUnavailableError):
+            gateway.complete([], model='m', max_tokens=1, deadline=1)
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+
+
+@override_settings(RAG_GENERATOR_BACKEND='fake', RAG_FAKE_LLM_LATENCY_MS=0,
+                   RAG_FAKE_LLM_TOKENS_PER_SECOND=0, RAG_FAKE_LLM_ANSWER_TOKENS=12,
+                   RAG_EXACT_MATCH=False)
+class GeneratorBackendTestCase(SimpleTestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(rag, '_generator', None),
+            mock.patch.object(rag, '_answer_cache', None),
+            mock.patch.object(rag.settings, 'RAG_ANSWER_CACHE_SIZE', 0),
+            mock.patch.object(rag, 'get_query_embedding', return_value=[0.1] * 384),
+            mock.patch.object(rag, 'find_similar_faqs', return_value=SOURCES),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_fake_backend_answers_process_question_offline(self):
+        """The fake backend runs the full pipeline with deterministic answers"""
+        first = rag.process_question("Can I break my lease?")
+        self.assertIsInstance(rag.get_generator(), FakeGenerator)
+        self.assertEqual(first['answer'], rag.process_question("Can I break my lease?")['answer'])
+        self.assertEqual(len(first['answer'].split()), 12)
+        self.assertNotEqual(first['answer'], rag.process_question("Who pays court fees?")['answer'])
+        self.assertEqual(''.join(rag.request_answer_stream("Can I break my lease?", SOURCES)),
+                         first['answer'])
+        self.assertEqual(rag.get_generator().stats()['calls'], 4)
+
+    def test_fake_backend_paces_tokens(self):
+        """Answers take the configured latency plus one token interval per word"""
+        generator = FakeGenerator(latency_ms=20, tokens_per_second=500, answer_tokens=11)
+        start = time.perf_counter()
+        generator.complete([{'role': 'user', 'content': "Question?"}], max_tokens=50, temperature=0)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.04)
+
+    @override_settings(RAG_GENERATOR_BACKEND='gpt')
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(ValueError):
+            rag.get_generator()
+
+
+class EmbeddingBatcherTestCase(SimpleTestCase):
+    def test_concurrent_requests_share_a_batch(self):
+        """Texts submitted within the wait window are encoded in one call"""
+        encode = mock.Mock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+        batcher = EmbeddingBatcher(encode, max_batch_size=8, max_wait_ms=200)
+        futures = [batcher.submit(text) for text in ("a", "bb", "ccc")]
+        self.assertEqual([f.result(timeout=5) for f in futures], [[1.0], [2.0], [3.0]])
+        self.assertEqual(encode.call_count, 1)
+        self.assertEqual(batcher.stats()['batch_sizes'], {3: 1})
+
+    def test_encode_errors_reach_every_caller(self):
+        """A failed batch raises in each waiting caller"""
+        batcher = EmbeddingBatcher(mock.Mock(side_effect=RuntimeError("boom")), max_wait_ms=1)
+        with self.assertRaises(RuntimeError):
+            batcher.embed("question")
+        self.assertEqual(batcher.stats()['errors'], 1)
+
+
+class NumpyRetrieverTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.faqs = [
+            FAQ.objects.create(question="Q1?", answer="A1.", category="Civil Law"),
+            FAQ.objects.create(question="Q2?", answer="A2.", category="Employment Law"),
+            FAQ.objects.create(question="Q3?", answer="A3.", category="Civil Law"),
+        ]
+        NumpyRetriever.build(
+            self.tmp.name,
+            ids=[faq.id for faq in self.faqs],
+            embeddings=[[1.0, 0.0], [0.8, 0.6], [0.0, 1.0]],
+            categories=[faq.category for faq in self.faqs]
+        )
+        self.retriever = NumpyRetriever(self.tmp.name)
+
+    def test_search_ranks_by_cosine_similarity(self):
+        """Exact search returns the closest vectors first"""
+        hits = self.retriever.search([2.0, 0.0], top_k=2)
+        self.assertEqual([hit['id'] for hit in hits], [str(self.faqs[0].id), str(self.faqs[1].id)])
+        self.assertAlmostEqual(hits[0]['similarity'], 1.0, places=5)
+
+    def test_category_prefilter(self):
+        """Category mask excludes rows outside the requested categories"""
+        hits = self.retriever.search([0.8, 0.6], top_k=3, categories=["Civil Law"])
+        self.assertEqual({hit['metadata']['category'] for hit in hits}, {"Civil Law"})
+        self.assertEqual(len(hits), 2)
+
+    def test_partitions_and_category_classifier(self):
+        """Rows are partitioned by category; the classifier routes only clear-cut questions"""
+        hits = self.retriever.search([1.0, 0.0], top_k=3, categories=["Employment Law", "Civil Law"])
+        self.assertEqual([hit['id'] for hit in hits], [str(faq.id) for faq in self.faqs])
+        classifier = self.retriever.category_classifier()
+        self.assertEqual(classifier.predict([0.0, 1.0], min_margin=0.05), "Civil Law")
+        self.assertEqual(classifier.predict([1.0, 0.0], min_margin=0.05), "Employment Law")
+        self.assertIsNone(classifier.predict([0.8, 0.6], min_margin=0.05))  # Near both centroids
+
+    def test_auto_category_routes_search(self):
+        """'auto' searches the classifier's category; explicit categories are used as given"""
+        with mock.patch.object(rag, '_retriever', self.retriever), \
+                mock.patch.object(rag, '_lexical_index', None), \
+                mock.patch.object(rag, '_faq_row_cache', None):
+            routed = rag.search_similar_faqs("Q1?", top_k=1, query_embedding=[1.0, 0.0], categories='auto')
+            unrouted = rag.search_similar_faqs("Q1?", top_k=1, query_embedding=[1.0, 0.0])
+            listed = rag.search_similar_faqs("Q1?", top_k=2, query_embedding=[1.0, 0.0],
+                                             categories=["Civil Law"])
+        self.assertEqual(routed[0]['id'], str(self.faqs[1].id))
+        self.assertEqual(unrouted[0]['id'], str(self.faqs[0].id))
+        self.assertEqual({source['category'] for source in listed}, {"Civil Law"})
+
+    def test_search_similar_faqs_hydrates_from_database(self):
+        """Hits without stored text are filled in from the FAQ table"""
+        with mock.patch.object(rag, '_retriever', self.retriever), \
+                mock.patch.object(rag, '_lexical_index', None), \
+                mock.patch.object(rag, '_faq_row_cache', None):
+            with self.assertNumQueries(3):  # Lexical index build (2) and one in_bulk
+                sources = rag.search_similar_faqs("Q1?", top_k=1, query_embedding=[1.0, 0.0])
+            with self.assertNumQueries(0):  # Served by the row cache
+                rag.search_similar_faqs("Q1?", top_k=1, query_embedding=[1.0, 0.0])
+        self.assertEqual(sources[0]['answer'], "A1.")
+        self.assertEqual(sources[0]['similarity_score'], 100.0)
+
+    def test_score_looks_up_rows_by_id(self):
+        """score() returns similarities for indexed ids only"""
+        scores = self.retriever.score([0.0, 1.0], [str(self.faqs[2].id), str(self.faqs[1].id), "999999"])
+        self.assertEqual(set(scores), {str(self.faqs[2].id), str(self.faqs[1].id)})
+        self.assertAlmostEqual(scores[str(self.faqs[1].id)], 0.6, places=5)
+
+
+
+class FakeCollection:
+    """Paged get() over stored vectors, like a ChromaDB collection."""
+
+    def __init__(self, embeddings, categories):
+        self.embeddings = embeddings
+        self.categories = categories
+        self.get_calls = 0
+
+    def get(self, include, limit, offset):
+        self.get_calls += 1
+        rows = range(offset, min(offset + limit, len(self.embeddings)))
+        return {
+            'ids': [str(row + 1) for row in rows],
+            'embeddings': [self.embeddings[row] for row in rows],
+            'metadatas': [{'category': self.categories[row]} for row in rows],
+        }
+
+
+class ChromaCentroidsTestCase(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'category_centroids.npz')
+        self.collection = FakeCollection(
+            [[1.0, 0.0], [0.8, 0.6], [0.0, 1.0]], ["Employment Law", "Employment Law", "Civil Law"]
+        )
+
+    def test_centroids_are_built_at_ingestion_and_reloaded_when_rewritten(self):
+        """Requests read the stored centroids without paging the collection, and pick up a rebuild"""
+        engine = mock.Mock(collection=self.collection)
+        with override_settings(RAG_RETRIEVER='chroma', RAG_CATEGORY_CENTROIDS_PATH=self.path), \
+                mock.patch.object(rag, 'get_engine', return_value=engine), \
+                mock.patch.object(rag, '_retriever', None):
+            self.assertEqual(rag.refresh_retriever_index(batch_size=2), 3)
+
+        retriever = ChromaRetriever(lambda: self.collection, self.path)
+        self.collection.get_calls = 0
+        classifier = retriever.category_classifier()
+        self.assertEqual(classifier.predict([0.0, 1.0], min_margin=0.05), "Civil Law")
+        self.assertIs(retriever.category_classifier(), classifier)
+        self.assertEqual(self.collection.get_calls, 0)
+
+        # Another process (load_faqs.py --sync) rewrites the file
+        ChromaRetriever.build_centroids(self.path, [[0.0, 1.0], [1.0, 0.0]], ["Family Law", "Tax Law"])
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertEqual(retriever.category_classifier().predict([0.0, 1.0], min_margin=0.05), "Family Law")
+
+    def test_no_centroids_file_means_no_routing(self):
+        """Without stored centroids 'auto' searches every category"""
+        retriever = ChromaRetriever(lambda: self.collection, self.path)
+        self.assertIsNone(retriever.category_classifier())
+        self.assertEqual(self.collection.get_calls, 0)
+
+
+class LexicalSearchTestCase(SimpleTestCase):
+    DOCUMENTS = [
+        (1, "Employment Law", "Am I entitled to overtime pay? Under the FLSA, most employees get 1.5 times pay."),
+        (2, "Employment Law", "Can my employer fire me without reason? Employment is at-will in most states."),
+        (3, "Bankruptcy Law", "How does bankruptcy affect my credit? Chapter 7 stays on your report for 10 years."),
+    ]
+
+    def test_exact_terms_rank_first(self):
+        """Rare exact terms outweigh common ones"""
+        index = BM25Index.build(self.DOCUMENTS)
+        self.assertEqual(index.search("FLSA rules for employees", top_k=3)[0]['id'], "1")
+        self.assertEqual(index.search("chapter 7", top_k=3)[0]['id'], "3")
+        self.assertEqual(index.search("what is the", top_k=3), [])
+
+    def test_category_filter(self):
+        """Only documents in the requested categories are scored"""
+        index = BM25Index.build(self.DOCUMENTS)
+        hits = index.search("employer pay credit", top_k=3, categories=["Bankruptcy Law"])
+        self.assertEqual([hit['id'] for hit in hits], ["3"])
+
+    def test_fuse_rrf(self):
+        """Documents ranked well by both lists win"""
+        fused = fuse_rrf([["a", "b", "c"], ["b", "c"]], k=60)
+        self.assertEqual([doc_id for doc_id, _ in fused], ["b", "c", "a"])
+
+    def test_manager_rebuilds_in_background_after_invalidate(self):
+        """Queries keep the old index until the background rebuild finishes"""
+        documents = list(self.DOCUMENTS[:1])
+        release = threading.Event()
+        release.set()
+
+        def load_documents():
+            release.wait(5)
+            return list(documents)
+
+        manager = LexicalIndexManager(load_documents, lambda: str(len(documents)), refresh_seconds=3600)
+        self.assertEqual(len(manager.get()), 1)
+
+        release.clear()
+        documents.append(self.DOCUMENTS[1])
+        manager.invalidate()
+        self.assertEqual(len(manager.get()), 1)
+        release.set()
+        for _ in range(100):
+            if manager.stats()['rebuilds'] == 2:
+                break
+            time.sleep(0.01)
+        self.assertEqual(len(manager.get()), 2)
+
+    def test_failed_rebuild_keeps_the_index_stale(self):
+        """A rebuild that fails after invalidate() is retried by the next query"""
+        failures = [RuntimeError("database is locked")]
+
+        def load_documents():
+            if failures:
+                raise failures.pop()
+            return list(self.DOCUMENTS)
+
+        manager = LexicalIndexManager(load_documents, lambda: 'v1', refresh_seconds=3600)
+        manager._index = BM25Index.build(self.DOCUMENTS[:1])
+        manager._fingerprint = 'v1'
+        manager.invalidate()
+        with mock.patch('builtins.print'):
+            manager._refresh()
+        self.assertTrue(manager._stale)
+        manager._refresh()
+        self.assertFalse(manager._stale)
+        self.assertEqual(len(manager.get()), len(self.DOCUMENTS))
+
+
+class HybridSearchTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.overtime = FAQ.objects.create(
+            question="Am I owed overtime?", answer="The FLSA requires overtime pay.", category="Employment Law"
+        )
+        self.lease = FAQ.objects.create(
+            question="Can I break my lease?", answer="Sometimes, with notice.", category="Real Estate Law"
+        )
+        NumpyRetriever.build(
+            self.tmp.name,
+            ids=[self.overtime.id, self.lease.id],
+            embeddings=[[0.6, 0.8], [1.0, 0.0]],
+            categories=["Employment Law", "Real Estate Law"]
+        )
+        for patcher in (mock.patch.object(rag, '_retriever', NumpyRetriever(self.tmp.name)),
+                        mock.patch.object(rag, '_lexical_index', None),
+                        mock.patch.object(rag, '_faq_row_cache', None)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_lexical_match_is_promoted(self):
+        """An exact-term match the vector search ranks second comes first after fusion"""
+        sources = rag.search_similar_faqs("FLSA rules", top_k=1, query_embedding=[1.0, 0.0])
+        self.assertEqual(sources[0]['id'], str(self.overtime.id))
+        self.assertEqual(sources[0]['similarity_score'], 60.0)
+
+    def test_search_many_matches_single_searches(self):
+        """Batched search gives the same sources as one search per question"""
+        questions = ["FLSA rules", "Can I break my lease?"]
+        embeddings = [[1.0, 0.0], [0.6, 0.8]]
+        rag.get_lexical_index().get()
+        with self.assertNumQueries(1):  # One hydration query for all questions
+            batched = rag.search_many_faqs(questions, embeddings, top_k=2)
+        single = [rag.search_similar_faqs(q, top_k=2, query_embedding=e) for q, e in zip(questions, embeddings)]
+        self.assertEqual(batched, single)
+
+    def test_corpus_fingerprint_is_one_aggregate(self):
+        """The staleness check is one query and changes on edits and deletes"""
+        with self.assertNumQueries(1):
+            before = rag.faq_corpus_fingerprint()
+        self.lease.answer = "Only with the landlord's consent."
+        self.lease.save()
+        edited = rag.faq_corpus_fingerprint()
+        self.overtime.delete()
+        self.assertEqual(len({before, edited, rag.faq_corpus_fingerprint()}), 3)
+
+    def test_vector_only_when_disabled(self):
+        """RAG_HYBRID_SEARCH=False keeps pure vector ranking"""
+        with self.settings(RAG_HYBRID_SEARCH=False):
+            sources = rag.search_similar_faqs("FLSA rules", top_k=1, query_embedding=[1.0, 0.0])
+        self.assertEqual(sources[0]['id'], str(self.lease.id))
+
+
+class VectorIndexConfigTestCase(SimpleTestCase):
+    def test_distance_to_similarity(self):
+        """Distances from every space map onto cosine similarity"""
+        self.assertAlmostEqual(distance_to_similarity(0.2, 'cosine'), 0.8)
+        self.assertAlmostEqual(distance_to_similarity(0.4, 'l2'), 0.8)
+        self.assertEqual(distance_to_similarity(1.7, 'cosine'), 0.0)
+
+    def test_legacy_collection_needs_rebuild(self):
+        """A collection created without hnsw:space is flagged for rebuild"""
+        mismatches = rag.collection_config_mismatches({"description": "Legal FAQ embeddings for RAG"})
+        self.assertEqual(mismatches['hnsw:space'], ('l2', 'cosine'))
+        self.assertEqual(rag.collection_config_mismatches(rag.collection_metadata()), {})
+
+
+class FakeEncoding:
+    def __init__(self, ids, length):
+        self.ids = ids + [0] * (length - len(ids))
+        self.attention_mask = [1] * len(ids) + [0] * (length - len(ids))
+
+
+class FakeTokenizer:
+    """One token per word; the token id is the word's length."""
+
+    def encode_batch(self, texts):
+        ids = [[len(word) for word in text.split()] for text in texts]
+        length = max(len(row) for row in ids)
+        return [FakeEncoding(row, length) for row in ids]
+
+
+class FakeSession:
+    """Token embedding [id, 1.0]; padding tokens get [99, 99] so leaks show."""
+
+    def __init__(self):
+        self.batches = []
+
+    def get_inputs(self):
+        inputs = [mock.Mock(), mock.Mock()]
+        inputs[0].name, inputs[1].name = 'input_ids', 'attention_mask'
+        return inputs
+
+    def run(self, outputs, feeds):
+        self.batches.append(feeds['input_ids'].shape)
+        ids = feeds['input_ids'].astype('float32')
+        hidden = np.stack([ids, np.ones_like(ids)], axis=-1)
+        hidden[feeds['attention_mask'] == 0] = 99.0
+        return [hidden]
+
+
+class EmbeddingRuntimeTestCase(SimpleTestCase):
+    def test_onnx_embedder_pools_real_tokens_in_input_order(self):
+        """Mean pooling ignores padding and batches come back in input order"""
+        session = FakeSession()
+        embedder = OnnxEmbedder(session, FakeTokenizer())
+
+        vectors = embedder.encode(["ccc", "a bb dddd", "ee"], batch_size=2)
+        np.testing.assert_allclose(vectors, [[3.0, 1.0], [7 / 3, 1.0], [2.0, 1.0]], rtol=1e-6)
+        self.assertEqual(session.batches[0], (2, 3))  # Longest texts batched first
+
+        single = embedder.encode("a bb", normalize_embeddings=True)
+        self.assertEqual(single.shape, (2,))
+        self.assertAlmostEqual(float(np.linalg.norm(single)), 1.0, places=6)
+
+    def test_compare_rankings(self):
+        """Identical embeddings agree fully; a swapped query is caught"""
+        corpus = np.eye(3, dtype=np.float32)
+        queries = np.array([[0.9, 0.1, 0.0], [0.0, 0.2, 0.8]], dtype=np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        report = compare_rankings(corpus, queries, corpus, queries)
+        self.assertEqual(report, {'min_cosine': 1.0, 'mean_cosine': 1.0,
+                                  'top1_agreement': 1.0, 'top2_overlap': 1.0})
+        self.assertEqual(compare_rankings(corpus, queries, corpus, queries[::-1])['top1_agreement'], 0.0)
+
+    def test_runtime_selection(self):
+        """Each runtime has its own embedding cache namespace; unknown ones fail"""
+        with self.settings(RAG_EMBEDDING_RUNTIME='onnx', RAG_ONNX_QUANTIZED=True):
+            self.assertEqual(rag.embedding_runtime_name(), 'onnx-int8')
+        with self.settings(RAG_EMBEDDING_RUNTIME='onnx', RAG_ONNX_QUANTIZED=False):
+            self.assertEqual(rag.embedding_runtime_name(), 'onnx')
+        with self.assertRaises(ValueError):
+            load_embedder('tensorflow', rag.EMBEDDING_MODEL_NAME, '/nonexistent')
+
+    def test_onnx_export_matches_torch_rankings(self):
+        """
+        The exported models rank the curated FAQs like PyTorch. Runs when
+        manage.py export_onnx_embedder has written RAG_ONNX_MODEL_DIR and
+        the PyTorch model can be loaded.
+        """
+        from django.conf import settings
+
+        if not os.path.exists(onnx_model_path(settings.RAG_ONNX_MODEL_DIR)):
+            self.skipTest("No ONNX export in RAG_ONNX_MODEL_DIR")
+        try:
+            reference_model = load_embedder('torch', rag.EMBEDDING_MODEL_NAME, settings.RAG_ONNX_MODEL_DIR)
+        except Exception as e:
+            self.skipTest(f"PyTorch embedding model unavailable: {e}")
+
+        with open(os.path.join(settings.BASE_DIR, 'data', 'legal_faqs.json'), encoding='utf-8') as f:
+            faqs = json.load(f)
+        corpus = [faq['question'] for faq in faqs]
+        queries = [faq['question'].lower().rstrip('?') for faq in faqs]
+        reference = [np.asarray(reference_model.encode(texts, normalize_embeddings=True))
+                     for texts in (corpus, queries)]
+
+        # fp32 should be numerically identical; int8 may swap near-ties
+        limits = {False: (0.99, 0.95), True: (0.95, 0.85)}
+        for quantized, (min_cosine, min_top1) in limits.items():
+            if not os.path.exists(onnx_model_path(settings.RAG_ONNX_MODEL_DIR, quantized)):
+                continue
+            embedder = load_embedder('onnx', rag.EMBEDDING_MODEL_NAME, settings.RAG_ONNX_MODEL_DIR,
+                                     quantized=quantized)
+            candidate = [embedder.encode(texts, normalize_embeddings=True) for texts in (corpus, queries)]
+            report = compare_rankings(*reference, *candidate)
+            with self.subTest(quantized=quantized):
+                self.assertGreaterEqual(report['mean_cosine'], min_cosine)
+                self.assertGreaterEqual(report['top1_agreement'], min_top1)
+
+
+class PreforkTestCase(SimpleTestCase):
+    def test_reset_after_fork_keeps_shared_state(self):
+        """A worker keeps the model and indexes but rebuilds clients, caches and locks"""
+        engine = rag.RAGEngine()
+        model = engine._embedding_model = object()
+        engine._chroma_client = engine._collection = engine._executor = object()
+        retriever = NumpyRetriever(tempfile.mkdtemp())
+        lexical_index = mock.Mock()
+        patches = [
+            mock.patch.object(rag, '_engine', engine),
+            mock.patch.object(rag, '_engine_lock', rag._engine_lock),
+            mock.patch.object(rag, '_retriever', retriever),
+            mock.patch.object(rag, '_lexical_index', lexical_index),
+        ] + [
+            mock.patch.object(rag, name, object())
+            for name in ('_embedding_cache', '_answer_cache', '_faq_row_cache',
+                         '_llm_gateway', '_generator', '_embedding_batcher')
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        parent_lock, retriever_lock = rag._engine_lock, retriever._lock
+
+        rag.reset_after_fork()
+        self.assertIs(engine._embedding_model, model)
+        self.assertIsNone(engine._chroma_client)
+        self.assertIsNone(engine._collection)
+        self.assertIsNone(engine._executor)
+        self.assertIsNone(rag._embedding_cache)
+        self.assertIsNone(rag._generator)
+        self.assertIsNone(rag._embedding_batcher)
+        self.assertIs(rag._retriever, retriever)
+        self.assertIsNot(rag._engine_lock, parent_lock)
+        self.assertIsNot(retriever._lock, retriever_lock)
+        lexical_index.reset_after_fork.assert_called_once_with()
+
+    @override_settings(RAG_EMBEDDING_RUNTIME='onnx')
+    def test_onnx_session_is_reloaded_after_fork(self):
+        """ONNX Runtime sessions don't survive fork; the worker loads its own"""
+        engine = rag.RAGEngine()
+        engine._embedding_model = object()
+        engine.reset_after_fork()
+        self.assertIsNone(engine._embedding_model)
+
+    def test_lexical_index_survives_fork(self):
+        """A refresh running in the parent doesn't block refreshes in the worker"""
+        manager = LexicalIndexManager(lambda: [(1, 'x', "lease")], lambda: 'v1')
+        index = manager.get()
+        manager._refreshing = True
+        manager.reset_after_fork()
+        self.assertFalse(manager._refreshing)
+        self.assertIs(manager.get(), index)
+
+
+def start_retrieval_service(test, encode_batch, search, max_wait_ms=1):
+    """Serve a RetrievalServer on a temporary socket for the duration of test."""
+    tmp = tempfile.TemporaryDirectory()
+    path = os.path.join(tmp.name, 'retrieval.sock')
+    server = RetrievalServer(path, encode_batch, search, describe=lambda: {'vectors': 3},
+                             max_wait_ms=max_wait_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    test.addCleanup(tmp.cleanup)
+    test.addCleanup(server.server_close)
+    test.addCleanup(server.shutdown)
+    return server
+
+
+def fake_encode(texts):
+    """'Q1...' questions point along x, everything else along y."""
+    return np.asarray([[1.0, 0.0] if text.startswith("Q1") else [0.0, 1.0] for text in texts])
+
+
+class RetrievalServiceTestCase(SimpleTestCase):
+    def setUp(self):
+        self.searches = []
+
+        def search(questions, embeddings, top_k, categories):
+            self.searches.append((embeddings, categories))
+            return [[{'id': '7', 'similarity': 0.5, 'metadata': {'category': "Civil Law"}},
+                     {'id': '8', 'similarity': 0.25, 'metadata': None}][:top_k] for _ in questions]
+
+        self.server = start_retrieval_service(self, fake_encode, search)
+        self.client = RetrievalClient(self.server.path, timeout=5)
+        self.addCleanup(self.client.close)
+
+    def test_embed_and_search_round_trip(self):
+        """Known embeddings are passed through; only missing ones are encoded"""
+        np.testing.assert_allclose(self.client.embed(["Q1 lease", "other"]), [[1, 0], [0, 1]])
+        vectors, hits, times = self.client.search(["Q1 lease", "other"], 2, [None, [0.6, 0.8]])
+        np.testing.assert_allclose(vectors, [[1, 0], [0.6, 0.8]], rtol=1e-6)
+        np.testing.assert_allclose(self.searches[0][0][1], [0.6, 0.8], rtol=1e-6)
+        self.assertIsNone(self.searches[0][1])
+        self.assertEqual(hits[0], [
+            {'id': '7', 'similarity': 0.5, 'metadata': {'category': "Civil Law"}},
+            {'id': '8', 'similarity': 0.25, 'metadata': None},
+        ])
+        self.assertEqual(set(times), {'embed', 'search'})
+
+        # Category filters travel with the request
+        self.client.search(["Q1"], 1, categories=["Civil Law", "Tax Law"])
+        self.client.search(["Q1"], 1, categories='auto')
+        self.assertEqual([categories for _, categories in self.searches[1:]], [["Civil Law", "Tax Law"], 'auto'])
+        stats = self.client.stats()
+        self.assertEqual(stats['requests'], {'embed': 1, 'search': 3})
+        self.assertEqual(stats['embedding_batcher']['items'], 5)
+        self.assertEqual(stats['vectors'], 3)
+
+    def test_concurrent_clients_share_encode_batches(self):
+        """Texts from different connections are encoded in one batch"""
+        self.server.batcher.max_wait = 0.2
+        threads = [threading.Thread(target=self.client.embed, args=([f"question {i}"],)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertLess(self.server.batcher.stats()['batches'], 4)
+
+    def test_errors_and_reconnects(self):
+        """Service errors raise RetrievalServiceError; a stale connection is replaced"""
+        self.server.search = mock.Mock(side_effect=RuntimeError("index missing"))
+        with self.assertRaisesRegex(RetrievalServiceError, "index missing"):
+            self.client.search(["Q1"], 2)
+
+        self.client._local.sock.close()  # As if the service had restarted
+        self.client._local.sock = mock.Mock(sendall=mock.Mock(side_effect=BrokenPipeError))
+        self.assertEqual(self.client.embed(["Q1"]).shape, (1, 2))
+
+        unreachable = RetrievalClient(os.path.join(tempfile.gettempdir(), 'missing.sock'))
+        with self.assertRaises(RetrievalServiceError):
+            unreachable.embed(["Q1"])
+
+
+@override_settings(RAG_RETRIEVAL_MODE='service', RAG_GENERATOR_BACKEND='fake',
+                   RAG_FAKE_LLM_LATENCY_MS=0, RAG_FAKE_LLM_TOKENS_PER_SECOND=0,
+                   RAG_EMBEDDING_CACHE_PATH='', RAG_ANSWER_CACHE_SIZE=0)
+class RetrievalServiceModeTestCase(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.faqs = [
+            FAQ.objects.create(question="Q1?", answer="A1.", category="Civil Law"),
+            FAQ.objects.create(question="Q2?", answer="A2.", category="Employment Law"),
+        ]
+        NumpyRetriever.build(self.tmp.name, [faq.id for faq in self.faqs],
+                             [[1.0, 0.0], [0.0, 1.0]], [faq.category for faq in self.faqs])
+        retriever = NumpyRetriever(self.tmp.name)
+        server = start_retrieval_service(
+            self, fake_encode, lambda questions, embeddings, top_k, categories: retriever.search_many(embeddings, top_k)
+        )
+        self.server = server
+        patches = [
+            override_settings(RAG_RETRIEVAL_SOCKET=server.path),
+            mock.patch.object(rag, '_retrieval_client', None),
+            mock.patch.object(rag, '_embedding_cache', None),
+            mock.patch.object(rag, '_answer_cache', None),
+            mock.patch.object(rag, '_faq_row_cache', None),
+            mock.patch.object(rag, '_generator', None),
+            mock.patch.object(rag, '_retriever', None),
+            mock.patch.object(rag.RAGEngine, 'embedding_model',
+                              mock.PropertyMock(side_effect=AssertionError("model loaded in web worker"))),
+        ]
+        for patcher in patches:
+            patcher.enable() if hasattr(patcher, 'enable') else patcher.start()
+            self.addCleanup(patcher.disable if hasattr(patcher, 'disable') else patcher.stop)
+
+    def test_pipeline_uses_the_service(self):
+        """Questions are embedded and searched remotely, and hydrated locally"""
+        timer = StageTimer('ask')
+        result = rag.process_question("Q1 can I break my lease?", timer=timer)
+        self.assertEqual(result['sources'][0]['answer'], "A1.")
+        self.assertEqual(result['sources'][0]['similarity_score'], 100.0)
+        self.assertEqual(set(timer.durations), {'embed', 'retrieve', 'generate'})
+
+        # The second ask reuses the cached embedding: nothing new is encoded
+        rag.process_question("Q1 can I break my lease?")
+        self.assertEqual(self.server.batcher.stats()['items'], 1)
+
+        results = dict(rag.process_questions(["Q1 again?", "Overtime?"], top_k=1))
+        self.assertEqual([results[i]['sources'][0]['answer'] for i in (0, 1)], ["A1.", "A2."])
+        self.assertEqual(rag.get_collection_count(), 3)
+        self.assertEqual(rag.get_engine().is_loaded()['retrieval_service'], True)
+
+    def test_unreachable_service_is_a_503(self):
+        """Every ask endpoint answers 503 without logging when the service is down"""
+        missing = os.path.join(self.tmp.name, 'missing.sock')
+        with override_settings(RAG_RETRIEVAL_SOCKET=missing), \
+                mock.patch.object(rag, '_retrieval_client', None):
+            for path, body in [('/api/ask/', {'question': "Q1 lease?"}),
+                               ('/api/ask/stream/', {'question': "Q1 lease?"}),
+                               ('/api/ask/batch/', {'questions': ["Q1 lease?", "Overtime?"]})]:
+                response = self.client.post(path, body, content_type='application/json')
+                self.assertEqual(response.status_code, 503, path)
+                self.assertIn('unavailable', response.json()['error'])
+            response = async_to_sync(self.async_client.post)(
+                '/api/ask/async/', {'question': "Q1 lease?"}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 503)
+        self.assertEqual(QueryLog.objects.count(), 0)
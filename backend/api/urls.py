@@ -7,7 +7,11 @@ from . import views
 
 urlpatterns = [
     path('ask/', views.ask_question, name='ask_question'),
+    path('ask/stream/', views.ask_question_stream, name='ask_question_stream'),
+    path('ask/async/', views.ask_question_async, name='ask_question_async'),
+    path('ask/batch/', views.ask_question_batch, name='ask_question_batch'),
     path('health/', views.health_check, name='health_check'),
     path('stats/', views.get_stats, name='get_stats'),
     path('logs/', views.get_logs, name='get_logs'),
+    path('metrics/', views.get_metrics, name='get_metrics'),
 ]
@@ -1,15 +1,33 @@
 """
 API Views for Legal Q&A Chatbot
-Endpoints: ask, health, stats, logs
+Endpoints: ask, ask/stream, ask/async, ask/batch, health, stats, logs, metrics
 """
 
+import os
+import json
 import time
-from django.db.models import Avg, Count
+from itertools import chain
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, F, TextField, Value, When
+from django.db.models.functions import Concat, Length, Substr
+from django.db.models.lookups import GreaterThan
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 
+from .llm import LLMUnavailableError
+from .metrics import StageTimer, pipeline_metrics, process_memory
 from .models import FAQ, QueryLog
+from .logsink import arecord_query_log, get_query_log_sink, record_query_log, record_query_logs
+from .pagination import after_cursor, encode_cursor
+from .retrieval_service import RetrievalServiceError
+from .rollups import approximate_query_count, parse_window, read_window
 from . import rag
 
 
@@ -23,6 +41,86 @@ def get_client_ip(request):
     return ip
 
 
+def average_similarity(sources):
+    """Average similarity_score of sources, or None if there are none."""
+    if not sources:
+        return None
+    return round(
+        sum(s.get('similarity_score', 0) for s in sources) / len(sources),
+        2
+    )
+
+
+def compact_sources(sources):
+    """Sources as logged: FAQ id, category and score (the text lives in the FAQ table)."""
+    return [
+        {'id': s['id'], 'category': s.get('category'), 'similarity_score': s.get('similarity_score')}
+        for s in sources
+    ]
+
+
+def build_query_log(request, question, result, processing_time, **extra):
+    """Build an unsaved QueryLog row for a processed question (request may be None)."""
+    if request is not None:
+        extra.setdefault('ip_address', get_client_ip(request))
+        extra.setdefault('user_agent', request.META.get('HTTP_USER_AGENT', '')[:500])  # Limit to 500 chars
+    return QueryLog(
+        question=question,
+        answer=result['answer'],
+        sources=compact_sources(result['sources']),
+        processing_time=processing_time,
+        source_count=len(result['sources']),
+        avg_similarity=average_similarity(result['sources']),
+        cache_hit=result['cache_hit'],
+        **extra
+    )
+
+
+def llm_unavailable_body(error):
+    """Body and headers of the 503 returned when the LLM gateway gives up."""
+    headers = {}
+    if error.retry_after is not None:
+        headers['Retry-After'] = str(max(1, round(error.retry_after)))
+    return {'error': 'The answer service is temporarily unavailable. Please try again shortly.',
+            'detail': str(error)}, headers
+
+
+def retrieval_unavailable_body(error):
+    """Body of the 503 returned when the retrieval service can't be reached."""
+    return {'error': 'The search service is temporarily unavailable. Please try again shortly.',
+            'detail': str(error)}
+
+
+def parse_category(body):
+    """
+    Validate the optional category filter of a request body: one category
+    name, a list of them, or "auto" for the query-side classifier to pick.
+
+    Returns:
+        (categories, None) or (None, error message); categories is None
+        when the body has no filter
+    """
+    category = body.get('category') if isinstance(body, dict) else None
+    if category is None:
+        return None, None
+    if isinstance(category, str) and category.strip():
+        return category.strip(), None
+    if isinstance(category, list) and category and \
+            all(isinstance(name, str) and name.strip() for name in category):
+        return [name.strip() for name in category], None
+    return None, 'category must be a non-empty string or list of strings'
+
+
+def log_query(request, question, result, processing_time, **extra):
+    """
+    Log a processed question. The row is handed to the background log sink
+    (see api.logsink) unless RAG_QUERY_LOG_ASYNC is disabled.
+    """
+    query_log = build_query_log(request, question, result, processing_time, **extra)
+    record_query_log(query_log)
+    return query_log
+
+
 @api_view(['POST'])
 def ask_question(request):
     """
@@ -31,7 +129,8 @@ def ask_question(request):
 
     Request body:
         {
-            "question": "User's legal question"
+            "question": "User's legal question",
+            "category": "Employment Law"    (optional)
         }
 
     Response:
@@ -46,9 +145,24 @@ def ask_question(request):
                     "similarity_score": 95.5
                 }
             ],
-            "processing_time": 1.23
+            "processing_time": 1.23,
+            "cache_hit": false,
+            "exact_match": false
         }
+
+    exact_match is true when the question matched a FAQ question after
+    normalization and the curated FAQ answer was returned without calling
+    the LLM (RAG_EXACT_MATCH).
+
+    category limits the sources to one category or a list of them; "auto"
+    lets the category classifier pick one from the question (all
+    categories are searched when it isn't confident).
+
+    Returns 503 (with Retry-After when known) if the LLM could not answer
+    within RAG_LLM_DEADLINE seconds, and 503 if the retrieval service
+    (RAG_RETRIEVAL_MODE='service') is unavailable.
     """
+    timer = None
     try:
         # Get question from request
         question = request.data.get('question', '').strip()
@@ -59,101 +173,441 @@ def ask_question(request):
                 {'error': 'Question is required'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        categories, error = parse_category(request.data)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Start timer
-        start_time = time.time()
+        # Start timer (per-stage times are kept for the log and /api/metrics/)
+        timer = StageTimer('ask')
 
         # Process question through RAG pipeline
-        result = rag.process_question(question)
+        result = rag.process_question(question, timer, categories)
 
         # Calculate processing time
-        processing_time = round(time.time() - start_time, 2)
-
-        # Calculate average similarity score
-        avg_similarity = None
-        if result['sources']:
-            avg_similarity = round(
-                sum(s.get('similarity_score', 0) for s in result['sources']) / len(result['sources']),
-                2
-            )
+        processing_time = round(timer.elapsed(), 2)
 
         # Save to query log with enhanced metadata
-        QueryLog.objects.create(
-            question=question,
-            answer=result['answer'],
-            sources=result['sources'],
-            processing_time=processing_time,
-            source_count=len(result['sources']),
-            avg_similarity=avg_similarity,
-            ip_address=get_client_ip(request),
-            user_agent=request.META.get('HTTP_USER_AGENT', '')[:500]  # Limit to 500 chars
-        )
+        with timer.stage('persist'):
+            log_query(request, question, result, processing_time, **timer.log_fields())
+        timer.finish(cache_hit=result['cache_hit'])
 
         # Return response
         return Response({
             'answer': result['answer'],
             'sources': result['sources'],
-            'processing_time': processing_time
+            'processing_time': processing_time,
+            'cache_hit': result['cache_hit'],
+            'exact_match': result['exact_match']
         })
 
+    except LLMUnavailableError as e:
+        timer.finish('unavailable')
+        body, headers = llm_unavailable_body(e)
+        return Response(body, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers=headers)
+    except RetrievalServiceError as e:
+        timer.finish('unavailable')
+        return Response(retrieval_unavailable_body(e), status=status.HTTP_503_SERVICE_UNAVAILABLE)
     except Exception as e:
+        if timer is not None:
+            timer.finish('error')
         return Response(
             {'error': f'An error occurred: {str(e)}'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
 
+async def ask_question_async(request):
+    """
+    POST /api/ask/async/
+    Async variant of /api/ask/ for ASGI servers (e.g. uvicorn legal_qa.asgi:application).
+
+    Embedding and search run on a bounded thread pool and the LLM call is
+    awaited, so no worker thread is held while waiting on Groq. Request and response bodies match /api/ask/.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    if not isinstance(body, dict):
+        return JsonResponse({'error': 'Request body must be a JSON object'}, status=400)
+
+    question = str(body.get('question', '')).strip()
+    if not question:
+        return JsonResponse({'error': 'Question is required'}, status=400)
+    categories, error = parse_category(body)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+
+    timer = StageTimer('ask_async')
+    try:
+        result = await rag.aprocess_question(question, timer, categories)
+        processing_time = round(timer.elapsed(), 2)
+
+        query_log = build_query_log(request, question, result, processing_time, **timer.log_fields())
+        with timer.stage('persist'):
+            await arecord_query_log(query_log)
+        timer.finish(cache_hit=result['cache_hit'])
+
+        return JsonResponse({
+            'answer': result['answer'],
+            'sources': result['sources'],
+            'processing_time': processing_time,
+            'cache_hit': result['cache_hit'],
+            'exact_match': result['exact_match']
+        })
+
+    except LLMUnavailableError as e:
+        timer.finish('unavailable')
+        body, headers = llm_unavailable_body(e)
+        return JsonResponse(body, status=503, headers=headers)
+    except RetrievalServiceError as e:
+        timer.finish('unavailable')
+        return JsonResponse(retrieval_unavailable_body(e), status=503)
+    except Exception as e:
+        timer.finish('error')
+        return JsonResponse({'error': f'An error occurred: {str(e)}'}, status=500)
+
+
+# Django 4.2's csrf_exempt/require_POST decorators don't support async views
+ask_question_async.csrf_exempt = True
+
+
+def sse_event(event, data):
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_answer_events(request, question, categories=None):
+    """
+    Run the streaming RAG pipeline and yield it as server-sent events.
+
+    The QueryLog row is written once the answer is complete, with time to
+    first token recorded separately from total processing time.
+    RetrievalServiceError is raised (before the first event) rather than
+    sent as an error event.
+    """
+    timer = StageTimer('ask_stream')
+    time_to_first_token = None
+
+    try:
+        for event, payload in rag.stream_question(question, timer, categories):
+            if event == 'sources':
+                yield sse_event('sources', {'sources': payload})
+            elif event in ('token', 'error'):
+                if time_to_first_token is None:
+                    time_to_first_token = round(timer.elapsed(), 3)
+                yield sse_event(event, {'text': payload})
+            elif event == 'done':
+                processing_time = round(timer.elapsed(), 2)
+                with timer.stage('persist'):
+                    log_query(
+                        request, question, payload, processing_time,
+                        time_to_first_token=time_to_first_token, **timer.log_fields()
+                    )
+                timer.finish(cache_hit=payload['cache_hit'])
+                yield sse_event('done', {
+                    'processing_time': processing_time,
+                    'time_to_first_token': time_to_first_token,
+                    'cache_hit': payload['cache_hit'],
+                    'exact_match': payload['exact_match']
+                })
+    except RetrievalServiceError:
+        timer.finish('unavailable')
+        raise
+    except Exception as e:
+        timer.finish('error')
+        yield sse_event('error', {'text': f'An error occurred: {str(e)}'})
+
+
+async def iterate_in_thread(iterator):
+    """Drive a blocking iterator from a worker thread for ASGI streaming."""
+    sentinel = object()
+    next_item = sync_to_async(lambda: next(iterator, sentinel), thread_sensitive=False)
+    while True:
+        item = await next_item()
+        if item is sentinel:
+            return
+        yield item
+
+
+@csrf_exempt
+@require_POST
+def ask_question_stream(request):
+    """
+    POST /api/ask/stream/
+    Process user question and stream the answer as server-sent events.
+
+    Request body:
+        {
+            "question": "User's legal question",
+            "category": "Employment Law"    (optional, as in /api/ask/)
+        }
+
+    Events:
+        event: sources   data: {"sources": [...]}        (sent immediately)
+        event: token     data: {"text": "partial answer"} (repeated)
+        event: error     data: {"text": "error message"}  (on failure)
+        event: done      data: {"processing_time": 2.1, "time_to_first_token": 0.4, "cache_hit": false,
+                                 "exact_match": false}
+
+    Retrieval runs before the response starts, so an unavailable retrieval
+    service is a 503 like on /api/ask/.
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+    if not isinstance(body, dict):
+        return JsonResponse({'error': 'Request body must be a JSON object'}, status=400)
+
+    question = str(body.get('question', '')).strip()
+    if not question:
+        return JsonResponse({'error': 'Question is required'}, status=400)
+    categories, error = parse_category(body)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+
+    events = stream_answer_events(request, question, categories)
+    try:
+        events = chain([next(events)], events)  # The sources event: retrieval is done
+    except RetrievalServiceError as e:
+        return JsonResponse(retrieval_unavailable_body(e), status=503)
+    if isinstance(request, ASGIRequest):
+        # Under ASGI an async iterator streams without blocking the event loop
+        events = iterate_in_thread(events)
+
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+
+def parse_batch_questions(body):
+    """
+    Validate the questions of a batch request body.
+
+    Returns:
+        (questions, None) or (None, error message)
+    """
+    questions = body.get('questions') if isinstance(body, dict) else None
+    if not isinstance(questions, list) or not questions:
+        return None, 'questions must be a non-empty list'
+    if len(questions) > settings.RAG_BATCH_MAX_QUESTIONS:
+        return None, f'At most {settings.RAG_BATCH_MAX_QUESTIONS} questions per batch'
+    cleaned = []
+    for index, question in enumerate(questions):
+        question = question.strip() if isinstance(question, str) else ''
+        if not question:
+            return None, f'questions[{index}] must be a non-empty string'
+        cleaned.append(question)
+    return cleaned, None
+
+
+def batch_answer_lines(request, questions, categories=None):
+    """
+    Run the batch RAG pipeline and yield NDJSON lines: one per question as
+    its answer completes, then a summary. QueryLog rows are written in bulk
+    once the batch is done. RetrievalServiceError is raised (before the
+    first line) rather than sent as an error line.
+    """
+    start_time = time.perf_counter()
+    timings = {}
+    timers = [StageTimer('batch') for _ in questions]
+    results = []
+    query_logs = []
+
+    try:
+        for index, result in rag.process_questions(questions, timings=timings, timers=timers,
+                                                       categories=categories):
+            # Time since the batch started, including the shared embedding and search
+            processing_time = round(time.perf_counter() - start_time, 2)
+            results.append(result)
+            query_logs.append(build_query_log(
+                request, questions[index], result, processing_time, **timers[index].log_fields()
+            ))
+            timers[index].finish('unavailable' if result.get('error') else None, result['cache_hit'])
+            line = {
+                'index': index,
+                'question': questions[index],
+                'answer': result['answer'],
+                'sources': result['sources'],
+                'processing_time': processing_time,
+                'cache_hit': result['cache_hit'],
+                'exact_match': result['exact_match']
+            }
+            if result.get('error'):
+                line['error'] = result['error']
+            yield json.dumps(line) + '\n'
+    except RetrievalServiceError:
+        for timer in timers:
+            timer.finish('unavailable')
+        raise
+    except Exception as e:
+        yield json.dumps({'error': f'An error occurred: {str(e)}'}) + '\n'
+
+    try:
+        record_query_logs(query_logs)
+    except Exception as e:
+        print(f"Error logging batch queries: {e}")
+    summary = rag.batch_report(results, time.perf_counter() - start_time, timings)
+    yield json.dumps({'summary': summary}) + '\n'
+
+
+@csrf_exempt
+@require_POST
+def ask_question_batch(request):
+    """
+    POST /api/ask/batch/
+    Answer many questions in one request, streaming results as NDJSON.
+
+    Questions are embedded and searched together, then answered with
+    bounded LLM concurrency (RAG_BATCH_GENERATION_CONCURRENCY). Lines arrive
+    in completion order; "index" refers to the position in "questions".
+
+    Request body:
+        {
+            "questions": ["First question", "Second question"],
+            "category": "auto"    (optional, as in /api/ask/; applies to every question)
+        }
+
+    Response (application/x-ndjson, one object per line):
+        {"index": 1, "question": "...", "answer": "...", "sources": [...],
+         "processing_time": 1.8, "cache_hit": false, "exact_match": false}
+        ...
+        {"summary": {"questions": 2, "seconds": 2.4, "questions_per_second": 0.83, ...}}
+
+    Returns 503 before streaming if the retrieval service is unavailable.
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON body'}, status=400)
+
+    questions, error = parse_batch_questions(body)
+    if not error:
+        categories, error = parse_category(body)
+    if error:
+        return JsonResponse({'error': error}, status=400)
+
+    lines = batch_answer_lines(request, questions, categories)
+    try:
+        lines = chain([next(lines)], lines)  # Every question has been searched
+    except RetrievalServiceError as e:
+        return JsonResponse(retrieval_unavailable_body(e), status=503)
+    if isinstance(request, ASGIRequest):
+        lines = iterate_in_thread(lines)
+
+    response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+
 @api_view(['GET'])
 def health_check(request):
     """
     GET /api/health/
     Check if API is running.
 
+    Does not load the RAG engine; "rag_ready" reports whether the
+    embedding model and clients have been initialized yet.
+
     Response:
         {
             "status": "ok",
-            "message": "API is running"
+            "message": "API is running",
+            "rag_ready": true
         }
     """
     return Response({
         'status': 'ok',
-        'message': 'API is running'
+        'message': 'API is running',
+        'rag_ready': all(rag.get_engine().is_loaded().values())
     })
 
 
+CORPUS_COUNTS_CACHE_KEY = 'api:stats:corpus_counts'
+
+
+def corpus_counts():
+    """FAQ and ChromaDB counts, cached for RAG_STATS_CORPUS_CACHE_SECONDS."""
+    counts = cache.get(CORPUS_COUNTS_CACHE_KEY)
+    if counts is None:
+        counts = {'total_faqs': FAQ.objects.count(), 'chroma_count': rag.get_collection_count()}
+        cache.set(CORPUS_COUNTS_CACHE_KEY, counts, settings.RAG_STATS_CORPUS_CACHE_SECONDS)
+    return counts
+
+
 @api_view(['GET'])
 def get_stats(request):
     """
     GET /api/stats/
     Get system statistics.
 
+    Query statistics are read from pre-aggregated rollups (api.rollups), so
+    the cost does not grow with the number of logged queries.
+
+    Query params:
+        - window: Time window for query statistics, e.g. 15m, 24h, 7d
+          (default: all). Rounded down to minute/hour/day buckets.
+
     Response:
         {
+            "window": "24h",
             "total_faqs": 15,
             "total_queries": 42,
             "chroma_count": 15,
             "avg_processing_time": 1.23,
-            "avg_similarity": 85.5
+            "avg_similarity": 85.5,
+            "cache_hits": 7,
+            "cache_hit_rate": 0.1667,
+            "latency_histogram": {"<=0.25s": 7, "<=0.5s": 0, ...},
+            "embedding_cache": {"hits": 10, "misses": 5, "hit_rate": 0.6667, ...},
+            "answer_cache": {"hits": 3, "misses": 12, "hit_rate": 0.2, ...},
+            "embedding_batcher": {"batches": 4, "avg_batch_size": 6.5, ...},
+            "query_log_sink": {"queued": 0, "flushed": 41, "dropped": 0, ...},
+            "lexical_index": {"documents": 15, "terms": 612, ...},
+            "faq_row_cache": {"hits": 40, "misses": 8, "hit_rate": 0.8333, ...},
+            "generator": {"backend": "groq", "calls": 12, "retries": 1, "queue_wait_avg_ms": 3.1, ...}
         }
     """
+    window = request.GET.get('window', 'all')
     try:
-        # Query counts
-        total_faqs = FAQ.objects.count()
-        total_queries = QueryLog.objects.count()
-        chroma_count = rag.get_collection_count()
-
-        # Calculate averages
-        stats = QueryLog.objects.aggregate(
-            avg_processing_time=Avg('processing_time'),
-            avg_similarity=Avg('avg_similarity')
-        )
+        window_delta = parse_window(window)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        embedding_cache = rag.get_embedding_cache()
+        answer_cache = rag.get_answer_cache()
+        embedding_batcher = rag.get_embedding_batcher()
+        lexical_index = rag.get_lexical_index() if settings.RAG_HYBRID_SEARCH else None
+        faq_row_cache = rag.get_faq_row_cache()
+        query_log_sink = get_query_log_sink()
+        generator = rag.get_generator()
+        retrieval_service = None
+        if rag.uses_retrieval_service():
+            try:
+                retrieval_service = rag.get_retrieval_client().stats()
+            except RetrievalServiceError as e:
+                retrieval_service = {'error': str(e)}
 
         return Response({
-            'total_faqs': total_faqs,
-            'total_queries': total_queries,
-            'chroma_count': chroma_count,
-            'avg_processing_time': round(stats['avg_processing_time'] or 0, 2),
-            'avg_similarity': round(stats['avg_similarity'] or 0, 2)
+            'window': window,
+            **corpus_counts(),
+            **read_window(window_delta),
+            'embedding_runtime': rag.embedding_runtime_name(),
+            'embedding_cache': embedding_cache.stats() if embedding_cache else None,
+            'answer_cache': answer_cache.stats() if answer_cache else None,
+            'embedding_batcher': embedding_batcher.stats() if embedding_batcher else None,
+            'query_log_sink': query_log_sink.stats() if query_log_sink else None,
+            'lexical_index': lexical_index.stats() if lexical_index else None,
+            'faq_row_cache': faq_row_cache.stats() if faq_row_cache else None,
+            'retrieval_service': retrieval_service,
+            'generator': generator.stats()
         })
 
     except Exception as e:
@@ -163,25 +617,105 @@ def get_stats(request):
         )
 
 
+# Characters of each answer returned by /api/logs/
+LOG_ANSWER_PREVIEW = 200
+LOG_COUNT_MODES = ('exact', 'approx', 'none')
+
+
+# Generator stats exported by /api/metrics/ (the fake backend only has calls)
+LLM_COUNTERS = {
+    'calls': "Answer generation calls.",
+    'failed': "Generation calls that gave up with LLMUnavailableError.",
+    'retries': "Upstream attempts retried by the LLM gateway.",
+    'upstream_rate_limited': "Upstream 429 responses.",
+}
+
+
+def component_samples():
+    """Counters of the caches, log sink and generator, and process memory, read at scrape time."""
+    samples = []
+    for name, component in (
+        ('embedding', rag.get_embedding_cache()),
+        ('answer', rag.get_answer_cache()),
+        ('faq_row', rag.get_faq_row_cache()),
+    ):
+        if component is None:
+            continue
+        stats = component.stats()
+        for result in ('hits', 'misses'):
+            samples.append(('rag_cache_lookups_total', 'counter', "Cache lookups by cache and result.",
+                            {'cache': name, 'result': result}, stats[result]))
+
+    sink = get_query_log_sink()
+    if sink is not None:
+        stats = sink.stats()
+        for outcome in ('flushed', 'dropped', 'failed'):
+            samples.append(('rag_query_logs_total', 'counter', "QueryLog rows handled by the log sink.",
+                            {'outcome': outcome}, stats[outcome]))
+
+    for kind, value in process_memory().items():
+        samples.append(('rag_process_memory_bytes', 'gauge', "Memory of this worker process by kind.",
+                        {'kind': kind, 'pid': os.getpid()}, value))
+
+    stats = rag.get_generator().stats()
+    for counter, text in LLM_COUNTERS.items():
+        if counter in stats:
+            samples.append((f'rag_llm_{counter}_total', 'counter', text,
+                            {'backend': stats['backend']}, stats[counter]))
+    return samples
+
+
+def get_metrics(request):
+    """
+    GET /api/metrics/
+    Prometheus scrape endpoint (text exposition format 0.0.4).
+
+    Per-stage latency histograms (rag_stage_duration_seconds{stage="embed"
+    |"retrieve"|"generate"|"persist"}), end-to-end latency per endpoint,
+    request counters by status, answer cache hits and stage errors, plus
+    cache, log sink and LLM counters and the worker's memory (rss/pss/uss).
+    Values are per process.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    try:
+        extra = component_samples()
+    except Exception as e:
+        print(f"Error collecting component metrics: {e}")
+        extra = []
+    return HttpResponse(pipeline_metrics.render(extra), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @api_view(['GET'])
 def get_logs(request):
     """
     GET /api/logs/
-    Get query logs with optional filtering.
+    Get query logs, newest first.
+
+    Pages are keyset-paginated: pass the next_cursor of one response as
+    cursor to get the following page, which costs the same at any depth.
+    offset is still accepted for older clients but gets slower the deeper
+    it goes.
 
     Query params:
         - limit: Number of logs to return (default: 50, max: 200)
+        - cursor: next_cursor from the previous page (takes precedence over offset)
         - offset: Pagination offset (default: 0)
+        - count: exact (default), approx (from the stats rollups) or none
 
     Response:
         {
             "count": 100,
+            "limit": 50,
+            "offset": 0,
+            "next_cursor": "MjAyNC0wMS0wMVQxMjowMDowMCswMDowMHw1MQ",
             "logs": [
                 {
                     "id": 1,
                     "question": "User question",
                     "answer": "AI answer",
                     "processing_time": 1.23,
+                    "stage_times": {"embed": 0.012, "retrieve": 0.031, "generate": 1.15},
                     "source_count": 2,
                     "avg_similarity": 85.5,
                     "created_at": "2024-01-01T12:00:00Z",
@@ -190,36 +724,84 @@ def get_logs(request):
             ]
         }
     """
+    cursor = request.GET.get('cursor')
+    count_mode = request.GET.get('count', 'exact')
+    if count_mode not in LOG_COUNT_MODES:
+        return Response(
+            {'error': f'count must be one of {", ".join(LOG_COUNT_MODES)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
     try:
         # Get query parameters
         limit = min(int(request.GET.get('limit', 50)), 200)
-        offset = int(request.GET.get('offset', 0))
+        offset = 0 if cursor else int(request.GET.get('offset', 0))
+
+        logs = QueryLog.objects.order_by('-created_at', '-id')
+        if cursor:
+            try:
+                logs = after_cursor(logs, cursor)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Only the returned columns, with long answers truncated in the database
+        logs = logs.annotate(
+            answer_preview=Case(
+                When(
+                    GreaterThan(Length('answer'), LOG_ANSWER_PREVIEW),
+                    then=Concat(Substr('answer', 1, LOG_ANSWER_PREVIEW), Value('...'))
+                ),
+                default=F('answer'),
+                output_field=TextField()
+            )
+        ).values(
+            'id', 'question', 'answer_preview', 'sources', 'processing_time',
+            'embed_time', 'retrieve_time', 'generate_time',
+            'source_count', 'avg_similarity', 'created_at', 'ip_address'
+        )
 
-        # Get total count
-        total_count = QueryLog.objects.count()
+        # One extra row tells whether there is a next page
+        page = list(logs[offset:offset + limit + 1])
+        next_cursor = None
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(page[-1]['created_at'], page[-1]['id'])
 
-        # Get logs with pagination
-        logs = QueryLog.objects.all()[offset:offset + limit]
+        # Get total count
+        if count_mode == 'exact':
+            total_count = QueryLog.objects.count()
+        elif count_mode == 'approx':
+            total_count = approximate_query_count()
+            if total_count is None:
+                total_count = QueryLog.objects.count()
+        else:
+            total_count = None
 
         # Format logs
         formatted_logs = []
-        for log in logs:
+        for log in page:
             formatted_logs.append({
-                'id': log.id,
-                'question': log.question,
-                'answer': log.answer[:200] + '...' if len(log.answer) > 200 else log.answer,  # Truncate long answers
-                'sources': log.sources,
-                'processing_time': log.processing_time,
-                'source_count': log.source_count,
-                'avg_similarity': log.avg_similarity,
-                'created_at': log.created_at.isoformat(),
-                'ip_address': log.ip_address
+                'id': log['id'],
+                'question': log['question'],
+                'answer': log['answer_preview'],
+                'sources': log['sources'],
+                'processing_time': log['processing_time'],
+                'stage_times': {
+                    'embed': log['embed_time'],
+                    'retrieve': log['retrieve_time'],
+                    'generate': log['generate_time'],
+                },
+                'source_count': log['source_count'],
+                'avg_similarity': log['avg_similarity'],
+                'created_at': log['created_at'].isoformat(),
+                'ip_address': log['ip_address']
             })
 
         return Response({
             'count': total_count,
             'limit': limit,
             'offset': offset,
+            'next_cursor': next_cursor,
             'logs': formatted_logs
         })
 
@@ -0,0 +1,135 @@
+"""
+Concurrency load test: sync /api/ask/ vs async /api/ask/async/.
+
+The LLM is the 'fake' generator backend with a fixed latency (time.sleep
+for the sync path, asyncio.sleep for the async one) and retrieval is
+stubbed with a short CPU-ish delay,
+so the numbers isolate how each request path handles waiting on I/O.
+
+The sync path is limited to --workers threads, like a WSGI server with that
+many worker threads; the async path serves every request on one event loop.
+
+Usage:
+    python benchmarks/bench_async_ask.py [--requests 200] [--concurrency 50]
+        [--workers 4] [--llm-latency 0.5]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+os.environ['RAG_WARMUP_ON_STARTUP'] = 'false'
+
+import django
+django.setup()
+
+from django.db import connection
+from django.test import AsyncClient, Client
+from api import rag
+from api.generators import FakeGenerator
+
+SOURCES = [{
+    'id': '1',
+    'question': "What is the statute of limitations for filing a lawsuit?",
+    'answer': "A statute of limitations is a law that sets the maximum time...",
+    'category': "Civil Law",
+    'similarity_score': 87.5,
+}]
+RETRIEVAL_LATENCY = 0.005
+
+
+def stub_pipeline(llm_latency):
+    """Patch retrieval and generation with fixed-latency stand-ins."""
+    def retrieve(question, timer=None):
+        time.sleep(RETRIEVAL_LATENCY)
+        return [0.0] * 384, SOURCES
+
+    return [
+        mock.patch.object(rag, 'retrieve', retrieve),
+        mock.patch.object(rag, '_generator', FakeGenerator(latency_ms=llm_latency * 1000,
+                                                           tokens_per_second=0)),
+        mock.patch.object(rag, 'get_answer_cache', lambda: None),
+    ]
+
+
+def run_sync(total, workers):
+    """Issue total requests through a pool of workers threads."""
+    def one(i):
+        response = Client().post('/api/ask/', {'question': f'Question {i}?'},
+                                 content_type='application/json')
+        assert response.status_code == 200, response.content
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(one, range(total)))
+    return time.perf_counter() - start
+
+
+async def run_async(total, concurrency):
+    """Issue total requests with at most concurrency in flight."""
+    client = AsyncClient()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with limit:
+            response = await client.post('/api/ask/async/', {'question': f'Question {i}?'},
+                                         content_type='application/json')
+            assert response.status_code == 200, response.content
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test sync vs async ask endpoints.")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4, help="Sync worker threads")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="Stubbed LLM seconds")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"ASYNC LOAD TEST ({args.requests} requests, LLM {args.llm_latency}s)")
+    print("="*60 + "\n")
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    patches = stub_pipeline(args.llm_latency)
+    for patcher in patches:
+        patcher.start()
+    try:
+        sync_seconds = run_sync(args.requests, args.workers)
+        async_seconds = asyncio.run(run_async(args.requests, args.concurrency))
+    finally:
+        for patcher in patches:
+            patcher.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    results = {
+        'sync': {
+            'workers': args.workers,
+            'seconds': round(sync_seconds, 3),
+            'requests_per_second': round(args.requests / sync_seconds, 1),
+        },
+        'async': {
+            'concurrency': args.concurrency,
+            'seconds': round(async_seconds, 3),
+            'requests_per_second': round(args.requests / async_seconds, 1),
+        },
+    }
+    print(f"sync  ({args.workers} threads):     {results['sync']['requests_per_second']} req/s")
+    print(f"async ({args.concurrency} in flight):  {results['async']['requests_per_second']} req/s")
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Batch question benchmark: one process_question() call per question (what
+sequential /api/ask/ requests do) vs process_questions() for the whole set.
+
+Runs against a synthetic FAQ corpus in a throwaway test database with the
+numpy retriever over random unit vectors. Answers come from the 'fake'
+generator backend with a fixed --llm-ms delay so generation concurrency is
+measured without network variance. Embeddings come from the real model when sentence_transformers
+is installed, otherwise from a random stand-in (embedding cost not measured).
+Each path also writes its QueryLog rows: one insert per question for the
+sequential path, one bulk insert for the batch.
+
+Usage:
+    python benchmarks/bench_batch_ask.py [--size 20000] [--questions 200]
+        [--llm-ms 300] [--concurrency 4 8]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from unittest import mock
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+
+from api import rag
+from api.generators import FakeGenerator
+from api.logsink import write_query_logs
+from api.models import FAQ, QueryLog
+from api.retrievers import NumpyRetriever
+from api.views import build_query_log
+from benchmarks.bench_retrievers import random_unit_vectors
+from benchmarks.corpus import make_synthetic_faqs
+
+
+def random_embeddings(texts, batch_size=rag.EMBEDDING_BATCH_SIZE):
+    return random_unit_vectors(len(texts), seed=len(texts)).tolist()
+
+
+def run_sequential(questions):
+    start = time.perf_counter()
+    for question in questions:
+        item_start = time.perf_counter()
+        result = rag.process_question(question)
+        write_query_logs([build_query_log(None, question, result, time.perf_counter() - item_start)])
+    return time.perf_counter() - start
+
+
+def run_batch(questions):
+    start = time.perf_counter()
+    timings = {}
+    results, logs = [], []
+    for index, result in rag.process_questions(questions, timings=timings):
+        results.append(result)
+        logs.append(build_query_log(None, questions[index], result, time.perf_counter() - start))
+    write_query_logs(logs)
+    return rag.batch_report(results, time.perf_counter() - start, timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and batched question answering.")
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument('--llm-ms', type=float, default=300)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[4, 8])
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"BATCH ASK BENCHMARK ({args.questions} questions, {args.size} FAQs, LLM {args.llm_ms}ms)")
+    print("="*60 + "\n")
+
+    try:
+        import sentence_transformers  # noqa: F401
+        real_model = True
+    except ImportError:
+        real_model = False
+        print("sentence_transformers not installed; using random embeddings\n")
+
+    faqs = make_synthetic_faqs(args.size)
+    questions = [faq['question'] for faq in make_synthetic_faqs(args.questions, seed=1)]
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    workdir = tempfile.mkdtemp(prefix='bench_batch_')
+    results = {}
+    try:
+        FAQ.objects.bulk_create(
+            [FAQ(id=faq['id'], question=faq['question'], answer=faq['answer'], category=faq['category'])
+             for faq in faqs],
+            batch_size=5000
+        )
+        vectors = random_unit_vectors(args.size, seed=args.size)
+        NumpyRetriever.build(workdir, [faq['id'] for faq in faqs], vectors,
+                             [faq['category'] for faq in faqs])
+
+        patches = [
+            mock.patch.object(rag, '_retriever', NumpyRetriever(workdir)),
+            mock.patch.object(rag, '_answer_cache', None),
+            mock.patch.object(rag, '_embedding_cache', None),
+            mock.patch.object(rag, '_lexical_index', None),
+            mock.patch.object(rag, '_faq_row_cache', None),
+            mock.patch.object(rag.settings, 'RAG_ANSWER_CACHE_SIZE', 0),
+            mock.patch.object(rag.settings, 'RAG_EMBEDDING_CACHE_SIZE', 0),
+            mock.patch.object(rag, '_generator', FakeGenerator(latency_ms=args.llm_ms, tokens_per_second=0)),
+        ]
+        if real_model:
+            rag.get_engine().embedding_model.encode("warm up")
+        else:
+            patches.append(mock.patch.object(rag, 'get_embeddings', random_embeddings))
+            patches.append(mock.patch.object(
+                rag, 'get_embedding', lambda text: random_embeddings([text])[0]
+            ))
+        for patcher in patches:
+            patcher.start()
+        try:
+            rag.get_lexical_index().get()  # Built once, outside the timings
+            seconds = run_sequential(questions)
+            results['sequential'] = {
+                'seconds': round(seconds, 3),
+                'questions_per_second': round(len(questions) / seconds, 2),
+            }
+            print(f"sequential       {results['sequential']['questions_per_second']:>8} q/s  "
+                  f"{results['sequential']['seconds']}s")
+
+            for concurrency in args.concurrency:
+                QueryLog.objects.all().delete()
+                engine = rag.get_engine()
+                engine._generation_executor = None
+                with mock.patch.object(rag.settings, 'RAG_BATCH_GENERATION_CONCURRENCY', concurrency):
+                    report = run_batch(questions)
+                engine._generation_executor.shutdown()
+                engine._generation_executor = None
+                results[f'batch_concurrency_{concurrency}'] = report
+                print(f"batch x{concurrency:<3}        {report['questions_per_second']:>8} q/s  "
+                      f"{report['seconds']}s  (embed {report['embedding_seconds']}s, "
+                      f"search {report['search_seconds']}s)")
+        finally:
+            for patcher in reversed(patches):
+                patcher.stop()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
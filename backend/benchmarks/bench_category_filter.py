@@ -0,0 +1,180 @@
+"""
+Category-filtered retrieval benchmark: whole-index search vs searching the
+question's category partition, chosen explicitly or by the centroid
+classifier ('auto').
+
+Uses clustered random unit vectors (384 dimensions, like all-MiniLM-L6-v2):
+each category is a cluster around its own direction, and each query is a
+noisy copy of one indexed row, which is the hit it should find. Reports
+query latency percentiles and recall@k per mode, plus how often the
+classifier routes a query and how often it picks the right category. The
+ChromaDB `where` pre-filter is included if chromadb is installed.
+
+Usage:
+    python benchmarks/bench_category_filter.py [--rows 100000] [--categories 50]
+        [--queries 300] [--top-k 2] [--spread 3.0] [--noise 0.8] [--min-margin 0.05]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+
+from api.retrievers import ChromaRetriever, NumpyRetriever
+
+DIMENSIONS = 384
+
+
+def unit(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)).astype(np.float32)
+
+
+def clustered_corpus(rows, n_categories, spread, seed):
+    """Rows around per-category directions; spread is the noise scale relative to the direction."""
+    rng = np.random.default_rng(seed)
+    directions = unit(rng.standard_normal((n_categories, DIMENSIONS)))
+    codes = rng.integers(0, n_categories, rows)
+    noise = unit(rng.standard_normal((rows, DIMENSIONS)))
+    return unit(directions[codes] + noise * spread), codes
+
+
+def make_queries(vectors, codes, count, noise, seed):
+    """Noisy copies of random rows: (queries, target row, target category code)."""
+    rng = np.random.default_rng(seed)
+    targets = rng.integers(0, len(vectors), count)
+    perturbation = unit(rng.standard_normal((count, DIMENSIONS))) * noise
+    return unit(vectors[targets] + perturbation), targets, codes[targets]
+
+
+def run_mode(search, queries, targets, top_k):
+    """Time search(query_index) per query and measure recall of the target row."""
+    latencies, found = [], 0
+    for i in range(len(queries)):
+        start = time.perf_counter()
+        hits = search(i)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += any(hit['id'] == str(targets[i] + 1) for hit in hits)
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        f'recall@{top_k}': round(found / len(queries), 3),
+    }
+
+
+def bench_numpy(workdir, vectors, names, queries, targets, target_names, args):
+    path = os.path.join(workdir, 'numpy')
+    NumpyRetriever.build(path, list(range(1, len(vectors) + 1)), vectors, names)
+    retriever = NumpyRetriever(path)
+    retriever.search(queries[0], args.top_k)  # Load the index outside the timings
+    classifier = retriever.category_classifier()
+
+    routed = []
+
+    def auto(i):
+        category = classifier.predict(queries[i], min_margin=args.min_margin)
+        routed.append(category)
+        return retriever.search(queries[i], args.top_k, [category] if category else None)
+
+    results = {
+        'unfiltered': run_mode(lambda i: retriever.search(queries[i], args.top_k), queries, targets, args.top_k),
+        'category': run_mode(lambda i: retriever.search(queries[i], args.top_k, [target_names[i]]),
+                             queries, targets, args.top_k),
+        'auto': run_mode(auto, queries, targets, args.top_k),
+    }
+    chosen = [(category, target_names[i]) for i, category in enumerate(routed) if category is not None]
+    results['classifier'] = {
+        'routed': round(len(chosen) / len(routed), 3),
+        'accuracy_when_routed': round(sum(c == t for c, t in chosen) / len(chosen), 3) if chosen else None,
+    }
+    return results
+
+
+def bench_chroma(workdir, vectors, names, queries, targets, target_names, args):
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=os.path.join(workdir, 'chroma'),
+                                       settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(name='bench', metadata={'hnsw:space': 'cosine'})
+    batch = 5000
+    for start in range(0, len(vectors), batch):
+        collection.add(
+            ids=[str(i + 1) for i in range(start, min(start + batch, len(vectors)))],
+            embeddings=vectors[start:start + batch].tolist(),
+            metadatas=[{'category': name} for name in names[start:start + batch]]
+        )
+    retriever = ChromaRetriever(lambda: collection)
+    return {
+        'unfiltered': run_mode(lambda i: retriever.search(queries[i], args.top_k), queries, targets, args.top_k),
+        'category': run_mode(lambda i: retriever.search(queries[i], args.top_k, [target_names[i]]),
+                             queries, targets, args.top_k),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark category-filtered retrieval.")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--categories', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--top-k', type=int, default=2)
+    parser.add_argument('--spread', type=float, default=3.0,
+                        help="Within-category noise scale (higher: categories overlap more)")
+    parser.add_argument('--noise', type=float, default=0.8,
+                        help="Query noise scale relative to its target row")
+    parser.add_argument('--min-margin', type=float, default=0.05,
+                        help="Classifier margin (RAG_CATEGORY_MIN_MARGIN)")
+    args = parser.parse_args()
+
+    try:
+        import chromadb  # noqa: F401
+        backends = {'numpy': bench_numpy, 'chroma': bench_chroma}
+    except ImportError:
+        print("chromadb not installed; benchmarking the NumPy backend only")
+        backends = {'numpy': bench_numpy}
+
+    print("\n" + "="*60)
+    print("CATEGORY FILTER BENCHMARK")
+    print("="*60 + "\n")
+
+    vectors, codes = clustered_corpus(args.rows, args.categories, args.spread, seed=args.rows)
+    names = [f"Category {code}" for code in codes]
+    queries, targets, target_codes = make_queries(vectors, codes, args.queries, args.noise, seed=1)
+    target_names = [f"Category {code}" for code in target_codes]
+    print(f"{args.rows} rows, {args.categories} categories, {args.queries} queries, top_k={args.top_k}\n")
+
+    results = {}
+    for name, bench in backends.items():
+        workdir = tempfile.mkdtemp(prefix='bench_category_')
+        try:
+            results[name] = bench(workdir, vectors, names, queries, targets, target_names, args)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        for mode, r in results[name].items():
+            if mode == 'classifier':
+                print(f"{name:<7} classifier  routed {r['routed']:.1%}  "
+                      f"accuracy when routed {r['accuracy_when_routed']}")
+                continue
+            print(f"{name:<7} {mode:<11} p50 {r['p50_ms']:>8}ms  p99 {r['p99_ms']:>8}ms  "
+                  f"recall@{args.top_k} {r[f'recall@{args.top_k}']}")
+
+    numpy_results = results['numpy']
+    numpy_results['speedup_p50'] = {
+        mode: round(numpy_results['unfiltered']['p50_ms'] / numpy_results[mode]['p50_ms'], 1)
+        for mode in ('category', 'auto')
+    }
+    print(f"\nNumPy p50 speedup over unfiltered: {numpy_results['speedup_p50']}")
+    print("\n" + json.dumps({'args': vars(args), 'results': results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
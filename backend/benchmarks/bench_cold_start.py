@@ -0,0 +1,94 @@
+"""
+Cold-start benchmark for the lazy RAG engine.
+
+Each scenario runs in a fresh Python process and reports wall time and peak
+RSS. "eager" scenarios call rag.warm_up() right after import, which is what
+the old import-time loading did for every process.
+
+Usage:
+    python benchmarks/bench_cold_start.py [--runs 3]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = (
+    "import os, django; "
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings'); "
+    "django.setup(); "
+)
+
+SCENARIOS = {
+    'import api.views (lazy)': SETUP + "from api import views",
+    'import api.views (eager)': SETUP + "from api import views, rag; rag.warm_up()",
+    'manage.py check (lazy)': SETUP + (
+        "from django.core.management import call_command; "
+        "from api import views; call_command('check')"
+    ),
+    'manage.py check (eager)': SETUP + (
+        "from django.core.management import call_command; "
+        "from api import views, rag; rag.warm_up(); call_command('check')"
+    ),
+    'GET /api/health/ (lazy)': SETUP + (
+        "from django.test import Client; "
+        "assert Client().get('/api/health/').status_code == 200"
+    ),
+    'GET /api/health/ (eager)': SETUP + (
+        "from api import rag; rag.warm_up(); "
+        "from django.test import Client; "
+        "assert Client().get('/api/health/').status_code == 200"
+    ),
+}
+
+
+REPORT_RSS = (
+    "; import resource; "
+    "print('MAX_RSS_KB=%d' % resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+
+def run_scenario(code: str) -> dict:
+    """Run code in a fresh interpreter and return wall time and peak RSS."""
+    env = dict(os.environ, RAG_WARMUP_ON_STARTUP='false')
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-c', code + REPORT_RSS],
+        cwd=BACKEND_DIR, env=env, check=True,
+        capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    rss_kb = 0
+    for line in proc.stdout.splitlines():
+        if line.startswith('MAX_RSS_KB='):
+            rss_kb = int(line.split('=', 1)[1])
+    return {'seconds': elapsed, 'max_rss_mb': rss_kb / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("COLD START BENCHMARK")
+    print("="*60 + "\n")
+
+    results = {}
+    for name, code in SCENARIOS.items():
+        timings = [run_scenario(code) for _ in range(args.runs)]
+        best = min(t['seconds'] for t in timings)
+        rss = max(t['max_rss_mb'] for t in timings)
+        results[name] = {'best_seconds': round(best, 3), 'max_rss_mb': round(rss, 1)}
+        print(f"{name:<28} best of {args.runs}: {best:.3f}s, peak RSS {rss:.1f} MB")
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Embedding micro-batching benchmark at 1, 8 and 64 concurrent clients.
+
+Each client thread embeds --per-client distinct questions back to back,
+either by calling the model directly (one encode per question) or through
+EmbeddingBatcher. Reports throughput, latency percentiles and the batcher's
+batch-size and queueing-delay metrics.
+
+Usage:
+    python benchmarks/bench_embedding_batching.py [--per-client 50]
+        [--clients 1 8 64] [--max-batch-size 32] [--max-wait-ms 5]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+import django
+django.setup()
+
+from api import rag
+from api.batching import EmbeddingBatcher
+from benchmarks.corpus import make_synthetic_faqs
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(clients, questions, embed):
+    """Run clients threads over questions and return throughput/latency."""
+    per_client = len(questions) // clients
+    latencies = []
+
+    def client(index):
+        mine = questions[index * per_client:(index + 1) * per_client]
+        for question in mine:
+            start = time.perf_counter()
+            embed(question)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(client, range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        'embeddings_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding micro-batching.")
+    parser.add_argument('--per-client', type=int, default=50)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 64])
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("EMBEDDING MICRO-BATCHING BENCHMARK")
+    print("="*60 + "\n")
+
+    rag.warm_up()
+    results = {}
+    for clients in args.clients:
+        questions = [faq['question'] for faq in make_synthetic_faqs(clients * args.per_client, seed=clients)]
+        direct = run(clients, questions, rag.get_embedding)
+
+        batcher = EmbeddingBatcher(
+            rag.get_embeddings,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_wait_ms
+        )
+        batched = run(clients, questions, batcher.embed)
+        stats = batcher.stats()
+        batched.update({
+            'avg_batch_size': stats['avg_batch_size'],
+            'batch_sizes': stats['batch_sizes'],
+            'queue_delay_avg_ms': stats['queue_delay_avg_ms'],
+            'queue_delay_max_ms': stats['queue_delay_max_ms'],
+        })
+
+        results[clients] = {'direct': direct, 'batched': batched}
+        print(f"{clients:>3} clients: direct {direct['embeddings_per_second']:>8}/s "
+              f"(p99 {direct['p99_ms']}ms) | batched {batched['embeddings_per_second']:>8}/s "
+              f"(p99 {batched['p99_ms']}ms, avg batch {batched['avg_batch_size']})")
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
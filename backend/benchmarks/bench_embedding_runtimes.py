@@ -0,0 +1,160 @@
+"""
+Embedding runtime benchmark: torch vs onnx vs onnx-int8.
+
+Each runtime runs in a fresh Python process (so peak RSS is the worker's
+own) and reports model load time, single-query encode latency, batch
+throughput, peak RSS and whether PyTorch was imported. Ranking agreement
+with torch (query cosine, top-1 and top-2 match against the seed FAQs) is
+computed in the parent from the vectors each worker writes. Runtimes
+whose model or export is unavailable are reported and skipped.
+
+Usage:
+    python benchmarks/bench_embedding_runtimes.py [--queries 200]
+        [--batch-texts 512] [--runtimes torch onnx onnx-int8]
+        [--onnx-dir DIR] [--model NAME_OR_PATH]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+RUNTIMES = ('torch', 'onnx', 'onnx-int8')
+HELDOUT_PATH = os.path.join(BACKEND_DIR, 'benchmarks', 'data', 'heldout_questions.json')
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def worker(args) -> None:
+    """Measure one runtime in this process; print a RESULT= line."""
+    import resource
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+    os.environ['RAG_EMBEDDING_RUNTIME'] = 'torch' if args.worker == 'torch' else 'onnx'
+    os.environ['RAG_ONNX_QUANTIZED'] = 'true' if args.worker == 'onnx-int8' else 'false'
+    if args.onnx_dir:
+        os.environ['RAG_ONNX_MODEL_DIR'] = args.onnx_dir
+
+    import django
+    django.setup()
+
+    from api import rag
+    from benchmarks.corpus import load_seed_faqs, make_synthetic_faqs
+
+    if args.model:
+        rag.EMBEDDING_MODEL_NAME = args.model
+
+    start = time.perf_counter()
+    model = rag.get_engine().embedding_model
+    load_seconds = time.perf_counter() - start
+
+    with open(HELDOUT_PATH, encoding='utf-8') as f:
+        heldout = [item['question'] for item in json.load(f)]
+    queries = (heldout * (args.queries // len(heldout) + 1))[:args.queries]
+    model.encode(queries[:8])  # Warm up kernels and allocator
+
+    latencies = []
+    for question in queries:
+        start = time.perf_counter()
+        model.encode(question)
+        latencies.append(time.perf_counter() - start)
+
+    texts = [f"{faq['question']} {faq['answer']}" for faq in make_synthetic_faqs(args.batch_texts)]
+    start = time.perf_counter()
+    model.encode(texts, batch_size=rag.EMBEDDING_BATCH_SIZE)
+    batch_seconds = time.perf_counter() - start
+
+    # Vectors for the ranking comparison in the parent
+    corpus = [faq['question'] for faq in load_seed_faqs()]
+    np.savez(args.vectors,
+             corpus=np.asarray(model.encode(corpus, normalize_embeddings=True)),
+             queries=np.asarray(model.encode(heldout, normalize_embeddings=True)))
+
+    print("RESULT=" + json.dumps({
+        'load_seconds': round(load_seconds, 3),
+        'single_p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'single_p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'batch_texts_per_second': round(len(texts) / batch_seconds, 1),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'torch_imported': 'torch' in sys.modules,
+    }))
+
+
+def run_runtime(runtime: str, args, vectors_path: str) -> dict:
+    command = [
+        sys.executable, os.path.abspath(__file__), '--worker', runtime, '--vectors', vectors_path,
+        '--queries', str(args.queries), '--batch-texts', str(args.batch_texts),
+    ]
+    if args.onnx_dir:
+        command += ['--onnx-dir', args.onnx_dir]
+    if args.model:
+        command += ['--model', args.model]
+    proc = subprocess.run(command, cwd=BACKEND_DIR, env=dict(os.environ, RAG_WARMUP_ON_STARTUP='false'),
+                          capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith('RESULT='):
+            return json.loads(line.split('=', 1)[1])
+    error = (proc.stderr.strip().splitlines() or ['no output'])[-1]
+    return {'skipped': error}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queries', type=int, default=200, help="Single-query encodes per runtime")
+    parser.add_argument('--batch-texts', type=int, default=512, help="Texts in the throughput batch")
+    parser.add_argument('--runtimes', nargs='+', choices=RUNTIMES, default=list(RUNTIMES))
+    parser.add_argument('--onnx-dir', help="ONNX export directory (default: RAG_ONNX_MODEL_DIR)")
+    parser.add_argument('--model', help="Model name or path for the torch runtime")
+    parser.add_argument('--worker', choices=RUNTIMES, help=argparse.SUPPRESS)
+    parser.add_argument('--vectors', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args)
+        return
+
+    from api.embeddings import compare_rankings
+
+    print("\n" + "="*60)
+    print("EMBEDDING RUNTIME BENCHMARK")
+    print("="*60 + "\n")
+
+    results, vectors = {}, {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for runtime in args.runtimes:
+            path = os.path.join(tmp, f"{runtime}.npz")
+            results[runtime] = run_runtime(runtime, args, path)
+            if 'skipped' in results[runtime]:
+                print(f"{runtime:<10} skipped: {results[runtime]['skipped']}")
+                continue
+            with np.load(path) as saved:
+                vectors[runtime] = (saved['corpus'], saved['queries'])
+            r = results[runtime]
+            print(f"{runtime:<10} load {r['load_seconds']:.2f}s, single p50 {r['single_p50_ms']:.2f}ms "
+                  f"p99 {r['single_p99_ms']:.2f}ms, batch {r['batch_texts_per_second']:.0f} texts/s, "
+                  f"peak RSS {r['max_rss_mb']:.0f} MB, torch imported: {r['torch_imported']}")
+
+    if 'torch' in vectors:
+        print()
+        for runtime in vectors:
+            if runtime != 'torch':
+                results[runtime]['vs_torch'] = compare_rankings(*vectors['torch'], *vectors[runtime])
+                print(f"{runtime:<10} vs torch: {json.dumps(results[runtime]['vs_torch'])}")
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Recall-vs-latency benchmark for ChromaDB HNSW settings.
+
+Embeds a synthetic FAQ corpus (built from data/legal_faqs.json) and a set of
+held-out query phrasings, computes exact top-k neighbours with NumPy as
+ground truth, then builds a cosine collection for every (M,
+construction_ef, search_ef) combination and reports recall@k and query
+latency. Use the output to choose RAG_HNSW_* for a given corpus size.
+
+Usage:
+    python benchmarks/bench_hnsw.py [--size 20000] [--queries 200] [--top-k 2]
+        [--m 8 16 32] [--construction-ef 100 200] [--search-ef 10 50 100]
+        [--random-vectors]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import itertools
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+import django
+django.setup()
+
+import numpy as np
+
+from api import rag
+from benchmarks.corpus import make_synthetic_faqs
+
+
+def embed_corpus(size, queries, random_vectors):
+    """Return (corpus matrix, query matrix), both L2-normalized float32."""
+    if random_vectors:
+        rng = np.random.default_rng(0)
+        corpus = rng.standard_normal((size, 384), dtype=np.float32)
+        query = corpus[rng.choice(size, queries)] + 0.3 * rng.standard_normal((queries, 384), dtype=np.float32)
+    else:
+        corpus = np.asarray(rag.get_embeddings([f['question'] for f in make_synthetic_faqs(size)]),
+                            dtype=np.float32)
+        held_out = make_synthetic_faqs(queries, seed=12345)
+        query = np.asarray(rag.get_embeddings([f['question'] for f in held_out]), dtype=np.float32)
+    corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    query /= np.linalg.norm(query, axis=1, keepdims=True)
+    return corpus, query
+
+
+def exact_top_k(corpus, queries, k):
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def bench_setting(corpus, queries, truth, k, m, construction_ef, search_ef):
+    import chromadb
+    from chromadb.config import Settings
+
+    workdir = tempfile.mkdtemp(prefix='bench_hnsw_')
+    try:
+        client = chromadb.PersistentClient(path=workdir, settings=Settings(anonymized_telemetry=False))
+        collection = client.create_collection(name='bench', metadata={
+            'hnsw:space': 'cosine',
+            'hnsw:M': m,
+            'hnsw:construction_ef': construction_ef,
+            'hnsw:search_ef': search_ef,
+        })
+        start = time.perf_counter()
+        for offset in range(0, len(corpus), rag.CHROMA_UPSERT_BATCH_SIZE):
+            batch = corpus[offset:offset + rag.CHROMA_UPSERT_BATCH_SIZE]
+            collection.add(
+                ids=[str(offset + i) for i in range(len(batch))],
+                embeddings=batch.tolist()
+            )
+        build_seconds = time.perf_counter() - start
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(expected & {int(i) for i in result['ids'][0]})
+        latencies.sort()
+        return {
+            'recall': round(hits / (k * len(queries)), 4),
+            'p50_ms': round(statistics.median(latencies), 3),
+            'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+            'build_seconds': round(build_seconds, 2),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall and latency per HNSW setting.")
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=2)
+    parser.add_argument('--m', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--construction-ef', type=int, nargs='+', default=[100, 200])
+    parser.add_argument('--search-ef', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--random-vectors', action='store_true',
+                        help="Use random vectors instead of embedding the synthetic corpus")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"HNSW RECALL vs LATENCY ({args.size} vectors, top-{args.top_k})")
+    print("="*60 + "\n")
+
+    corpus, queries = embed_corpus(args.size, args.queries, args.random_vectors)
+    truth = exact_top_k(corpus, queries, args.top_k)
+
+    results = []
+    for m, construction_ef, search_ef in itertools.product(args.m, args.construction_ef, args.search_ef):
+        result = bench_setting(corpus, queries, truth, args.top_k, m, construction_ef, search_ef)
+        result.update({'M': m, 'construction_ef': construction_ef, 'search_ef': search_ef})
+        results.append(result)
+        print(f"M={m:<3} construction_ef={construction_ef:<4} search_ef={search_ef:<4} "
+              f"recall {result['recall']:.4f}  p50 {result['p50_ms']}ms  p99 {result['p99_ms']}ms")
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
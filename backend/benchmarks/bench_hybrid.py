@@ -0,0 +1,168 @@
+"""
+Hybrid retrieval benchmark: BM25 lookup latency and hit quality.
+
+Latency: builds the BM25 index over a synthetic corpus (100k FAQs by default)
+and times lexical lookups for the held-out questions, reporting build time,
+postings memory and p50/p99 per query, plus the cost of reciprocal rank
+fusion of two candidate lists.
+
+Quality: ranks the curated FAQs in data/legal_faqs.json for every question in
+benchmarks/data/heldout_questions.json (paraphrases labelled with the FAQ
+that answers them) and reports hit@1, hit@3 and MRR for BM25 alone and, when
+sentence_transformers is installed, for dense search and the RRF hybrid.
+
+Usage:
+    python benchmarks/bench_hybrid.py [--size 100000] [--queries 1000]
+        [--candidates 10] [--rrf-k 60]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+import django
+django.setup()
+
+import numpy as np
+
+from api.lexical import BM25Index, fuse_rrf
+from benchmarks.corpus import load_seed_faqs, make_synthetic_faqs
+
+HELDOUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'heldout_questions.json')
+
+
+def load_heldout():
+    with open(HELDOUT_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def to_documents(faqs):
+    return [(faq['id'], faq['category'], f"{faq['question']}\n{faq['answer']}") for faq in faqs]
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return {
+        'p50_ms': round(statistics.median(latencies), 4),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 4),
+    }
+
+
+def bench_latency(size, questions, queries, candidates):
+    start = time.perf_counter()
+    index = BM25Index.build(to_documents(make_synthetic_faqs(size)))
+    build_s = time.perf_counter() - start
+
+    lookups = []
+    fusions = []
+    for i in range(queries):
+        question = questions[i % len(questions)]
+        start = time.perf_counter()
+        hits = index.search(question, candidates)
+        lookups.append((time.perf_counter() - start) * 1000)
+
+        lexical_ids = [hit['id'] for hit in hits]
+        start = time.perf_counter()
+        fuse_rrf([lexical_ids[::-1], lexical_ids])
+        fusions.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'documents': len(index),
+        'terms': len(index.postings),
+        'postings_mb': round(index.postings_bytes() / (1024 * 1024), 2),
+        'build_s': round(build_s, 2),
+        'lookup': percentiles(lookups),
+        'fusion': percentiles(fusions),
+    }
+
+
+def score_rankings(rankings, heldout):
+    """hit@1, hit@3 and MRR of ranked id lists against the expected ids."""
+    hit1 = hit3 = reciprocal = 0.0
+    for ranking, item in zip(rankings, heldout):
+        expected = str(item['expected_id'])
+        if expected in ranking:
+            rank = ranking.index(expected) + 1
+            hit1 += rank == 1
+            hit3 += rank <= 3
+            reciprocal += 1 / rank
+    n = len(heldout)
+    return {'hit@1': round(hit1 / n, 3), 'hit@3': round(hit3 / n, 3), 'mrr': round(reciprocal / n, 3)}
+
+
+def dense_rankings(faqs, questions, candidates):
+    """Rank faqs for each question by cosine similarity, or None without a model."""
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        return None
+    from api.rag import EMBEDDING_MODEL_NAME
+
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    corpus = model.encode([faq['question'] for faq in faqs], normalize_embeddings=True)
+    queries = model.encode(questions, normalize_embeddings=True)
+    ids = [str(faq['id']) for faq in faqs]
+    return [
+        [ids[row] for row in np.argsort(-(corpus @ query))[:candidates]]
+        for query in queries
+    ]
+
+
+def bench_quality(heldout, candidates, rrf_k):
+    faqs = load_seed_faqs()
+    index = BM25Index.build(to_documents(faqs))
+    questions = [item['question'] for item in heldout]
+
+    lexical = [[hit['id'] for hit in index.search(q, candidates)] for q in questions]
+    results = {'questions': len(heldout), 'bm25': score_rankings(lexical, heldout)}
+
+    dense = dense_rankings(faqs, questions, candidates)
+    if dense is None:
+        print("sentence_transformers not installed; reporting BM25 quality only")
+        return results
+
+    hybrid = [
+        [doc_id for doc_id, _ in fuse_rrf([d, l], k=rrf_k)]
+        for d, l in zip(dense, lexical)
+    ]
+    results['dense'] = score_rankings(dense, heldout)
+    results['hybrid'] = score_rankings(hybrid, heldout)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM25 latency and hybrid hit quality.")
+    parser.add_argument('--size', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--candidates', type=int, default=10, help="Candidates per ranking before fusion")
+    parser.add_argument('--rrf-k', type=int, default=60)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("HYBRID RETRIEVAL BENCHMARK")
+    print("="*60 + "\n")
+
+    heldout = load_heldout()
+    latency = bench_latency(args.size, [item['question'] for item in heldout], args.queries, args.candidates)
+    print(f"BM25 over {latency['documents']} FAQs: {latency['terms']} terms, "
+          f"{latency['postings_mb']}MB postings, built in {latency['build_s']}s")
+    print(f"  lookup p50 {latency['lookup']['p50_ms']}ms  p99 {latency['lookup']['p99_ms']}ms")
+
+    quality = bench_quality(heldout, args.candidates, args.rrf_k)
+    for name in ('bm25', 'dense', 'hybrid'):
+        if name in quality:
+            q = quality[name]
+            print(f"  {name:<7} hit@1 {q['hit@1']}  hit@3 {q['hit@3']}  MRR {q['mrr']}")
+
+    print("\n" + json.dumps({'latency': latency, 'quality': quality}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
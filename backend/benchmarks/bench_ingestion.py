@@ -0,0 +1,84 @@
+"""
+Ingestion benchmark: original per-row loop vs chunked bulk loader.
+
+Runs against a throwaway test database and ChromaDB directory, so the
+development db.sqlite3 and ./chroma_db are left untouched.
+
+Usage:
+    python benchmarks/bench_ingestion.py [--size 2000] [--chunk-size 1000]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'data'))
+
+CHROMA_DIR = tempfile.mkdtemp(prefix='bench_chroma_')
+os.environ['CHROMA_PATH'] = CHROMA_DIR
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+import load_faqs as loader
+from api import rag
+from api.models import FAQ
+from benchmarks.corpus import make_synthetic_faqs, write_corpus
+
+
+def timed_load(label, load):
+    """Reset both stores, run load() quietly and return rows/s."""
+    FAQ.objects.all().delete()
+    rag.clear_collection()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        loaded = load()
+    elapsed = time.perf_counter() - start
+    rate = loaded / elapsed if elapsed else 0
+    print(f"{label:<10} {loaded} rows in {elapsed:.2f}s -> {rate:.0f} rows/s")
+    return {'rows': loaded, 'seconds': round(elapsed, 3), 'rows_per_second': round(rate, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and bulk FAQ ingestion.")
+    parser.add_argument('--size', type=int, default=2000)
+    parser.add_argument('--chunk-size', type=int, default=loader.DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"INGESTION BENCHMARK ({args.size} FAQs)")
+    print("="*60 + "\n")
+
+    corpus_path = write_corpus(
+        make_synthetic_faqs(args.size),
+        os.path.join(CHROMA_DIR, 'corpus.json')
+    )
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        rag.warm_up()
+        results = {
+            'legacy': timed_load('legacy', lambda: loader.load_one_by_one(
+                loader.iter_faqs(corpus_path))),
+            'bulk': timed_load('bulk', lambda: loader.load_in_chunks(
+                loader.iter_faqs(corpus_path), chunk_size=args.chunk_size)),
+        }
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    speedup = results['bulk']['rows_per_second'] / max(results['legacy']['rows_per_second'], 1e-9)
+    print(f"\nSpeedup: {speedup:.1f}x")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+LLM gateway benchmark against the local fake LLM server.
+
+Fires a burst of concurrent chat completions at a fake server that enforces
+a requests-per-minute limit and fails a fraction of requests with 503,
+first with direct client calls (what rag.request_answer used to do) and
+then through LLMGateway configured with the same limit. Reports failures
+surfaced to callers, caller latency and the gateway's metrics.
+
+Uses the groq SDK when installed (as in production), otherwise the fake
+server's minimal client.
+
+Usage:
+    python benchmarks/bench_llm_gateway.py [--requests 180] [--rpm 120]
+        [--error-rate 0.05] [--latency-ms 200] [--callers 32] [--concurrency 8]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from api.llm import LLMGateway
+from benchmarks.fake_llm_server import FakeServerClient, start_fake_llm_server
+
+MESSAGES = [
+    {'role': 'system', 'content': "You are a helpful legal assistant."},
+    {'role': 'user', 'content': "Context: ... " * 200 + "\nUser Question: Can I break my lease?"},
+]
+MODEL = 'llama-3.3-70b-versatile'
+
+
+def make_client(base_url):
+    try:
+        from groq import Groq
+    except ImportError:
+        print("groq not installed; using the fake server's minimal client\n")
+        return FakeServerClient(base_url)
+    return Groq(api_key='fake', base_url=base_url, max_retries=0)
+
+
+def run(label, call, requests, callers):
+    latencies, failures = [], []
+
+    def one(_):
+        start = time.perf_counter()
+        try:
+            call()
+        except Exception as e:
+            failures.append(type(e).__name__)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    result = {
+        'failed': len(failures),
+        'failure_types': {name: failures.count(name) for name in set(failures)},
+        'seconds': round(elapsed, 2),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 1),
+    }
+    print(f"{label:<8} failed {result['failed']:>4}/{requests}  p50 {result['p50_ms']:>8}ms  "
+          f"p99 {result['p99_ms']:>8}ms  {result['seconds']}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the LLM gateway against a fake LLM server.")
+    parser.add_argument('--requests', type=int, default=180)
+    parser.add_argument('--rpm', type=int, default=120)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--latency-ms', type=float, default=200)
+    parser.add_argument('--callers', type=int, default=32)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"LLM GATEWAY BENCHMARK ({args.requests} requests, server limit {args.rpm} rpm, "
+          f"{args.error_rate:.0%} errors)")
+    print("="*60 + "\n")
+
+    results = {}
+    options = dict(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 4,
+                   error_rate=args.error_rate, rpm=args.rpm, seed=0)
+
+    server, base_url = start_fake_llm_server(**options)
+    client = make_client(base_url)
+    results['direct'] = run('direct', lambda: client.chat.completions.create(
+        messages=MESSAGES, model=MODEL, max_tokens=500, timeout=20
+    ), args.requests, args.callers)
+    results['direct']['server'] = dict(server.counts)
+    server.shutdown()
+
+    server, base_url = start_fake_llm_server(**options)
+    client = make_client(base_url)
+    gateway = LLMGateway(lambda: client, max_concurrency=args.concurrency,
+                         requests_per_minute=args.rpm, max_retries=3,
+                         backoff_base=0.2, timeout=20, deadline=120)
+    results['gateway'] = run('gateway', lambda: gateway.complete(
+        MESSAGES, model=MODEL, max_tokens=500
+    ), args.requests, args.callers)
+    results['gateway']['server'] = dict(server.counts)
+    results['gateway']['metrics'] = gateway.stats()
+    server.shutdown()
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+/api/logs/ pagination benchmark: OFFSET pages vs keyset (cursor) pages.
+
+Fills a throwaway file-backed SQLite test database with QueryLog rows
+(1M by default, with realistic answer lengths), then times fetching one
+page through the view at increasing depths, once with ?offset= and once
+with the cursor of the row just before that depth, and the cost of each
+count mode.
+
+Usage:
+    python benchmarks/bench_logs_pagination.py [--rows 1000000] [--limit 50] [--repeat 10]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+import django
+django.setup()
+
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from api import views
+from api.models import QueryLog
+from api.pagination import encode_cursor
+from api.rollups import backfill_rollups
+from benchmarks.bench_stats import fill_logs
+
+ANSWER = "Under the applicable statute the claimant must first serve notice. " * 15
+
+
+def time_page(factory, params, repeat):
+    latencies = []
+    for _ in range(repeat):
+        request = factory.get('/api/logs/', params)
+        start = time.perf_counter()
+        response = views.get_logs(request)
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.data
+    return {'p50_ms': round(statistics.median(latencies), 3), 'max_ms': round(max(latencies), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare offset and cursor pagination of /api/logs/.")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"LOGS PAGINATION BENCHMARK ({args.rows} query logs, {args.limit} per page)")
+    print("="*60 + "\n")
+
+    old_name = connection.settings_dict['NAME']
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(prefix='bench_pages_'), 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0)
+    factory = APIRequestFactory()
+    results = {}
+    try:
+        start = time.perf_counter()
+        fill_logs(args.rows, days=30, answer=ANSWER)
+        backfill_rollups()
+        print(f"Inserted {args.rows} rows in {time.perf_counter() - start:.1f}s\n")
+
+        depths = sorted({0, 1000, args.rows // 10, args.rows - args.limit})
+        ordered = QueryLog.objects.order_by('-created_at', '-id').values_list('created_at', 'id')
+        for depth in depths:
+            base = {'limit': args.limit, 'count': 'none'}
+            offset = time_page(factory, {**base, 'offset': depth}, args.repeat)
+            cursor_params = dict(base)
+            if depth:
+                cursor_params['cursor'] = encode_cursor(*ordered[depth - 1])
+            cursor = time_page(factory, cursor_params, args.repeat)
+            results[f'depth_{depth}'] = {'offset': offset, 'cursor': cursor}
+            print(f"depth {depth:>9}  offset p50 {offset['p50_ms']:>9}ms  cursor p50 {cursor['p50_ms']:>9}ms")
+
+        print()
+        for mode in ('exact', 'approx', 'none'):
+            results[f'count_{mode}'] = time_page(factory, {'limit': args.limit, 'count': mode}, args.repeat)
+            print(f"count={mode:<6} first page p50 {results[f'count_{mode}']['p50_ms']:>9}ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Vector store payload benchmark: question/answer text in Chroma metadata vs
+category-only metadata with sources hydrated from the FAQ table.
+
+Builds two ChromaDB collections over the same synthetic corpus (random unit
+vectors, so no model is needed) - one storing the full question/answer
+payload like older versions did, one storing only the category - and
+reports on-disk size, resident memory after querying, and end-to-end
+retrieval latency. The hydrated path includes rag.fetch_faq_rows() against
+a throwaway test database, with the row cache both cold and warm.
+
+Usage:
+    python benchmarks/bench_payloads.py [--size 50000] [--queries 200] [--top-k 2]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+from unittest import mock
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+import django
+django.setup()
+
+import numpy as np
+from django.db import connection
+
+from api import rag
+from api.cache import FAQRowCache
+from api.models import FAQ
+from benchmarks.bench_retrievers import current_rss_mb, directory_size_mb, random_unit_vectors
+from benchmarks.corpus import make_synthetic_faqs
+
+CHROMA_BATCH = 5000
+
+
+def build_collection(path, faqs, vectors, with_payloads):
+    import chromadb
+    from chromadb.config import Settings
+
+    client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(name='bench', metadata={'hnsw:space': 'cosine'})
+    for start in range(0, len(faqs), CHROMA_BATCH):
+        chunk = faqs[start:start + CHROMA_BATCH]
+        rows = {
+            'ids': [str(faq['id']) for faq in chunk],
+            'embeddings': vectors[start:start + CHROMA_BATCH].tolist(),
+        }
+        if with_payloads:
+            rows['documents'] = [faq['question'] for faq in chunk]
+            rows['metadatas'] = [
+                {'question': faq['question'], 'answer': faq['answer'], 'category': faq['category']}
+                for faq in chunk
+            ]
+        else:
+            rows['metadatas'] = [rag.vector_metadata(faq['category']) for faq in chunk]
+        collection.add(**rows)
+    return collection
+
+
+def time_calls(call, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        call(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+    }
+
+
+def bench_payload_collection(workdir, faqs, vectors, queries, top_k):
+    path = os.path.join(workdir, 'payloads')
+    collection = build_collection(path, faqs, vectors, with_payloads=True)
+    rss_before = current_rss_mb()
+
+    def search(query):
+        results = collection.query(query_embeddings=[query.tolist()], n_results=top_k,
+                                   include=['distances', 'metadatas', 'documents'])
+        return [(metadata['question'], metadata['answer']) for metadata in results['metadatas'][0]]
+
+    result = {'latency': time_calls(search, queries)}
+    result['rss_added_mb'] = round(current_rss_mb() - rss_before, 1)
+    result['disk_mb'] = round(directory_size_mb(path), 1)
+    return result
+
+
+def bench_hydrated_collection(workdir, faqs, vectors, queries, top_k):
+    path = os.path.join(workdir, 'hydrated')
+    collection = build_collection(path, faqs, vectors, with_payloads=False)
+    rss_before = current_rss_mb()
+
+    def search(query):
+        results = collection.query(query_embeddings=[query.tolist()], n_results=top_k,
+                                   include=['distances', 'metadatas'])
+        return rag.fetch_faq_rows([int(faq_id) for faq_id in results['ids'][0]])
+
+    result = {'latency_cold': bench_hydration_only(search, queries, cache_size=0)}
+    result['latency_warm'] = bench_hydration_only(search, queries, cache_size=len(queries) * top_k)
+    result['rss_added_mb'] = round(current_rss_mb() - rss_before, 1)
+    result['disk_mb'] = round(directory_size_mb(path), 1)
+    return result
+
+
+def bench_hydration_only(search, queries, cache_size):
+    """Time search() with a row cache of cache_size (0 = every lookup hits the database)."""
+    cache = FAQRowCache(max_size=cache_size, ttl=0) if cache_size else None
+    with mock.patch.object(rag, '_faq_row_cache', cache), \
+            mock.patch.object(rag.settings, 'RAG_FAQ_ROW_CACHE_SIZE', cache_size):
+        if cache is not None:
+            for query in queries:  # Fill the cache
+                search(query)
+        return time_calls(search, queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare payload-in-metadata and hydrated retrieval.")
+    parser.add_argument('--size', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=2)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"PAYLOAD BENCHMARK ({args.size} FAQs)")
+    print("="*60 + "\n")
+
+    faqs = make_synthetic_faqs(args.size)
+    vectors = random_unit_vectors(args.size, seed=args.size)
+    queries = random_unit_vectors(args.queries, seed=1)
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    workdir = tempfile.mkdtemp(prefix='bench_payloads_')
+    results = {}
+    try:
+        FAQ.objects.bulk_create(
+            [FAQ(id=faq['id'], question=faq['question'], answer=faq['answer'], category=faq['category'])
+             for faq in faqs],
+            batch_size=5000
+        )
+
+        # Database-only hydration cost, measurable without chromadb
+        sample_ids = np.random.default_rng(0).integers(1, args.size + 1, size=(args.queries, args.top_k))
+        results['hydration_only'] = {
+            'cold': bench_hydration_only(lambda ids: rag.fetch_faq_rows(ids.tolist()), sample_ids, 0),
+            'warm': bench_hydration_only(lambda ids: rag.fetch_faq_rows(ids.tolist()), sample_ids,
+                                         args.queries * args.top_k),
+        }
+        print(f"hydration only: cold p50 {results['hydration_only']['cold']['p50_ms']}ms  "
+              f"warm p50 {results['hydration_only']['warm']['p50_ms']}ms")
+
+        try:
+            import chromadb  # noqa: F401
+        except ImportError:
+            print("chromadb not installed; skipping the collection size/latency comparison")
+        else:
+            results['payloads'] = bench_payload_collection(workdir, faqs, vectors, queries, args.top_k)
+            results['hydrated'] = bench_hydrated_collection(workdir, faqs, vectors, queries, args.top_k)
+            for name in ('payloads', 'hydrated'):
+                r = results[name]
+                latency = r.get('latency') or r['latency_cold']
+                print(f"{name:<9} disk {r['disk_mb']}MB  RSS +{r['rss_added_mb']}MB  "
+                      f"p50 {latency['p50_ms']}ms  p99 {latency['p99_ms']}ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Per-worker memory of pre-fork serving vs workers that load their own copies.
+
+Each mode runs in a fresh driver process that forks --workers children,
+like a gunicorn master:
+
+    preload     the driver calls rag.prepare_for_fork() (what wsgi.py does
+                under gunicorn.conf.py) and each worker calls
+                rag.reset_after_fork()
+    per-worker  the driver imports nothing from the RAG engine; each worker
+                loads the model and maps the index itself (gunicorn without
+                --preload)
+
+Every worker embeds and searches the held-out questions against a numpy
+index of --index-rows random vectors, then all workers report their memory
+at the same moment (PSS is only meaningful while siblings are alive).
+USS is what one more worker costs; the summed PSS of the driver and its
+workers is the node memory the whole server uses.
+
+Usage:
+    python benchmarks/bench_prefork.py [--workers 4] [--index-rows 100000]
+        [--dimensions 384] [--runtime torch|onnx|onnx-int8]
+        [--model NAME_OR_PATH] [--onnx-dir DIR]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+import traceback
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+MODES = ('preload', 'per-worker')
+HELDOUT_PATH = os.path.join(BACKEND_DIR, 'benchmarks', 'data', 'heldout_questions.json')
+
+
+def build_index(path: str, rows: int, dimensions: int) -> None:
+    from api.retrievers import NumpyRetriever
+
+    rng = np.random.default_rng(0)
+    NumpyRetriever.build(path, list(range(1, rows + 1)),
+                         rng.standard_normal((rows, dimensions), dtype=np.float32),
+                         [f"category-{i % 8}" for i in range(rows)])
+
+
+def serve(args, go_read: int, report_write: int, exit_read: int) -> None:
+    """One worker: get ready, wait for the barrier, report memory, wait to exit."""
+    start = time.perf_counter()
+    from api import rag
+    from api.metrics import process_memory
+
+    if args.model:
+        rag.EMBEDDING_MODEL_NAME = args.model
+    if args.driver == 'preload':
+        rag.reset_after_fork()
+    model = rag.get_engine().embedding_model
+    retriever = rag.get_retriever()
+    with open(HELDOUT_PATH, encoding='utf-8') as f:
+        questions = [item['question'] for item in json.load(f)]
+    for question in questions:
+        retriever.search(model.encode(question, normalize_embeddings=True), 2)
+    ready = time.perf_counter() - start
+
+    os.read(go_read, 1)  # Every worker is ready
+    report = {'ready_seconds': ready, **process_memory()}
+    os.write(report_write, (json.dumps(report) + '\n').encode())
+    os.read(exit_read, 1)  # EOF once the driver has every report
+
+
+def driver(args) -> None:
+    """Fork the workers of one mode and print their memory as a RESULT= line."""
+    import django
+    django.setup()
+
+    from api.metrics import process_memory
+
+    if args.driver == 'preload':
+        from api import rag
+
+        if args.model:
+            rag.EMBEDDING_MODEL_NAME = args.model
+        rag.prepare_for_fork()
+
+    go_read, go_write = os.pipe()
+    report_read, report_write = os.pipe()
+    exit_read, exit_write = os.pipe()
+    pids = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(go_write)
+            os.close(report_read)
+            os.close(exit_write)
+            code = 0
+            try:
+                serve(args, go_read, report_write, exit_read)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            os._exit(code)
+        pids.append(pid)
+    os.close(go_read)
+    os.close(report_write)
+    os.close(exit_read)
+
+    os.write(go_write, b'x' * args.workers)
+    with os.fdopen(report_read) as reports:
+        lines = [reports.readline() for _ in pids]
+    if not all(lines):
+        raise RuntimeError("A worker failed before reporting (traceback above)")
+    workers = [json.loads(line) for line in lines]
+    master = process_memory()
+    os.close(go_write)
+    os.close(exit_write)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+    mb = 1024 * 1024
+    result = {
+        'workers': len(workers),
+        'worker_ready_seconds': round(statistics.mean(w['ready_seconds'] for w in workers), 3),
+        'master_pss_mb': round(master.get('pss', master['max_rss']) / mb, 1),
+    }
+    for kind in ('rss', 'pss', 'uss'):
+        if kind in workers[0]:
+            result[f'worker_{kind}_mb'] = round(statistics.mean(w[kind] for w in workers) / mb, 1)
+    if 'pss' in workers[0]:
+        result['total_pss_mb'] = round((master['pss'] + sum(w['pss'] for w in workers)) / mb, 1)
+    print("RESULT=" + json.dumps(result))
+
+
+def run_mode(mode: str, args, index_path: str) -> dict:
+    runtime = args.runtime
+    env = dict(
+        os.environ,
+        RAG_WARMUP_ON_STARTUP='false',
+        RAG_RETRIEVER='numpy',
+        RAG_NUMPY_INDEX_PATH=index_path,
+        RAG_HYBRID_SEARCH='false',
+        RAG_EMBEDDING_RUNTIME='torch' if runtime == 'torch' else 'onnx',
+        RAG_ONNX_QUANTIZED='true' if runtime == 'onnx-int8' else 'false',
+        RAG_ONNX_THREADS='1',
+        TOKENIZERS_PARALLELISM='false',
+    )
+    if args.onnx_dir:
+        env['RAG_ONNX_MODEL_DIR'] = args.onnx_dir
+    command = [sys.executable, os.path.abspath(__file__), '--driver', mode,
+               '--workers', str(args.workers), '--runtime', runtime]
+    if args.model:
+        command += ['--model', args.model]
+    proc = subprocess.run(command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith('RESULT='):
+            return json.loads(line.split('=', 1)[1])
+    error = (proc.stderr.strip().splitlines() or ['no output'])[-1]
+    return {'skipped': error}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--index-rows', type=int, default=100000, help="Vectors in the numpy index")
+    parser.add_argument('--dimensions', type=int, default=384, help="Embedding model dimensions")
+    parser.add_argument('--runtime', choices=('torch', 'onnx', 'onnx-int8'), default='torch')
+    parser.add_argument('--model', help="Model name or path for the torch runtime")
+    parser.add_argument('--onnx-dir', help="ONNX export directory (default: RAG_ONNX_MODEL_DIR)")
+    parser.add_argument('--driver', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.driver:
+        driver(args)
+        return
+
+    import django
+    django.setup()
+
+    print("\n" + "="*60)
+    print(f"PRE-FORK MEMORY BENCHMARK ({args.workers} workers, {args.runtime}, "
+          f"{args.index_rows:,} x {args.dimensions} index)")
+    print("="*60 + "\n")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        build_index(tmp, args.index_rows, args.dimensions)
+        for mode in MODES:
+            results[mode] = r = run_mode(mode, args, tmp)
+            if 'skipped' in r:
+                print(f"{mode:<11} skipped: {r['skipped']}")
+                continue
+            print(f"{mode:<11} per worker: USS {r.get('worker_uss_mb', '-')} MB, "
+                  f"PSS {r.get('worker_pss_mb', '-')} MB, RSS {r.get('worker_rss_mb', '-')} MB, "
+                  f"ready in {r['worker_ready_seconds']:.2f}s; "
+                  f"total PSS {r.get('total_pss_mb', '-')} MB")
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
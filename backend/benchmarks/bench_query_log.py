@@ -0,0 +1,105 @@
+"""
+QueryLog write benchmark: inline save() on the request path vs the
+background QueryLogSink.
+
+Concurrent threads each "serve" requests that only log a QueryLog row, so
+the measured per-request time is exactly what logging adds to request
+latency. Runs against a throwaway file-backed SQLite test database so lock
+contention matches a real deployment.
+
+Usage:
+    python benchmarks/bench_query_log.py [--threads 8] [--requests 2000]
+        [--batch-size 200] [--flush-ms 500]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+import django
+django.setup()
+
+from django.db import connection, connections
+
+from api.logsink import QueryLogSink
+from api.models import QueryLog
+
+SOURCES = [{'id': '1', 'category': 'Civil Law', 'similarity_score': 81.5}]
+
+
+def make_log(n):
+    return QueryLog(
+        question=f"Benchmark question {n}?", answer="Benchmark answer. " * 20,
+        sources=SOURCES, processing_time=1.0, source_count=1, avg_similarity=81.5
+    )
+
+
+def run(label, record, threads, requests, drain=None):
+    QueryLog.objects.all().delete()
+    latencies = []
+
+    def serve(n):
+        start = time.perf_counter()
+        record(make_log(n))
+        latencies.append((time.perf_counter() - start) * 1000)
+        connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(serve, range(requests)))
+    served = time.perf_counter() - start
+    if drain is not None:
+        drain()
+    total = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+        'requests_per_second': round(requests / served, 1),
+        'seconds_until_persisted': round(total, 3),
+        'rows': QueryLog.objects.count(),
+    }
+    print(f"{label:<7} p50 {result['p50_ms']:>8}ms  p99 {result['p99_ms']:>8}ms  "
+          f"{result['requests_per_second']:>9} req/s  rows {result['rows']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inline and background QueryLog writes.")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=200)
+    parser.add_argument('--flush-ms', type=float, default=500)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"QUERY LOG BENCHMARK ({args.requests} requests, {args.threads} threads)")
+    print("="*60 + "\n")
+
+    old_name = connection.settings_dict['NAME']
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(prefix='bench_logs_'), 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        results = {'inline': run('inline', lambda log: log.save(), args.threads, args.requests)}
+        sink = QueryLogSink(max_queue=args.requests, batch_size=args.batch_size,
+                            flush_interval_ms=args.flush_ms)
+        results['sink'] = run('sink', sink.submit, args.threads, args.requests, drain=sink.flush)
+        results['sink']['stats'] = sink.stats()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Retrieval backend benchmark: NumPy exact search vs ChromaDB.
+
+Uses random unit vectors (384 dimensions, like all-MiniLM-L6-v2) so no model
+is needed. For each corpus size it reports query latency percentiles,
+resident memory added by the index and on-disk size. The ChromaDB backend is
+skipped if chromadb isn't installed.
+
+Usage:
+    python benchmarks/bench_retrievers.py [--sizes 10000 100000 500000]
+        [--queries 200] [--top-k 2] [--categories 20]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+
+from api.retrievers import ChromaRetriever, NumpyRetriever
+
+DIMENSIONS = 384
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux)."""
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def directory_size_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def random_unit_vectors(count, seed):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, DIMENSIONS), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def time_queries(retriever, queries, top_k, categories=None):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        retriever.search(query, top_k, categories=categories)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3),
+    }
+
+
+def bench_numpy(workdir, vectors, ids, categories, queries, top_k):
+    path = os.path.join(workdir, 'numpy')
+    NumpyRetriever.build(path, ids, vectors, categories)
+    rss_before = current_rss_mb()
+    retriever = NumpyRetriever(path)
+    result = time_queries(retriever, queries, top_k)
+    result['filtered'] = time_queries(retriever, queries, top_k, categories=[categories[0]])
+    result['rss_added_mb'] = round(current_rss_mb() - rss_before, 1)
+    result['disk_mb'] = round(directory_size_mb(path), 1)
+    return result
+
+
+def bench_chroma(workdir, vectors, ids, categories, queries, top_k):
+    import chromadb
+    from chromadb.config import Settings
+
+    path = os.path.join(workdir, 'chroma')
+    client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+    collection = client.create_collection(name='bench')
+    batch = 5000
+    for start in range(0, len(ids), batch):
+        collection.add(
+            ids=[str(i) for i in ids[start:start + batch]],
+            embeddings=vectors[start:start + batch].tolist(),
+            metadatas=[{'category': c} for c in categories[start:start + batch]]
+        )
+
+    rss_before = current_rss_mb()
+    retriever = ChromaRetriever(lambda: collection)
+    result = time_queries(retriever, queries, top_k)
+    result['filtered'] = time_queries(retriever, queries, top_k, categories=[categories[0]])
+    result['rss_added_mb'] = round(current_rss_mb() - rss_before, 1)
+    result['disk_mb'] = round(directory_size_mb(path), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare NumPy and ChromaDB retrieval.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=2)
+    parser.add_argument('--categories', type=int, default=20)
+    args = parser.parse_args()
+
+    try:
+        import chromadb  # noqa: F401
+        backends = {'numpy': bench_numpy, 'chroma': bench_chroma}
+    except ImportError:
+        print("chromadb not installed; benchmarking the NumPy backend only")
+        backends = {'numpy': bench_numpy}
+
+    print("\n" + "="*60)
+    print("RETRIEVER BENCHMARK")
+    print("="*60 + "\n")
+
+    results = {}
+    queries = random_unit_vectors(args.queries, seed=1)
+    for size in args.sizes:
+        vectors = random_unit_vectors(size, seed=size)
+        ids = list(range(1, size + 1))
+        categories = [f"Category {i % args.categories}" for i in range(size)]
+        results[size] = {}
+        for name, bench in backends.items():
+            workdir = tempfile.mkdtemp(prefix='bench_retriever_')
+            try:
+                results[size][name] = bench(workdir, vectors, ids, categories, queries, args.top_k)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+            r = results[size][name]
+            print(f"{size:>7} vectors {name:<7} p50 {r['p50_ms']:>8}ms  p99 {r['p99_ms']:>8}ms  "
+                  f"RSS +{r['rss_added_mb']}MB  disk {r['disk_mb']}MB")
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+/api/stats/ benchmark: full-table QueryLog aggregates vs rollup reads.
+
+Fills a throwaway file-backed SQLite test database with QueryLog rows
+(1M by default, spread over the last 30 days), backfills the rollups, then
+times the original statistics queries (count plus Avg over QueryLog)
+against read_window() for several windows.
+
+Usage:
+    python benchmarks/bench_stats.py [--rows 1000000] [--days 30] [--repeat 20]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+
+import django
+django.setup()
+
+from django.db import connection, transaction
+from django.db.models import Avg
+from django.utils import timezone
+
+from api.models import QueryLog
+from api.rollups import backfill_rollups, parse_window, read_window
+
+INSERT_BATCH = 50000
+
+
+def fill_logs(rows, days, seed=0, answer="Benchmark answer."):
+    """Insert rows QueryLog rows with raw SQL (bulk_create would overwrite created_at)."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    span = days * 86400
+    sql = (
+        f"INSERT INTO {QueryLog._meta.db_table} "
+        "(question, answer, sources, processing_time, source_count, avg_similarity, "
+        "cache_hit, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)"
+    )
+    for start in range(0, rows, INSERT_BATCH):
+        batch = []
+        for _ in range(min(INSERT_BATCH, rows - start)):
+            created = now - timedelta(seconds=rng.random() * span)
+            batch.append((
+                "Benchmark question?", answer, '[]',
+                round(rng.lognormvariate(0, 0.6), 3), 2, round(rng.uniform(40, 95), 2),
+                rng.random() < 0.2, connection.ops.adapt_datetimefield_value(created),
+            ))
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+
+
+def time_call(call, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {'p50_ms': round(statistics.median(latencies), 3), 'max_ms': round(max(latencies), 3)}
+
+
+def legacy_stats():
+    QueryLog.objects.count()
+    QueryLog.objects.aggregate(
+        avg_processing_time=Avg('processing_time'),
+        avg_similarity=Avg('avg_similarity')
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full-table stats with rollup reads.")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f"STATS BENCHMARK ({args.rows} query logs over {args.days} days)")
+    print("="*60 + "\n")
+
+    old_name = connection.settings_dict['NAME']
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(prefix='bench_stats_'), 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=0)
+    results = {}
+    try:
+        start = time.perf_counter()
+        fill_logs(args.rows, args.days)
+        print(f"Inserted {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        rollup_rows = backfill_rollups()
+        results['backfill'] = {'rollup_rows': rollup_rows, 'seconds': round(time.perf_counter() - start, 2)}
+        print(f"Backfilled {rollup_rows} rollup rows in {results['backfill']['seconds']}s\n")
+
+        results['legacy_full_scan'] = time_call(legacy_stats, max(1, args.repeat // 4))
+        print(f"legacy (count + Avg)  p50 {results['legacy_full_scan']['p50_ms']:>10}ms")
+        for window in ('all', '15m', '1h', '24h', '7d', '30d'):
+            delta = parse_window(window)
+            results[f'rollup_{window}'] = time_call(lambda: read_window(delta), args.repeat)
+            print(f"rollups window={window:<5}  p50 {results[f'rollup_{window}']['p50_ms']:>10}ms")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    print("\n" + json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
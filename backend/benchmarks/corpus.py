@@ -0,0 +1,70 @@
+"""
+Synthetic legal FAQ corpora for benchmarks.
+
+Rows are variations of the curated FAQs in data/legal_faqs.json, so text
+lengths and vocabulary stay realistic at any corpus size.
+"""
+
+import os
+import json
+import random
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_FAQS_PATH = os.path.join(BACKEND_DIR, 'data', 'legal_faqs.json')
+
+JURISDICTIONS = [
+    'California', 'Texas', 'New York', 'Florida', 'Illinois', 'Ohio',
+    'Georgia', 'Washington', 'Arizona', 'Colorado', 'federal court',
+]
+FRAMINGS = [
+    '{q}',
+    'In {j}, {q_lower}',
+    '{q} (applies in {j})',
+    'My client asks: {q_lower}',
+    'Quick question - {q_lower}',
+]
+
+
+def load_seed_faqs() -> List[Dict]:
+    """Return the curated FAQs shipped with the repo."""
+    with open(SEED_FAQS_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def make_synthetic_faqs(size: int, seed: int = 0) -> List[Dict]:
+    """
+    Build a deterministic corpus of size FAQs.
+
+    Args:
+        size: Number of FAQs to generate
+        seed: Random seed, so the same size always yields the same corpus
+
+    Returns:
+        List of FAQ dicts with id, question, answer and category
+    """
+    rng = random.Random(seed)
+    seeds = load_seed_faqs()
+    faqs = []
+    for i in range(size):
+        base = seeds[i % len(seeds)]
+        jurisdiction = rng.choice(JURISDICTIONS)
+        question = rng.choice(FRAMINGS).format(
+            q=base['question'],
+            q_lower=base['question'][0].lower() + base['question'][1:],
+            j=jurisdiction
+        )
+        faqs.append({
+            'id': i + 1,
+            'question': f"{question} [#{i + 1}]",
+            'answer': f"{base['answer']} This summary was reviewed for {jurisdiction}.",
+            'category': base['category'],
+        })
+    return faqs
+
+
+def write_corpus(faqs: List[Dict], path: str) -> str:
+    """Write faqs as a JSON array to path and return the path."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(faqs, f)
+    return path
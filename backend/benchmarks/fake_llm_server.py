@@ -0,0 +1,203 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Serves POST /openai/v1/chat/completions (the path the Groq SDK calls) with
+a configurable latency, random 503s and a server-side requests-per-minute
+limit answered with 429 + Retry-After, so the LLM gateway's pacing, retries
+and deadlines can be exercised without a network or API key. Supports
+"stream": true with server-sent events like the real API.
+
+Point the app at it with GROQ_BASE_URL=http://127.0.0.1:8089.
+
+Usage:
+    python benchmarks/fake_llm_server.py [--port 8089] [--latency-ms 300]
+        [--jitter-ms 100] [--error-rate 0.0] [--rpm 0]
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+COMPLETIONS_PATH = '/openai/v1/chat/completions'
+ANSWER = "This is a simulated answer from the fake LLM server. " * 4
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=300, jitter_ms=100, error_rate=0.0, rpm=0, seed=None):
+        super().__init__(address, FakeLLMHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = deque()  # Request times within the last minute
+        self.counts = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'errors': 0}
+
+    def admit(self):
+        """Return (status, retry_after) for a new request."""
+        with self.lock:
+            now = time.monotonic()
+            self.counts['requests'] += 1
+            while self.recent and now - self.recent[0] >= 60:
+                self.recent.popleft()
+            if self.rpm and len(self.recent) >= self.rpm:
+                self.counts['rate_limited'] += 1
+                return 429, 60 - (now - self.recent[0])
+            self.recent.append(now)
+            if self.rng.random() < self.error_rate:
+                self.counts['errors'] += 1
+                return 503, None
+            self.counts['ok'] += 1
+            return 200, None
+
+    def delay(self):
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(0.0, self.latency_ms + jitter) / 1000)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        if self.path != COMPLETIONS_PATH:
+            self.send_json(404, {'error': {'message': 'Not found'}})
+            return
+
+        status, retry_after = self.server.admit()
+        if status == 429:
+            self.send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit'}},
+                           headers={'Retry-After': f"{retry_after:.1f}"})
+            return
+        self.server.delay()
+        if status == 503:
+            self.send_json(503, {'error': {'message': 'Service unavailable'}})
+            return
+
+        prompt_tokens = sum(len(m.get('content') or '') for m in request.get('messages', [])) // 4
+        completion_tokens = len(ANSWER) // 4
+        if request.get('stream'):
+            self.send_stream(request, ANSWER)
+            return
+        self.send_json(200, {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ANSWER},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        })
+
+    def send_stream(self, request, answer):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for word in answer.split(' '):
+            chunk = {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': request.get('model'),
+                'choices': [{'index': 0, 'delta': {'content': word + ' '}, 'finish_reason': None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+def start_fake_llm_server(port=0, **options):
+    """Start a FakeLLMServer on a background thread; returns (server, base_url)."""
+    server = FakeLLMServer(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, name='fake-llm-server', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class FakeServerError(Exception):
+    """HTTP error from the fake server, shaped like the SDK's APIStatusError."""
+
+    def __init__(self, status_code, headers):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class FakeServerClient:
+    """
+    Minimal non-streaming chat client for the fake server, for benchmarking
+    the gateway where the groq package is not installed.
+    """
+
+    def __init__(self, base_url):
+        self.url = base_url + COMPLETIONS_PATH
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, timeout=None, **request):
+        http_request = urllib.request.Request(
+            self.url, data=json.dumps(request).encode(),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(http_request, timeout=timeout) as response:
+                body = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise FakeServerError(e.code, {k.lower(): v for k, v in e.headers.items()}) from None
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=body['choices'][0]['message']['content']))],
+            usage=SimpleNamespace(total_tokens=body['usage']['total_tokens']),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Groq chat completions server.")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--jitter-ms', type=float, default=100)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rpm', type=int, default=0, help="Requests per minute before 429s (0: no limit)")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(('127.0.0.1', args.port), latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           error_rate=args.error_rate, rpm=args.rpm)
+    print(f"Fake LLM server on http://127.0.0.1:{args.port} (GROQ_BASE_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(server.counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+"""
+Benchmark suite: one reproducible run of the headline numbers, saved as JSON
+so runs can be compared across commits.
+
+For each corpus size (synthetic FAQs from data/legal_faqs.json, see
+corpus.py) it measures, in a throwaway test database:
+
+    ingestion   data/load_faqs.load_in_chunks into the database, with vectors
+                written to a NumPy index instead of ChromaDB (rows/s)
+    embedding   batched encode throughput and single-question latency
+    retrieval   rag.search_similar_faqs latency and recall@2 for the held-out
+                paraphrases in benchmarks/data/heldout_questions.json (a hit
+                is any returned FAQ generated from the expected curated FAQ)
+    ask         end-to-end POST /api/ask/ latency with the 'fake' generator
+                backend, plus median per-stage times from the QueryLog rows
+
+Everything runs offline. By default questions are embedded with a
+deterministic feature-hashing stand-in so results only depend on the code
+and the machine; --embedder model uses all-MiniLM-L6-v2 instead (needs
+sentence_transformers and the model weights).
+
+Results go to benchmarks/results/<commit>.json. With --baseline (or
+--compare BASELINE CURRENT) every metric listed in benchmarks/thresholds.json
+is checked against the baseline and the exit status is 1 on a regression.
+
+Usage:
+    python benchmarks/suite.py [--sizes 1000 10000] [--queries 200]
+        [--ask-requests 100] [--llm-ms 50] [--embedder hashing|model]
+        [--output results.json] [--baseline results/abc1234.json]
+    python benchmarks/suite.py --compare BASELINE.json CURRENT.json
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import subprocess
+from datetime import datetime, timezone
+from unittest import mock
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(BACKEND_DIR, 'benchmarks')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'data'))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+os.environ['RAG_WARMUP_ON_STARTUP'] = 'false'
+
+import django
+django.setup()
+
+import numpy as np
+from django.db import connection
+from django.test import Client, override_settings
+
+import load_faqs as loader
+from api import rag
+from api.generators import FakeGenerator
+from api.models import FAQ, QueryLog
+from api.retrievers import NumpyRetriever
+from benchmarks.corpus import load_seed_faqs, make_synthetic_faqs
+
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+THRESHOLDS_PATH = os.path.join(BENCHMARKS_DIR, 'thresholds.json')
+HELDOUT_PATH = os.path.join(BENCHMARKS_DIR, 'data', 'heldout_questions.json')
+DIMENSIONS = 384
+TOP_K = 2
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def hashing_embeddings(texts, batch_size=None):
+    """
+    Deterministic offline embedder: signed feature hashing of word tokens
+    into 384 dimensions, L2-normalized. Paraphrases sharing words land close
+    together, which is enough for meaningful recall numbers.
+    """
+    vectors = np.zeros((len(texts), DIMENSIONS), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in TOKEN_RE.findall(text.lower()):
+            digest = zlib.crc32(token.encode())  # Stable across runs, unlike hash()
+            vectors[row, digest % DIMENSIONS] += 1.0 if digest & 0x80000000 else -1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).tolist()
+
+
+def summarize(latencies_ms):
+    latencies = sorted(latencies_ms)
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3)
+
+    return {
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+    }
+
+
+def git_commit():
+    """Short HEAD hash, suffixed with -dirty for uncommitted changes."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BACKEND_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty else '')
+
+
+# Benchmarks
+
+def bench_ingestion(faqs, index_dir, embed):
+    """Bulk-load faqs through the loader; vectors go to a NumPy index."""
+    vectors = {}
+
+    def add_faqs(rows, batch_size=rag.EMBEDDING_BATCH_SIZE, collection=None):
+        for row, vector in zip(rows, embed([row['question'] for row in rows])):
+            vectors[row['id']] = (vector, row['category'])
+        return len(rows)
+
+    FAQ.objects.all().delete()
+    start = time.perf_counter()
+    with mock.patch.object(rag, 'add_faqs_to_chroma', add_faqs), \
+            contextlib.redirect_stdout(io.StringIO()):
+        loaded = loader.load_in_chunks(iter(faqs))
+        ids = sorted(vectors)
+        NumpyRetriever.build(index_dir, ids, [vectors[i][0] for i in ids], [vectors[i][1] for i in ids])
+    elapsed = time.perf_counter() - start
+    return {
+        'rows': loaded,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(loaded / elapsed, 1),
+    }
+
+
+def bench_embedding(questions, embed, embed_one, single_queries=50):
+    start = time.perf_counter()
+    embed(questions)
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    for question in questions[:single_queries]:
+        start = time.perf_counter()
+        embed_one(question)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'texts': len(questions),
+        'texts_per_second': round(len(questions) / elapsed, 1),
+        'single_p50_ms': summarize(latencies)['p50_ms'],
+    }
+
+
+def bench_retrieval(heldout, queries, seed_of, embed_one):
+    """Latency and recall@TOP_K of search_similar_faqs over the loaded corpus."""
+    items = [heldout[i % len(heldout)] for i in range(queries)]
+    embeddings = [embed_one(item['question']) for item in items]
+    latencies, hits = [], 0
+    for item, query_embedding in zip(items, embeddings):
+        start = time.perf_counter()
+        sources = rag.search_similar_faqs(item['question'], top_k=TOP_K, query_embedding=query_embedding)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += any(seed_of(int(source['id'])) == item['expected_id'] for source in sources)
+    return {**summarize(latencies), f'recall@{TOP_K}': round(hits / len(items), 3)}
+
+
+def bench_ask(heldout, requests):
+    """End-to-end /api/ask/ through the Django test client."""
+    client = Client()
+    client.post('/api/ask/', {'question': heldout[0]['question']}, content_type='application/json')  # Warm up
+    QueryLog.objects.all().delete()
+    latencies = []
+    for i in range(requests):
+        question = heldout[i % len(heldout)]['question']
+        start = time.perf_counter()
+        response = client.post('/api/ask/', {'question': question}, content_type='application/json')
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.content
+
+    stages = {}
+    for field in ('embed_time', 'retrieve_time', 'generate_time'):
+        values = [v for v in QueryLog.objects.values_list(field, flat=True) if v is not None]
+        if values:
+            stages[f"{field.replace('_time', '')}_p50_ms"] = round(statistics.median(values) * 1000, 3)
+    return {**summarize(latencies), 'requests': requests, **stages}
+
+
+def run_size(size, args, embed, embed_one, heldout, seeds, workdir):
+    faqs = make_synthetic_faqs(size)
+    seed_ids = [seed['id'] for seed in seeds]
+
+    def seed_of(faq_id):
+        return seed_ids[(faq_id - 1) % len(seed_ids)]  # make_synthetic_faqs cycles the seeds
+
+    index_dir = os.path.join(workdir, f'index_{size}')
+    results = {'ingestion': bench_ingestion(faqs, index_dir, embed)}
+    results['embedding'] = bench_embedding([faq['question'] for faq in faqs[:args.queries * 4]],
+                                           embed, embed_one)
+
+    patches = [
+        mock.patch.object(rag, '_retriever', NumpyRetriever(index_dir)),
+        mock.patch.object(rag, '_lexical_index', None),
+        mock.patch.object(rag, '_faq_row_cache', None),
+        mock.patch.object(rag, '_embedding_cache', None),
+        mock.patch.object(rag, '_answer_cache', None),
+        mock.patch.object(rag, '_generator', FakeGenerator(latency_ms=args.llm_ms, tokens_per_second=0)),
+        mock.patch.object(rag.settings, 'RAG_EMBEDDING_CACHE_SIZE', 0),
+        mock.patch.object(rag.settings, 'RAG_ANSWER_CACHE_SIZE', 0),
+    ]
+    for patcher in patches:
+        patcher.start()
+    try:
+        if rag.settings.RAG_HYBRID_SEARCH:
+            rag.get_lexical_index().get()  # Built once, outside the timings
+        results['retrieval'] = bench_retrieval(heldout, args.queries, seed_of, embed_one)
+        with override_settings(RAG_QUERY_LOG_ASYNC=False):
+            results['ask'] = bench_ask(heldout, args.ask_requests)
+    finally:
+        for patcher in patches:
+            patcher.stop()
+    return results
+
+
+def run_suite(args):
+    if args.embedder == 'model':
+        embed, embed_one = rag.get_embeddings, rag.get_embedding
+        rag.get_engine().embedding_model.encode("warm up")
+        embedder_patches = []
+    else:
+        embed, embed_one = hashing_embeddings, lambda text: hashing_embeddings([text])[0]
+        embedder_patches = [
+            mock.patch.object(rag, 'get_embeddings', embed),
+            mock.patch.object(rag, 'get_embedding', embed_one),
+        ]
+
+    with open(HELDOUT_PATH, 'r', encoding='utf-8') as f:
+        heldout = json.load(f)
+    seeds = load_seed_faqs()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': f"{platform.system()} {platform.machine()}",
+            'cpus': os.cpu_count(),
+            'embedder': args.embedder,
+            'hybrid_search': rag.settings.RAG_HYBRID_SEARCH,
+            'llm_ms': args.llm_ms,
+            'queries': args.queries,
+            'ask_requests': args.ask_requests,
+        },
+        'results': {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix='bench_suite_')
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    for patcher in embedder_patches:
+        patcher.start()
+    try:
+        for size in args.sizes:
+            print(f"--- {size} FAQs ---")
+            results = run_size(size, args, embed, embed_one, heldout, seeds, workdir)
+            report['results'][str(size)] = results
+            print(f"ingestion  {results['ingestion']['rows_per_second']:>10} rows/s")
+            print(f"embedding  {results['embedding']['texts_per_second']:>10} texts/s")
+            print(f"retrieval  p50 {results['retrieval']['p50_ms']:>8}ms  p99 {results['retrieval']['p99_ms']:>8}ms  "
+                  f"recall@{TOP_K} {results['retrieval'][f'recall@{TOP_K}']}")
+            print(f"ask        p50 {results['ask']['p50_ms']:>8}ms  p99 {results['ask']['p99_ms']:>8}ms\n")
+    finally:
+        for patcher in embedder_patches:
+            patcher.stop()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+# Comparison
+
+def flatten(report):
+    """{'<size>.<benchmark>.<metric>': value} for every numeric result."""
+    return {
+        f"{size}.{bench}.{metric}": value
+        for size, benches in report['results'].items()
+        for bench, metrics in benches.items()
+        for metric, value in metrics.items()
+        if isinstance(value, (int, float))
+    }
+
+
+def compare(baseline, current, thresholds):
+    """
+    Check current against baseline for every metric with a threshold.
+
+    A threshold is {"better": "higher"|"lower", "tolerance": relative change
+    allowed, "min_delta": absolute change always allowed}; a metric regresses
+    when it moves the wrong way by more than both.
+
+    Returns:
+        List of dicts with metric, baseline, current, change and status
+        ('ok', 'improved' or 'regressed'), for metrics present in both runs
+    """
+    base_values, current_values = flatten(baseline), flatten(current)
+    rows = []
+    for key in sorted(base_values.keys() & current_values.keys(), key=lambda k: (int(k.split('.')[0]), k)):
+        rule = thresholds.get(key.split('.', 1)[1])
+        if rule is None:
+            continue
+        base, value = base_values[key], current_values[key]
+        worse_by = (base - value) if rule['better'] == 'higher' else (value - base)
+        allowed = max(abs(base) * rule.get('tolerance', 0.0), rule.get('min_delta', 0.0))
+        if worse_by > allowed:
+            status = 'regressed'
+        elif -worse_by > allowed:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append({
+            'metric': key,
+            'baseline': base,
+            'current': value,
+            'change': round((value - base) / base, 4) if base else None,
+            'status': status,
+        })
+    return rows
+
+
+def print_comparison(baseline, current, rows):
+    print(f"Baseline {baseline['meta']['commit']} vs current {current['meta']['commit']}")
+    for field in ('embedder', 'machine', 'cpus', 'llm_ms', 'hybrid_search'):
+        if baseline['meta'].get(field) != current['meta'].get(field):
+            print(f"warning: {field} differs ({baseline['meta'].get(field)} vs {current['meta'].get(field)})")
+    print()
+    for row in rows:
+        change = f"{row['change']:+.1%}" if row['change'] is not None else 'n/a'
+        print(f"{row['metric']:<36} {row['baseline']:>12} -> {row['current']:>12}  {change:>8}  {row['status']}")
+    regressions = [row for row in rows if row['status'] == 'regressed']
+    print(f"\n{len(regressions)} regression(s) in {len(rows)} checked metrics")
+    return regressions
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare against a baseline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--queries', type=int, default=200, help="Retrieval queries per size")
+    parser.add_argument('--ask-requests', type=int, default=100, help="/api/ask/ requests per size")
+    parser.add_argument('--llm-ms', type=float, default=50, help="Fake generator latency")
+    parser.add_argument('--embedder', choices=['hashing', 'model'], default='hashing')
+    parser.add_argument('--output', help="Results path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--baseline', help="Results file to check this run against")
+    parser.add_argument('--thresholds', default=THRESHOLDS_PATH)
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="Only compare two results files")
+    args = parser.parse_args()
+    thresholds = load_json(args.thresholds)['metrics']
+
+    if args.compare:
+        baseline, current = map(load_json, args.compare)
+        regressions = print_comparison(baseline, current, compare(baseline, current, thresholds))
+        sys.exit(1 if regressions else 0)
+
+    print("\n" + "="*60)
+    print(f"BENCHMARK SUITE (sizes {', '.join(map(str, args.sizes))}, {args.embedder} embedder)")
+    print("="*60 + "\n")
+
+    report = run_suite(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        baseline = load_json(args.baseline)
+        print()
+        regressions = print_comparison(baseline, report, compare(baseline, report, thresholds))
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,29 @@
 """
 Data Loading Script for Legal FAQs
 Loads FAQs from JSON into both Django database and ChromaDB.
+
+By default FAQs are streamed from the JSON file and loaded in chunks:
+one bulk_create, one batched encode and one Chroma upsert per chunk.
+Pass --legacy to use the original one-row-at-a-time loop.
+
+Pass --sync for an incremental update instead of a full reload: FAQs are
+matched by their JSON "id", only new or changed FAQs (by content hash) are
+re-embedded, and FAQs missing from the file are deleted from both stores.
+
+Every load also fills FAQ.question_hash, the exact-match index used to
+answer verbatim FAQ questions without retrieval (a sync re-hashes unchanged
+FAQs whose hash is stale, e.g. after the normalization rules changed).
+
+Usage:
+    python data/load_faqs.py [--file faqs.json] [--chunk-size 1000] [--legacy | --sync]
 """
 
 import os
 import sys
 import json
+import time
+import argparse
+from itertools import islice
 import django
 
 # Setup Django environment
@@ -13,39 +31,116 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
 django.setup()
 
+from django.db import transaction
+from django.utils import timezone
 from api.models import FAQ
+from api.normalization import question_hash
 from api import rag
 
+DEFAULT_JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'legal_faqs.json')
+DEFAULT_CHUNK_SIZE = 1000
+READ_SIZE = 1 << 16  # 64 KiB per file read
 
-def load_faqs():
-    """Load FAQs from JSON file into database and ChromaDB."""
 
-    # Get path to JSON file
-    json_path = os.path.join(os.path.dirname(__file__), 'legal_faqs.json')
+def iter_faqs(json_path):
+    """
+    Yield FAQ dicts from a JSON array (or JSON Lines) file without
+    loading the whole file into memory.
 
-    print("\n" + "="*60)
-    print("LOADING LEGAL FAQs")
-    print("="*60 + "\n")
+    Args:
+        json_path: Path to a file containing a JSON array of FAQ objects,
+            or one JSON object per line
 
-    # Load JSON data
-    print(f"Reading FAQs from: {json_path}")
+    Yields:
+        FAQ dicts in file order
+    """
+    decoder = json.JSONDecoder()
     with open(json_path, 'r', encoding='utf-8') as f:
-        faqs_data = json.load(f)
+        buffer = ''
+        pos = 0
+        started = False
 
-    print(f"Found {len(faqs_data)} FAQs to load\n")
+        while True:
+            # Skip whitespace and separators, reading more input as needed
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= len(buffer):
+                more = f.read(READ_SIZE)
+                if not more:
+                    return
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+
+            if not started:
+                started = True
+                if buffer[pos] == '[':
+                    pos += 1
+                    continue
+            if buffer[pos] == ']':
+                return
+
+            try:
+                faq_data, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Object spans the end of the buffer; read more and retry
+                more = f.read(READ_SIZE)
+                if not more:
+                    raise
+                buffer = buffer[pos:] + more
+                pos = 0
+                continue
+
+            yield faq_data
+            pos = end
+
+
+def iter_chunks(iterable, size):
+    """Yield lists of up to size items from iterable."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
 
-    # Clear existing FAQs
-    print("Clearing existing FAQs from database...")
-    FAQ.objects.all().delete()
-    print("Database cleared!\n")
 
-    # Note: ChromaDB collection is persistent, you may want to clear it too
-    # Uncomment the next line if you want to clear ChromaDB
-    # rag.clear_collection()
+def build_faq(faq_data):
+    """Build an unsaved FAQ, keeping the JSON id so re-syncs can match it."""
+    return FAQ(
+        id=faq_data.get('id'),
+        question=faq_data['question'],
+        answer=faq_data['answer'],
+        category=faq_data['category'],
+        content_hash=FAQ.compute_content_hash(
+            faq_data['question'], faq_data['answer'], faq_data['category']
+        ),
+        question_hash=question_hash(faq_data['question'])
+    )
 
-    # Load each FAQ
+
+def to_chroma_rows(faqs):
+    """Convert saved FAQ instances to dicts for rag.add_faqs_to_chroma."""
+    return [
+        {
+            'id': faq.id,
+            'question': faq.question,
+            'answer': faq.answer,
+            'category': faq.category
+        }
+        for faq in faqs
+    ]
+
+
+def load_one_by_one(faqs):
+    """
+    Original loader: one FAQ row and one Chroma add per FAQ.
+
+    Returns:
+        Number of FAQs loaded
+    """
     loaded_count = 0
-    for faq_data in faqs_data:
+    for faq_data in faqs:
         try:
             # Create Django model instance
             faq = FAQ.objects.create(
@@ -63,16 +158,177 @@ def load_faqs():
             )
 
             loaded_count += 1
-            print(f"✓ [{loaded_count}/{len(faqs_data)}] Loaded: {faq_data['category']} - {faq_data['question'][:60]}...")
+            print(f"✓ [{loaded_count}] Loaded: {faq_data['category']} - {faq_data['question'][:60]}...")
+
+        except Exception as e:
+            print(f"✗ Error loading FAQ ID {faq_data.get('id')}: {e}")
+
+    return loaded_count
+
+
+def load_in_chunks(faqs, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Bulk loader: bulk_create, batched encode and batched Chroma upsert
+    per chunk of FAQs. The upsert runs inside the chunk's transaction, so a
+    chunk whose vectors could not be written leaves no database rows.
+
+    Args:
+        faqs: Iterable of FAQ dicts (consumed lazily)
+        chunk_size: Number of FAQs per database/Chroma batch
+
+    Returns:
+        Number of FAQs loaded
+    """
+    loaded_count = 0
+    start_time = time.perf_counter()
+
+    for chunk in iter_chunks(faqs, chunk_size):
+        try:
+            with transaction.atomic():
+                created = FAQ.objects.bulk_create([
+                    build_faq(faq_data) for faq_data in chunk
+                ])
+                rag.add_faqs_to_chroma(to_chroma_rows(created))
+
+            loaded_count += len(created)
+            elapsed = time.perf_counter() - start_time
+            print(f"✓ Loaded {loaded_count} FAQs ({loaded_count / elapsed:.0f} rows/s)")
 
         except Exception as e:
-            print(f"✗ Error loading FAQ ID {faq_data['id']}: {e}")
+            # Vectors upserted before the failure are orphans; --sync deletes them
+            print(f"✗ Error loading chunk after {loaded_count} FAQs "
+                  f"(run with --sync to repair): {e}")
+
+    return loaded_count
+
+
+def sync_faqs(faqs, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Incrementally sync the database and ChromaDB with faqs.
+
+    FAQs are matched on their "id". Only new FAQs and FAQs whose question,
+    answer or category changed are written and re-embedded; FAQs that are no
+    longer present, and Chroma vectors without a database row, are deleted.
+    Unchanged FAQs with a stale question_hash are re-hashed in place.
+
+    Args:
+        faqs: Iterable of FAQ dicts, each with an "id" (consumed lazily)
+        chunk_size: Number of FAQs per database/Chroma batch
+
+    Returns:
+        Dict with added, updated, unchanged, rehashed, removed and
+        orphans_removed counts
+    """
+    existing = {
+        faq_id: (content_hash, stored_question_hash)
+        for faq_id, content_hash, stored_question_hash
+        in FAQ.objects.values_list('id', 'content_hash', 'question_hash')
+    }
+    seen = set()
+    summary = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'rehashed': 0}
+
+    for chunk in iter_chunks(faqs, chunk_size):
+        to_add = []
+        to_update = []
+        to_rehash = []
+        for faq_data in chunk:
+            if faq_data.get('id') is None:
+                raise ValueError(f"Sync requires an 'id' on every FAQ: {faq_data.get('question', '')[:60]}")
+            faq = build_faq(faq_data)
+            if faq.id in seen:
+                continue
+            seen.add(faq.id)
+
+            if faq.id not in existing:
+                to_add.append(faq)
+            elif existing[faq.id][0] != faq.content_hash:
+                to_update.append(faq)
+            else:
+                summary['unchanged'] += 1
+                if existing[faq.id][1] != faq.question_hash:
+                    to_rehash.append(faq)
+
+        with transaction.atomic():
+            FAQ.objects.bulk_create(to_add)
+            now = timezone.now()  # bulk_update skips auto_now
+            for faq in to_update:
+                faq.updated_at = now
+            FAQ.objects.bulk_update(
+                to_update, ['question', 'answer', 'category', 'content_hash', 'question_hash', 'updated_at']
+            )
+            FAQ.objects.bulk_update(to_rehash, ['question_hash'])
+            # Rolls the chunk back if the upsert fails, so the next sync retries it
+            rag.add_faqs_to_chroma(to_chroma_rows(to_add + to_update))
+
+        summary['added'] += len(to_add)
+        summary['updated'] += len(to_update)
+        summary['rehashed'] += len(to_rehash)
+
+    # Delete FAQs that are no longer in the source file
+    removed_ids = sorted(set(existing) - seen)
+    for chunk in iter_chunks(removed_ids, chunk_size):
+        FAQ.objects.filter(id__in=chunk).delete()
+    rag.delete_faqs_from_chroma(removed_ids)
+    summary['removed'] = len(removed_ids)
+
+    # Drop vectors left behind by earlier loads that had no matching row
+    orphan_ids = [int(faq_id) for faq_id in rag.get_collection_ids() if int(faq_id) not in seen]
+    rag.delete_faqs_from_chroma(orphan_ids)
+    summary['orphans_removed'] = len(orphan_ids)
+
+    return summary
+
+
+def load_faqs(json_path=DEFAULT_JSON_PATH, chunk_size=DEFAULT_CHUNK_SIZE, legacy=False, sync=False):
+    """Load FAQs from JSON file into database and ChromaDB."""
+
+    print("\n" + "="*60)
+    print("SYNCING LEGAL FAQs" if sync else "LOADING LEGAL FAQs")
+    print("="*60 + "\n")
+
+    print(f"Reading FAQs from: {json_path}")
+
+    start_time = time.perf_counter()
+    if sync:
+        summary = sync_faqs(iter_faqs(json_path), chunk_size=chunk_size)
+        rag.refresh_retriever_index()
+        elapsed = time.perf_counter() - start_time
+        print("\n" + "="*60)
+        print("SYNC COMPLETE!")
+        print("="*60)
+        print(f"\n  + added:     {summary['added']}")
+        print(f"  ~ updated:   {summary['updated']}")
+        print(f"  - removed:   {summary['removed']}")
+        print(f"  = unchanged: {summary['unchanged']}")
+        if summary['rehashed']:
+            print(f"  # re-hashed: {summary['rehashed']}")
+        if summary['orphans_removed']:
+            print(f"  - orphaned vectors removed: {summary['orphans_removed']}")
+        print(f"\nSynced in {elapsed:.2f}s")
+        print(f"Database FAQs: {FAQ.objects.count()}")
+        print(f"ChromaDB FAQs: {rag.get_collection_count()}\n")
+        return summary
+
+    # Clear existing FAQs from both stores so no stale vectors remain
+    print("Clearing existing FAQs from database and ChromaDB...")
+    FAQ.objects.all().delete()
+    rag.clear_collection()
+    print("Database cleared!\n")
+
+    if legacy:
+        loaded_count = load_one_by_one(iter_faqs(json_path))
+    else:
+        loaded_count = load_in_chunks(iter_faqs(json_path), chunk_size=chunk_size)
+    rag.refresh_retriever_index()
+    elapsed = time.perf_counter() - start_time
 
     # Verify loading
     print("\n" + "="*60)
     print("LOADING COMPLETE!")
     print("="*60)
-    print(f"\nDatabase FAQs: {FAQ.objects.count()}")
+    print(f"\nLoaded {loaded_count} FAQs in {elapsed:.2f}s "
+          f"({loaded_count / elapsed if elapsed else 0:.0f} rows/s)")
+    print(f"Database FAQs: {FAQ.objects.count()}")
     print(f"ChromaDB FAQs: {rag.get_collection_count()}")
 
     # Show category breakdown
@@ -85,6 +341,16 @@ def load_faqs():
     print("\n✓ All FAQs loaded successfully!")
     print("\nYou can now start the Django server and test the RAG system.\n")
 
+    return loaded_count
+
 
 if __name__ == "__main__":
-    load_faqs()
+    parser = argparse.ArgumentParser(description="Load legal FAQs into the database and ChromaDB.")
+    parser.add_argument('--file', default=DEFAULT_JSON_PATH, help="JSON array or JSON Lines file")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--legacy', action='store_true', help="Use the one-row-at-a-time loop")
+    mode.add_argument('--sync', action='store_true', help="Only apply changes since the last load")
+    args = parser.parse_args()
+
+    load_faqs(json_path=args.file, chunk_size=args.chunk_size, legacy=args.legacy, sync=args.sync)
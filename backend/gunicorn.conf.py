@@ -0,0 +1,55 @@
+"""
+Gunicorn configuration for pre-fork serving.
+
+The app is imported once in the master (preload_app) with RAG_PREFORK set,
+so wsgi.py loads the embedding model, numpy index and BM25 index there
+(rag.prepare_for_fork) and every worker inherits them copy-on-write. Each
+worker then drops the inherited per-process state (rag.reset_after_fork)
+and opens its own ChromaDB, SQLite and HTTP handles.
+
+Compare per-worker memory with benchmarks/bench_prefork.py, or scrape
+rag_process_memory_bytes{kind="uss"} from each worker's /api/metrics/.
+
+Usage:
+    gunicorn -c gunicorn.conf.py legal_qa.wsgi:application
+"""
+
+import os
+import sys
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
+os.environ['RAG_PREFORK'] = 'true'
+# HF tokenizers turns its thread pool off with a warning in forked workers
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+
+CPU_COUNT = os.cpu_count() or 1
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', str(CPU_COUNT)))
+# Threads keep a worker serving while its requests wait on the LLM
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = 120
+preload_app = True
+
+# Split the cores between workers instead of one encode thread per core each
+ENCODE_THREADS = max(1, CPU_COUNT // workers)
+os.environ.setdefault('RAG_ONNX_THREADS', str(ENCODE_THREADS))
+
+
+def post_fork(server, worker):
+    from api import logsink, rag
+
+    rag.reset_after_fork()
+    logsink.reset_after_fork()
+    if 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(ENCODE_THREADS)
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    if settings.RAG_WARMUP_ON_STARTUP:
+        from api import rag
+
+        rag.warm_up()  # Opens this worker's clients; the model is already loaded
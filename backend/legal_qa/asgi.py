@@ -4,8 +4,14 @@ ASGI config for legal_qa project.
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
 
 application = get_asgi_application()
+
+# Load the embedding model and clients before serving the first request
+if settings.RAG_WARMUP_ON_STARTUP:
+    from api import rag
+    rag.warm_up()
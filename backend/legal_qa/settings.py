@@ -96,4 +96,169 @@ REST_FRAMEWORK = {
 
 # CORS Configuration - Allow all origins for development
 CORS_ALLOW_ALL_ORIGINS = True
-CORS_ALLOW_CREDENTIALS = True
\ No newline at end of file
+CORS_ALLOW_CREDENTIALS = True
+
+# RAG Configuration
+# The embedding model, ChromaDB and Groq clients load lazily on first use.
+# Set RAG_WARMUP_ON_STARTUP=false to skip eager loading in wsgi.py/asgi.py.
+RAG_WARMUP_ON_STARTUP = os.getenv('RAG_WARMUP_ON_STARTUP', 'true').lower() == 'true'
+
+# Query-embedding cache: LRU size (0 disables), TTL in seconds, and an
+# optional SQLite file shared by all worker processes on the host
+RAG_EMBEDDING_CACHE_SIZE = int(os.getenv('RAG_EMBEDDING_CACHE_SIZE', '2048'))
+RAG_EMBEDDING_CACHE_TTL = float(os.getenv('RAG_EMBEDDING_CACHE_TTL', '86400'))
+RAG_EMBEDDING_CACHE_PATH = os.getenv('RAG_EMBEDDING_CACHE_PATH', '')
+
+# Semantic answer cache: reuse an answer when a new question's embedding is
+# within RAG_ANSWER_CACHE_THRESHOLD cosine similarity of a cached one and the
+# same FAQs were retrieved. Size 0 disables it.
+RAG_ANSWER_CACHE_SIZE = int(os.getenv('RAG_ANSWER_CACHE_SIZE', '512'))
+RAG_ANSWER_CACHE_TTL = float(os.getenv('RAG_ANSWER_CACHE_TTL', '3600'))
+RAG_ANSWER_CACHE_THRESHOLD = float(os.getenv('RAG_ANSWER_CACHE_THRESHOLD', '0.95'))
+
+# Threads used by the async ask path for embedding and vector search
+RAG_EXECUTOR_WORKERS = int(os.getenv('RAG_EXECUTOR_WORKERS', '4'))
+
+# Micro-batching of query embeddings across concurrent requests: texts that
+# arrive within RAG_EMBEDDING_BATCH_MAX_WAIT_MS are encoded in one batch
+RAG_EMBEDDING_BATCHING = os.getenv('RAG_EMBEDDING_BATCHING', 'false').lower() == 'true'
+RAG_EMBEDDING_BATCH_MAX_SIZE = int(os.getenv('RAG_EMBEDDING_BATCH_MAX_SIZE', '32'))
+RAG_EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv('RAG_EMBEDDING_BATCH_MAX_WAIT_MS', '5'))
+
+# Vector search backend: 'chroma' or 'numpy' (exact search over a memory-mapped
+# .npy index, rebuilt from ChromaDB by data/load_faqs.py)
+RAG_RETRIEVER = os.getenv('RAG_RETRIEVER', 'chroma')
+RAG_NUMPY_INDEX_PATH = os.getenv('RAG_NUMPY_INDEX_PATH', str(BASE_DIR / 'vector_index'))
+
+# Category centroids for 'auto' routing with the chroma retriever, written
+# after ingestion by data/load_faqs.py and rebuild_vector_index (the NumPy
+# index stores its own)
+RAG_CATEGORY_CENTROIDS_PATH = os.getenv(
+    'RAG_CATEGORY_CENTROIDS_PATH', str(BASE_DIR / 'category_centroids.npz')
+)
+
+# HNSW index parameters for the ChromaDB collection (cosine space). They are
+# fixed at creation; run `python manage.py rebuild_vector_index` after changing
+RAG_HNSW_M = int(os.getenv('RAG_HNSW_M', '16'))
+RAG_HNSW_CONSTRUCTION_EF = int(os.getenv('RAG_HNSW_CONSTRUCTION_EF', '100'))
+RAG_HNSW_SEARCH_EF = int(os.getenv('RAG_HNSW_SEARCH_EF', '50'))
+
+# Hybrid retrieval: fuse vector search with an in-process BM25 index over FAQ
+# questions and answers (reciprocal rank fusion with constant RAG_RRF_K). Each
+# side fetches top_k * RAG_HYBRID_CANDIDATES candidates. The BM25 index is
+# rebuilt in the background when the FAQ table changes, checked at most every
+# RAG_LEXICAL_REFRESH_SECONDS.
+RAG_HYBRID_SEARCH = os.getenv('RAG_HYBRID_SEARCH', 'true').lower() == 'true'
+RAG_HYBRID_CANDIDATES = int(os.getenv('RAG_HYBRID_CANDIDATES', '5'))
+RAG_RRF_K = int(os.getenv('RAG_RRF_K', '60'))
+RAG_LEXICAL_REFRESH_SECONDS = float(os.getenv('RAG_LEXICAL_REFRESH_SECONDS', '60'))
+
+# Sources are hydrated from the FAQ table by id; recently used rows are kept
+# in an LRU of this size (0 disables) for at most RAG_FAQ_ROW_CACHE_TTL seconds
+RAG_FAQ_ROW_CACHE_SIZE = int(os.getenv('RAG_FAQ_ROW_CACHE_SIZE', '1024'))
+RAG_FAQ_ROW_CACHE_TTL = float(os.getenv('RAG_FAQ_ROW_CACHE_TTL', '300'))
+
+# QueryLog rows are written by a background thread with bulk_create, every
+# RAG_QUERY_LOG_BATCH_SIZE rows or RAG_QUERY_LOG_FLUSH_MS. When the queue is
+# full, RAG_QUERY_LOG_FULL_POLICY decides: 'drop_newest', 'drop_oldest' or
+# 'block' (wait up to RAG_QUERY_LOG_BLOCK_TIMEOUT seconds, then drop).
+# Set RAG_QUERY_LOG_ASYNC=false to save each row on the request path.
+RAG_QUERY_LOG_ASYNC = os.getenv('RAG_QUERY_LOG_ASYNC', 'true').lower() == 'true'
+RAG_QUERY_LOG_QUEUE_SIZE = int(os.getenv('RAG_QUERY_LOG_QUEUE_SIZE', '10000'))
+RAG_QUERY_LOG_BATCH_SIZE = int(os.getenv('RAG_QUERY_LOG_BATCH_SIZE', '200'))
+RAG_QUERY_LOG_FLUSH_MS = float(os.getenv('RAG_QUERY_LOG_FLUSH_MS', '500'))
+RAG_QUERY_LOG_FULL_POLICY = os.getenv('RAG_QUERY_LOG_FULL_POLICY', 'drop_newest')
+RAG_QUERY_LOG_BLOCK_TIMEOUT = float(os.getenv('RAG_QUERY_LOG_BLOCK_TIMEOUT', '1.0'))
+
+# /api/stats/ caches the FAQ and ChromaDB counts for this many seconds
+RAG_STATS_CORPUS_CACHE_SECONDS = int(os.getenv('RAG_STATS_CORPUS_CACHE_SECONDS', '30'))
+
+# /api/ask/batch/ and manage.py ask_batch: at most RAG_BATCH_MAX_QUESTIONS per
+# request, answered with at most RAG_BATCH_GENERATION_CONCURRENCY concurrent
+# LLM calls (shared by all batches in the process)
+RAG_BATCH_MAX_QUESTIONS = int(os.getenv('RAG_BATCH_MAX_QUESTIONS', '500'))
+RAG_BATCH_GENERATION_CONCURRENCY = int(os.getenv('RAG_BATCH_GENERATION_CONCURRENCY', '4'))
+
+# LLM gateway (api.llm). At most RAG_LLM_MAX_CONCURRENCY Groq calls run at
+# once over a keep-alive pool of as many connections; calls are paced to
+# RAG_LLM_REQUESTS_PER_MINUTE / RAG_LLM_TOKENS_PER_MINUTE when set (0, the
+# default, disables pacing; set your account's limits, e.g. 30 and 12000 on
+# Groq's free tier, see .env.example). Failed attempts are retried up to
+# RAG_LLM_MAX_RETRIES times with jittered exponential backoff starting at
+# RAG_LLM_BACKOFF_BASE seconds. Each attempt may take RAG_LLM_TIMEOUT seconds
+# and the whole call RAG_LLM_DEADLINE, after which the request gets a 503.
+# GROQ_BASE_URL points the client elsewhere, e.g. benchmarks/fake_llm_server.py.
+RAG_LLM_BASE_URL = os.getenv('GROQ_BASE_URL', '')
+RAG_LLM_MAX_CONCURRENCY = int(os.getenv('RAG_LLM_MAX_CONCURRENCY', '8'))
+RAG_LLM_REQUESTS_PER_MINUTE = float(os.getenv('RAG_LLM_REQUESTS_PER_MINUTE', '0'))
+RAG_LLM_TOKENS_PER_MINUTE = float(os.getenv('RAG_LLM_TOKENS_PER_MINUTE', '0'))
+RAG_LLM_MAX_RETRIES = int(os.getenv('RAG_LLM_MAX_RETRIES', '3'))
+RAG_LLM_BACKOFF_BASE = float(os.getenv('RAG_LLM_BACKOFF_BASE', '0.5'))
+RAG_LLM_BACKOFF_MAX = float(os.getenv('RAG_LLM_BACKOFF_MAX', '8'))
+RAG_LLM_TIMEOUT = float(os.getenv('RAG_LLM_TIMEOUT', '20'))
+RAG_LLM_DEADLINE = float(os.getenv('RAG_LLM_DEADLINE', '30'))
+
+# Answer generation backend (api.generators): 'groq' (default, through the
+# LLM gateway above), 'local' (an OpenAI-compatible server such as
+# llama.cpp's llama-server running a GGUF model on CPU, Ollama or vLLM at
+# RAG_LOCAL_LLM_URL, at most RAG_LOCAL_LLM_MAX_CONCURRENCY calls at once) or
+# 'fake' (deterministic offline answers for load tests and CI benchmarks:
+# RAG_FAKE_LLM_LATENCY_MS to the first token, then
+# RAG_FAKE_LLM_TOKENS_PER_SECOND for RAG_FAKE_LLM_ANSWER_TOKENS words).
+RAG_GENERATOR_BACKEND = os.getenv('RAG_GENERATOR_BACKEND', 'groq')
+RAG_LOCAL_LLM_URL = os.getenv('RAG_LOCAL_LLM_URL', 'http://127.0.0.1:8080/v1')
+RAG_LOCAL_LLM_MODEL = os.getenv('RAG_LOCAL_LLM_MODEL', 'local')
+RAG_LOCAL_LLM_API_KEY = os.getenv('RAG_LOCAL_LLM_API_KEY', '')
+RAG_LOCAL_LLM_MAX_CONCURRENCY = int(os.getenv('RAG_LOCAL_LLM_MAX_CONCURRENCY', '2'))
+RAG_LOCAL_LLM_TIMEOUT = float(os.getenv('RAG_LOCAL_LLM_TIMEOUT', '120'))
+RAG_FAKE_LLM_LATENCY_MS = float(os.getenv('RAG_FAKE_LLM_LATENCY_MS', '200'))
+RAG_FAKE_LLM_TOKENS_PER_SECOND = float(os.getenv('RAG_FAKE_LLM_TOKENS_PER_SECOND', '50'))
+RAG_FAKE_LLM_ANSWER_TOKENS = int(os.getenv('RAG_FAKE_LLM_ANSWER_TOKENS', '80'))
+
+# Emit each question as OpenTelemetry spans (rag.request with one child per
+# stage, see api.metrics). Needs opentelemetry-api plus an SDK/exporter
+# configured by the deployment; ignored when the package is missing.
+RAG_TRACING = os.getenv('RAG_TRACING', 'false').lower() == 'true'
+
+# Embedding runtime (api.embeddings): 'torch' (SentenceTransformer) or 'onnx'
+# (ONNX Runtime, no PyTorch import: smaller workers, faster start-up on
+# CPU-only nodes). Export the model first with
+# `python manage.py export_onnx_embedder` (needs sentence_transformers once,
+# on any machine); RAG_ONNX_QUANTIZED picks the int8 export.
+# RAG_ONNX_THREADS caps ONNX Runtime threads per worker (0: one per core).
+RAG_EMBEDDING_RUNTIME = os.getenv('RAG_EMBEDDING_RUNTIME', 'torch')
+RAG_ONNX_MODEL_DIR = os.getenv('RAG_ONNX_MODEL_DIR', str(BASE_DIR / 'onnx_model'))
+RAG_ONNX_QUANTIZED = os.getenv('RAG_ONNX_QUANTIZED', 'false').lower() == 'true'
+RAG_ONNX_THREADS = int(os.getenv('RAG_ONNX_THREADS', '0'))
+
+# Pre-fork serving (gunicorn -c gunicorn.conf.py, which sets this): wsgi.py
+# loads the PyTorch model, numpy index and BM25 index once in the gunicorn
+# master (rag.prepare_for_fork) and workers inherit them copy-on-write
+# instead of loading their own copies. Per-process handles (ChromaDB,
+# SQLite, HTTP clients, ONNX sessions) are opened by each worker.
+RAG_PREFORK = os.getenv('RAG_PREFORK', 'false').lower() == 'true'
+
+# Where embedding and search run: 'local' (in each web worker) or 'service'
+# (a separate `python manage.py run_retrieval_service` process owning the
+# model and indexes, reached over the Unix socket RAG_RETRIEVAL_SOCKET).
+# RAG_RETRIEVAL_TIMEOUT bounds each request to the service, in seconds.
+RAG_RETRIEVAL_MODE = os.getenv('RAG_RETRIEVAL_MODE', 'local')
+RAG_RETRIEVAL_SOCKET = os.getenv('RAG_RETRIEVAL_SOCKET', str(BASE_DIR / 'retrieval.sock'))
+RAG_RETRIEVAL_TIMEOUT = float(os.getenv('RAG_RETRIEVAL_TIMEOUT', '10'))
+
+# Exact-match fast path: a question whose normalized form (case, punctuation,
+# whitespace and common abbreviations, see api.normalization) equals a FAQ
+# question is answered with that FAQ's curated answer, skipping embedding,
+# vector search and the LLM. Normalized questions shorter than
+# RAG_EXACT_MATCH_MIN_WORDS words always go through retrieval.
+RAG_EXACT_MATCH = os.getenv('RAG_EXACT_MATCH', 'true').lower() == 'true'
+RAG_EXACT_MATCH_MIN_WORDS = int(os.getenv('RAG_EXACT_MATCH_MIN_WORDS', '3'))
+
+# Category-aware retrieval: requests may send "category" (a name or a list)
+# to search only those FAQ categories, or "auto" to let a nearest-centroid
+# classifier over the indexed categories pick one. With RAG_CATEGORY_AUTO
+# every unfiltered question is routed that way. The classifier only routes
+# when its best category beats the runner-up by RAG_CATEGORY_MIN_MARGIN
+# (cosine similarity); otherwise all categories are searched.
+RAG_CATEGORY_AUTO = os.getenv('RAG_CATEGORY_AUTO', 'false').lower() == 'true'
+RAG_CATEGORY_MIN_MARGIN = float(os.getenv('RAG_CATEGORY_MIN_MARGIN', '0.05'))
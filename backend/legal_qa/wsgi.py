@@ -4,8 +4,19 @@ WSGI config for legal_qa project.
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'legal_qa.settings')
 
 application = get_wsgi_application()
+
+if settings.RAG_PREFORK:
+    # Imported in the gunicorn master (preload_app): load only what the
+    # workers can share; gunicorn.conf.py's post_fork hook does the rest
+    from api import rag
+    rag.prepare_for_fork()
+elif settings.RAG_WARMUP_ON_STARTUP:
+    # Load the embedding model and clients before serving the first request
+    from api import rag
+    rag.warm_up()
@@ -5,23 +5,37 @@ import { Button } from './ui/button'
 import { Badge } from './ui/badge'
 import { getLogs, getStats } from '../services/api'
 
+// Hover text breaking processing time down by pipeline stage
+const stageTimesTitle = (stageTimes) =>
+  Object.entries(stageTimes || {})
+    .filter(([, seconds]) => seconds != null)
+    .map(([stage, seconds]) => `${stage}: ${Math.round(seconds * 1000)}ms`)
+    .join(', ') || undefined
+
 export function LogsViewer({ isOpen, onClose }) {
   const [logs, setLogs] = useState([])
   const [stats, setStats] = useState(null)
   const [loading, setLoading] = useState(false)
   const [page, setPage] = useState(0)
   const [totalCount, setTotalCount] = useState(0)
+  // cursors[n] is the cursor of page n (null for the first page)
+  const [cursors, setCursors] = useState([null])
   const limit = 20
 
   const fetchLogs = async () => {
     setLoading(true)
     try {
       const [logsData, statsData] = await Promise.all([
-        getLogs({ limit, offset: page * limit }),
+        getLogs({ limit, cursor: cursors[page] || undefined, count: 'approx' }),
         getStats()
       ])
       setLogs(logsData.logs)
       setTotalCount(logsData.count)
+      setCursors(prev => {
+        const next = prev.slice(0, page + 1)
+        if (logsData.next_cursor) next.push(logsData.next_cursor)
+        return next
+      })
       setStats(statsData)
     } catch (error) {
       console.error('Error fetching logs:', error)
@@ -47,6 +61,7 @@ export function LogsViewer({ isOpen, onClose }) {
   }
 
   const totalPages = Math.ceil(totalCount / limit)
+  const hasNextPage = cursors.length > page + 1
 
   if (!isOpen) return null
 
@@ -164,7 +179,7 @@ export function LogsViewer({ isOpen, onClose }) {
                         </p>
                       </div>
                       <div className="flex flex-col items-end gap-2 flex-shrink-0">
-                        <Badge variant="secondary" className="text-xs">
+                        <Badge variant="secondary" className="text-xs" title={stageTimesTitle(log.stage_times)}>
                           <Clock className="w-3 h-3 mr-1" />
                           {log.processing_time}s
                         </Badge>
@@ -203,13 +218,13 @@ export function LogsViewer({ isOpen, onClose }) {
                   Previous
                 </Button>
                 <span className="text-sm text-muted-foreground px-3">
-                  Page {page + 1} of {totalPages || 1}
+                  Page {page + 1} of {Math.max(totalPages, page + 1)}
                 </span>
                 <Button
                   variant="outline"
                   size="sm"
-                  onClick={() => setPage(p => Math.min(totalPages - 1, p + 1))}
-                  disabled={page >= totalPages - 1 || loading}
+                  onClick={() => setPage(p => p + 1)}
+                  disabled={!hasNextPage || loading}
                   className="gap-1"
                 >
                   Next
@@ -1,5 +1,5 @@
 import React from 'react'
-import { Bot, Clock, Sparkles, MessageSquare } from 'lucide-react'
+import { Bot, Clock, Sparkles, MessageSquare, BadgeCheck } from 'lucide-react'
 import { SourceCard } from './SourceCard'
 import { formatTimestamp } from '../lib/utils'
 import { motion } from 'framer-motion'
@@ -39,6 +39,15 @@ export function MessageBubble({ message, isUser }) {
                 {formatTimestamp(message.timestamp)}
               </p>
             </div>
+            {message.exactMatch && (
+              <div
+                className="flex items-center gap-1.5 px-3 py-1.5 rounded-full bg-primary/10 text-xs font-medium text-primary"
+                title="Your question matched a curated FAQ, so its answer is shown as written"
+              >
+                <BadgeCheck className="w-3.5 h-3.5" />
+                <span>FAQ answer</span>
+              </div>
+            )}
             {message.processingTime && (
               <div className="flex items-center gap-1.5 px-3 py-1.5 rounded-full bg-muted/50 text-xs font-medium text-muted-foreground">
                 <Clock className="w-3.5 h-3.5" />
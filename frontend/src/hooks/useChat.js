@@ -1,5 +1,5 @@
 import { useState } from 'react'
-import { askQuestion } from '../services/api'
+import { askQuestionStream } from '../services/api'
 import { useLocalStorage } from './useLocalStorage'
 
 export function useChat() {
@@ -25,22 +25,42 @@ export function useChat() {
     setLoading(true)
     setError(null)
 
-    try {
-      // Call API
-      const response = await askQuestion(text)
-
-      // Add AI response with user's question attached
-      const aiMessage = {
-        id: Date.now() + 1,
-        text: response.answer,
-        sender: 'ai',
-        timestamp: new Date().toISOString(),
-        sources: response.sources || [],
-        processingTime: response.processing_time,
-        userQuestion: text.trim(), // Attach the user's question
-      }
+    const aiMessageId = Date.now() + 1
+    let aiMessageAdded = false
+    const updateAiMessage = (update) => {
+      setMessages(prev => prev.map(m => (m.id === aiMessageId ? { ...m, ...update(m) } : m)))
+    }
 
-      setMessages(prev => [...prev, aiMessage])
+    try {
+      // Stream the answer: sources arrive first, then answer fragments
+      await askQuestionStream(text, {
+        onSources: (sources) => {
+          // Add AI response with user's question attached
+          const aiMessage = {
+            id: aiMessageId,
+            text: '',
+            sender: 'ai',
+            timestamp: new Date().toISOString(),
+            sources: sources || [],
+            userQuestion: text.trim(), // Attach the user's question
+          }
+          setMessages(prev => [...prev, aiMessage])
+          aiMessageAdded = true
+          setLoading(false)
+        },
+        onToken: (token) => {
+          updateAiMessage(m => ({ text: m.text + token }))
+        },
+        onDone: (data) => {
+          updateAiMessage(() => ({ processingTime: data.processing_time, exactMatch: data.exact_match }))
+        },
+        onError: (errorText) => {
+          // Before the sources there is no answer to append to: show it like a failed request
+          if (!aiMessageAdded) throw new Error(errorText || 'Server error occurred')
+          setError(errorText)
+          updateAiMessage(m => ({ text: m.text ? `${m.text}\n\n${errorText}` : errorText, isError: true }))
+        },
+      })
     } catch (err) {
       console.error('Error sending message:', err)
       setError(err.message || 'Failed to get response. Please try again.')
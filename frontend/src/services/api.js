@@ -48,13 +48,69 @@ api.interceptors.response.use(
 /**
  * Ask a question to the legal AI assistant
  * @param {string} question - The user's question
- * @returns {Promise<Object>} Response with answer, sources, and processing_time
+ * @returns {Promise<Object>} Response with answer, sources, processing_time, cache_hit and exact_match
  */
 export async function askQuestion(question) {
   const response = await api.post('/ask/', { question })
   return response.data
 }
 
+/**
+ * Ask a question and receive the answer as a server-sent event stream
+ * @param {string} question - The user's question
+ * @param {Object} handlers - Event callbacks
+ * @param {Function} handlers.onSources - Called once with the sources array
+ * @param {Function} handlers.onToken - Called with each answer fragment
+ * @param {Function} handlers.onDone - Called with processing_time, time_to_first_token, cache_hit
+ *   and exact_match (the curated FAQ answer was returned as-is)
+ * @param {Function} handlers.onError - Called with the error text if the server fails mid-stream;
+ *   without it the returned promise rejects with that error
+ * @returns {Promise<void>} Resolves when the stream ends
+ */
+export async function askQuestionStream(question, { onSources, onToken, onDone, onError } = {}) {
+  const response = await fetch(`${API_BASE_URL}/ask/stream/`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+    body: JSON.stringify({ question }),
+  })
+  if (!response.ok || !response.body) {
+    const data = await response.json().catch(() => ({}))
+    throw new Error(data.error || 'Server error occurred')
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  try {
+    while (true) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+
+      // Events are separated by a blank line
+      let boundary
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const raw = buffer.slice(0, boundary)
+        buffer = buffer.slice(boundary + 2)
+
+        const event = raw.match(/^event: (.*)$/m)?.[1]
+        const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] || '{}')
+
+        if (event === 'sources') onSources?.(data.sources)
+        else if (event === 'token') onToken?.(data.text)
+        else if (event === 'error') {
+          if (!onError) throw new Error(data.text || 'Server error occurred')
+          onError(data.text)
+        } else if (event === 'done') onDone?.(data)
+      }
+    }
+  } catch (err) {
+    reader.cancel().catch(() => {})
+    throw err
+  }
+}
+
 /**
  * Check if API is healthy
  * @returns {Promise<Object>} Health status
@@ -77,8 +133,10 @@ export async function getStats() {
  * Get query logs with pagination
  * @param {Object} params - Query parameters
  * @param {number} params.limit - Number of logs to return (default: 50)
- * @param {number} params.offset - Pagination offset (default: 0)
- * @returns {Promise<Object>} Logs data with count and logs array
+ * @param {string} params.cursor - next_cursor from the previous page
+ * @param {number} params.offset - Pagination offset, ignored with cursor (default: 0)
+ * @param {string} params.count - 'exact' (default), 'approx' or 'none'
+ * @returns {Promise<Object>} Logs data with count, next_cursor and logs array
  */
 export async function getLogs(params = {}) {
   const response = await api.get('/logs/', { params })